@@ -0,0 +1,132 @@
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from repositorio import (
+    obtener_repositorio,
+    CRITERIO_TODAS,
+    CRITERIO_TIENDA,
+    CRITERIO_SEMANA,
+    CRITERIO_CATEGORIA,
+)
+
+# Atributos que se leen del almacenamiento para el análisis de precisión
+CAMPOS_ANALITICA = (
+    'tienda_id',
+    'categoria_insumo',
+    'semana',
+    'cantidad_estimada',
+    'cantidad_despachada',
+    'cantidad_consumida_real',
+)
+
+DIMENSIONES = {
+    'tienda': 'tienda_id',
+    'categoria': 'categoria_insumo',
+    'semana': 'semana',
+}
+
+
+def cargar_columnas(semana: Optional[str] = None, tienda_id: Optional[str] = None,
+                    categoria: Optional[str] = None) -> Dict[str, np.ndarray]:
+    """
+    Lee el subconjunto pedido desde el índice más selectivo (solo los atributos
+    de CAMPOS_ANALITICA) y lo convierte en columnas de NumPy. Los filtros que
+    el índice no resuelve se aplican como máscaras vectorizadas.
+    """
+    if tienda_id is not None:
+        items = obtener_repositorio().listar_items(CRITERIO_TIENDA, tienda_id, CAMPOS_ANALITICA)
+    elif semana is not None:
+        items = obtener_repositorio().listar_items(CRITERIO_SEMANA, semana, CAMPOS_ANALITICA)
+    elif categoria is not None:
+        items = obtener_repositorio().listar_items(CRITERIO_CATEGORIA, categoria, CAMPOS_ANALITICA)
+    else:
+        items = obtener_repositorio().listar_items(CRITERIO_TODAS, None, CAMPOS_ANALITICA)
+
+    columnas = {
+        'tienda_id': np.array([item['tienda_id'] for item in items], dtype=object),
+        'categoria_insumo': np.array([item['categoria_insumo'] for item in items], dtype=object),
+        'semana': np.array([item['semana'] for item in items], dtype=object),
+        'cantidad_estimada': np.array([item['cantidad_estimada'] for item in items], dtype=np.float64),
+        'cantidad_despachada': np.array([item['cantidad_despachada'] for item in items], dtype=np.float64),
+        'cantidad_consumida_real': np.array([item['cantidad_consumida_real'] for item in items], dtype=np.float64),
+    }
+
+    mascara = np.ones(len(items), dtype=bool)
+    for columna, valor in (('semana', semana), ('tienda_id', tienda_id), ('categoria_insumo', categoria)):
+        if valor is not None:
+            mascara &= columnas[columna] == valor
+    if not mascara.all():
+        columnas = {nombre: valores[mascara] for nombre, valores in columnas.items()}
+    return columnas
+
+
+def _metricas_por_grupo(grupos: np.ndarray, columnas: Dict[str, np.ndarray]) -> List[dict]:
+    """
+    Calcula las métricas de precisión de cada grupo con np.bincount sobre el
+    índice de grupo de cada fila, sin recorrer las filas en Python.
+    """
+    etiquetas, indice = np.unique(grupos, return_inverse=True)
+    cantidad_grupos = len(etiquetas)
+
+    estimada = columnas['cantidad_estimada']
+    despachada = columnas['cantidad_despachada']
+    real = columnas['cantidad_consumida_real']
+
+    def suma(pesos: np.ndarray) -> np.ndarray:
+        return np.bincount(indice, weights=pesos, minlength=cantidad_grupos)
+
+    filas = np.bincount(indice, minlength=cantidad_grupos)
+    total_estimada = suma(estimada)
+    total_despachada = suma(despachada)
+    total_real = suma(real)
+
+    # MAPE: media de |estimada - real| / real, solo en filas con consumo real > 0
+    con_real = real > 0
+    error_relativo = np.zeros_like(real)
+    np.divide(np.abs(estimada - real), real, out=error_relativo, where=con_real)
+    filas_con_real = np.bincount(indice, weights=con_real, minlength=cantidad_grupos)
+    suma_error = suma(error_relativo)
+
+    sobre_despacho = suma(np.maximum(despachada - real, 0))
+    sub_despacho = suma(np.maximum(real - despachada, 0))
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mape = np.where(filas_con_real > 0, suma_error / filas_con_real * 100, np.nan)
+        sesgo = np.where(total_real != 0, (total_estimada - total_real) / total_real * 100, np.nan)
+
+    def redondear(valor: float) -> Optional[float]:
+        return None if np.isnan(valor) else round(float(valor), 4)
+
+    return [
+        {
+            'grupo': str(etiquetas[i]),
+            'filas': int(filas[i]),
+            'total_estimada': round(float(total_estimada[i]), 4),
+            'total_despachada': round(float(total_despachada[i]), 4),
+            'total_consumida_real': round(float(total_real[i]), 4),
+            'mape': redondear(mape[i]),
+            'sesgo': redondear(sesgo[i]),
+            'sobre_despacho': round(float(sobre_despacho[i]), 4),
+            'sub_despacho': round(float(sub_despacho[i]), 4),
+        }
+        for i in range(cantidad_grupos)
+    ]
+
+
+def calcular_precision(columnas: Dict[str, np.ndarray]) -> dict:
+    """Métricas globales y por tienda, categoría y semana"""
+    filas = len(columnas['semana'])
+    total = _metricas_por_grupo(np.zeros(filas, dtype=np.int8), columnas) if filas else []
+    reporte = {'total': total[0] if total else None}
+    for dimension, columna in DIMENSIONES.items():
+        reporte[f'por_{dimension}'] = _metricas_por_grupo(columnas[columna], columnas) if filas else []
+    if reporte['total']:
+        reporte['total']['grupo'] = 'total'
+    return reporte
+
+
+def reporte_precision(semana: Optional[str] = None, tienda_id: Optional[str] = None,
+                      categoria: Optional[str] = None) -> dict:
+    """Carga el subconjunto indicado y calcula su reporte de precisión"""
+    return calcular_precision(cargar_columnas(semana, tienda_id, categoria))
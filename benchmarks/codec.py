@@ -0,0 +1,107 @@
+"""
+Microbenchmark del codec de lectura.
+
+Compara, para N items tal como los devuelve DynamoDB:
+  - actual: _item_to_proyeccion (validación pydantic por fila) y luego la
+    revalidación + serialización que hace FastAPI con response_model
+  - modelos_rapidos: _item_to_proyeccion_rapido (model_construct, sin validar)
+  - json_directo: codificar_json, de items a bytes JSON sin crear modelos
+
+Uso:
+    python benchmarks/codec.py --filas 20000 --repeticiones 5
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from dynamodb_service import DynamoDBService
+from model import ProyeccionInsumo
+
+
+def generar_items(filas: int) -> List[dict]:
+    """Items con la forma que escribe _proyeccion_to_item (cantidades como números, Decimal al leerlas)"""
+    inicio = date(2025, 1, 1)
+    items = []
+    for i in range(filas):
+        fecha = inicio + timedelta(days=i % 365)
+        semana = f"{fecha.isocalendar()[0]}-W{fecha.isocalendar()[1]:02d}"
+        categoria = ("crepas", "waffles", "helados")[i % 3]
+        items.append({
+            'tienda_id': f"T{i % 200:03d}",
+            'fecha_proyeccion_semana': DynamoDBService._fecha_semana(fecha.isoformat(), semana, categoria),
+            'fecha_proyeccion': fecha.isoformat(),
+            'nombre_tienda': f"Salón {i % 200}",
+            'categoria_insumo': categoria,
+            'unidad_medida': "Base de crepe",
+            'cantidad_estimada': Decimal("12.50"),
+            'semana': semana,
+            'origen_modelo': "Modelo_Ventas_2025_v1",
+            'fecha_generacion': "2025-10-01",
+            'estado_proyeccion': "pendiente",
+            'cantidad_despachada': Decimal("11.00"),
+            'cantidad_consumida_real': Decimal("11.80"),
+            'diferencia_vs_real': Decimal("0.70"),
+            'usuario_ajuste': "sistema_autajuste",
+            'fecha_confirmacion': "2025-10-06",
+            'observaciones': "Sobrestimado por evento local",
+        })
+    return items
+
+
+def ruta_actual(items: List[dict]) -> bytes:
+    adaptador = TypeAdapter(List[ProyeccionInsumo])
+    proyecciones = [DynamoDBService._item_to_proyeccion(item) for item in items]
+    # FastAPI valida el resultado contra response_model y luego lo codifica
+    validadas = adaptador.validate_python(proyecciones)
+    return json.dumps(jsonable_encoder(validadas)).encode('utf-8')
+
+
+def ruta_modelos_rapidos(items: List[dict]) -> bytes:
+    adaptador = TypeAdapter(List[ProyeccionInsumo])
+    proyecciones = [DynamoDBService._item_to_proyeccion_rapido(item) for item in items]
+    return adaptador.dump_json(proyecciones)
+
+
+def ruta_json_directo(items: List[dict]) -> bytes:
+    return DynamoDBService.codificar_json(items)
+
+
+def medir(funcion, items: List[dict], repeticiones: int) -> float:
+    mejores = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion(items)
+        mejores.append(time.perf_counter() - inicio)
+    return min(mejores)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmark del codec de lectura")
+    parser.add_argument("--filas", type=int, default=20000)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    items = generar_items(args.filas)
+    assert json.loads(ruta_actual(items[:50])) == json.loads(ruta_json_directo(items[:50]))
+
+    base = None
+    for nombre, funcion in (("actual", ruta_actual),
+                            ("modelos_rapidos", ruta_modelos_rapidos),
+                            ("json_directo", ruta_json_directo)):
+        segundos = medir(funcion, items, args.repeticiones)
+        base = base or segundos
+        print(f"{nombre:16s} {segundos * 1000:9.1f} ms  {args.filas / segundos:12,.0f} filas/s  x{base / segundos:5.1f}")
+
+
+if __name__ == "__main__":
+    main()
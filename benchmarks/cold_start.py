@@ -0,0 +1,119 @@
+"""
+Benchmark de arranque en frío del handler de Lambda (main.handler).
+
+Cada repetición corre en un proceso Python nuevo y mide:
+  - importacion_ms: tiempo de "import main"
+  - primera_respuesta_ms: primera invocación del handler (incluye la carga diferida)
+  - segunda_respuesta_ms: una invocación warm posterior
+
+Uso:
+    python benchmarks/cold_start.py --repeticiones 10 --ruta /proyecciones/cache/metricas
+    python benchmarks/cold_start.py --salida resultados.json --max-total-ms 1500
+
+Con --max-total-ms el proceso termina con código 1 si la mediana de
+importación + primera respuesta supera el presupuesto, para detectar regresiones.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCRIPT_MEDICION = r"""
+import json, sys, time
+sys.path.insert(0, {raiz!r})
+t0 = time.perf_counter()
+import main
+t1 = time.perf_counter()
+evento = {{
+    "version": "2.0",
+    "routeKey": "$default",
+    "rawPath": {ruta!r},
+    "rawQueryString": "",
+    "headers": {{"host": "localhost", "accept": "application/json"}},
+    "requestContext": {{
+        "accountId": "000000000000",
+        "apiId": "benchmark",
+        "domainName": "localhost",
+        "domainPrefix": "benchmark",
+        "http": {{"method": "GET", "path": {ruta!r}, "protocol": "HTTP/1.1",
+                  "sourceIp": "127.0.0.1", "userAgent": "cold-start-benchmark"}},
+        "requestId": "benchmark",
+        "routeKey": "$default",
+        "stage": "$default",
+        "time": "01/Jan/2025:00:00:00 +0000",
+        "timeEpoch": 0
+    }},
+    "isBase64Encoded": False
+}}
+respuesta = main.handler(evento, None)
+t2 = time.perf_counter()
+main.handler(evento, None)
+t3 = time.perf_counter()
+print(json.dumps({{
+    "importacion_ms": (t1 - t0) * 1000,
+    "primera_respuesta_ms": (t2 - t1) * 1000,
+    "segunda_respuesta_ms": (t3 - t2) * 1000,
+    "status": respuesta["statusCode"],
+}}))
+"""
+
+
+def medir(ruta: str) -> dict:
+    """Ejecuta una medición en un proceso nuevo"""
+    entorno = dict(os.environ)
+    entorno.setdefault("AWS_ACCESS_KEY_ID", "benchmark")
+    entorno.setdefault("AWS_SECRET_ACCESS_KEY", "benchmark")
+    salida = subprocess.run(
+        [sys.executable, "-c", SCRIPT_MEDICION.format(raiz=RAIZ, ruta=ruta)],
+        capture_output=True, text=True, check=True, env=entorno, cwd=RAIZ
+    )
+    return json.loads(salida.stdout.strip().splitlines()[-1])
+
+
+def percentil(valores, p: float) -> float:
+    ordenados = sorted(valores)
+    indice = min(len(ordenados) - 1, max(0, round(p / 100 * (len(ordenados) - 1))))
+    return ordenados[indice]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de arranque en frío del handler")
+    parser.add_argument("--repeticiones", type=int, default=10)
+    parser.add_argument("--ruta", default="/proyecciones/cache/metricas",
+                        help="Ruta GET a invocar (por defecto una que no accede a DynamoDB)")
+    parser.add_argument("--salida", help="Archivo JSON donde guardar el resultado")
+    parser.add_argument("--max-total-ms", type=float,
+                        help="Presupuesto para la mediana de importación + primera respuesta")
+    args = parser.parse_args()
+
+    # Una ejecución previa compila los .pyc para no medir la compilación
+    medir(args.ruta)
+    mediciones = [medir(args.ruta) for _ in range(args.repeticiones)]
+
+    resumen = {"ruta": args.ruta, "repeticiones": args.repeticiones, "status": mediciones[-1]["status"]}
+    for metrica in ("importacion_ms", "primera_respuesta_ms", "segunda_respuesta_ms"):
+        valores = [m[metrica] for m in mediciones]
+        resumen[metrica] = {
+            "p50": round(statistics.median(valores), 2),
+            "p95": round(percentil(valores, 95), 2),
+            "min": round(min(valores), 2),
+        }
+    total = statistics.median(m["importacion_ms"] + m["primera_respuesta_ms"] for m in mediciones)
+    resumen["total_p50_ms"] = round(total, 2)
+
+    print(json.dumps(resumen, indent=2))
+    if args.salida:
+        with open(args.salida, "w") as f:
+            json.dump(resumen, f, indent=2)
+
+    if args.max_total_ms is not None and total > args.max_total_ms:
+        print(f"Regresión: {total:.1f} ms supera el presupuesto de {args.max_total_ms:.1f} ms", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,354 @@
+"""
+Benchmark de carga de los endpoints de /proyecciones y del codec de items.
+
+Corre sin red: con --backend dynamodb (por defecto) la tabla es un DynamoDB
+simulado en el propio proceso con moto; con --backend memoria se usa
+RepositorioMemoria. Antes de medir se cargan tiendas x días (las semanas
+salen de los días) con cantidades aleatorias reproducibles. La clave primaria
+admite una fila por tienda y fecha, así que las categorías se reparten entre
+los días de cada tienda.
+
+Para cada endpoint se hacen --repeticiones peticiones (repartidas entre
+--concurrencia hilos) y se informa la latencia p50/p95/p99, peticiones/s y
+filas/s (filas devueltas, o escritas en las rutas de escritura). Para
+_item_to_proyeccion, _item_to_proyeccion_rapido, _proyeccion_to_item y
+codificar_json se mide cada conversión por separado.
+
+El resultado se guarda en JSON (por defecto en benchmarks/resultados/) y con
+--comparar se muestra la variación frente a una ejecución anterior.
+
+Uso:
+    python benchmarks/endpoints.py
+    python benchmarks/endpoints.py --tiendas 100 --dias 56 --repeticiones 200 --concurrencia 4
+    python benchmarks/endpoints.py --backend memoria --comparar benchmarks/resultados/base.json
+    python benchmarks/endpoints.py --solo listar_tienda,resumen_total
+
+Requiere las dependencias de requirements-dev.txt (moto y httpx).
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Callable, Dict, List, Optional, Tuple
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from cold_start import percentil
+
+CATEGORIAS = ("crepas", "waffles", "helados", "bebidas", "salsas", "toppings", "frutas", "empaques")
+INICIO = date(2025, 9, 1)
+
+
+class Escenario:
+    """Una petición parametrizada por el número de repetición"""
+
+    def __init__(self, nombre: str, metodo: str, ruta: Callable[[int], str],
+                 cuerpo: Optional[Callable[[int], dict]] = None, repeticiones: Optional[int] = None,
+                 filas_escritas: Optional[Callable[[dict], int]] = None):
+        self.nombre = nombre
+        self.metodo = metodo
+        self.ruta = ruta
+        self.cuerpo = cuerpo
+        self.repeticiones = repeticiones
+        self.filas_escritas = filas_escritas
+
+
+def _semana(fecha: date) -> str:
+    anio, numero, _ = fecha.isocalendar()
+    return f"{anio}-W{numero:02d}"
+
+
+def fila_sintetica(tienda: int, categoria: str, fecha: date, aleatorio: random.Random) -> dict:
+    estimada = Decimal(aleatorio.randint(500, 3000)) / 100
+    real = (estimada * Decimal(aleatorio.uniform(0.7, 1.3))).quantize(Decimal("0.01"))
+    return {
+        'fecha_proyeccion': fecha.isoformat(),
+        'tienda_id': f"T{tienda:03d}",
+        'nombre_tienda': f"Salón {tienda:03d}",
+        'categoria_insumo': categoria,
+        'unidad_medida': "unidad",
+        'cantidad_estimada': str(estimada),
+        'semana': _semana(fecha),
+        'origen_modelo': "Benchmark_v1",
+        'fecha_generacion': (fecha - timedelta(days=7)).isoformat(),
+        'estado_proyeccion': "confirmada",
+        'cantidad_despachada': str((estimada * Decimal("0.95")).quantize(Decimal("0.01"))),
+        'cantidad_consumida_real': str(real),
+        'diferencia_vs_real': str(estimada - real),
+        'usuario_ajuste': "benchmark",
+        'fecha_confirmacion': (fecha + timedelta(days=1)).isoformat(),
+        'observaciones': None,
+    }
+
+
+def preparar_backend(backend: str):
+    """Configura el backend antes de importar el router; devuelve el mock de moto (o None)"""
+    os.environ["BACKEND_ALMACENAMIENTO"] = backend
+    simulacion = None
+    if backend == "dynamodb":
+        os.environ.setdefault("AWS_ACCESS_KEY_ID", "benchmark")
+        os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "benchmark")
+        # moto no aplica la capacidad provisionada; limitar a 5 WCU solo mediría esperas
+        os.environ.setdefault("ESCRITURA_WCU", "0")
+        from moto import mock_aws
+        simulacion = mock_aws()
+        simulacion.start()
+        import config
+        config.create_table_if_not_exists()
+    return simulacion
+
+
+def sembrar(tiendas: int, categorias: int, dias: int, semilla: int) -> Tuple[int, float]:
+    """Carga los datos con el repositorio configurado; devuelve (filas, segundos)"""
+    from model import ProyeccionInsumo
+    from repositorio import obtener_repositorio
+
+    aleatorio = random.Random(semilla)
+    proyecciones = (
+        ProyeccionInsumo(**fila_sintetica(tienda, CATEGORIAS[(tienda + dia) % categorias],
+                                          INICIO + timedelta(days=dia), aleatorio))
+        for tienda in range(tiendas)
+        for dia in range(dias)
+    )
+    inicio = time.perf_counter()
+    errores = [error for _, error in obtener_repositorio().crear_proyecciones_lote(proyecciones) if error]
+    if errores:
+        raise RuntimeError(f"{len(errores)} filas no se pudieron cargar: {errores[0]}")
+    return tiendas * dias, time.perf_counter() - inicio
+
+
+def escenarios(tiendas: int, categorias: int, dias: int, semilla: int) -> List[Escenario]:
+    semanas = sorted({_semana(INICIO + timedelta(days=dia)) for dia in range(dias)})
+    tienda = lambda i: f"T{i % tiendas:03d}"
+    semana = lambda i: semanas[i % len(semanas)]
+    categoria = lambda i: CATEGORIAS[i % categorias]
+    fecha = lambda i: (INICIO + timedelta(days=i % dias)).isoformat()
+    aleatorio = random.Random(semilla + 1)
+    nueva = lambda i: fila_sintetica(tiendas + i, categoria(i), INICIO, aleatorio)
+    lote = lambda i: [fila_sintetica(tiendas + 10000 + i, categoria(d), INICIO + timedelta(days=d), aleatorio)
+                      for d in range(dias)]
+    hasta = lambda i: (INICIO + timedelta(days=min(dias - 1, i % dias + 6))).isoformat()
+    # Cada eliminación borra un par (tienda, semana) distinto para no medir borrados vacíos
+    pares = [(t, s) for s in range(len(semanas)) for t in range(tiendas)]
+
+    return [
+        Escenario("registrar", "POST", lambda i: "/proyecciones/registrar", nueva,
+                  filas_escritas=lambda respuesta: 1),
+        Escenario("registrar_lote", "POST", lambda i: "/proyecciones/registrar-lote", lote, repeticiones=20,
+                  filas_escritas=lambda respuesta: respuesta['exitosas']),
+        Escenario("listar_pagina", "GET", lambda i: "/proyecciones/listar?limit=100"),
+        Escenario("listar_tienda", "GET", lambda i: f"/proyecciones/listar/{tienda(i)}"),
+        Escenario("listar_tienda_rango", "GET",
+                  lambda i: f"/proyecciones/listar/{tienda(i)}/rango?desde={fecha(i)}&hasta={hasta(i)}"),
+        Escenario("listar_tienda_semana", "GET", lambda i: f"/proyecciones/listar/{tienda(i)}/semana/{semana(i)}"),
+        Escenario("semana", "GET", lambda i: f"/proyecciones/semana/{semana(i)}"),
+        Escenario("semana_ndjson", "GET", lambda i: f"/proyecciones/semana/{semana(i)}?formato=ndjson"),
+        Escenario("semana_categoria", "GET", lambda i: f"/proyecciones/semana/{semana(i)}/categoria/{categoria(i)}"),
+        Escenario("semana_desviaciones", "GET", lambda i: f"/proyecciones/semana/{semana(i)}/desviaciones?minima=3"),
+        Escenario("categoria", "GET", lambda i: f"/proyecciones/categoria/{categoria(i)}", repeticiones=20),
+        Escenario("resumen_total", "GET", lambda i: f"/proyecciones/resumen/{semana(i)}/total"),
+        Escenario("resumen_semana", "GET", lambda i: f"/proyecciones/resumen/{semana(i)}"),
+        Escenario("analitica_precision", "GET", lambda i: f"/proyecciones/analitica/precision?semana={semana(i)}",
+                  repeticiones=20),
+        Escenario("actualizar_parcial", "PATCH",
+                  lambda i: f"/proyecciones/actualizar/{tienda(i)}/{fecha(i)}/{_semana(date.fromisoformat(fecha(i)))}",
+                  lambda i: {'cantidad_estimada': str(10 + i % 20)}, filas_escritas=lambda respuesta: 1),
+        Escenario("eliminar", "DELETE",
+                  lambda i: f"/proyecciones/eliminar/{tienda(pares[i][0])}/{semanas[pares[i][1]]}",
+                  repeticiones=min(50, len(pares) - 1),
+                  filas_escritas=lambda respuesta: int(respuesta['mensaje'].split()[0])),
+    ]
+
+
+def filas_respuesta(respuesta) -> int:
+    """Filas devueltas: elementos de la lista, de la página o líneas NDJSON"""
+    if respuesta.headers.get('content-type', '').startswith('application/x-ndjson'):
+        return respuesta.content.count(b"\n")
+    cuerpo = respuesta.json()
+    if isinstance(cuerpo, list):
+        return len(cuerpo)
+    if isinstance(cuerpo, dict) and isinstance(cuerpo.get('items'), list):
+        return len(cuerpo['items'])
+    return 1
+
+
+def estadisticas(latencias: List[float], segundos: float, peticiones: int, filas: int) -> dict:
+    return {
+        'peticiones': peticiones,
+        'p50_ms': round(percentil(latencias, 50) * 1000, 3),
+        'p95_ms': round(percentil(latencias, 95) * 1000, 3),
+        'p99_ms': round(percentil(latencias, 99) * 1000, 3),
+        'peticiones_s': round(peticiones / segundos, 1),
+        'filas': filas,
+        'filas_s': round(filas / segundos, 1),
+    }
+
+
+def medir_escenario(cliente, escenario: Escenario, repeticiones: int, concurrencia: int) -> dict:
+    repeticiones = min(repeticiones, escenario.repeticiones or repeticiones)
+
+    def peticion(i: int) -> Tuple[float, int]:
+        inicio = time.perf_counter()
+        respuesta = cliente.request(escenario.metodo, escenario.ruta(i),
+                                    json=escenario.cuerpo(i) if escenario.cuerpo else None)
+        latencia = time.perf_counter() - inicio
+        if respuesta.status_code >= 400:
+            raise RuntimeError(f"{escenario.nombre}: {escenario.metodo} {escenario.ruta(i)} "
+                               f"devolvió {respuesta.status_code}: {respuesta.text[:200]}")
+        if escenario.filas_escritas:
+            return latencia, escenario.filas_escritas(respuesta.json())
+        return latencia, filas_respuesta(respuesta)
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrencia) as executor:
+        resultados = list(executor.map(peticion, range(repeticiones)))
+    segundos = time.perf_counter() - inicio
+    return estadisticas([latencia for latencia, _ in resultados], segundos, repeticiones,
+                        sum(filas for _, filas in resultados))
+
+
+def medir_codec(filas: int, semilla: int) -> Dict[str, dict]:
+    """Latencia por conversión de los codecs de DynamoDBService"""
+    from dynamodb_service import DynamoDBService
+    from model import ProyeccionInsumo
+
+    aleatorio = random.Random(semilla)
+    proyecciones = [ProyeccionInsumo(**fila_sintetica(i % 200, CATEGORIAS[i % 8], INICIO + timedelta(days=i % 90),
+                                                      aleatorio))
+                    for i in range(filas)]
+    items = [DynamoDBService._proyeccion_to_item(proyeccion) for proyeccion in proyecciones]
+
+    resultados = {}
+    for nombre, funcion, entradas in (
+        ("_proyeccion_to_item", DynamoDBService._proyeccion_to_item, proyecciones),
+        ("_item_to_proyeccion", DynamoDBService._item_to_proyeccion, items),
+        ("_item_to_proyeccion_rapido", DynamoDBService._item_to_proyeccion_rapido, items),
+        ("codificar_json", lambda item: DynamoDBService.codificar_json((item,)), items),
+    ):
+        latencias = []
+        inicio = time.perf_counter()
+        for entrada in entradas:
+            t0 = time.perf_counter()
+            funcion(entrada)
+            latencias.append(time.perf_counter() - t0)
+        segundos = time.perf_counter() - inicio
+        medida = estadisticas(latencias, segundos, filas, filas)
+        resultados[nombre] = {
+            'filas': filas,
+            'p50_us': round(percentil(latencias, 50) * 1e6, 2),
+            'p95_us': round(percentil(latencias, 95) * 1e6, 2),
+            'p99_us': round(percentil(latencias, 99) * 1e6, 2),
+            'filas_s': medida['filas_s'],
+        }
+    return resultados
+
+
+def commit_actual() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True, cwd=RAIZ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def comparar(actual: dict, anterior: dict):
+    """Imprime la variación de p50/p95 y filas/s frente a una ejecución anterior"""
+    print(f"\nComparación con {anterior.get('fecha')} ({anterior.get('commit')}):")
+    for seccion, metricas in (('endpoints', ('p50_ms', 'p95_ms', 'filas_s')),
+                              ('codec', ('p50_us', 'p95_us', 'filas_s'))):
+        for nombre, medida in actual[seccion].items():
+            base = anterior.get(seccion, {}).get(nombre)
+            if not base:
+                continue
+            variaciones = []
+            for metrica in metricas:
+                if base.get(metrica):
+                    variaciones.append(f"{metrica} {(medida[metrica] - base[metrica]) / base[metrica] * 100:+6.1f}%")
+            print(f"  {nombre:28s} " + "  ".join(variaciones))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de los endpoints de proyecciones")
+    parser.add_argument("--backend", choices=["dynamodb", "memoria"], default="dynamodb",
+                        help="dynamodb: DynamoDB simulado con moto en el proceso; memoria: RepositorioMemoria")
+    parser.add_argument("--tiendas", type=int, default=50)
+    parser.add_argument("--categorias", type=int, default=4, choices=range(1, len(CATEGORIAS) + 1),
+                        metavar=f"1..{len(CATEGORIAS)}")
+    parser.add_argument("--dias", type=int, default=28, help="Días de datos desde el 2025-09-01")
+    parser.add_argument("--repeticiones", type=int, default=100, help="Peticiones por endpoint")
+    parser.add_argument("--concurrencia", type=int, default=1, help="Hilos que envían peticiones a la vez")
+    parser.add_argument("--filas-codec", type=int, default=20000, help="Conversiones medidas por codec")
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--solo", help="Endpoints a medir separados por coma (por defecto todos)")
+    parser.add_argument("--salida", help="Archivo JSON del resultado (por defecto benchmarks/resultados/<fecha>.json)")
+    parser.add_argument("--comparar", help="Resultado JSON anterior con el que comparar")
+    args = parser.parse_args()
+
+    simulacion = preparar_backend(args.backend)
+    try:
+        from fastapi import FastAPI
+        from fastapi.testclient import TestClient
+        from proyecciones import router
+
+        app = FastAPI()
+        app.include_router(router)
+        cliente = TestClient(app)
+
+        filas, segundos = sembrar(args.tiendas, args.categorias, args.dias, args.semilla)
+        print(f"Carga inicial: {filas} filas en {segundos:.1f} s ({filas / segundos:,.0f} filas/s), "
+              f"backend {args.backend}")
+
+        seleccion = set(args.solo.split(",")) if args.solo else None
+        resultados = {}
+        for escenario in escenarios(args.tiendas, args.categorias, args.dias, args.semilla):
+            if seleccion and escenario.nombre not in seleccion:
+                continue
+            # Una petición previa (con el último parámetro, que no se repite
+            # al medir) carga los módulos diferidos y no se mide
+            cliente.request(escenario.metodo, escenario.ruta(-1),
+                            json=escenario.cuerpo(-1) if escenario.cuerpo else None)
+            medida = medir_escenario(cliente, escenario, args.repeticiones, args.concurrencia)
+            resultados[escenario.nombre] = medida
+            print(f"{escenario.nombre:22s} p50 {medida['p50_ms']:8.2f} ms  p95 {medida['p95_ms']:8.2f} ms  "
+                  f"p99 {medida['p99_ms']:8.2f} ms  {medida['peticiones_s']:8.1f} req/s  "
+                  f"{medida['filas_s']:10,.0f} filas/s")
+    finally:
+        if simulacion:
+            simulacion.stop()
+
+    codec = medir_codec(args.filas_codec, args.semilla)
+    for nombre, medida in codec.items():
+        print(f"{nombre:28s} p50 {medida['p50_us']:7.1f} us  p95 {medida['p95_us']:7.1f} us  "
+              f"p99 {medida['p99_us']:7.1f} us  {medida['filas_s']:12,.0f} filas/s")
+
+    resultado = {
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'commit': commit_actual(),
+        'python': platform.python_version(),
+        'parametros': {**vars(args), 'filas_iniciales': filas},
+        'carga_inicial_s': round(segundos, 3),
+        'endpoints': resultados,
+        'codec': codec,
+    }
+    salida = args.salida or os.path.join(RAIZ, "benchmarks", "resultados",
+                                         f"{datetime.now():%Y%m%d-%H%M%S}-{args.backend}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(salida)), exist_ok=True)
+    with open(salida, "w") as f:
+        json.dump(resultado, f, indent=2)
+    print(f"\nResultado guardado en {salida}")
+
+    if args.comparar:
+        with open(args.comparar) as f:
+            comparar(resultado, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+
+class CacheTTL:
+    """
+    Cache en memoria del proceso, acotada por número de entradas (LRU)
+    y con expiración por TTL. Es segura para hilos.
+
+    Las cargas concurrentes de una misma clave se agrupan (single-flight):
+    solo el primer hilo ejecuta cargar() y los demás esperan su resultado o
+    su excepción. Funciona aunque la cache esté desactivada (max_entradas 0).
+    """
+
+    def __init__(self, max_entradas: int, ttl_segundos: float):
+        self.max_entradas = max_entradas
+        self.ttl_segundos = ttl_segundos
+        self._entradas: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        # Generación por clave: una carga iniciada antes de una invalidación no
+        # debe guardar su resultado, porque podría ser anterior a la escritura.
+        # Solo se lleva mientras la clave tiene cargas en curso (contadas en
+        # _cargas), así no crece con cada clave consultada alguna vez
+        self._generaciones: Dict[Hashable, int] = {}
+        self._cargas: Dict[Hashable, int] = {}
+        # Cargas en curso por (clave, generación): tras una invalidación, una
+        # petición nueva no se une a la carga anterior a la escritura
+        self._en_curso: Dict[Tuple[Hashable, int], Future] = {}
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.agrupadas = 0
+        self.expiradas = 0
+        self.desalojos = 0
+        self.invalidaciones = 0
+
+    def obtener_o_cargar(self, clave: Hashable, cargar: Callable[[], Any]) -> Any:
+        """
+        Devuelve el valor en cache o lo carga con cargar() y lo guarda; si otra
+        carga de la misma clave está en curso, espera su resultado
+        """
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is not None:
+                expira, valor = entrada
+                if expira > time.monotonic():
+                    self._entradas.move_to_end(clave)
+                    self.aciertos += 1
+                    return valor
+                del self._entradas[clave]
+                self.expiradas += 1
+            generacion = self._generaciones.get(clave, 0)
+            vuelo = self._en_curso.get((clave, generacion))
+            propio = vuelo is None
+            if propio:
+                self.fallos += 1
+                vuelo = self._en_curso[(clave, generacion)] = Future()
+                self._cargas[clave] = self._cargas.get(clave, 0) + 1
+            else:
+                self.agrupadas += 1
+
+        if not propio:
+            return vuelo.result()
+
+        try:
+            valor = cargar()
+        except BaseException as e:
+            with self._lock:
+                self._terminar_carga(clave, generacion)
+            vuelo.set_exception(e)
+            raise
+
+        with self._lock:
+            if self._generaciones.get(clave, 0) == generacion and self.max_entradas > 0:
+                self._entradas[clave] = (time.monotonic() + self.ttl_segundos, valor)
+                self._entradas.move_to_end(clave)
+                while len(self._entradas) > self.max_entradas:
+                    self._entradas.popitem(last=False)
+                    self.desalojos += 1
+            self._terminar_carga(clave, generacion)
+        vuelo.set_result(valor)
+        return valor
+
+    def _terminar_carga(self, clave: Hashable, generacion: int):
+        """Da de baja una carga (con el lock tomado); sin cargas en curso, la clave olvida su generación"""
+        del self._en_curso[(clave, generacion)]
+        self._cargas[clave] -= 1
+        if not self._cargas[clave]:
+            del self._cargas[clave]
+            self._generaciones.pop(clave, None)
+
+    def invalidar(self, *claves: Hashable):
+        """Elimina las claves indicadas"""
+        with self._lock:
+            for clave in claves:
+                if clave in self._cargas:
+                    self._generaciones[clave] = self._generaciones.get(clave, 0) + 1
+                if self._entradas.pop(clave, None) is not None:
+                    self.invalidaciones += 1
+
+    def invalidar_si(self, condicion: Callable[[Hashable], bool]):
+        """Elimina todas las claves (en cache o cargándose) que cumplen la condición"""
+        with self._lock:
+            claves = {clave for clave in self._entradas if condicion(clave)}
+            claves.update(clave for clave in self._cargas if condicion(clave))
+        self.invalidar(*claves)
+
+    def metricas(self) -> Dict[str, int]:
+        """Contadores de uso de la cache"""
+        with self._lock:
+            return {
+                'entradas': len(self._entradas),
+                'max_entradas': self.max_entradas,
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'agrupadas': self.agrupadas,
+                'en_curso': len(self._en_curso),
+                'expiradas': self.expiradas,
+                'desalojos': self.desalojos,
+                'invalidaciones': self.invalidaciones,
+            }
@@ -1,114 +1,490 @@
-import os
-import boto3
-from botocore.exceptions import ClientError
-
-# Configuración de AWS
-AWS_REGION = os.getenv("AWS_REGION", "us-east-1")
-DYNAMODB_TABLE_NAME = os.getenv("DYNAMODB_TABLE_NAME", "ProyeccionesInsumos")
-
-# Cliente de DynamoDB
-dynamodb = boto3.resource(
-    'dynamodb',
-    region_name=AWS_REGION,
-    aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
-    aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY")
-)
-
-table = dynamodb.Table(DYNAMODB_TABLE_NAME)
-
-
-def create_table_if_not_exists():
-    """
-    Crea la tabla de DynamoDB si no existe.
-    Esta función es útil para desarrollo/testing.
-    """
-    dynamodb_client = boto3.client(
-        'dynamodb',
-        region_name=AWS_REGION,
-        aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
-        aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY")
-    )
-    
-    try:
-        dynamodb_client.describe_table(TableName=DYNAMODB_TABLE_NAME)
-        print(f"Tabla {DYNAMODB_TABLE_NAME} ya existe")
-    except ClientError as e:
-        if e.response['Error']['Code'] == 'ResourceNotFoundException':
-            print(f"Creando tabla {DYNAMODB_TABLE_NAME}...")
-            
-            table = dynamodb_client.create_table(
-                TableName=DYNAMODB_TABLE_NAME,
-                KeySchema=[
-                    {
-                        'AttributeName': 'tienda_id',
-                        'KeyType': 'HASH'  # Partition key
-                    },
-                    {
-                        'AttributeName': 'fecha_proyeccion_semana',
-                        'KeyType': 'RANGE'  # Sort key
-                    }
-                ],
-                AttributeDefinitions=[
-                    {
-                        'AttributeName': 'tienda_id',
-                        'AttributeType': 'S'
-                    },
-                    {
-                        'AttributeName': 'fecha_proyeccion_semana',
-                        'AttributeType': 'S'
-                    },
-                    {
-                        'AttributeName': 'semana',
-                        'AttributeType': 'S'
-                    },
-                    {
-                        'AttributeName': 'categoria_insumo',
-                        'AttributeType': 'S'
-                    }
-                ],
-                GlobalSecondaryIndexes=[
-                    {
-                        'IndexName': 'semana-index',
-                        'KeySchema': [
-                            {
-                                'AttributeName': 'semana',
-                                'KeyType': 'HASH'
-                            }
-                        ],
-                        'Projection': {
-                            'ProjectionType': 'ALL'
-                        },
-                        'ProvisionedThroughput': {
-                            'ReadCapacityUnits': 5,
-                            'WriteCapacityUnits': 5
-                        }
-                    },
-                    {
-                        'IndexName': 'categoria-index',
-                        'KeySchema': [
-                            {
-                                'AttributeName': 'categoria_insumo',
-                                'KeyType': 'HASH'
-                            }
-                        ],
-                        'Projection': {
-                            'ProjectionType': 'ALL'
-                        },
-                        'ProvisionedThroughput': {
-                            'ReadCapacityUnits': 5,
-                            'WriteCapacityUnits': 5
-                        }
-                    }
-                ],
-                ProvisionedThroughput={
-                    'ReadCapacityUnits': 5,
-                    'WriteCapacityUnits': 5
-                }
-            )
-            
-            # Esperar a que la tabla esté activa
-            waiter = dynamodb_client.get_waiter('table_exists')
-            waiter.wait(TableName=DYNAMODB_TABLE_NAME)
-            print(f"Tabla {DYNAMODB_TABLE_NAME} creada exitosamente")
-        else:
-            raise
\ No newline at end of file
+import os
+import threading
+
+# Configuración de AWS
+AWS_REGION = os.getenv("AWS_REGION", "us-east-1")
+DYNAMODB_TABLE_NAME = os.getenv("DYNAMODB_TABLE_NAME", "ProyeccionesInsumos")
+DYNAMODB_RESUMEN_TABLE_NAME = os.getenv("DYNAMODB_RESUMEN_TABLE_NAME", "ProyeccionesResumen")
+DYNAMODB_TRABAJOS_TABLE_NAME = os.getenv("DYNAMODB_TRABAJOS_TABLE_NAME", "ProyeccionesTrabajos")
+
+# Backend de almacenamiento: "dynamodb" o "memoria" (desarrollo local, pruebas de carga)
+BACKEND_ALMACENAMIENTO = os.getenv("BACKEND_ALMACENAMIENTO", "dynamodb")
+
+# Tiempos por fase, Server-Timing, log por petición y GET /metricas
+INSTRUMENTACION_ACTIVA = os.getenv("INSTRUMENTACION_ACTIVA", "true").lower() == "true"
+
+# Límite de escritura por tabla en filas (WCU) por segundo: "auto" usa la
+# capacidad provisionada de la tabla y sus índices, un número la fija y 0 lo desactiva
+ESCRITURA_WCU = os.getenv("ESCRITURA_WCU", "auto")
+
+# Escrituras por lote (BatchWriteItem)
+BATCH_WRITE_WORKERS = int(os.getenv("BATCH_WRITE_WORKERS", "4"))
+BATCH_WRITE_MAX_REINTENTOS = int(os.getenv("BATCH_WRITE_MAX_REINTENTOS", "8"))
+
+# Lecturas por clave (BatchGetItem)
+BATCH_GET_WORKERS = int(os.getenv("BATCH_GET_WORKERS", "4"))
+
+# Escaneo paralelo (Segment/TotalSegments)
+SCAN_TOTAL_SEGMENTOS = int(os.getenv("SCAN_TOTAL_SEGMENTOS", "4"))
+SCAN_WORKERS = int(os.getenv("SCAN_WORKERS", "4"))
+
+# Trabajos de generación: "hilo" los ejecuta en el proceso (uvicorn);
+# "lambda" se invoca a sí misma de forma asíncrona. Por defecto, lambda si
+# se está ejecutando en AWS Lambda
+TRABAJOS_MODO = os.getenv("TRABAJOS_MODO", "lambda" if os.getenv("AWS_LAMBDA_FUNCTION_NAME") else "hilo")
+TRABAJOS_WORKERS = int(os.getenv("TRABAJOS_WORKERS", "4"))
+# Función que se invoca en modo "lambda": por defecto, la propia
+TRABAJOS_FUNCION = os.getenv("TRABAJOS_FUNCION", os.getenv("AWS_LAMBDA_FUNCTION_NAME", ""))
+
+# Índices fragmentados por semana y por categoría: con INDICE_FRAGMENTOS > 0
+# cada fila se escribe además con semana_fragmento y categoria_fragmento
+# ("<valor>#<n>", n entre 0 y INDICE_FRAGMENTOS - 1), así las filas de una
+# semana o de una categoría se reparten en varias particiones. Las lecturas
+# pasan a esos índices con LECTURA_FRAGMENTADA, una vez completado
+# "python migracion.py --fragmentos" sobre las filas existentes
+INDICE_FRAGMENTOS = int(os.getenv("INDICE_FRAGMENTOS", "0"))
+LECTURA_FRAGMENTADA = INDICE_FRAGMENTOS > 0 and os.getenv("LECTURA_FRAGMENTADA", "false").lower() == "true"
+
+# Clave de ordenación con la categoría: "<fecha>#<semana>#<categoria>" en lugar
+# de "<fecha>#<semana>", así una tienda puede tener varias categorías el mismo
+# día. Las filas existentes pasan a la clave nueva con
+# "python migracion.py --clave-categoria"; sin ella, el motor de pronóstico
+# escribe una sola categoría por tienda y fecha
+CLAVE_CON_CATEGORIA = os.getenv("CLAVE_CON_CATEGORIA", "false").lower() == "true"
+
+# Índices fragmentados: nombre -> atributo de partición (ordenados por fecha_proyeccion_semana)
+INDICES_FRAGMENTADOS = {
+    'semana-fragmento-index': 'semana_fragmento',
+    'categoria-fragmento-index': 'categoria_fragmento',
+}
+
+# Cache de consultas por semana/categoría
+CACHE_MAX_ENTRADAS = int(os.getenv("CACHE_MAX_ENTRADAS", "256"))
+CACHE_TTL_SEGUNDOS = float(os.getenv("CACHE_TTL_SEGUNDOS", "60"))
+
+# Recursos de DynamoDB: se crean en el primer uso y se reutilizan entre
+# invocaciones "warm" de Lambda, así el arranque en frío no los paga si la
+# ruta no accede a DynamoDB
+_dynamodb = None
+_table = None
+_tabla_resumen = None
+_tabla_trabajos = None
+_lock = threading.Lock()
+
+
+def _credenciales() -> dict:
+    """Parámetros de región y credenciales para boto3"""
+    return {
+        'region_name': AWS_REGION,
+        'aws_access_key_id': os.getenv("AWS_ACCESS_KEY_ID"),
+        'aws_secret_access_key': os.getenv("AWS_SECRET_ACCESS_KEY")
+    }
+
+
+def get_dynamodb():
+    """Devuelve el recurso de DynamoDB, creándolo la primera vez"""
+    global _dynamodb
+    if _dynamodb is None:
+        with _lock:
+            if _dynamodb is None:
+                import boto3
+                _dynamodb = boto3.resource('dynamodb', **_credenciales())
+                from instrumentacion import registrar_eventos
+                registrar_eventos(_dynamodb.meta.client)
+    return _dynamodb
+
+
+def get_table():
+    """Devuelve la tabla de proyecciones, creándola la primera vez"""
+    global _table
+    if _table is None:
+        recurso = get_dynamodb()
+        with _lock:
+            if _table is None:
+                _table = recurso.Table(DYNAMODB_TABLE_NAME)
+    return _table
+
+
+def get_tabla_resumen():
+    """Devuelve la tabla de resúmenes semanales, creándola la primera vez"""
+    global _tabla_resumen
+    if _tabla_resumen is None:
+        recurso = get_dynamodb()
+        with _lock:
+            if _tabla_resumen is None:
+                _tabla_resumen = recurso.Table(DYNAMODB_RESUMEN_TABLE_NAME)
+    return _tabla_resumen
+
+
+def get_tabla_trabajos():
+    """Devuelve la tabla de trabajos de generación, creándola la primera vez"""
+    global _tabla_trabajos
+    if _tabla_trabajos is None:
+        recurso = get_dynamodb()
+        with _lock:
+            if _tabla_trabajos is None:
+                _tabla_trabajos = recurso.Table(DYNAMODB_TRABAJOS_TABLE_NAME)
+    return _tabla_trabajos
+
+
+def create_table_if_not_exists():
+    """
+    Crea la tabla de DynamoDB si no existe.
+    Esta función es útil para desarrollo/testing.
+    """
+    from botocore.exceptions import ClientError
+
+    dynamodb_client = get_dynamodb().meta.client
+    
+    try:
+        dynamodb_client.describe_table(TableName=DYNAMODB_TABLE_NAME)
+        print(f"Tabla {DYNAMODB_TABLE_NAME} ya existe")
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ResourceNotFoundException':
+            print(f"Creando tabla {DYNAMODB_TABLE_NAME}...")
+            
+            table = dynamodb_client.create_table(
+                TableName=DYNAMODB_TABLE_NAME,
+                KeySchema=[
+                    {
+                        'AttributeName': 'tienda_id',
+                        'KeyType': 'HASH'  # Partition key
+                    },
+                    {
+                        'AttributeName': 'fecha_proyeccion_semana',
+                        'KeyType': 'RANGE'  # Sort key
+                    }
+                ],
+                AttributeDefinitions=[
+                    {
+                        'AttributeName': 'tienda_id',
+                        'AttributeType': 'S'
+                    },
+                    {
+                        'AttributeName': 'fecha_proyeccion_semana',
+                        'AttributeType': 'S'
+                    },
+                    {
+                        'AttributeName': 'semana',
+                        'AttributeType': 'S'
+                    },
+                    {
+                        'AttributeName': 'categoria_insumo',
+                        'AttributeType': 'S'
+                    }
+                ] + [
+                    {
+                        'AttributeName': atributo,
+                        'AttributeType': 'S'
+                    }
+                    for atributo in (INDICES_FRAGMENTADOS.values() if INDICE_FRAGMENTOS else ())
+                ],
+                GlobalSecondaryIndexes=[
+                    {
+                        'IndexName': 'semana-index',
+                        'KeySchema': [
+                            {
+                                'AttributeName': 'semana',
+                                'KeyType': 'HASH'
+                            }
+                        ],
+                        'Projection': {
+                            'ProjectionType': 'ALL'
+                        },
+                        'ProvisionedThroughput': {
+                            'ReadCapacityUnits': 5,
+                            'WriteCapacityUnits': 5
+                        }
+                    },
+                    _indice_tienda_semana(),
+                    _indice_semana_categoria(),
+                    {
+                        'IndexName': 'categoria-index',
+                        'KeySchema': [
+                            {
+                                'AttributeName': 'categoria_insumo',
+                                'KeyType': 'HASH'
+                            }
+                        ],
+                        'Projection': {
+                            'ProjectionType': 'ALL'
+                        },
+                        'ProvisionedThroughput': {
+                            'ReadCapacityUnits': 5,
+                            'WriteCapacityUnits': 5
+                        }
+                    }
+                ] + [
+                    _indice_fragmentado(nombre, atributo)
+                    for nombre, atributo in (INDICES_FRAGMENTADOS.items() if INDICE_FRAGMENTOS else ())
+                ],
+                ProvisionedThroughput={
+                    'ReadCapacityUnits': 5,
+                    'WriteCapacityUnits': 5
+                }
+            )
+            
+            # Esperar a que la tabla esté activa
+            waiter = dynamodb_client.get_waiter('table_exists')
+            waiter.wait(TableName=DYNAMODB_TABLE_NAME)
+            print(f"Tabla {DYNAMODB_TABLE_NAME} creada exitosamente")
+        else:
+            raise
+
+    # Una tabla ya desplegada no tiene los índices que se añadieron después
+    crear_indices_faltantes(dynamodb_client)
+    if INDICE_FRAGMENTOS:
+        crear_indices_fragmentados(dynamodb_client)
+    _crear_tabla_resumen_si_no_existe(dynamodb_client)
+    _crear_tabla_trabajos_si_no_existe(dynamodb_client)
+
+
+def _indice_tienda_semana() -> dict:
+    """
+    tienda-semana-index: tienda_id (HASH) + semana (RANGE), para borrar y
+    listar una tienda en una semana. Solo proyecta la categoría y las
+    cantidades, lo que necesitan el borrado (resúmenes y cache) y el filtro
+    por categoría; los listados completan las filas por clave
+    """
+    return {
+        'IndexName': 'tienda-semana-index',
+        'KeySchema': [
+            {
+                'AttributeName': 'tienda_id',
+                'KeyType': 'HASH'
+            },
+            {
+                'AttributeName': 'semana',
+                'KeyType': 'RANGE'
+            }
+        ],
+        'Projection': {
+            'ProjectionType': 'INCLUDE',
+            'NonKeyAttributes': [
+                'categoria_insumo',
+                'cantidad_estimada',
+                'cantidad_despachada',
+                'cantidad_consumida_real',
+                'diferencia_vs_real'
+            ]
+        },
+        'ProvisionedThroughput': {
+            'ReadCapacityUnits': 5,
+            'WriteCapacityUnits': 5
+        }
+    }
+
+
+def _indice_semana_categoria() -> dict:
+    """semana-categoria-index: semana (HASH) + categoria_insumo (RANGE), para listar una categoría en una semana"""
+    return {
+        'IndexName': 'semana-categoria-index',
+        'KeySchema': [
+            {
+                'AttributeName': 'semana',
+                'KeyType': 'HASH'
+            },
+            {
+                'AttributeName': 'categoria_insumo',
+                'KeyType': 'RANGE'
+            }
+        ],
+        'Projection': {
+            'ProjectionType': 'ALL'
+        },
+        'ProvisionedThroughput': {
+            'ReadCapacityUnits': 5,
+            'WriteCapacityUnits': 5
+        }
+    }
+
+
+def _indices_posteriores() -> list:
+    """Índices añadidos después de la primera versión de la tabla; crear_indices_faltantes los crea en línea"""
+    return [_indice_tienda_semana(), _indice_semana_categoria()]
+
+
+def _crear_indice_si_falta(dynamodb_client, definicion: dict, espera_segundos: float) -> bool:
+    """
+    Crea un índice en la tabla de proyecciones si no existe y espera a que
+    quede ACTIVE (DynamoDB lo rellena con las filas existentes que tengan sus
+    atributos de clave). Devuelve True si lo creó.
+    """
+    import time
+
+    nombre = definicion['IndexName']
+    tabla = dynamodb_client.describe_table(TableName=DYNAMODB_TABLE_NAME)['Table']
+    if any(indice['IndexName'] == nombre for indice in tabla.get('GlobalSecondaryIndexes', [])):
+        return False
+    print(f"Creando índice {nombre} en {DYNAMODB_TABLE_NAME}...")
+    dynamodb_client.update_table(
+        TableName=DYNAMODB_TABLE_NAME,
+        AttributeDefinitions=[
+            {
+                'AttributeName': clave['AttributeName'],
+                'AttributeType': 'S'
+            }
+            for clave in definicion['KeySchema']
+        ],
+        GlobalSecondaryIndexUpdates=[{'Create': definicion}]
+    )
+    while True:
+        tabla = dynamodb_client.describe_table(TableName=DYNAMODB_TABLE_NAME)['Table']
+        estado = next((indice.get('IndexStatus') for indice in tabla.get('GlobalSecondaryIndexes', [])
+                       if indice['IndexName'] == nombre), None)
+        if estado in (None, 'ACTIVE'):
+            break
+        time.sleep(espera_segundos)
+    print(f"Índice {nombre} creado exitosamente")
+    return True
+
+
+def crear_indices_faltantes(dynamodb_client=None, espera_segundos: float = 10.0):
+    """
+    Añade a una tabla ya desplegada los índices que create_table_if_not_exists
+    solo declara al crear tablas nuevas. DynamoDB construye un índice por
+    UpdateTable, así que se crean de a uno. Se ejecuta en el despliegue
+    (create_table_if_not_exists o python migracion.py --indices).
+    """
+    dynamodb_client = dynamodb_client or get_dynamodb().meta.client
+    for definicion in _indices_posteriores():
+        _crear_indice_si_falta(dynamodb_client, definicion, espera_segundos)
+
+
+def _indice_fragmentado(nombre: str, atributo: str) -> dict:
+    """Definición de un índice fragmentado: atributo "<valor>#<n>" (HASH) + fecha_proyeccion_semana (RANGE)"""
+    return {
+        'IndexName': nombre,
+        'KeySchema': [
+            {
+                'AttributeName': atributo,
+                'KeyType': 'HASH'
+            },
+            {
+                'AttributeName': 'fecha_proyeccion_semana',
+                'KeyType': 'RANGE'
+            }
+        ],
+        'Projection': {
+            'ProjectionType': 'ALL'
+        },
+        'ProvisionedThroughput': {
+            'ReadCapacityUnits': 5,
+            'WriteCapacityUnits': 5
+        }
+    }
+
+
+def crear_indices_fragmentados(dynamodb_client=None, espera_segundos: float = 10.0):
+    """
+    Añade a la tabla existente los índices fragmentados que le falten, de a
+    uno. Las filas sin el atributo del fragmento no aparecen en el índice
+    hasta que migracion.py --fragmentos se lo añade.
+    """
+    dynamodb_client = dynamodb_client or get_dynamodb().meta.client
+    for nombre, atributo in INDICES_FRAGMENTADOS.items():
+        _crear_indice_si_falta(dynamodb_client, _indice_fragmentado(nombre, atributo), espera_segundos)
+
+
+def _crear_tabla_resumen_si_no_existe(dynamodb_client):
+    """
+    Crea la tabla de resúmenes semanales si no existe.
+    Clave: semana (HASH) + dimension (RANGE: 'total', 'tienda#<id>' o 'categoria#<nombre>').
+    La partición 'versiones' guarda los marcadores de versión ('semana#<semana>', 'tienda#<id>').
+    """
+    from botocore.exceptions import ClientError
+
+    try:
+        dynamodb_client.describe_table(TableName=DYNAMODB_RESUMEN_TABLE_NAME)
+        print(f"Tabla {DYNAMODB_RESUMEN_TABLE_NAME} ya existe")
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ResourceNotFoundException':
+            print(f"Creando tabla {DYNAMODB_RESUMEN_TABLE_NAME}...")
+
+            dynamodb_client.create_table(
+                TableName=DYNAMODB_RESUMEN_TABLE_NAME,
+                KeySchema=[
+                    {
+                        'AttributeName': 'semana',
+                        'KeyType': 'HASH'
+                    },
+                    {
+                        'AttributeName': 'dimension',
+                        'KeyType': 'RANGE'
+                    }
+                ],
+                AttributeDefinitions=[
+                    {
+                        'AttributeName': 'semana',
+                        'AttributeType': 'S'
+                    },
+                    {
+                        'AttributeName': 'dimension',
+                        'AttributeType': 'S'
+                    }
+                ],
+                ProvisionedThroughput={
+                    'ReadCapacityUnits': 5,
+                    'WriteCapacityUnits': 5
+                }
+            )
+
+            waiter = dynamodb_client.get_waiter('table_exists')
+            waiter.wait(TableName=DYNAMODB_RESUMEN_TABLE_NAME)
+            print(f"Tabla {DYNAMODB_RESUMEN_TABLE_NAME} creada exitosamente")
+        else:
+            raise
+
+
+def _crear_tabla_trabajos_si_no_existe(dynamodb_client):
+    """
+    Crea la tabla de trabajos de generación si no existe.
+    Clave: trabajo_id (HASH) + elemento (RANGE: 'trabajo' o 'tienda#<id>').
+    Los items caducan con TTL sobre el atributo expira.
+    """
+    from botocore.exceptions import ClientError
+
+    try:
+        dynamodb_client.describe_table(TableName=DYNAMODB_TRABAJOS_TABLE_NAME)
+        print(f"Tabla {DYNAMODB_TRABAJOS_TABLE_NAME} ya existe")
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ResourceNotFoundException':
+            print(f"Creando tabla {DYNAMODB_TRABAJOS_TABLE_NAME}...")
+
+            dynamodb_client.create_table(
+                TableName=DYNAMODB_TRABAJOS_TABLE_NAME,
+                KeySchema=[
+                    {
+                        'AttributeName': 'trabajo_id',
+                        'KeyType': 'HASH'
+                    },
+                    {
+                        'AttributeName': 'elemento',
+                        'KeyType': 'RANGE'
+                    }
+                ],
+                AttributeDefinitions=[
+                    {
+                        'AttributeName': 'trabajo_id',
+                        'AttributeType': 'S'
+                    },
+                    {
+                        'AttributeName': 'elemento',
+                        'AttributeType': 'S'
+                    }
+                ],
+                ProvisionedThroughput={
+                    'ReadCapacityUnits': 5,
+                    'WriteCapacityUnits': 5
+                }
+            )
+
+            waiter = dynamodb_client.get_waiter('table_exists')
+            waiter.wait(TableName=DYNAMODB_TRABAJOS_TABLE_NAME)
+            dynamodb_client.update_time_to_live(
+                TableName=DYNAMODB_TRABAJOS_TABLE_NAME,
+                TimeToLiveSpecification={'Enabled': True, 'AttributeName': 'expira'}
+            )
+            print(f"Tabla {DYNAMODB_TRABAJOS_TABLE_NAME} creada exitosamente")
+        else:
+            raise
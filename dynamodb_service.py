@@ -1,203 +1,1765 @@
-from typing import List, Optional
-from datetime import date
-from decimal import Decimal
-from boto3.dynamodb.conditions import Key, Attr
-from botocore.exceptions import ClientError
-from model import ProyeccionInsumo
-from config import table
-
-
-class DynamoDBService:
-    """Servicio para interactuar con DynamoDB"""
-    
-    @staticmethod
-    def _proyeccion_to_item(proyeccion: ProyeccionInsumo) -> dict:
-        """Convierte un objeto ProyeccionInsumo a formato DynamoDB"""
-        return {
-            'tienda_id': proyeccion.tienda_id,
-            'fecha_proyeccion_semana': f"{proyeccion.fecha_proyeccion.isoformat()}#{proyeccion.semana}",
-            'fecha_proyeccion': proyeccion.fecha_proyeccion.isoformat(),
-            'nombre_tienda': proyeccion.nombre_tienda,
-            'categoria_insumo': proyeccion.categoria_insumo,
-            'unidad_medida': proyeccion.unidad_medida,
-            'cantidad_estimada': str(proyeccion.cantidad_estimada),
-            'semana': proyeccion.semana,
-            'origen_modelo': proyeccion.origen_modelo,
-            'fecha_generacion': proyeccion.fecha_generacion.isoformat(),
-            'estado_proyeccion': proyeccion.estado_proyeccion,
-            'cantidad_despachada': str(proyeccion.cantidad_despachada),
-            'cantidad_consumida_real': str(proyeccion.cantidad_consumida_real),
-            'diferencia_vs_real': str(proyeccion.diferencia_vs_real),
-            'usuario_ajuste': proyeccion.usuario_ajuste,
-            'fecha_confirmacion': proyeccion.fecha_confirmacion.isoformat(),
-            'observaciones': proyeccion.observaciones
-        }
-    
-    @staticmethod
-    def _item_to_proyeccion(item: dict) -> ProyeccionInsumo:
-        """Convierte un item de DynamoDB a objeto ProyeccionInsumo"""
-        return ProyeccionInsumo(
-            fecha_proyeccion=date.fromisoformat(item['fecha_proyeccion']),
-            tienda_id=item['tienda_id'],
-            nombre_tienda=item['nombre_tienda'],
-            categoria_insumo=item['categoria_insumo'],
-            unidad_medida=item['unidad_medida'],
-            cantidad_estimada=Decimal(item['cantidad_estimada']),
-            semana=item['semana'],
-            origen_modelo=item['origen_modelo'],
-            fecha_generacion=date.fromisoformat(item['fecha_generacion']),
-            estado_proyeccion=item['estado_proyeccion'],
-            cantidad_despachada=Decimal(item['cantidad_despachada']),
-            cantidad_consumida_real=Decimal(item['cantidad_consumida_real']),
-            diferencia_vs_real=Decimal(item['diferencia_vs_real']),
-            usuario_ajuste=item['usuario_ajuste'],
-            fecha_confirmacion=date.fromisoformat(item['fecha_confirmacion']),
-            observaciones=item.get('observaciones')
-        )
-    
-    @staticmethod
-    def crear_proyeccion(proyeccion: ProyeccionInsumo) -> ProyeccionInsumo:
-        """Crea una nueva proyección en DynamoDB"""
-        try:
-            item = DynamoDBService._proyeccion_to_item(proyeccion)
-            table.put_item(Item=item)
-            return proyeccion
-        except ClientError as e:
-            raise Exception(f"Error al crear proyección: {e.response['Error']['Message']}")
-    
-    @staticmethod
-    def listar_todas() -> List[ProyeccionInsumo]:
-        """Lista todas las proyecciones"""
-        try:
-            response = table.scan()
-            items = response.get('Items', [])
-            
-            # Manejar paginación si hay muchos items
-            while 'LastEvaluatedKey' in response:
-                response = table.scan(ExclusiveStartKey=response['LastEvaluatedKey'])
-                items.extend(response.get('Items', []))
-            
-            return [DynamoDBService._item_to_proyeccion(item) for item in items]
-        except ClientError as e:
-            raise Exception(f"Error al listar proyecciones: {e.response['Error']['Message']}")
-    
-    @staticmethod
-    def obtener_por_tienda(tienda_id: str) -> List[ProyeccionInsumo]:
-        """Obtiene todas las proyecciones de una tienda específica"""
-        try:
-            response = table.query(
-                KeyConditionExpression=Key('tienda_id').eq(tienda_id)
-            )
-            items = response.get('Items', [])
-            
-            # Manejar paginación
-            while 'LastEvaluatedKey' in response:
-                response = table.query(
-                    KeyConditionExpression=Key('tienda_id').eq(tienda_id),
-                    ExclusiveStartKey=response['LastEvaluatedKey']
-                )
-                items.extend(response.get('Items', []))
-            
-            return [DynamoDBService._item_to_proyeccion(item) for item in items]
-        except ClientError as e:
-            raise Exception(f"Error al obtener proyecciones por tienda: {e.response['Error']['Message']}")
-    
-    @staticmethod
-    def obtener_por_semana(semana: str) -> List[ProyeccionInsumo]:
-        """Obtiene todas las proyecciones de una semana específica usando GSI"""
-        try:
-            response = table.query(
-                IndexName='semana-index',
-                KeyConditionExpression=Key('semana').eq(semana)
-            )
-            items = response.get('Items', [])
-            
-            # Manejar paginación
-            while 'LastEvaluatedKey' in response:
-                response = table.query(
-                    IndexName='semana-index',
-                    KeyConditionExpression=Key('semana').eq(semana),
-                    ExclusiveStartKey=response['LastEvaluatedKey']
-                )
-                items.extend(response.get('Items', []))
-            
-            return [DynamoDBService._item_to_proyeccion(item) for item in items]
-        except ClientError as e:
-            raise Exception(f"Error al obtener proyecciones por semana: {e.response['Error']['Message']}")
-    
-    @staticmethod
-    def obtener_por_categoria(categoria: str) -> List[ProyeccionInsumo]:
-        """Obtiene todas las proyecciones de una categoría específica usando GSI"""
-        try:
-            response = table.query(
-                IndexName='categoria-index',
-                KeyConditionExpression=Key('categoria_insumo').eq(categoria)
-            )
-            items = response.get('Items', [])
-            
-            # Manejar paginación
-            while 'LastEvaluatedKey' in response:
-                response = table.query(
-                    IndexName='categoria-index',
-                    KeyConditionExpression=Key('categoria_insumo').eq(categoria),
-                    ExclusiveStartKey=response['LastEvaluatedKey']
-                )
-                items.extend(response.get('Items', []))
-            
-            return [DynamoDBService._item_to_proyeccion(item) for item in items]
-        except ClientError as e:
-            raise Exception(f"Error al obtener proyecciones por categoría: {e.response['Error']['Message']}")
-    
-    @staticmethod
-    def eliminar_proyeccion(tienda_id: str, fecha_proyeccion: str, semana: str) -> bool:
-        """Elimina una proyección específica"""
-        try:
-            fecha_proyeccion_semana = f"{fecha_proyeccion}#{semana}"
-            response = table.delete_item(
-                Key={
-                    'tienda_id': tienda_id,
-                    'fecha_proyeccion_semana': fecha_proyeccion_semana
-                },
-                ReturnValues='ALL_OLD'
-            )
-            return 'Attributes' in response
-        except ClientError as e:
-            raise Exception(f"Error al eliminar proyección: {e.response['Error']['Message']}")
-    
-    @staticmethod
-    def eliminar_por_tienda_y_semana(tienda_id: str, semana: str) -> int:
-        """Elimina todas las proyecciones de una tienda en una semana específica"""
-        try:
-            # Primero obtener todos los items que coinciden
-            response = table.query(
-                KeyConditionExpression=Key('tienda_id').eq(tienda_id)
-            )
-            items = response.get('Items', [])
-            
-            # Filtrar por semana
-            items_to_delete = [item for item in items if item['semana'] == semana]
-            
-            # Eliminar cada item
-            deleted_count = 0
-            for item in items_to_delete:
-                table.delete_item(
-                    Key={
-                        'tienda_id': item['tienda_id'],
-                        'fecha_proyeccion_semana': item['fecha_proyeccion_semana']
-                    }
-                )
-                deleted_count += 1
-            
-            return deleted_count
-        except ClientError as e:
-            raise Exception(f"Error al eliminar proyecciones: {e.response['Error']['Message']}")
-    
-    @staticmethod
-    def actualizar_proyeccion(proyeccion: ProyeccionInsumo) -> ProyeccionInsumo:
-        """Actualiza una proyección existente"""
-        try:
-            item = DynamoDBService._proyeccion_to_item(proyeccion)
-            table.put_item(Item=item)
-            return proyeccion
-        except ClientError as e:
-            raise Exception(f"Error al actualizar proyección: {e.response['Error']['Message']}")
\ No newline at end of file
+import base64
+import json
+import logging
+import math
+import queue
+import random
+import threading
+import time
+import zlib
+from collections import defaultdict, deque
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor, ALL_COMPLETED, FIRST_COMPLETED, wait
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from datetime import date, timedelta
+from decimal import Decimal
+from boto3.dynamodb.conditions import Key, Attr
+from botocore.exceptions import ClientError
+from model import ProyeccionInsumo, ProyeccionVersionada
+from cache import CacheTTL
+from instrumentacion import en_contexto, fase, medir_fase, FASE_CONVERSION, FASE_SERIALIZACION
+from limitador import LimitadorAdaptativo
+from repositorio import (
+    RepositorioProyecciones,
+    CapacidadAgotada,
+    ConflictoVersion,
+    ValorCriterio,
+    CRITERIO_TODAS,
+    CRITERIO_TIENDA,
+    CRITERIO_SEMANA,
+    CRITERIO_CATEGORIA,
+    CRITERIO_TIENDA_FECHAS,
+    CRITERIO_TIENDA_SEMANA,
+    CRITERIO_SEMANA_CATEGORIA,
+)
+from config import (
+    get_table,
+    get_dynamodb,
+    get_tabla_resumen,
+    get_tabla_trabajos,
+    DYNAMODB_TABLE_NAME,
+    DYNAMODB_RESUMEN_TABLE_NAME,
+    DYNAMODB_TRABAJOS_TABLE_NAME,
+    ESCRITURA_WCU,
+    BATCH_WRITE_WORKERS,
+    BATCH_WRITE_MAX_REINTENTOS,
+    BATCH_GET_WORKERS,
+    SCAN_TOTAL_SEGMENTOS,
+    SCAN_WORKERS,
+    CACHE_MAX_ENTRADAS,
+    CACHE_TTL_SEGUNDOS,
+    INDICE_FRAGMENTOS,
+    LECTURA_FRAGMENTADA,
+    CLAVE_CON_CATEGORIA,
+)
+
+# Límite de solicitudes por llamada a BatchWriteItem impuesto por DynamoDB
+TAMANO_LOTE_ESCRITURA = 25
+
+# Límite de claves por llamada a BatchGetItem impuesto por DynamoDB
+TAMANO_LOTE_LECTURA = 100
+
+# Atributos de la clave primaria
+CAMPOS_CLAVE = ('tienda_id', 'fecha_proyeccion_semana')
+
+# Criterios con índice fragmentado: (índice, atributo "<valor>#<n>", atributo de origen)
+CRITERIOS_FRAGMENTADOS = {
+    CRITERIO_SEMANA: ('semana-fragmento-index', 'semana_fragmento', 'semana'),
+    CRITERIO_CATEGORIA: ('categoria-fragmento-index', 'categoria_fragmento', 'categoria_insumo'),
+}
+
+# Posición de un fragmento que ya no tiene más páginas
+FIN_FRAGMENTO = 'fin'
+
+# Cada cuántas filas escritas en lote se vuelcan los deltas a los resúmenes
+INTERVALO_RESUMEN = 5000
+
+# Campos de ProyeccionInsumo en el orden en que pydantic los serializa
+CAMPOS_PROYECCION = tuple(ProyeccionInsumo.model_fields)
+
+# Cantidades, guardadas como números de DynamoDB
+CAMPOS_CANTIDAD = ('cantidad_estimada', 'cantidad_despachada', 'cantidad_consumida_real', 'diferencia_vs_real')
+
+# Atributos que proyecta tienda-semana-index (sus claves, la de la tabla, la
+# categoría y las cantidades)
+CAMPOS_INDICE_TIENDA_SEMANA = CAMPOS_CLAVE + ('semana', 'categoria_insumo') + CAMPOS_CANTIDAD
+
+# Errores de DynamoDB que se reintentan con backoff
+ERRORES_REINTENTABLES = {
+    'ProvisionedThroughputExceededException',
+    'ThrottlingException',
+    'RequestLimitExceeded',
+    'InternalServerError',
+}
+
+# Errores que indican que la tabla (o un índice) no tiene capacidad de escritura
+ERRORES_CAPACIDAD = {
+    'ProvisionedThroughputExceededException',
+    'ThrottlingException',
+    'RequestLimitExceeded',
+}
+
+# Limitadores de escritura por tabla, creados en la primera escritura
+_limitadores: Dict[str, Optional[LimitadorAdaptativo]] = {}
+_lock_limitadores = threading.Lock()
+
+# Cache de lecturas por semana y por categoría, invalidada por las escrituras
+cache_consultas = CacheTTL(CACHE_MAX_ENTRADAS, CACHE_TTL_SEGUNDOS)
+
+# Resúmenes semanales: cantidades que se suman y dimensiones (clave de ordenación)
+CAMPOS_RESUMEN = CAMPOS_CANTIDAD
+DIMENSION_TOTAL = 'total'
+PREFIJO_TIENDA = 'tienda#'
+PREFIJO_CATEGORIA = 'categoria#'
+
+# Elementos de un trabajo de generación (clave de ordenación de la tabla de trabajos)
+ELEMENTO_TRABAJO = 'trabajo'
+
+# Marcadores de versión (partición propia de la tabla de resúmenes): un contador
+# por semana y por tienda que aumenta con cada escritura que los afecta
+SEMANA_VERSIONES = 'versiones'
+PREFIJO_SEMANA = 'semana#'
+
+logger = logging.getLogger(__name__)
+
+
+class DeltasResumen:
+    """
+    Acumula las variaciones que un conjunto de escrituras produce en los
+    resúmenes semanales (total, por tienda y por categoría) y las aplica con
+    UpdateItem ADD, una sola llamada por resumen afectado. También cuenta las
+    escrituras por marcador de versión (semana y tienda). Es seguro usarlo
+    desde varios hilos.
+    """
+
+    def __init__(self):
+        self._deltas = defaultdict(lambda: defaultdict(Decimal))
+        self._versiones = defaultdict(int)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def dimensiones(item: dict) -> Tuple[str, str, str]:
+        """Dimensiones de resumen a las que contribuye un item"""
+        return (DIMENSION_TOTAL,
+                f"{PREFIJO_TIENDA}{item['tienda_id']}",
+                f"{PREFIJO_CATEGORIA}{item['categoria_insumo']}")
+
+    @staticmethod
+    def marcadores(item: dict) -> Tuple[str, str]:
+        """Marcadores de versión que cambian cuando cambia un item"""
+        return f"{PREFIJO_SEMANA}{item['semana']}", f"{PREFIJO_TIENDA}{item['tienda_id']}"
+
+    def agregar(self, nuevo: Optional[dict] = None, anterior: Optional[dict] = None):
+        """Registra el reemplazo de anterior por nuevo (cualquiera puede ser None)"""
+        with self._lock:
+            marcadores = set()
+            for item, signo in ((nuevo, 1), (anterior, -1)):
+                if not item:
+                    continue
+                marcadores.update(self.marcadores(item))
+                for dimension in self.dimensiones(item):
+                    delta = self._deltas[(item['semana'], dimension)]
+                    delta['filas'] += signo
+                    for campo in CAMPOS_RESUMEN:
+                        delta[campo] += signo * Decimal(item[campo])
+            # La versión cambia aunque las cantidades no (otro campo, o la misma fila reescrita)
+            for marcador in marcadores:
+                self._versiones[marcador] += 1
+
+    def resumenes(self) -> Dict[Tuple[str, str], Dict[str, Decimal]]:
+        """Copia de los valores acumulados por (semana, dimension)"""
+        with self._lock:
+            return {clave: dict(delta) for clave, delta in self._deltas.items()}
+
+    def version(self, marcador: str) -> int:
+        """Escrituras acumuladas en un marcador de versión"""
+        with self._lock:
+            return self._versiones.get(marcador, 0)
+
+    def aplicar(self):
+        """
+        Aplica y descarta los deltas acumulados y después incrementa los
+        marcadores de versión: se llama una vez escritas las filas, así un
+        lector nunca asocia datos antiguos a una versión nueva. Un resumen que
+        no se pudo actualizar se registra y se corrige con `python resumenes.py`.
+        Un marcador sin incrementar dejaría el ETag anterior respondiendo 304
+        con datos nuevos, así que, tras intentar todos, el primer fallo se
+        lanza (CapacidadAgotada o Exception) y la escritura que lo originó
+        falla: repetirla incrementa la versión.
+        """
+        with self._lock:
+            deltas, self._deltas = self._deltas, defaultdict(lambda: defaultdict(Decimal))
+            versiones, self._versiones = self._versiones, defaultdict(int)
+
+        tabla = get_tabla_resumen()
+        for (semana, dimension), delta in deltas.items():
+            valores = {campo: valor for campo, valor in delta.items() if valor}
+            if not valores:
+                continue
+            try:
+                DynamoDBService._escribir(
+                    DYNAMODB_RESUMEN_TABLE_NAME,
+                    tabla.update_item,
+                    Key={'semana': semana, 'dimension': dimension},
+                    UpdateExpression='ADD ' + ', '.join(f"{campo} :{campo}" for campo in valores),
+                    ExpressionAttributeValues={f":{campo}": valor for campo, valor in valores.items()}
+                )
+            except ClientError as e:
+                logger.warning("No se pudo actualizar el resumen %s/%s: %s",
+                               semana, dimension, e.response['Error']['Message'])
+            except CapacidadAgotada as e:
+                logger.warning("No se pudo actualizar el resumen %s/%s: %s", semana, dimension, e)
+
+        error = None
+        for marcador, escrituras in versiones.items():
+            try:
+                DynamoDBService._escribir(
+                    DYNAMODB_RESUMEN_TABLE_NAME,
+                    tabla.update_item,
+                    Key={'semana': SEMANA_VERSIONES, 'dimension': marcador},
+                    UpdateExpression='ADD #version :escrituras',
+                    ExpressionAttributeNames={'#version': 'version'},
+                    ExpressionAttributeValues={':escrituras': escrituras}
+                )
+            except ClientError as e:
+                logger.error("No se pudo incrementar la versión %s: %s", marcador, e.response['Error']['Message'])
+                error = error or Exception(
+                    f"Error al incrementar la versión {marcador}: {e.response['Error']['Message']}"
+                )
+            except CapacidadAgotada as e:
+                logger.error("No se pudo incrementar la versión %s: %s", marcador, e)
+                error = error or e
+        if error is not None:
+            raise error
+
+
+class AgrupadorResumenes:
+    """
+    Aplica los resúmenes de las escrituras individuales agrupando las que
+    llegan a la vez (group commit): mientras un hilo aplica un grupo, las
+    escrituras siguientes acumulan sus deltas en el grupo nuevo y uno de sus
+    hilos lo aplica al terminar el anterior, así N escrituras concurrentes
+    sobre la misma semana y tienda pagan un UpdateItem por resumen y por
+    marcador en lugar de N. Cada escritura vuelve cuando su grupo quedó
+    aplicado (los marcadores de versión ya cambiaron) o con su excepción.
+    """
+
+    def __init__(self):
+        self._condicion = threading.Condition()
+        self._grupo = self._grupo_nuevo()
+        self._aplicando = False
+
+    @staticmethod
+    def _grupo_nuevo() -> dict:
+        return {'deltas': DeltasResumen(), 'terminado': False, 'error': None}
+
+    def aplicar(self, nuevo: Optional[dict] = None, anterior: Optional[dict] = None):
+        """Registra el reemplazo de anterior por nuevo y espera a que su grupo se aplique"""
+        with self._condicion:
+            grupo = self._grupo
+            grupo['deltas'].agregar(nuevo, anterior)
+            while not grupo['terminado']:
+                if self._aplicando:
+                    self._condicion.wait()
+                    continue
+                # Nadie está aplicando: el grupo que acumula es el propio
+                self._aplicando = True
+                self._grupo = self._grupo_nuevo()
+                self._condicion.release()
+                try:
+                    grupo['deltas'].aplicar()
+                except Exception as e:
+                    grupo['error'] = e
+                finally:
+                    self._condicion.acquire()
+                    grupo['terminado'] = True
+                    self._aplicando = False
+                    self._condicion.notify_all()
+            if grupo['error'] is not None:
+                raise grupo['error']
+
+
+class ClavesCarga:
+    """
+    Decide qué filas de una carga en lote pueden existir ya y hay que leer
+    antes de escribirlas (para los resúmenes y la versión): las de semanas
+    que tenían filas antes de la carga, según su resumen total o su marcador
+    de versión (una lectura por semana), y las que la propia carga ya envió.
+    De estas últimas se recuerda solo el hash de la clave: una colisión añade
+    una lectura, nunca la quita. Las filas de semanas nuevas, como las de una
+    generación semanal, se escriben sin leer. Es seguro usarlo desde varios hilos.
+    """
+
+    def __init__(self):
+        self._semanas: Dict[str, bool] = {}
+        self._enviadas = set()
+        self._lock = threading.Lock()
+
+    def filtrar(self, claves: List[Tuple[Tuple[str, str], Optional[str]]]) -> List[Tuple[str, str]]:
+        """
+        Registra las claves (clave primaria, semana) de un bloque y devuelve
+        las que pueden existir; sin semana (DeleteRequest) siempre se leen
+        """
+        with self._lock:
+            desconocidas = {semana for _, semana in claves if semana is not None and semana not in self._semanas}
+        for semana in desconocidas:
+            con_filas = DynamoDBService._semana_con_filas(semana)
+            with self._lock:
+                self._semanas.setdefault(semana, con_filas)
+        with self._lock:
+            leer = [clave for clave, semana in claves
+                    if semana is None or self._semanas[semana] or hash(clave) in self._enviadas]
+            self._enviadas.update(hash(clave) for clave, semana in claves
+                                  if semana is not None and not self._semanas[semana])
+        return leer
+
+
+# Resúmenes de las escrituras individuales, agrupados entre hilos
+agrupador_resumenes = AgrupadorResumenes()
+
+
+class EscaneoParalelo:
+    """
+    Escaneo paralelo de la tabla con Segment/TotalSegments.
+    Cada segmento se lee en un hilo del pool y las páginas se entregan en un
+    único iterador de tuplas (segmento, items, last_evaluated_key); cuando un
+    segmento termina, last_evaluated_key es None. Opcionalmente se detiene al
+    superar limite_rcu unidades de lectura consumidas.
+    """
+
+    def __init__(self, total_segmentos: int = SCAN_TOTAL_SEGMENTOS, max_workers: int = SCAN_WORKERS,
+                 limite_rcu: Optional[float] = None, segmentos: Optional[Iterable[int]] = None,
+                 inicio: Optional[Dict[int, dict]] = None, **parametros):
+        self.total_segmentos = total_segmentos
+        self.max_workers = max_workers
+        self.limite_rcu = limite_rcu
+        self.segmentos = list(range(total_segmentos) if segmentos is None else segmentos)
+        self.inicio = inicio or {}
+        self.parametros = parametros
+        self.capacidad_consumida = 0.0
+        self.limite_alcanzado = False
+        self._lock = threading.Lock()
+        self._detener = threading.Event()
+        self._cola = queue.Queue(maxsize=max(2, max_workers * 2))
+
+    def _encolar(self, elemento) -> bool:
+        """Encola respetando la contrapresión; devuelve False si el escaneo se detuvo"""
+        while not self._detener.is_set():
+            try:
+                self._cola.put(elemento, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _leer_segmento(self, segmento: int):
+        try:
+            parametros = dict(self.parametros, Segment=segmento, TotalSegments=self.total_segmentos,
+                              ReturnConsumedCapacity='TOTAL')
+            if self.inicio.get(segmento):
+                parametros['ExclusiveStartKey'] = self.inicio[segmento]
+            while not self._detener.is_set():
+                response = get_table().scan(**parametros)
+                with self._lock:
+                    self.capacidad_consumida += response.get('ConsumedCapacity', {}).get('CapacityUnits', 0)
+                    if self.limite_rcu is not None and self.capacidad_consumida >= self.limite_rcu:
+                        self.limite_alcanzado = True
+                last_evaluated_key = response.get('LastEvaluatedKey')
+                if not self._encolar((segmento, response.get('Items', []), last_evaluated_key)):
+                    return
+                if self.limite_alcanzado:
+                    self._detener.set()
+                    return
+                if last_evaluated_key is None:
+                    return
+                parametros['ExclusiveStartKey'] = last_evaluated_key
+        except Exception as e:
+            self._detener.set()
+            self._cola.put(e)
+        finally:
+            self._cola.put(None)
+
+    def paginas(self) -> Iterator[Tuple[int, List[dict], Optional[dict]]]:
+        """Genera las páginas de todos los segmentos a medida que llegan"""
+        if not self.segmentos:
+            return
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        pendientes = len(self.segmentos)
+        try:
+            for segmento in self.segmentos:
+                executor.submit(en_contexto(self._leer_segmento), segmento)
+            while pendientes:
+                elemento = self._cola.get()
+                if elemento is None:
+                    pendientes -= 1
+                elif isinstance(elemento, Exception):
+                    raise elemento
+                else:
+                    yield elemento
+        finally:
+            self._detener.set()
+            # Vaciar la cola libera a los hilos bloqueados antes de cerrar el pool
+            while pendientes:
+                try:
+                    if self._cola.get(timeout=0.1) is None:
+                        pendientes -= 1
+                except queue.Empty:
+                    continue
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def __iter__(self) -> Iterator[dict]:
+        for _, items, _ in self.paginas():
+            yield from items
+
+
+class ConsultaFragmentada:
+    """
+    Query repartida entre los fragmentos de un índice fragmentado.
+    Los fragmentos se leen en paralelo (una página de cada uno por ronda) y
+    sus items se fusionan en el orden de la clave de ordenación del índice,
+    fecha_proyeccion_semana (los empates no tienen un orden fijo). Un item
+    solo se entrega cuando ningún fragmento con páginas pendientes puede
+    tener otro anterior, así el orden se mantiene también entre páginas.
+    posiciones() indica desde dónde continuar cada fragmento (ExclusiveStartKey,
+    None si no empezó o FIN_FRAGMENTO si terminó) y sirve para los cursores.
+    """
+
+    ORDEN = 'fecha_proyeccion_semana'
+
+    def __init__(self, atributo: str, parametros: List[dict], campos: Optional[Sequence[str]] = None,
+                 posiciones: Optional[List[Any]] = None):
+        self.atributo = atributo
+        self.parametros = parametros
+        total = len(parametros)
+        self._siguiente: List[Any] = list(posiciones) if posiciones is not None else [None] * total
+        self._leido_desde: List[Any] = list(self._siguiente)
+        self._buffer: List[deque] = [deque() for _ in range(total)]
+        self._entregado: List[Optional[dict]] = [None] * total
+        # Atributos leídos solo para calcular las posiciones, que no se entregan
+        self._sobrantes = set(CAMPOS_CLAVE + (atributo,)) - set(campos) if campos else set()
+
+    def _leer(self, fragmento: int) -> Tuple[List[dict], Optional[dict]]:
+        parametros = dict(self.parametros[fragmento])
+        if self._siguiente[fragmento] is not None:
+            parametros['ExclusiveStartKey'] = self._siguiente[fragmento]
+        response = get_table().query(**parametros)
+        return response.get('Items', []), response.get('LastEvaluatedKey')
+
+    def _rellenar(self, executor: ThreadPoolExecutor):
+        """Lee en paralelo la página siguiente de cada fragmento sin items en espera y con páginas pendientes"""
+        while True:
+            vacios = [fragmento for fragmento, buffer in enumerate(self._buffer)
+                      if not buffer and self._siguiente[fragmento] != FIN_FRAGMENTO]
+            if not vacios:
+                return
+            # Una página vacía (por FilterExpression) con LastEvaluatedKey se vuelve a pedir
+            for fragmento, (items, last_evaluated_key) in zip(vacios, executor.map(en_contexto(self._leer), vacios)):
+                self._leido_desde[fragmento] = self._siguiente[fragmento]
+                self._buffer[fragmento] = deque(items)
+                self._entregado[fragmento] = None
+                self._siguiente[fragmento] = last_evaluated_key if last_evaluated_key is not None else FIN_FRAGMENTO
+
+    def _salida(self, item: dict) -> dict:
+        if not self._sobrantes:
+            return item
+        return {campo: valor for campo, valor in item.items() if campo not in self._sobrantes}
+
+    def paginas(self, limite: Optional[int] = None) -> Iterator[List[dict]]:
+        """
+        Genera los items en orden, en páginas de como mucho `limite` items o,
+        sin limite, en una página por ronda de lecturas
+        """
+        pagina = []
+        with ThreadPoolExecutor(max_workers=max(1, len(self.parametros))) as executor:
+            while True:
+                self._rellenar(executor)
+                activos = [fragmento for fragmento, buffer in enumerate(self._buffer) if buffer]
+                if not activos:
+                    break
+                # Lo que falta leer de un fragmento va después del último item de su buffer
+                cotas = [self._buffer[fragmento][-1][self.ORDEN] for fragmento in activos
+                         if self._siguiente[fragmento] != FIN_FRAGMENTO]
+                cota = min(cotas) if cotas else None
+                while activos:
+                    fragmento = min(activos, key=lambda f: (self._buffer[f][0][self.ORDEN], f))
+                    if cota is not None and self._buffer[fragmento][0][self.ORDEN] > cota:
+                        break
+                    item = self._buffer[fragmento].popleft()
+                    self._entregado[fragmento] = item
+                    if not self._buffer[fragmento]:
+                        activos.remove(fragmento)
+                    pagina.append(self._salida(item))
+                    if limite is not None and len(pagina) == limite:
+                        yield pagina
+                        pagina = []
+                if pagina and limite is None:
+                    yield pagina
+                    pagina = []
+        if pagina:
+            yield pagina
+
+    def _clave_indice(self, item: dict) -> dict:
+        return {'tienda_id': item['tienda_id'], 'fecha_proyeccion_semana': item['fecha_proyeccion_semana'],
+                self.atributo: item[self.atributo]}
+
+    def posiciones(self) -> List[Any]:
+        """Desde dónde continuar cada fragmento después de lo ya entregado"""
+        resultado = []
+        for fragmento, buffer in enumerate(self._buffer):
+            if not buffer:
+                resultado.append(self._siguiente[fragmento])
+            elif self._entregado[fragmento] is not None:
+                resultado.append(self._clave_indice(self._entregado[fragmento]))
+            else:
+                resultado.append(self._leido_desde[fragmento])
+        return resultado
+
+    @property
+    def terminada(self) -> bool:
+        return all(not buffer for buffer in self._buffer) and all(
+            posicion == FIN_FRAGMENTO for posicion in self._siguiente)
+
+
+class DynamoDBService(RepositorioProyecciones):
+    """
+    Servicio para interactuar con DynamoDB; es el backend por defecto de
+    RepositorioProyecciones. Los métodos son estáticos, así que también se
+    pueden llamar sobre la clase.
+    """
+    
+    @staticmethod
+    def _fecha_semana(fecha_proyeccion: str, semana: str, categoria: Optional[str] = None) -> str:
+        """
+        Clave de ordenación: fecha ISO y semana separadas por #, más la
+        categoría con CLAVE_CON_CATEGORIA (en ese caso es obligatoria y se
+        lanza ValueError si falta)
+        """
+        if not CLAVE_CON_CATEGORIA:
+            return f"{fecha_proyeccion}#{semana}"
+        if categoria is None:
+            raise ValueError("La clave de la proyección incluye la categoría: indique categoria_insumo")
+        return f"{fecha_proyeccion}#{semana}#{categoria}"
+
+    @staticmethod
+    def _proyeccion_to_item(proyeccion: ProyeccionInsumo) -> dict:
+        """
+        Convierte un objeto ProyeccionInsumo a formato DynamoDB.
+        Las cantidades se guardan como números (tipo N); las filas anteriores
+        las tienen como texto hasta que se ejecuta migracion.py, y los lectores
+        aceptan ambos formatos. Con INDICE_FRAGMENTOS se añaden los atributos
+        de los índices fragmentados.
+        """
+        item = {
+            'tienda_id': proyeccion.tienda_id,
+            'fecha_proyeccion_semana': DynamoDBService._fecha_semana(proyeccion.fecha_proyeccion.isoformat(),
+                                                                     proyeccion.semana, proyeccion.categoria_insumo),
+            'fecha_proyeccion': proyeccion.fecha_proyeccion.isoformat(),
+            'nombre_tienda': proyeccion.nombre_tienda,
+            'categoria_insumo': proyeccion.categoria_insumo,
+            'unidad_medida': proyeccion.unidad_medida,
+            'cantidad_estimada': proyeccion.cantidad_estimada,
+            'semana': proyeccion.semana,
+            'origen_modelo': proyeccion.origen_modelo,
+            'fecha_generacion': proyeccion.fecha_generacion.isoformat(),
+            'estado_proyeccion': proyeccion.estado_proyeccion,
+            'cantidad_despachada': proyeccion.cantidad_despachada,
+            'cantidad_consumida_real': proyeccion.cantidad_consumida_real,
+            'diferencia_vs_real': proyeccion.diferencia_vs_real,
+            'usuario_ajuste': proyeccion.usuario_ajuste,
+            'fecha_confirmacion': proyeccion.fecha_confirmacion.isoformat(),
+            'observaciones': proyeccion.observaciones
+        }
+        if INDICE_FRAGMENTOS:
+            item.update(DynamoDBService._atributos_fragmento(item))
+        return item
+
+    @staticmethod
+    def _atributos_fragmento(item: dict) -> Dict[str, str]:
+        """
+        semana_fragmento y categoria_fragmento de un item (vacío sin
+        INDICE_FRAGMENTOS). El fragmento sale de un hash estable (CRC32) de la
+        clave primaria: una fila siempre cae en el mismo y las de una semana
+        se reparten por igual entre todos.
+        """
+        if not INDICE_FRAGMENTOS:
+            return {}
+        clave = f"{item['tienda_id']}#{item['fecha_proyeccion_semana']}"
+        fragmento = zlib.crc32(clave.encode('utf-8')) % INDICE_FRAGMENTOS
+        return {atributo: f"{item[origen]}#{fragmento}" for _, atributo, origen in CRITERIOS_FRAGMENTADOS.values()}
+    
+    @staticmethod
+    def _item_to_proyeccion(item: dict) -> ProyeccionInsumo:
+        """Convierte un item de DynamoDB a objeto ProyeccionInsumo"""
+        return ProyeccionInsumo(
+            fecha_proyeccion=date.fromisoformat(item['fecha_proyeccion']),
+            tienda_id=item['tienda_id'],
+            nombre_tienda=item['nombre_tienda'],
+            categoria_insumo=item['categoria_insumo'],
+            unidad_medida=item['unidad_medida'],
+            cantidad_estimada=Decimal(item['cantidad_estimada']),
+            semana=item['semana'],
+            origen_modelo=item['origen_modelo'],
+            fecha_generacion=date.fromisoformat(item['fecha_generacion']),
+            estado_proyeccion=item['estado_proyeccion'],
+            cantidad_despachada=Decimal(item['cantidad_despachada']),
+            cantidad_consumida_real=Decimal(item['cantidad_consumida_real']),
+            diferencia_vs_real=Decimal(item['diferencia_vs_real']),
+            usuario_ajuste=item['usuario_ajuste'],
+            fecha_confirmacion=date.fromisoformat(item['fecha_confirmacion']),
+            observaciones=item.get('observaciones')
+        )
+    
+    @staticmethod
+    def _item_to_proyeccion_rapido(item: dict) -> ProyeccionInsumo:
+        """
+        Convierte un item leído de la tabla sin volver a validarlo con pydantic.
+        Solo debe usarse con items escritos por este servicio (ya validados al escribirse).
+        """
+        return ProyeccionInsumo.model_construct(
+            fecha_proyeccion=date.fromisoformat(item['fecha_proyeccion']),
+            tienda_id=item['tienda_id'],
+            nombre_tienda=item['nombre_tienda'],
+            categoria_insumo=item['categoria_insumo'],
+            unidad_medida=item['unidad_medida'],
+            cantidad_estimada=Decimal(item['cantidad_estimada']),
+            semana=item['semana'],
+            origen_modelo=item['origen_modelo'],
+            fecha_generacion=date.fromisoformat(item['fecha_generacion']),
+            estado_proyeccion=item['estado_proyeccion'],
+            cantidad_despachada=Decimal(item['cantidad_despachada']),
+            cantidad_consumida_real=Decimal(item['cantidad_consumida_real']),
+            diferencia_vs_real=Decimal(item['diferencia_vs_real']),
+            usuario_ajuste=item['usuario_ajuste'],
+            fecha_confirmacion=date.fromisoformat(item['fecha_confirmacion']),
+            observaciones=item.get('observaciones')
+        )
+
+    @staticmethod
+    @medir_fase(FASE_CONVERSION)
+    def _items_a_proyecciones(items: Iterable[dict]) -> List[ProyeccionInsumo]:
+        """
+        Convierte una lista de items con _item_to_proyeccion_rapido; la
+        conversión se mide una vez por lista y no por fila
+        """
+        return [DynamoDBService._item_to_proyeccion_rapido(item) for item in items]
+
+    @staticmethod
+    def _item_a_json(item: dict, campos: Optional[Sequence[str]] = None) -> dict:
+        """
+        Prepara un item para json.dumps con la misma forma que produce pydantic
+        para ProyeccionInsumo: fechas ISO y Decimal como texto. Las fechas ya se
+        guardan en ISO, así que solo se copian. Con campos, solo se incluyen esos.
+        """
+        salida = {}
+        for campo in campos or CAMPOS_PROYECCION:
+            valor = item.get(campo)
+            salida[campo] = str(valor) if isinstance(valor, Decimal) else valor
+        return salida
+
+    @staticmethod
+    @medir_fase(FASE_SERIALIZACION)
+    def codificar_json(items: Iterable[dict], campos: Optional[Sequence[str]] = None) -> bytes:
+        """Serializa items de la tabla directamente a un arreglo JSON"""
+        return json.dumps([DynamoDBService._item_a_json(item, campos) for item in items],
+                          ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    @staticmethod
+    @medir_fase(FASE_SERIALIZACION)
+    def codificar_ndjson(items: Iterable[dict], campos: Optional[Sequence[str]] = None) -> bytes:
+        """Serializa items de la tabla como NDJSON (una línea por item)"""
+        return ''.join(
+            json.dumps(DynamoDBService._item_a_json(item, campos), ensure_ascii=False, separators=(',', ':')) + '\n'
+            for item in items
+        ).encode('utf-8')
+
+    @staticmethod
+    @medir_fase(FASE_SERIALIZACION)
+    def codificar_consulta(items: Sequence[Optional[dict]], campos: Optional[Sequence[str]] = None) -> bytes:
+        """Serializa una lectura por claves (forma de RespuestaConsultaLote) directamente a JSON"""
+        encontradas = sum(1 for item in items if item is not None)
+        return json.dumps(
+            {'total': len(items), 'encontradas': encontradas, 'faltantes': len(items) - encontradas,
+             'resultados': [{'indice': indice, 'encontrada': item is not None,
+                             'proyeccion': DynamoDBService._item_a_json(item, campos) if item is not None else None}
+                            for indice, item in enumerate(items)]},
+            ensure_ascii=False, separators=(',', ':')
+        ).encode('utf-8')
+
+    @staticmethod
+    @medir_fase(FASE_SERIALIZACION)
+    def codificar_pagina(items: Iterable[dict], siguiente_cursor: Optional[str],
+                         campos: Optional[Sequence[str]] = None) -> bytes:
+        """Serializa una página (forma de PaginaProyecciones) directamente a JSON"""
+        return json.dumps(
+            {'items': [DynamoDBService._item_a_json(item, campos) for item in items],
+             'siguiente_cursor': siguiente_cursor},
+            ensure_ascii=False, separators=(',', ':')
+        ).encode('utf-8')
+
+    @staticmethod
+    def _reemplazar(proyeccion: ProyeccionInsumo):
+        """Escribe la fila completa (_reemplazar_item) y actualiza la cache y los resúmenes"""
+        with fase(FASE_CONVERSION):
+            item = DynamoDBService._proyeccion_to_item(proyeccion)
+        anterior = DynamoDBService._reemplazar_item(item)
+        DynamoDBService._invalidar_cache(item, anterior)
+        DynamoDBService._actualizar_resumenes(item, anterior)
+
+    @staticmethod
+    def _reemplazar_item(item: dict) -> Optional[dict]:
+        """
+        Escribe un item completo con UpdateItem en lugar de PutItem, así la
+        versión no vuelve a 0: pasa a la siguiente de la anterior (1 en una
+        fila nueva) y un PATCH con la versión leída antes de la escritura
+        responde 409. Los atributos de fragmento que el item no lleva se borran.
+        Devuelve la fila anterior (None si no existía).
+        """
+        valores = {campo: valor for campo, valor in item.items() if campo not in CAMPOS_CLAVE}
+        nombres = {f"#a{i}": campo for i, campo in enumerate(valores)}
+        sobrantes = {f"#r{i}": atributo for i, (_, atributo, _) in enumerate(CRITERIOS_FRAGMENTADOS.values())
+                     if atributo not in item}
+        expresion = ('SET ' + ', '.join(f"{nombre} = :{nombre[1:]}" for nombre in nombres)
+                     + ', #version = if_not_exists(#version, :cero) + :uno')
+        if sobrantes:
+            expresion += ' REMOVE ' + ', '.join(sobrantes)
+        return DynamoDBService._escribir(
+            DYNAMODB_TABLE_NAME, get_table().update_item,
+            Key={campo: item[campo] for campo in CAMPOS_CLAVE},
+            UpdateExpression=expresion,
+            ExpressionAttributeNames={**nombres, **sobrantes, '#version': 'version'},
+            ExpressionAttributeValues={**{f":{nombre[1:]}": valores[campo] for nombre, campo in nombres.items()},
+                                       ':cero': 0, ':uno': 1},
+            ReturnValues='ALL_OLD'
+        ).get('Attributes')
+
+    @staticmethod
+    def crear_proyeccion(proyeccion: ProyeccionInsumo) -> ProyeccionInsumo:
+        """Crea una nueva proyección en DynamoDB"""
+        try:
+            DynamoDBService._reemplazar(proyeccion)
+            return proyeccion
+        except ClientError as e:
+            raise Exception(f"Error al crear proyección: {e.response['Error']['Message']}")
+    
+    @staticmethod
+    def crear_proyecciones_lote(proyecciones: Iterable[ProyeccionInsumo]) -> Iterator[Tuple[int, Optional[str]]]:
+        """
+        Crea proyecciones en bloques de 25 con BatchWriteItem.
+        Acepta cualquier iterable (se consume de forma incremental) y devuelve
+        pares (posición, error) a medida que cada bloque termina; error es None
+        si la fila se escribió correctamente. Los cambios en los resúmenes
+        semanales se agregan y se aplican cada INTERVALO_RESUMEN filas y al final.
+        Solo se leen antes las filas que pueden existir (ClavesCarga).
+        """
+        semanas = set()
+        deltas = DeltasResumen()
+        claves_carga = ClavesCarga()
+
+        def escribir_bloque(bloque):
+            return DynamoDBService._escribir_bloque_con_resumen(bloque, deltas, claves_carga)
+
+        def solicitudes():
+            # Se convierten de a un bloque, así la conversión se mide una vez por bloque
+            posiciones = enumerate(proyecciones)
+            while True:
+                bloque = list(islice(posiciones, TAMANO_LOTE_ESCRITURA))
+                if not bloque:
+                    break
+                with fase(FASE_CONVERSION):
+                    items = [(posicion, DynamoDBService._proyeccion_to_item(proyeccion))
+                             for posicion, proyeccion in bloque]
+                for posicion, item in items:
+                    semanas.add(item['semana'])
+                    yield posicion, {'PutRequest': {'Item': item}}
+
+        try:
+            escritas = 0
+            for resultado in DynamoDBService._escribir_en_lotes(solicitudes(), escribir_bloque=escribir_bloque):
+                yield resultado
+                escritas += 1
+                if escritas % INTERVALO_RESUMEN == 0:
+                    deltas.aplicar()
+        finally:
+            try:
+                deltas.aplicar()
+            finally:
+                # La semana forma parte de la clave, así que basta con las semanas
+                # escritas; la categoría anterior de una fila sobrescrita no se
+                # conoce, por lo que se invalidan todas las consultas por categoría
+                cache_consultas.invalidar_si(
+                    lambda clave: clave[0] == CRITERIO_CATEGORIA
+                    or (clave[0] == CRITERIO_SEMANA and clave[1] in semanas)
+                )
+
+    @staticmethod
+    def _clave_solicitud(solicitud: dict) -> Tuple[str, str]:
+        """Obtiene la clave primaria de una solicitud PutRequest/DeleteRequest"""
+        if 'PutRequest' in solicitud:
+            datos = solicitud['PutRequest']['Item']
+        else:
+            datos = solicitud['DeleteRequest']['Key']
+        return datos['tienda_id'], datos['fecha_proyeccion_semana']
+
+    @staticmethod
+    def _espera_backoff(intento: int) -> float:
+        """Backoff exponencial con jitter completo (máximo 5 segundos)"""
+        return random.uniform(0, min(5.0, 0.05 * (2 ** intento)))
+
+    @staticmethod
+    def _limitador(tabla: str) -> Optional[LimitadorAdaptativo]:
+        """
+        Limitador de escritura compartido de una tabla, dimensionado con
+        ESCRITURA_WCU o, en modo "auto", con su capacidad provisionada. None
+        si la tabla es bajo demanda, el límite está desactivado o no se pudo
+        leer la capacidad.
+        """
+        if tabla in _limitadores:
+            return _limitadores[tabla]
+        with _lock_limitadores:
+            if tabla not in _limitadores:
+                if ESCRITURA_WCU == 'auto':
+                    try:
+                        capacidad = DynamoDBService.capacidad_escritura(tabla)
+                    except Exception as e:
+                        logger.warning("Escrituras en %s sin limitar: %s", tabla, e)
+                        capacidad = None
+                else:
+                    capacidad = float(ESCRITURA_WCU) or None
+                _limitadores[tabla] = LimitadorAdaptativo(capacidad) if capacidad else None
+            return _limitadores[tabla]
+
+    @staticmethod
+    def _escribir(tabla: str, operacion, **parametros) -> dict:
+        """
+        Ejecuta una escritura individual (PutItem, UpdateItem, DeleteItem) al
+        ritmo del limitador de la tabla. Los rechazos por capacidad reducen el
+        ritmo y se reintentan con backoff y jitter; si se agotan los reintentos
+        lanza CapacidadAgotada. Los demás errores se propagan sin reintentar.
+        """
+        limitador = DynamoDBService._limitador(tabla)
+        intento = 0
+        while True:
+            if limitador:
+                limitador.esperar()
+            try:
+                return operacion(**parametros)
+            except ClientError as e:
+                codigo = e.response['Error']['Code']
+                if codigo not in ERRORES_REINTENTABLES:
+                    raise
+                if limitador and codigo in ERRORES_CAPACIDAD:
+                    limitador.reducir()
+                intento += 1
+                if intento > BATCH_WRITE_MAX_REINTENTOS:
+                    if codigo in ERRORES_CAPACIDAD:
+                        raise CapacidadAgotada(
+                            f"La tabla {tabla} no tiene capacidad de escritura disponible: "
+                            f"{e.response['Error']['Message']}"
+                        )
+                    raise
+                time.sleep(DynamoDBService._espera_backoff(intento))
+
+    @staticmethod
+    def _fragmentar_solicitudes(solicitudes: Iterable[Tuple[Any, dict]]) -> Iterator[List[Tuple[Any, dict]]]:
+        """
+        Agrupa solicitudes en bloques de hasta 25.
+        BatchWriteItem rechaza bloques con claves repetidas, así que una clave
+        repetida abre un bloque nuevo.
+        """
+        bloque = []
+        claves = set()
+        for identificador, solicitud in solicitudes:
+            clave = DynamoDBService._clave_solicitud(solicitud)
+            if len(bloque) == TAMANO_LOTE_ESCRITURA or clave in claves:
+                yield bloque
+                bloque = []
+                claves = set()
+            bloque.append((identificador, solicitud))
+            claves.add(clave)
+        if bloque:
+            yield bloque
+
+    @staticmethod
+    def _escribir_bloque(bloque: List[Tuple[Any, dict]]) -> List[Tuple[Any, Optional[str]]]:
+        """
+        Envía un bloque a BatchWriteItem al ritmo del limitador de la tabla y
+        reintenta los UnprocessedItems con backoff hasta
+        BATCH_WRITE_MAX_REINTENTOS veces; cada rechazo reduce el ritmo.
+        """
+        pendientes = {DynamoDBService._clave_solicitud(solicitud): (identificador, solicitud)
+                      for identificador, solicitud in bloque}
+        resultados = []
+        intento = 0
+        limitador = DynamoDBService._limitador(DYNAMODB_TABLE_NAME)
+        while pendientes:
+            if limitador:
+                limitador.esperar(len(pendientes))
+            try:
+                response = get_dynamodb().batch_write_item(
+                    RequestItems={DYNAMODB_TABLE_NAME: [solicitud for _, solicitud in pendientes.values()]}
+                )
+                no_procesadas = {
+                    DynamoDBService._clave_solicitud(solicitud)
+                    for solicitud in response.get('UnprocessedItems', {}).get(DYNAMODB_TABLE_NAME, [])
+                }
+                error = "No procesada por DynamoDB tras agotar los reintentos"
+            except ClientError as e:
+                if e.response['Error']['Code'] not in ERRORES_REINTENTABLES:
+                    mensaje = e.response['Error']['Message']
+                    resultados.extend((identificador, mensaje) for identificador, _ in pendientes.values())
+                    return resultados
+                no_procesadas = set(pendientes)
+                error = e.response['Error']['Message']
+                if limitador and e.response['Error']['Code'] in ERRORES_CAPACIDAD:
+                    limitador.reducir()
+            else:
+                # Las filas no procesadas son las que DynamoDB rechazó por capacidad
+                if limitador and no_procesadas:
+                    limitador.reducir()
+
+            for clave in list(pendientes):
+                if clave not in no_procesadas:
+                    resultados.append((pendientes.pop(clave)[0], None))
+
+            if pendientes:
+                intento += 1
+                if intento > BATCH_WRITE_MAX_REINTENTOS:
+                    resultados.extend((identificador, error) for identificador, _ in pendientes.values())
+                    break
+                time.sleep(DynamoDBService._espera_backoff(intento))
+        return resultados
+
+    @staticmethod
+    def _escribir_bloque_con_resumen(bloque: List[Tuple[Any, dict]], deltas: DeltasResumen,
+                                     claves_carga: Optional[ClavesCarga] = None) -> List[Tuple[Any, Optional[str]]]:
+        """
+        Igual que _escribir_bloque, pero lee antes las filas anteriores
+        (BatchWriteItem no las devuelve; con claves_carga, solo las que pueden
+        existir) y registra en deltas el cambio de las que se escribieron. Las filas nuevas van en el BatchWriteItem con la
+        versión 1; las que ya existían se reemplazan de a una con
+        _reemplazar_item, que incrementa la versión en la propia escritura y
+        devuelve la fila reemplazada, así un PATCH concurrente nunca comparte
+        versión con la carga. Las cargas no comprueban versiones (no hay
+        If-Match): la última escritura gana, y una fila creada por otro
+        proceso entre la lectura y el BatchWriteItem se sobrescribe. Los
+        identificadores deben ser hashables.
+        """
+        claves = [DynamoDBService._clave_solicitud(solicitud) for _, solicitud in bloque]
+        try:
+            if claves_carga is not None:
+                claves = claves_carga.filtrar([
+                    (clave, solicitud['PutRequest']['Item']['semana'] if 'PutRequest' in solicitud else None)
+                    for clave, (_, solicitud) in zip(claves, bloque)
+                ])
+            anteriores = DynamoDBService._leer_para_resumen(claves)
+        except Exception as e:
+            # Sin las versiones anteriores el resumen quedaría descuadrado: el bloque no se escribe
+            return [(identificador, str(e)) for identificador, _ in bloque]
+        nuevas, existentes = [], []
+        for identificador, solicitud in bloque:
+            if 'PutRequest' not in solicitud:
+                nuevas.append((identificador, solicitud))
+            elif DynamoDBService._clave_solicitud(solicitud) in anteriores:
+                existentes.append((identificador, solicitud['PutRequest']['Item']))
+            else:
+                solicitud['PutRequest']['Item']['version'] = 1
+                nuevas.append((identificador, solicitud))
+
+        resultados = DynamoDBService._escribir_bloque(nuevas) if nuevas else []
+        escritos = {identificador for identificador, error in resultados if error is None}
+        for identificador, solicitud in nuevas:
+            if identificador in escritos:
+                nuevo = solicitud['PutRequest']['Item'] if 'PutRequest' in solicitud else None
+                deltas.agregar(nuevo, anteriores.get(DynamoDBService._clave_solicitud(solicitud)))
+        for identificador, item in existentes:
+            try:
+                anterior = DynamoDBService._reemplazar_item(item)
+            except ClientError as e:
+                resultados.append((identificador, e.response['Error']['Message']))
+                continue
+            except CapacidadAgotada as e:
+                resultados.append((identificador, str(e)))
+                continue
+            deltas.agregar(item, anterior)
+            resultados.append((identificador, None))
+        return resultados
+
+    @staticmethod
+    def _leer_para_resumen(claves: List[Tuple[str, str]]) -> Dict[Tuple[str, str], dict]:
+        """Lee con BatchGetItem (máximo 100 claves) los campos que intervienen en los resúmenes"""
+        return DynamoDBService._leer_bloque(claves, ('semana', 'categoria_insumo') + CAMPOS_RESUMEN)
+
+    @staticmethod
+    def _semana_con_filas(semana: str) -> bool:
+        """
+        Si una semana pudo tener filas alguna vez: existe su resumen total o
+        su marcador de versión (un BatchGetItem de dos claves). Ante un error
+        responde True, que solo cuesta leer las filas antes de escribirlas.
+        """
+        claves = [{'semana': semana, 'dimension': DIMENSION_TOTAL},
+                  {'semana': SEMANA_VERSIONES, 'dimension': f"{PREFIJO_SEMANA}{semana}"}]
+        try:
+            response = get_dynamodb().batch_get_item(RequestItems={DYNAMODB_RESUMEN_TABLE_NAME: {
+                'Keys': claves, 'ProjectionExpression': 'semana'
+            }})
+        except ClientError as e:
+            logger.warning("No se pudo comprobar si la semana %s tiene filas: %s",
+                           semana, e.response['Error']['Message'])
+            return True
+        sin_leer = response.get('UnprocessedKeys', {}).get(DYNAMODB_RESUMEN_TABLE_NAME)
+        return bool(sin_leer or response.get('Responses', {}).get(DYNAMODB_RESUMEN_TABLE_NAME))
+
+    @staticmethod
+    def _leer_bloque(claves: List[Tuple[str, str]],
+                     campos: Optional[Sequence[str]] = None) -> Dict[Tuple[str, str], dict]:
+        """
+        Lee hasta 100 claves primarias (sin repetir) con BatchGetItem,
+        reintentando las UnprocessedKeys con backoff. Devuelve los items
+        encontrados por clave; con campos, solo esos atributos y la clave.
+        """
+        if not claves:
+            return {}
+        solicitud = {
+            'Keys': [{'tienda_id': tienda_id, 'fecha_proyeccion_semana': fecha_semana}
+                     for tienda_id, fecha_semana in claves],
+            **DynamoDBService._proyeccion_campos(
+                tuple(dict.fromkeys(CAMPOS_CLAVE + tuple(campos))) if campos else None
+            ),
+        }
+        encontrados = {}
+        intento = 0
+        while solicitud['Keys']:
+            try:
+                response = get_dynamodb().batch_get_item(RequestItems={DYNAMODB_TABLE_NAME: solicitud})
+            except ClientError as e:
+                raise Exception(f"Error al leer proyecciones por clave: {e.response['Error']['Message']}")
+            for item in response.get('Responses', {}).get(DYNAMODB_TABLE_NAME, []):
+                encontrados[(item['tienda_id'], item['fecha_proyeccion_semana'])] = item
+            solicitud['Keys'] = response.get('UnprocessedKeys', {}).get(DYNAMODB_TABLE_NAME, {}).get('Keys', [])
+            if solicitud['Keys']:
+                intento += 1
+                if intento > BATCH_WRITE_MAX_REINTENTOS:
+                    raise Exception("No se pudieron leer las proyecciones por clave tras agotar los reintentos")
+                time.sleep(DynamoDBService._espera_backoff(intento))
+        return encontrados
+
+    @staticmethod
+    def obtener_por_claves(claves: Sequence[Tuple[str, str, str, Optional[str]]],
+                           campos: Optional[Sequence[str]] = None) -> List[Optional[dict]]:
+        """
+        Lee proyecciones por clave (tienda_id, fecha_proyeccion ISO, semana,
+        categoria_insumo; la categoría solo se usa con CLAVE_CON_CATEGORIA) con
+        BatchGetItem en bloques de 100, varios a la vez. Devuelve los items en
+        el orden de las claves, con None en las que no existen; las claves
+        repetidas se leen una sola vez.
+        """
+        primarias = [(tienda_id, DynamoDBService._fecha_semana(fecha_proyeccion, semana, categoria))
+                     for tienda_id, fecha_proyeccion, semana, categoria in claves]
+        encontrados = DynamoDBService._leer_claves(primarias, campos)
+        return [encontrados.get(clave) for clave in primarias]
+
+    @staticmethod
+    def _leer_claves(primarias: Sequence[Tuple[str, str]],
+                     campos: Optional[Sequence[str]] = None) -> Dict[Tuple[str, str], dict]:
+        """Lee claves primarias con BatchGetItem en bloques de 100, varios a la vez; devuelve los items por clave"""
+        unicas = list(dict.fromkeys(primarias))
+        bloques = [unicas[inicio:inicio + TAMANO_LOTE_LECTURA]
+                   for inicio in range(0, len(unicas), TAMANO_LOTE_LECTURA)]
+        if len(bloques) <= 1:
+            return DynamoDBService._leer_bloque(bloques[0], campos) if bloques else {}
+        encontrados = {}
+        with ThreadPoolExecutor(max_workers=min(BATCH_GET_WORKERS, len(bloques))) as executor:
+            futuros = [executor.submit(en_contexto(DynamoDBService._leer_bloque), bloque, campos)
+                       for bloque in bloques]
+            for futuro in futuros:
+                encontrados.update(futuro.result())
+        return encontrados
+
+    @staticmethod
+    def _query_completada(campos: Optional[Sequence[str]] = None):
+        """
+        Operación con la forma de Table.query para índices que no proyectan
+        todos los atributos: cada página de claves del índice se completa con
+        BatchGetItem, en el mismo orden y con el mismo LastEvaluatedKey. Una
+        fila borrada entre las dos lecturas se omite.
+        """
+        def operacion(**parametros) -> dict:
+            response = get_table().query(**parametros)
+            claves = [(item['tienda_id'], item['fecha_proyeccion_semana']) for item in response.get('Items', [])]
+            encontrados = DynamoDBService._leer_claves(claves, campos)
+            response['Items'] = [encontrados[clave] for clave in claves if clave in encontrados]
+            return response
+        return operacion
+
+    @staticmethod
+    def _escribir_en_lotes(solicitudes: Iterable[Tuple[Any, dict]],
+                           max_workers: int = BATCH_WRITE_WORKERS,
+                           escribir_bloque=None) -> Iterator[Tuple[Any, Optional[str]]]:
+        """
+        Escribe solicitudes (identificador, PutRequest/DeleteRequest) en bloques
+        de 25 con varios bloques en vuelo a la vez. Solo se mantienen en memoria
+        los bloques en curso, por lo que el origen puede ser un stream. Un bloque
+        con una clave que ya está en vuelo espera a que ese bloque termine, así
+        la última solicitud de una clave repetida es la que queda escrita.
+        escribir_bloque reemplaza a _escribir_bloque para cada bloque.
+        """
+        escribir_bloque = escribir_bloque or DynamoDBService._escribir_bloque
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            en_vuelo = {}
+            for bloque in DynamoDBService._fragmentar_solicitudes(solicitudes):
+                claves = {DynamoDBService._clave_solicitud(solicitud) for _, solicitud in bloque}
+                conflictos = [futuro for futuro, claves_bloque in en_vuelo.items() if claves & claves_bloque]
+                if conflictos or len(en_vuelo) >= max_workers * 2:
+                    terminados, _ = wait(conflictos or en_vuelo,
+                                         return_when=ALL_COMPLETED if conflictos else FIRST_COMPLETED)
+                    for futuro in terminados:
+                        del en_vuelo[futuro]
+                        yield from futuro.result()
+                en_vuelo[executor.submit(en_contexto(escribir_bloque), bloque)] = claves
+            for futuro in en_vuelo:
+                yield from futuro.result()
+
+    @staticmethod
+    def _paginas(operacion, **parametros) -> Iterator[dict]:
+        """Genera las respuestas de una query/scan siguiendo LastEvaluatedKey"""
+        while True:
+            response = operacion(**parametros)
+            yield response
+            if 'LastEvaluatedKey' not in response:
+                break
+            parametros['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    @staticmethod
+    def validar_campos(campos: Optional[Iterable[str]]) -> Optional[Tuple[str, ...]]:
+        """
+        Normaliza una selección de campos (fields=) y la valida contra ProyeccionInsumo.
+        Devuelve None si no se pidió selección; lanza ValueError si hay campos desconocidos.
+        """
+        if campos is None:
+            return None
+        seleccion = tuple(dict.fromkeys(campo.strip() for campo in campos if campo.strip()))
+        desconocidos = [campo for campo in seleccion if campo not in CAMPOS_PROYECCION]
+        if desconocidos:
+            raise ValueError(f"Campos desconocidos: {', '.join(desconocidos)}")
+        if not seleccion:
+            raise ValueError("Debe indicar al menos un campo")
+        return seleccion
+
+    @staticmethod
+    def _proyeccion_campos(campos: Optional[Sequence[str]]) -> dict:
+        """Parámetros ProjectionExpression para leer solo los campos indicados"""
+        if not campos:
+            return {}
+        nombres = {f"#c{i}": campo for i, campo in enumerate(campos)}
+        return {
+            'ProjectionExpression': ', '.join(nombres),
+            'ExpressionAttributeNames': nombres
+        }
+
+    @staticmethod
+    def _consulta(criterio: str, valor: ValorCriterio = None,
+                  campos: Optional[Sequence[str]] = None) -> Tuple[Any, dict]:
+        """Devuelve la operación y los parámetros de DynamoDB para un criterio de listado"""
+        proyeccion = DynamoDBService._proyeccion_campos(campos)
+        if criterio == CRITERIO_TODAS:
+            return get_table().scan, proyeccion
+        if criterio == CRITERIO_TIENDA:
+            return get_table().query, {'KeyConditionExpression': Key('tienda_id').eq(valor), **proyeccion}
+        if criterio == CRITERIO_SEMANA:
+            return get_table().query, {
+                'IndexName': 'semana-index',
+                'KeyConditionExpression': Key('semana').eq(valor),
+                **proyeccion
+            }
+        if criterio == CRITERIO_CATEGORIA:
+            return get_table().query, {
+                'IndexName': 'categoria-index',
+                'KeyConditionExpression': Key('categoria_insumo').eq(valor),
+                **proyeccion
+            }
+        if criterio == CRITERIO_TIENDA_FECHAS:
+            # La clave de ordenación empieza por "<fecha>#": un día se resuelve con
+            # begins_with y un rango con between hasta "<hasta>$" ('$' sigue a '#')
+            tienda_id, desde, hasta = valor
+            if desde == hasta:
+                condicion_fecha = Key('fecha_proyeccion_semana').begins_with(f"{desde}#")
+            else:
+                condicion_fecha = Key('fecha_proyeccion_semana').between(desde, f"{hasta}$")
+            return get_table().query, {
+                'KeyConditionExpression': Key('tienda_id').eq(tienda_id) & condicion_fecha,
+                **proyeccion
+            }
+        if criterio == CRITERIO_TIENDA_SEMANA:
+            tienda_id, semana = valor
+            parametros = {
+                'IndexName': 'tienda-semana-index',
+                'KeyConditionExpression': Key('tienda_id').eq(tienda_id) & Key('semana').eq(semana),
+            }
+            if campos and set(campos) <= set(CAMPOS_INDICE_TIENDA_SEMANA):
+                return get_table().query, {**parametros, **proyeccion}
+            # El índice solo proyecta la categoría y las cantidades: se leen
+            # las claves y las filas se completan por clave
+            return DynamoDBService._query_completada(campos), {
+                **parametros, **DynamoDBService._proyeccion_campos(CAMPOS_CLAVE)
+            }
+        if criterio == CRITERIO_SEMANA_CATEGORIA:
+            semana, categoria = valor
+            return get_table().query, {
+                'IndexName': 'semana-categoria-index',
+                'KeyConditionExpression': Key('semana').eq(semana) & Key('categoria_insumo').eq(categoria),
+                **proyeccion
+            }
+        raise ValueError(f"Criterio de listado desconocido: {criterio}")
+
+    @staticmethod
+    def _consulta_fragmentada(criterio: str, valor: ValorCriterio = None,
+                              campos: Optional[Sequence[str]] = None,
+                              posiciones: Optional[List[Any]] = None,
+                              **adicionales) -> Optional[ConsultaFragmentada]:
+        """
+        Prepara la lectura de un criterio por semana o por categoría sobre los
+        fragmentos de su índice (una query por fragmento, con los parámetros
+        adicionales). None si LECTURA_FRAGMENTADA no está activa o el criterio
+        no tiene índice fragmentado.
+        """
+        if not LECTURA_FRAGMENTADA or criterio not in CRITERIOS_FRAGMENTADOS:
+            return None
+        indice, atributo, _ = CRITERIOS_FRAGMENTADOS[criterio]
+        # La clave del índice se lee siempre: con ella se calculan las posiciones
+        lectura = tuple(dict.fromkeys(tuple(campos) + CAMPOS_CLAVE + (atributo,))) if campos else None
+        parametros = [
+            {
+                'IndexName': indice,
+                'KeyConditionExpression': Key(atributo).eq(f"{valor}#{fragmento}"),
+                **DynamoDBService._proyeccion_campos(lectura),
+                **adicionales
+            }
+            for fragmento in range(INDICE_FRAGMENTOS)
+        ]
+        return ConsultaFragmentada(atributo, parametros, campos, posiciones)
+
+    @staticmethod
+    def _listar_items(criterio: str, valor: ValorCriterio = None,
+                      campos: Optional[Sequence[str]] = None) -> List[dict]:
+        """Lee todas las páginas de un criterio y devuelve los items sin convertir"""
+        fragmentada = DynamoDBService._consulta_fragmentada(criterio, valor, campos)
+        if fragmentada is not None:
+            return [item for pagina in fragmentada.paginas() for item in pagina]
+        operacion, parametros = DynamoDBService._consulta(criterio, valor, campos)
+        return [
+            item
+            for response in DynamoDBService._paginas(operacion, **parametros)
+            for item in response.get('Items', [])
+        ]
+
+    @staticmethod
+    def _codificar_cursor(criterio: str, valor: ValorCriterio, last_evaluated_key: dict) -> str:
+        """Envuelve un LastEvaluatedKey en un token opaco ligado al criterio de listado"""
+        contenido = json.dumps({'c': criterio, 'v': valor, 'k': last_evaluated_key},
+                               default=str, separators=(',', ':'))
+        return base64.urlsafe_b64encode(contenido.encode('utf-8')).decode('ascii').rstrip('=')
+
+    @staticmethod
+    def _decodificar_cursor(criterio: str, valor: ValorCriterio, cursor: str) -> dict:
+        """Recupera el ExclusiveStartKey de un cursor; lanza ValueError si no es válido"""
+        try:
+            relleno = '=' * (-len(cursor) % 4)
+            contenido = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+            clave = contenido['k']
+        except (ValueError, TypeError, KeyError):
+            raise ValueError("Cursor inválido")
+        # En JSON las tuplas de los criterios compuestos vuelven como listas
+        esperado = list(valor) if isinstance(valor, tuple) else valor
+        if contenido.get('c') != criterio or contenido.get('v') != esperado or not isinstance(clave, dict):
+            raise ValueError("El cursor no corresponde a este listado")
+        return clave
+
+    @staticmethod
+    def listar_pagina(criterio: str, valor: ValorCriterio = None, limit: Optional[int] = None,
+                      cursor: Optional[str] = None,
+                      campos: Optional[Sequence[str]] = None) -> Tuple[List[dict], Optional[str]]:
+        """
+        Lee una sola página de un listado.
+        Devuelve los items de DynamoDB y el cursor de la página siguiente (None si no hay más).
+        Con índices fragmentados, el cursor guarda la posición de cada fragmento.
+        """
+        if LECTURA_FRAGMENTADA and criterio in CRITERIOS_FRAGMENTADOS:
+            return DynamoDBService._listar_pagina_fragmentada(criterio, valor, limit, cursor, campos)
+        operacion, parametros = DynamoDBService._consulta(criterio, valor, campos)
+        if limit is not None:
+            parametros['Limit'] = limit
+        if cursor:
+            parametros['ExclusiveStartKey'] = DynamoDBService._decodificar_cursor(criterio, valor, cursor)
+        try:
+            response = operacion(**parametros)
+        except ClientError as e:
+            raise Exception(f"Error al listar proyecciones: {e.response['Error']['Message']}")
+
+        siguiente = None
+        if 'LastEvaluatedKey' in response:
+            siguiente = DynamoDBService._codificar_cursor(criterio, valor, response['LastEvaluatedKey'])
+        return response.get('Items', []), siguiente
+
+    @staticmethod
+    def _posiciones_cursor(criterio: str, valor: ValorCriterio, cursor: Optional[str]) -> Optional[List[Any]]:
+        """Posiciones por fragmento guardadas en un cursor; lanza ValueError si no es válido"""
+        if not cursor:
+            return None
+        posiciones = DynamoDBService._decodificar_cursor(criterio, valor, cursor).get('fragmentos')
+        if not isinstance(posiciones, list) or len(posiciones) != INDICE_FRAGMENTOS:
+            raise ValueError("El cursor no corresponde a este listado")
+        return posiciones
+
+    @staticmethod
+    def _listar_pagina_fragmentada(criterio: str, valor: ValorCriterio, limit: Optional[int],
+                                   cursor: Optional[str],
+                                   campos: Optional[Sequence[str]]) -> Tuple[List[dict], Optional[str]]:
+        """
+        Página de un listado sobre un índice fragmentado. Cada fragmento se lee
+        con Limit proporcional a su parte de la página, así una página cuesta
+        poco más que en el índice sin fragmentar.
+        """
+        adicionales = {'Limit': math.ceil(limit / INDICE_FRAGMENTOS)} if limit is not None else {}
+        fragmentada = DynamoDBService._consulta_fragmentada(
+            criterio, valor, campos, DynamoDBService._posiciones_cursor(criterio, valor, cursor), **adicionales
+        )
+        try:
+            items = next(fragmentada.paginas(limit), [])
+        except ClientError as e:
+            raise Exception(f"Error al listar proyecciones: {e.response['Error']['Message']}")
+
+        siguiente = None
+        if not fragmentada.terminada:
+            siguiente = DynamoDBService._codificar_cursor(criterio, valor, {'fragmentos': fragmentada.posiciones()})
+        return items, siguiente
+
+    @staticmethod
+    def iterar_paginas(criterio: str, valor: ValorCriterio = None, cursor: Optional[str] = None,
+                       campos: Optional[Sequence[str]] = None) -> Iterator[List[dict]]:
+        """
+        Genera los items de DynamoDB de un listado página a página, sin acumular
+        el resultado completo en memoria.
+        """
+        fragmentada = None
+        if LECTURA_FRAGMENTADA and criterio in CRITERIOS_FRAGMENTADOS:
+            fragmentada = DynamoDBService._consulta_fragmentada(
+                criterio, valor, campos, DynamoDBService._posiciones_cursor(criterio, valor, cursor)
+            )
+        operacion, parametros = DynamoDBService._consulta(criterio, valor, campos)
+        if cursor and fragmentada is None:
+            parametros['ExclusiveStartKey'] = DynamoDBService._decodificar_cursor(criterio, valor, cursor)
+        if fragmentada is not None:
+            paginas = fragmentada.paginas()
+        elif criterio == CRITERIO_TODAS and not cursor:
+            paginas = (items for _, items, _ in DynamoDBService.escanear_paralelo(**parametros).paginas())
+        else:
+            paginas = (response.get('Items', []) for response in DynamoDBService._paginas(operacion, **parametros))
+        try:
+            yield from paginas
+        except ClientError as e:
+            raise Exception(f"Error al listar proyecciones: {e.response['Error']['Message']}")
+
+    @staticmethod
+    def escanear_paralelo(total_segmentos: int = SCAN_TOTAL_SEGMENTOS, max_workers: int = SCAN_WORKERS,
+                          limite_rcu: Optional[float] = None, **parametros) -> EscaneoParalelo:
+        """
+        Prepara un escaneo paralelo de toda la tabla. Iterar el resultado
+        entrega los items; EscaneoParalelo.paginas() entrega las páginas por segmento.
+        """
+        return EscaneoParalelo(total_segmentos=total_segmentos, max_workers=max_workers,
+                               limite_rcu=limite_rcu, **parametros)
+
+    @staticmethod
+    def listar_todas() -> List[ProyeccionInsumo]:
+        """Lista todas las proyecciones usando el escaneo paralelo"""
+        try:
+            return DynamoDBService._items_a_proyecciones(list(DynamoDBService.escanear_paralelo()))
+        except ClientError as e:
+            raise Exception(f"Error al listar proyecciones: {e.response['Error']['Message']}")
+
+    @staticmethod
+    def listar_items(criterio: str, valor: ValorCriterio = None,
+                     campos: Optional[Sequence[str]] = None) -> List[dict]:
+        """
+        Devuelve los items de DynamoDB de un listado completo, sin convertirlos.
+        Con campos, DynamoDB solo devuelve esos atributos (ProjectionExpression).
+        Las consultas por semana y por categoría pasan por la cache, que además
+        agrupa las lecturas concurrentes de la misma consulta en una sola.
+        """
+        try:
+            if criterio == CRITERIO_TODAS:
+                return list(DynamoDBService.escanear_paralelo(**DynamoDBService._proyeccion_campos(campos)))
+            if criterio in (CRITERIO_SEMANA, CRITERIO_CATEGORIA):
+                return list(cache_consultas.obtener_o_cargar(
+                    (criterio, valor, campos),
+                    lambda: DynamoDBService._listar_items(criterio, valor, campos)
+                ))
+            return DynamoDBService._listar_items(criterio, valor, campos)
+        except ClientError as e:
+            raise Exception(f"Error al listar proyecciones: {e.response['Error']['Message']}")
+
+    @staticmethod
+    def listar_desviaciones(semana: str, minima: Decimal,
+                            campos: Optional[Sequence[str]] = None) -> List[dict]:
+        """
+        Filas de una semana cuya |diferencia_vs_real| supera minima, filtradas
+        en DynamoDB (FilterExpression). Las filas con cantidades aún en texto
+        no cumplen la comparación numérica: ejecutar migracion.py antes.
+        """
+        filtro = Attr('diferencia_vs_real').gt(minima) | Attr('diferencia_vs_real').lt(-minima)
+        fragmentada = DynamoDBService._consulta_fragmentada(CRITERIO_SEMANA, semana, campos,
+                                                            FilterExpression=filtro)
+        operacion, parametros = DynamoDBService._consulta(CRITERIO_SEMANA, semana, campos)
+        parametros['FilterExpression'] = filtro
+        try:
+            if fragmentada is not None:
+                return [item for pagina in fragmentada.paginas() for item in pagina]
+            return [
+                item
+                for response in DynamoDBService._paginas(operacion, **parametros)
+                for item in response.get('Items', [])
+            ]
+        except ClientError as e:
+            raise Exception(f"Error al listar desviaciones: {e.response['Error']['Message']}")
+
+    @staticmethod
+    def listar_por_fechas(desde: date, hasta: date,
+                          campos: Optional[Sequence[str]] = None) -> List[dict]:
+        """Lee con el escaneo paralelo las filas con fecha_proyeccion en [desde, hasta)"""
+        filtro = Attr('fecha_proyeccion').between(desde.isoformat(), (hasta - timedelta(days=1)).isoformat())
+        try:
+            return list(DynamoDBService.escanear_paralelo(FilterExpression=filtro,
+                                                          **DynamoDBService._proyeccion_campos(campos)))
+        except ClientError as e:
+            raise Exception(f"Error al listar proyecciones por fechas: {e.response['Error']['Message']}")
+
+    @staticmethod
+    def capacidad_escritura(nombre_tabla: str = DYNAMODB_TABLE_NAME) -> Optional[float]:
+        """
+        WCU provisionadas efectivas: el mínimo entre la tabla y sus índices, que
+        también consumen capacidad en cada escritura. None en modo bajo demanda.
+        """
+        try:
+            tabla = get_dynamodb().meta.client.describe_table(TableName=nombre_tabla)['Table']
+        except ClientError as e:
+            raise Exception(f"Error al leer la capacidad de la tabla: {e.response['Error']['Message']}")
+        capacidades = [tabla.get('ProvisionedThroughput', {}).get('WriteCapacityUnits', 0)]
+        capacidades += [indice.get('ProvisionedThroughput', {}).get('WriteCapacityUnits', 0)
+                        for indice in tabla.get('GlobalSecondaryIndexes', [])]
+        capacidades = [capacidad for capacidad in capacidades if capacidad]
+        return float(min(capacidades)) if capacidades else None
+
+    @staticmethod
+    def obtener_por_tienda(tienda_id: str) -> List[ProyeccionInsumo]:
+        """Obtiene todas las proyecciones de una tienda específica"""
+        try:
+            return DynamoDBService._items_a_proyecciones(DynamoDBService.listar_items(CRITERIO_TIENDA, tienda_id))
+        except ClientError as e:
+            raise Exception(f"Error al obtener proyecciones por tienda: {e.response['Error']['Message']}")
+
+    @staticmethod
+    def _invalidar_cache(*items: Optional[dict]):
+        """
+        Invalida las consultas en cache por semana y categoría afectadas por los items,
+        con cualquier selección de campos
+        """
+        afectadas = set()
+        for item in items:
+            if item:
+                afectadas.add((CRITERIO_SEMANA, item['semana']))
+                afectadas.add((CRITERIO_CATEGORIA, item['categoria_insumo']))
+        if afectadas:
+            cache_consultas.invalidar_si(lambda clave: clave[:2] in afectadas)
+
+    @staticmethod
+    def _actualizar_resumenes(nuevo: Optional[dict], anterior: Optional[dict]):
+        """Refleja en los resúmenes semanales el reemplazo de una fila, agrupado con las escrituras concurrentes"""
+        agrupador_resumenes.aplicar(nuevo, anterior)
+
+    @staticmethod
+    def obtener_resumen(semana: str, dimension: str = DIMENSION_TOTAL) -> Optional[dict]:
+        """Lee un resumen semanal con un único GetItem (None si no existe)"""
+        try:
+            response = get_tabla_resumen().get_item(Key={'semana': semana, 'dimension': dimension})
+            return response.get('Item')
+        except ClientError as e:
+            raise Exception(f"Error al obtener resumen: {e.response['Error']['Message']}")
+
+    @staticmethod
+    def guardar_trabajo(trabajo: dict):
+        """Escribe el registro de un trabajo de generación"""
+        try:
+            DynamoDBService._escribir(DYNAMODB_TRABAJOS_TABLE_NAME, get_tabla_trabajos().put_item,
+                                      Item={**trabajo, 'elemento': ELEMENTO_TRABAJO})
+        except ClientError as e:
+            raise Exception(f"Error al guardar trabajo: {e.response['Error']['Message']}")
+
+    @staticmethod
+    def guardar_bloque_trabajo(trabajo_id: str, bloque: dict):
+        """Escribe el resultado de un bloque (una tienda) de un trabajo de generación"""
+        try:
+            DynamoDBService._escribir(
+                DYNAMODB_TRABAJOS_TABLE_NAME, get_tabla_trabajos().put_item,
+                Item={**bloque, 'trabajo_id': trabajo_id, 'elemento': f"{PREFIJO_TIENDA}{bloque['tienda_id']}"}
+            )
+        except ClientError as e:
+            raise Exception(f"Error al guardar bloque de trabajo: {e.response['Error']['Message']}")
+
+    @staticmethod
+    def leer_trabajo(trabajo_id: str) -> Optional[Tuple[dict, List[dict]]]:
+        """Lee con una query el registro de un trabajo y los resultados de sus bloques"""
+        try:
+            items = [
+                item
+                for response in DynamoDBService._paginas(get_tabla_trabajos().query,
+                                                         KeyConditionExpression=Key('trabajo_id').eq(trabajo_id),
+                                                         ConsistentRead=True)
+                for item in response.get('Items', [])
+            ]
+        except ClientError as e:
+            raise Exception(f"Error al obtener trabajo: {e.response['Error']['Message']}")
+        trabajo = next((item for item in items if item['elemento'] == ELEMENTO_TRABAJO), None)
+        if trabajo is None:
+            return None
+        return trabajo, [item for item in items if item['elemento'] != ELEMENTO_TRABAJO]
+
+    @staticmethod
+    def _version(marcador: str) -> int:
+        """Lee un marcador de versión con un GetItem consistente (0 si nunca se escribió)"""
+        try:
+            item = get_tabla_resumen().get_item(
+                Key={'semana': SEMANA_VERSIONES, 'dimension': marcador},
+                ConsistentRead=True,
+                ProjectionExpression='#version',
+                ExpressionAttributeNames={'#version': 'version'}
+            ).get('Item')
+            return int(item['version']) if item else 0
+        except ClientError as e:
+            raise Exception(f"Error al obtener versión: {e.response['Error']['Message']}")
+
+    @staticmethod
+    def version_semana(semana: str) -> Optional[int]:
+        """Versión de los datos de una semana"""
+        return DynamoDBService._version(f"{PREFIJO_SEMANA}{semana}")
+
+    @staticmethod
+    def version_tienda(tienda_id: str) -> Optional[int]:
+        """Versión de los datos de una tienda"""
+        return DynamoDBService._version(f"{PREFIJO_TIENDA}{tienda_id}")
+
+    @staticmethod
+    def listar_resumenes(semana: str) -> List[dict]:
+        """Lee todos los resúmenes de una semana (total, tiendas y categorías) con una query"""
+        try:
+            return [
+                item
+                for response in DynamoDBService._paginas(get_tabla_resumen().query,
+                                                         KeyConditionExpression=Key('semana').eq(semana))
+                for item in response.get('Items', [])
+            ]
+        except ClientError as e:
+            raise Exception(f"Error al obtener resúmenes: {e.response['Error']['Message']}")
+
+    @staticmethod
+    def metricas_cache() -> Dict[str, int]:
+        """Contadores de aciertos/fallos de la cache de consultas"""
+        return cache_consultas.metricas()
+
+    @staticmethod
+    def obtener_por_semana(semana: str) -> List[ProyeccionInsumo]:
+        """
+        Obtiene todas las proyecciones de una semana específica usando GSI (con
+        cache); con LECTURA_FRAGMENTADA, leyendo los fragmentos en paralelo
+        """
+        try:
+            return DynamoDBService._items_a_proyecciones(DynamoDBService.listar_items(CRITERIO_SEMANA, semana))
+        except ClientError as e:
+            raise Exception(f"Error al obtener proyecciones por semana: {e.response['Error']['Message']}")
+
+    @staticmethod
+    def obtener_por_categoria(categoria: str) -> List[ProyeccionInsumo]:
+        """
+        Obtiene todas las proyecciones de una categoría específica usando GSI
+        (con cache); con LECTURA_FRAGMENTADA, leyendo los fragmentos en paralelo
+        """
+        try:
+            return DynamoDBService._items_a_proyecciones(DynamoDBService.listar_items(CRITERIO_CATEGORIA, categoria))
+        except ClientError as e:
+            raise Exception(f"Error al obtener proyecciones por categoría: {e.response['Error']['Message']}")
+
+    @staticmethod
+    def eliminar_proyeccion(tienda_id: str, fecha_proyeccion: str, semana: str,
+                            categoria: Optional[str] = None) -> bool:
+        """Elimina una proyección específica (la categoría solo se usa con CLAVE_CON_CATEGORIA)"""
+        try:
+            fecha_proyeccion_semana = DynamoDBService._fecha_semana(fecha_proyeccion, semana, categoria)
+            response = DynamoDBService._escribir(
+                DYNAMODB_TABLE_NAME,
+                get_table().delete_item,
+                Key={
+                    'tienda_id': tienda_id,
+                    'fecha_proyeccion_semana': fecha_proyeccion_semana
+                },
+                ReturnValues='ALL_OLD'
+            )
+            DynamoDBService._invalidar_cache(response.get('Attributes'))
+            DynamoDBService._actualizar_resumenes(None, response.get('Attributes'))
+            return 'Attributes' in response
+        except ClientError as e:
+            raise Exception(f"Error al eliminar proyección: {e.response['Error']['Message']}")
+    
+    @staticmethod
+    def eliminar_por_tienda_y_semana(tienda_id: str, semana: str) -> int:
+        """
+        Elimina todas las proyecciones de una tienda en una semana específica.
+        Lee solo las claves desde tienda-semana-index (siguiendo la paginación)
+        y las elimina con BatchWriteItem en paralelo.
+        """
+        try:
+            solicitudes = (
+                (item, {'DeleteRequest': {'Key': {
+                    'tienda_id': item['tienda_id'],
+                    'fecha_proyeccion_semana': item['fecha_proyeccion_semana']
+                }}})
+                for item in DynamoDBService._items_por_tienda_y_semana(tienda_id, semana)
+            )
+            deleted_count = 0
+            errores = []
+            eliminados = []
+            try:
+                for item, error in DynamoDBService._escribir_en_lotes(solicitudes):
+                    if error is None:
+                        deleted_count += 1
+                        eliminados.append(item)
+                    else:
+                        errores.append(error)
+            finally:
+                DynamoDBService._invalidar_cache(*eliminados)
+                deltas = DeltasResumen()
+                for item in eliminados:
+                    deltas.agregar(anterior=item)
+                deltas.aplicar()
+
+            if errores:
+                raise Exception(
+                    f"{len(errores)} proyección(es) no se pudieron eliminar ({deleted_count} eliminada(s)): {errores[0]}"
+                )
+            return deleted_count
+        except ClientError as e:
+            raise Exception(f"Error al eliminar proyecciones: {e.response['Error']['Message']}")
+
+    @staticmethod
+    def _items_por_tienda_y_semana(tienda_id: str, semana: str) -> Iterator[dict]:
+        """
+        Genera las claves primarias (más semana, categoría y cantidades,
+        necesarias para invalidar la cache y descontar los resúmenes) de una
+        tienda en una semana, página a página
+        """
+        paginas = DynamoDBService._paginas(
+            get_table().query,
+            IndexName='tienda-semana-index',
+            KeyConditionExpression=Key('tienda_id').eq(tienda_id) & Key('semana').eq(semana),
+            ProjectionExpression=', '.join(CAMPOS_INDICE_TIENDA_SEMANA)
+        )
+        for response in paginas:
+            yield from response.get('Items', [])
+
+    @staticmethod
+    def actualizar_proyeccion(proyeccion: ProyeccionInsumo) -> ProyeccionInsumo:
+        """Actualiza una proyección existente"""
+        try:
+            DynamoDBService._reemplazar(proyeccion)
+            return proyeccion
+        except ClientError as e:
+            raise Exception(f"Error al actualizar proyección: {e.response['Error']['Message']}")
+
+    @staticmethod
+    def _valor_item(valor: Any) -> Any:
+        """Convierte un valor de ProyeccionInsumo al formato en que se guarda en la tabla"""
+        if isinstance(valor, date):
+            return valor.isoformat()
+        return valor
+
+    @staticmethod
+    def actualizar_parcial(tienda_id: str, fecha_proyeccion: str, semana: str, cambios: Dict[str, Any],
+                           version: Optional[int] = None,
+                           categoria: Optional[str] = None) -> Optional[ProyeccionVersionada]:
+        """
+        Actualiza solo los atributos indicados con UpdateItem.
+        diferencia_vs_real se recalcula cuando cambia la cantidad estimada o la
+        real; si solo llega una de las dos, la otra se lee antes y la escritura
+        se condiciona a la versión leída. Con version, la escritura falla con
+        ConflictoVersion si la fila ya no está en esa versión (las escrituras
+        completas también la incrementan; las filas sin versión cuentan como 0).
+        Con CLAVE_CON_CATEGORIA la categoría identifica la fila y no se puede
+        cambiar (ValueError). Devuelve None si la proyección no existe.
+        """
+        if CLAVE_CON_CATEGORIA and 'categoria_insumo' in cambios:
+            raise ValueError("categoria_insumo forma parte de la clave de la proyección y no se puede cambiar")
+        clave = {'tienda_id': tienda_id,
+                 'fecha_proyeccion_semana': DynamoDBService._fecha_semana(fecha_proyeccion, semana, categoria)}
+        valores = {campo: DynamoDBService._valor_item(valor) for campo, valor in cambios.items()}
+        if 'categoria_insumo' in valores:
+            # La fila cambia de partición en el índice fragmentado por categoría
+            valores.update(DynamoDBService._atributos_fragmento({**clave, 'semana': semana,
+                                                                 'categoria_insumo': valores['categoria_insumo']}))
+        try:
+            if 'cantidad_estimada' in valores or 'cantidad_consumida_real' in valores:
+                if 'cantidad_estimada' not in valores or 'cantidad_consumida_real' not in valores:
+                    actual = get_table().get_item(
+                        Key=clave,
+                        ConsistentRead=True,
+                        ProjectionExpression='cantidad_estimada, cantidad_consumida_real, #version',
+                        ExpressionAttributeNames={'#version': 'version'}
+                    ).get('Item')
+                    if actual is None:
+                        return None
+                    if version is None:
+                        version = int(actual.get('version', 0))
+                    valores = {**{campo: actual[campo] for campo in ('cantidad_estimada', 'cantidad_consumida_real')},
+                               **valores}
+                valores['diferencia_vs_real'] = (
+                    Decimal(valores['cantidad_estimada']) - Decimal(valores['cantidad_consumida_real'])
+                )
+
+            nombres = {f"#a{i}": campo for i, campo in enumerate(valores)}
+            parametros = {
+                'Key': clave,
+                'UpdateExpression': 'SET ' + ', '.join(f"{nombre} = :{nombre[1:]}" for nombre in nombres)
+                                    + ' ADD #version :uno',
+                'ExpressionAttributeNames': {**nombres, '#version': 'version'},
+                'ExpressionAttributeValues': {**{f":{nombre[1:]}": valores[campo] for nombre, campo in nombres.items()},
+                                              ':uno': 1},
+                'ConditionExpression': 'attribute_exists(tienda_id)',
+                'ReturnValues': 'ALL_OLD',
+                'ReturnValuesOnConditionCheckFailure': 'ALL_OLD',
+            }
+            if version is not None:
+                parametros['ExpressionAttributeValues'][':version'] = version
+                parametros['ConditionExpression'] += (
+                    ' AND (attribute_not_exists(#version) OR #version = :version)' if version == 0
+                    else ' AND #version = :version'
+                )
+
+            try:
+                anterior = DynamoDBService._escribir(DYNAMODB_TABLE_NAME, get_table().update_item,
+                                                     **parametros)['Attributes']
+            except ClientError as e:
+                if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                    raise
+                if not e.response.get('Item'):
+                    return None
+                raise ConflictoVersion(f"La proyección ya no está en la versión {version}")
+
+            # Solo se envían los atributos modificados; el item completo se
+            # reconstruye con la versión anterior que devuelve DynamoDB
+            item = {**anterior, **valores, 'version': int(anterior.get('version', 0)) + 1}
+            DynamoDBService._invalidar_cache(item, anterior)
+            DynamoDBService._actualizar_resumenes(item, anterior)
+            with fase(FASE_CONVERSION):
+                return ProyeccionVersionada(
+                    **DynamoDBService._item_to_proyeccion(item).model_dump(),
+                    version=item['version']
+                )
+        except ClientError as e:
+            raise Exception(f"Error al actualizar proyección: {e.response['Error']['Message']}")
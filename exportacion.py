@@ -0,0 +1,238 @@
+"""
+Exportación de la tabla de proyecciones a NDJSON o CSV comprimidos con gzip.
+
+Las filas pasan de cada página leída directamente al archivo, sin acumular
+el resultado en memoria. Sin filtros se usa el escaneo paralelo y cada
+segmento escribe su propio archivo parte; con filtros se consulta el índice
+que corresponde (semana, tienda, categoría o sus combinaciones). Con
+LECTURA_FRAGMENTADA, una semana o una categoría se exportan desde su índice
+fragmentado con un archivo parte por fragmento.
+
+Cada página se comprime como un miembro gzip independiente (un archivo con
+varios miembros sigue siendo un .gz válido) y después se guarda en el
+checkpoint el LastEvaluatedKey y el tamaño del archivo de ese segmento. Si
+la exportación se interrumpe, al relanzarla cada parte se trunca a su último
+tamaño confirmado y la lectura continúa desde su LastEvaluatedKey.
+
+Uso:
+    python exportacion.py --salida /tmp/proyecciones --segmentos 8
+    python exportacion.py --salida semana41 --semana 2025-W41 --formato csv
+    python exportacion.py --salida t001 --tienda T001 --campos tienda_id,fecha_proyeccion,cantidad_estimada
+"""
+import argparse
+import csv
+import gzip
+import io
+import json
+import os
+import sys
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from boto3.dynamodb.conditions import Attr
+from config import get_table, SCAN_TOTAL_SEGMENTOS, SCAN_WORKERS
+from dynamodb_service import (
+    DynamoDBService,
+    ConsultaFragmentada,
+    CAMPOS_PROYECCION,
+    CRITERIO_TODAS,
+    CRITERIO_TIENDA,
+    CRITERIO_SEMANA,
+    CRITERIO_CATEGORIA,
+    CRITERIO_TIENDA_SEMANA,
+    CRITERIO_SEMANA_CATEGORIA,
+    ValorCriterio,
+)
+
+FORMATO_NDJSON = "ndjson"
+FORMATO_CSV = "csv"
+
+
+def plan_lectura(semana: Optional[str] = None, tienda_id: Optional[str] = None,
+                 categoria: Optional[str] = None) -> Tuple[str, ValorCriterio, dict]:
+    """
+    Elige el criterio (índice) más selectivo para los filtros y devuelve
+    (criterio, valor, parámetros adicionales). La categoría combinada con la
+    tienda no tiene índice propio y se aplica como FilterExpression.
+    """
+    filtro_categoria = {'FilterExpression': Attr('categoria_insumo').eq(categoria)} if categoria else {}
+    if tienda_id and semana:
+        return CRITERIO_TIENDA_SEMANA, (tienda_id, semana), filtro_categoria
+    if semana and categoria:
+        return CRITERIO_SEMANA_CATEGORIA, (semana, categoria), {}
+    if tienda_id:
+        return CRITERIO_TIENDA, tienda_id, filtro_categoria
+    if semana:
+        return CRITERIO_SEMANA, semana, {}
+    if categoria:
+        return CRITERIO_CATEGORIA, categoria, {}
+    return CRITERIO_TODAS, None, {}
+
+
+def codificar_pagina(items: List[dict], formato: str, campos: Sequence[str], cabecera: bool) -> bytes:
+    """Serializa una página en NDJSON o CSV (con cabecera solo al inicio de cada parte)"""
+    if formato == FORMATO_NDJSON:
+        return DynamoDBService.codificar_ndjson(items, campos)
+    salida = io.StringIO()
+    escritor = csv.writer(salida)
+    if cabecera:
+        escritor.writerow(campos)
+    for item in items:
+        fila = DynamoDBService._item_a_json(item, campos)
+        escritor.writerow(['' if fila[campo] is None else fila[campo] for campo in campos])
+    return salida.getvalue().encode('utf-8')
+
+
+def ruta_parte(salida: str, segmento: int, formato: str) -> str:
+    return f"{salida}.parte-{segmento:03d}.{formato}.gz"
+
+
+def guardar_checkpoint(ruta: str, checkpoint: dict):
+    """Escritura atómica: un corte a mitad no deja el checkpoint corrupto"""
+    temporal = ruta + ".tmp"
+    with open(temporal, "w", encoding="utf-8") as archivo:
+        json.dump(checkpoint, archivo)
+    os.replace(temporal, ruta)
+
+
+def cargar_checkpoint(ruta: str, parametros: dict, total_segmentos: int) -> dict:
+    """
+    Lee el checkpoint de una exportación anterior con los mismos parámetros o
+    crea uno nuevo; lanza ValueError si los parámetros no coinciden
+    """
+    if os.path.exists(ruta):
+        with open(ruta, encoding="utf-8") as archivo:
+            checkpoint = json.load(archivo)
+        if checkpoint['parametros'] != parametros:
+            raise ValueError(f"El checkpoint {ruta} es de una exportación con otros parámetros; "
+                             f"use otra --salida o bórrelo")
+        return checkpoint
+    return {
+        'parametros': parametros,
+        'segmentos': {str(segmento): {'clave': None, 'bytes': 0, 'filas': 0, 'terminado': False}
+                      for segmento in range(total_segmentos)},
+    }
+
+
+def _paginas_consulta(criterio: str, valor: ValorCriterio, campos: Sequence[str], adicionales: dict,
+                      inicio: Optional[dict]) -> Iterator[Tuple[int, List[dict], Optional[dict]]]:
+    """Páginas de una query con la misma forma que EscaneoParalelo.paginas() (segmento 0)"""
+    operacion, parametros = DynamoDBService._consulta(criterio, valor, campos)
+    parametros.update(adicionales)
+    if inicio:
+        parametros['ExclusiveStartKey'] = inicio
+    for response in DynamoDBService._paginas(operacion, **parametros):
+        yield 0, response.get('Items', []), response.get('LastEvaluatedKey')
+
+
+def _paginas_fragmentos(fragmentada: ConsultaFragmentada, pendientes: List[int],
+                        estado: Dict[str, dict]) -> Iterator[Tuple[int, List[dict], Optional[dict]]]:
+    """Páginas de los fragmentos pendientes de un índice fragmentado; cada fragmento es un segmento"""
+    for fragmento in pendientes:
+        parametros = dict(fragmentada.parametros[fragmento])
+        if estado[str(fragmento)]['clave']:
+            parametros['ExclusiveStartKey'] = estado[str(fragmento)]['clave']
+        for response in DynamoDBService._paginas(get_table().query, **parametros):
+            yield fragmento, response.get('Items', []), response.get('LastEvaluatedKey')
+
+
+def exportar(salida: str, formato: str = FORMATO_NDJSON, semana: Optional[str] = None,
+             tienda_id: Optional[str] = None, categoria: Optional[str] = None,
+             campos: Optional[Sequence[str]] = None, total_segmentos: int = SCAN_TOTAL_SEGMENTOS,
+             max_workers: int = SCAN_WORKERS) -> dict:
+    """
+    Exporta (o reanuda la exportación de) las filas que cumplen los filtros.
+    Devuelve el checkpoint final, con las filas y bytes escritos por segmento.
+    """
+    campos = tuple(campos or CAMPOS_PROYECCION)
+    criterio, valor, adicionales = plan_lectura(semana, tienda_id, categoria)
+    fragmentada = DynamoDBService._consulta_fragmentada(criterio, valor, campos, **adicionales)
+    if fragmentada is not None:
+        total_segmentos = len(fragmentada.parametros)
+    elif criterio != CRITERIO_TODAS:
+        total_segmentos = 1
+    parametros = {'formato': formato, 'semana': semana, 'tienda_id': tienda_id, 'categoria': categoria,
+                  'campos': list(campos), 'total_segmentos': total_segmentos}
+    ruta_checkpoint = f"{salida}.checkpoint.json"
+    checkpoint = cargar_checkpoint(ruta_checkpoint, parametros, total_segmentos)
+    estado: Dict[str, dict] = checkpoint['segmentos']
+
+    # Se descarta lo escrito después del último checkpoint de cada parte pendiente
+    archivos = {}
+    pendientes = [int(segmento) for segmento, datos in estado.items() if not datos['terminado']]
+    try:
+        for segmento in pendientes:
+            ruta = ruta_parte(salida, segmento, formato)
+            archivo = open(ruta, "r+b" if os.path.exists(ruta) else "w+b")
+            archivo.truncate(estado[str(segmento)]['bytes'])
+            archivo.seek(0, os.SEEK_END)
+            if archivo.tell() != estado[str(segmento)]['bytes']:
+                raise ValueError(f"{ruta} es más corto que su checkpoint; bórrelo junto con {ruta_checkpoint}")
+            archivos[segmento] = archivo
+
+        if criterio == CRITERIO_TODAS:
+            paginas = DynamoDBService.escanear_paralelo(
+                total_segmentos=total_segmentos,
+                max_workers=max_workers,
+                segmentos=pendientes,
+                inicio={int(segmento): datos['clave'] for segmento, datos in estado.items() if datos['clave']},
+                **DynamoDBService._proyeccion_campos(campos)
+            ).paginas()
+        elif fragmentada is not None:
+            paginas = _paginas_fragmentos(fragmentada, pendientes, estado)
+        elif pendientes:
+            paginas = _paginas_consulta(criterio, valor, campos, adicionales, estado['0']['clave'])
+        else:
+            paginas = iter(())
+
+        for segmento, items, last_evaluated_key in paginas:
+            datos = estado[str(segmento)]
+            archivo = archivos[segmento]
+            if items or datos['bytes'] == 0:
+                contenido = codificar_pagina(items, formato, campos, cabecera=datos['bytes'] == 0)
+                archivo.write(gzip.compress(contenido))
+                archivo.flush()
+                os.fsync(archivo.fileno())
+            estado[str(segmento)] = {
+                'clave': last_evaluated_key,
+                'bytes': archivo.tell(),
+                'filas': datos['filas'] + len(items),
+                'terminado': last_evaluated_key is None,
+            }
+            guardar_checkpoint(ruta_checkpoint, checkpoint)
+    finally:
+        for archivo in archivos.values():
+            archivo.close()
+    return checkpoint
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exporta las proyecciones a NDJSON o CSV con gzip")
+    parser.add_argument("--salida", required=True,
+                        help="Prefijo de los archivos: <salida>.parte-NNN.<formato>.gz y <salida>.checkpoint.json")
+    parser.add_argument("--formato", choices=[FORMATO_NDJSON, FORMATO_CSV], default=FORMATO_NDJSON)
+    parser.add_argument("--semana", help="Solo esta semana (semana-index)")
+    parser.add_argument("--tienda", dest="tienda_id", help="Solo esta tienda (clave de partición)")
+    parser.add_argument("--categoria", help="Solo esta categoría (categoria-index)")
+    parser.add_argument("--campos", help="Campos a exportar separados por coma; por defecto todos")
+    parser.add_argument("--segmentos", type=int, default=SCAN_TOTAL_SEGMENTOS,
+                        help="Segmentos del escaneo paralelo cuando no hay filtros (un archivo por segmento)")
+    parser.add_argument("--workers", type=int, default=SCAN_WORKERS)
+    args = parser.parse_args()
+
+    try:
+        campos = DynamoDBService.validar_campos(args.campos.split(",") if args.campos else None)
+        checkpoint = exportar(args.salida, args.formato, args.semana, args.tienda_id, args.categoria,
+                              campos, args.segmentos, args.workers)
+    except ValueError as e:
+        sys.exit(str(e))
+
+    segmentos = checkpoint['segmentos']
+    filas = sum(datos['filas'] for datos in segmentos.values())
+    tamano = sum(datos['bytes'] for datos in segmentos.values())
+    print(f"{filas} filas exportadas en {len(segmentos)} archivo(s), {tamano / 1024 / 1024:.1f} MB comprimidos")
+    for segmento in sorted(segmentos, key=int):
+        print(f"  {ruta_parte(args.salida, int(segmento), args.formato)}: {segmentos[segmento]['filas']} filas")
+
+
+if __name__ == "__main__":
+    main()
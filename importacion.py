@@ -0,0 +1,262 @@
+"""
+Importación masiva de proyecciones desde archivos CSV o NDJSON.
+
+El archivo se lee fila a fila (nunca completo en memoria), se valida contra
+ProyeccionInsumo en bloques y se escribe con BatchWriteItem en bloques de 25
+con concurrencia acotada. El servicio ya limita el ritmo a la capacidad de
+escritura de la tabla; --wcu fija un ritmo menor, para dejar capacidad al
+resto de la aplicación. Escribe en el backend configurado en
+BACKEND_ALMACENAMIENTO.
+
+El progreso se guarda en un checkpoint: la última fila hasta la cual todas
+las anteriores quedaron resueltas (escritas o rechazadas). Al relanzar el
+comando con el mismo archivo se continúa desde ahí sin reescribir filas.
+
+Uso:
+    python importacion.py proyecciones.csv
+    python importacion.py proyecciones.ndjson --wcu 2 --errores rechazadas.ndjson
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from typing import IO, Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from pydantic import TypeAdapter, ValidationError
+
+from limitador import Limitador
+from model import ProyeccionInsumo
+from repositorio import obtener_repositorio
+
+FORMATO_CSV = "csv"
+FORMATO_NDJSON = "ndjson"
+
+# Filas que se validan juntas con una sola llamada a pydantic
+TAMANO_VALIDACION = 500
+
+# Cada cuántas filas resueltas se guarda el checkpoint
+INTERVALO_CHECKPOINT = 1000
+
+_validador_lote = TypeAdapter(List[ProyeccionInsumo])
+
+
+def formato_de_archivo(nombre: str) -> str:
+    """Deduce el formato por la extensión; lanza ValueError si no se reconoce"""
+    extension = os.path.splitext(nombre)[1].lower()
+    if extension == ".csv":
+        return FORMATO_CSV
+    if extension in (".ndjson", ".jsonl"):
+        return FORMATO_NDJSON
+    raise ValueError(f"Formato no soportado: {nombre} (se esperaba .csv, .ndjson o .jsonl)")
+
+
+def leer_filas(archivo: IO[str], formato: str) -> Iterator[Tuple[int, Any]]:
+    """
+    Genera (número de fila, datos) empezando en 1, sin contar la cabecera del CSV.
+    Una línea NDJSON que no es JSON válido se entrega como una excepción, para
+    que se registre como fila rechazada sin detener la importación.
+    """
+    if formato == FORMATO_CSV:
+        for numero, fila in enumerate(csv.DictReader(archivo), start=1):
+            # En CSV un campo vacío equivale a no informado
+            yield numero, {campo: (valor if valor != '' else None) for campo, valor in fila.items()}
+    elif formato == FORMATO_NDJSON:
+        numero = 0
+        for linea in archivo:
+            if not linea.strip():
+                continue
+            numero += 1
+            try:
+                yield numero, json.loads(linea)
+            except ValueError as e:
+                yield numero, e
+    else:
+        raise ValueError(f"Formato no soportado: {formato}")
+
+
+def _mensaje_validacion(errores: List[dict]) -> str:
+    return "; ".join(
+        f"{'.'.join(str(parte) for parte in error['loc'])}: {error['msg']}" if error['loc'] else error['msg']
+        for error in errores
+    )
+
+
+def validar_bloque(filas: List[Tuple[int, Any]]) -> Tuple[List[Tuple[int, ProyeccionInsumo]], List[Tuple[int, str]]]:
+    """
+    Valida un bloque de filas con una sola llamada a pydantic. Si alguna
+    falla, los errores se reparten por fila y las demás se validan de nuevo.
+    Devuelve (válidas, rechazadas).
+    """
+    rechazadas = [(numero, f"JSON inválido: {datos}") for numero, datos in filas if isinstance(datos, Exception)]
+    candidatas = [(numero, datos) for numero, datos in filas if not isinstance(datos, Exception)]
+    try:
+        modelos = _validador_lote.validate_python([datos for _, datos in candidatas])
+        return [(numero, modelo) for (numero, _), modelo in zip(candidatas, modelos)], rechazadas
+    except ValidationError as e:
+        por_posicion: Dict[int, List[dict]] = {}
+        for error in e.errors():
+            posicion, *resto = error['loc']
+            por_posicion.setdefault(posicion, []).append({**error, 'loc': tuple(resto)})
+
+    rechazadas += [(candidatas[posicion][0], _mensaje_validacion(errores))
+                   for posicion, errores in por_posicion.items()]
+    restantes = [fila for posicion, fila in enumerate(candidatas) if posicion not in por_posicion]
+    modelos = _validador_lote.validate_python([datos for _, datos in restantes])
+    return [(numero, modelo) for (numero, _), modelo in zip(restantes, modelos)], rechazadas
+
+
+class Importacion:
+    """
+    Estado de una importación: contadores, errores y la fila confirmada
+    (todas las anteriores están resueltas), que es lo que se guarda como
+    checkpoint.
+    """
+
+    def __init__(self, desde_fila: int = 0, max_errores: Optional[int] = None,
+                 al_rechazar: Optional[Callable[[int, str], None]] = None):
+        self.fila_confirmada = desde_fila
+        self.leidas = 0
+        self.exitosas = 0
+        self.fallidas = 0
+        self.errores: List[Tuple[int, str]] = []
+        self.max_errores = max_errores
+        self.al_rechazar = al_rechazar
+        self._resueltas = set()
+
+    def resolver(self, numero: int, error: Optional[str]):
+        if error is None:
+            self.exitosas += 1
+        else:
+            self.fallidas += 1
+            if self.max_errores is None or len(self.errores) < self.max_errores:
+                self.errores.append((numero, error))
+            if self.al_rechazar:
+                self.al_rechazar(numero, error)
+        self._resueltas.add(numero)
+        while self.fila_confirmada + 1 in self._resueltas:
+            self.fila_confirmada += 1
+            self._resueltas.remove(self.fila_confirmada)
+
+
+def importar(archivo: IO[str], formato: str, desde_fila: int = 0, wcu: Optional[float] = None,
+             max_errores: Optional[int] = None,
+             al_rechazar: Optional[Callable[[int, str], None]] = None,
+             al_avanzar: Optional[Callable[[Importacion], None]] = None) -> Importacion:
+    """
+    Importa un archivo ya abierto en modo texto. Las filas hasta desde_fila
+    se leen pero no se escriben. Con wcu se limita el ritmo a esas filas por
+    segundo (una fila de hasta 1 KB consume 1 WCU). al_avanzar se llama cada
+    INTERVALO_CHECKPOINT filas resueltas y al terminar.
+    """
+    estado = Importacion(desde_fila, max_errores, al_rechazar)
+    limitador = Limitador(wcu) if wcu else None
+    en_vuelo: Dict[int, int] = {}
+    avisado = 0
+
+    def avisar(forzar: bool = False):
+        nonlocal avisado
+        resueltas = estado.exitosas + estado.fallidas
+        if al_avanzar and (resueltas >= avisado + INTERVALO_CHECKPOINT or (forzar and resueltas != avisado)):
+            avisado = resueltas
+            al_avanzar(estado)
+
+    def bloques():
+        bloque = []
+        for numero, datos in leer_filas(archivo, formato):
+            if numero <= desde_fila:
+                continue
+            estado.leidas += 1
+            bloque.append((numero, datos))
+            if len(bloque) == TAMANO_VALIDACION:
+                yield bloque
+                bloque = []
+        if bloque:
+            yield bloque
+
+    def proyecciones():
+        posicion = 0
+        for bloque in bloques():
+            validas, rechazadas = validar_bloque(bloque)
+            for numero, error in rechazadas:
+                estado.resolver(numero, error)
+            for numero, proyeccion in validas:
+                if limitador:
+                    limitador.esperar()
+                en_vuelo[posicion] = numero
+                posicion += 1
+                yield proyeccion
+            avisar()
+
+    for posicion, error in obtener_repositorio().crear_proyecciones_lote(proyecciones()):
+        estado.resolver(en_vuelo.pop(posicion), error)
+        avisar()
+    avisar(forzar=True)
+    return estado
+
+
+def _identidad_archivo(ruta: str) -> dict:
+    informacion = os.stat(ruta)
+    return {'archivo': os.path.abspath(ruta), 'tamano': informacion.st_size, 'modificado': informacion.st_mtime}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Importa proyecciones desde un archivo CSV o NDJSON")
+    parser.add_argument("archivo", help="Ruta del archivo .csv, .ndjson o .jsonl")
+    parser.add_argument("--formato", choices=[FORMATO_CSV, FORMATO_NDJSON],
+                        help="Formato del archivo; por defecto se deduce de la extensión")
+    parser.add_argument("--wcu", type=float,
+                        help="Filas por segundo, por debajo de la capacidad de escritura de la tabla")
+    parser.add_argument("--checkpoint", help="Archivo de checkpoint (por defecto <archivo>.checkpoint.json)")
+    parser.add_argument("--errores", help="Archivo NDJSON donde se anotan las filas rechazadas")
+    args = parser.parse_args()
+
+    formato = args.formato or formato_de_archivo(args.archivo)
+    ruta_checkpoint = args.checkpoint or f"{args.archivo}.checkpoint.json"
+    identidad = _identidad_archivo(args.archivo)
+
+    desde_fila = 0
+    if os.path.exists(ruta_checkpoint):
+        with open(ruta_checkpoint, encoding="utf-8") as archivo:
+            checkpoint = json.load(archivo)
+        if {clave: checkpoint.get(clave) for clave in identidad} != identidad:
+            sys.exit(f"El checkpoint {ruta_checkpoint} corresponde a otro archivo o el archivo cambió; bórrelo para empezar de cero")
+        desde_fila = checkpoint['fila_confirmada']
+        print(f"Reanudando después de la fila {desde_fila}")
+
+    errores = open(args.errores, "a", encoding="utf-8") if args.errores else None
+
+    def al_rechazar(numero: int, error: str):
+        if errores:
+            errores.write(json.dumps({'fila': numero, 'error': error}, ensure_ascii=False) + "\n")
+
+    def al_avanzar(estado: Importacion):
+        if errores:
+            # Las filas rechazadas quedan en disco antes de confirmar el checkpoint
+            errores.flush()
+        temporal = ruta_checkpoint + ".tmp"
+        with open(temporal, "w", encoding="utf-8") as archivo:
+            json.dump({**identidad, 'fila_confirmada': estado.fila_confirmada}, archivo)
+        os.replace(temporal, ruta_checkpoint)
+        print(f"Fila {estado.fila_confirmada}: {estado.exitosas} escritas, {estado.fallidas} rechazadas", flush=True)
+
+    inicio = time.perf_counter()
+    try:
+        with open(args.archivo, encoding="utf-8-sig", newline="") as archivo:
+            estado = importar(archivo, formato, desde_fila, args.wcu, max_errores=0,
+                              al_rechazar=al_rechazar, al_avanzar=al_avanzar)
+    finally:
+        if errores:
+            errores.close()
+
+    segundos = time.perf_counter() - inicio
+    print(f"Importación terminada en {segundos:.1f} s: {estado.leidas} filas leídas, "
+          f"{estado.exitosas} escritas, {estado.fallidas} rechazadas"
+          + (f" (ritmo limitado a {args.wcu:g} filas/s)" if args.wcu else ""))
+    if estado.fallidas:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
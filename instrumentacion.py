@@ -0,0 +1,313 @@
+"""
+Instrumentación por petición: tiempos por fase, llamadas y páginas de
+DynamoDB y capacidad consumida (ReturnConsumedCapacity).
+
+Cada petición HTTP abre una Medicion en una variable de contexto. Las
+llamadas a DynamoDB se registran con los eventos de botocore (registrados
+en config.get_dynamodb) y el código marca sus fases con `fase()` o
+`medir_fase`. Al terminar la petición la medición sale:
+  - en la cabecera Server-Timing (lo medido hasta enviar las cabeceras),
+  - en una línea de log JSON con todo lo medido, cuerpo incluido (logger
+    "instrumentacion" en INFO; main.crear_app configura un handler en la
+    raíz con logging.basicConfig si no lo hay),
+  - acumulada por ruta en METRICAS, que GET /metricas expone en formato
+    de texto de Prometheus.
+
+Los hilos de trabajo (escaneo paralelo, escritura por lotes) heredan la
+medición si se lanzan con `en_contexto`; la fase "dynamodb" suma la duración
+de todas las llamadas, así que con llamadas en paralelo puede superar al
+total. Fuera de una petición todas las funciones son no-ops. Las métricas
+son del proceso: en Lambda, de cada contenedor.
+"""
+import contextvars
+import functools
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Fases medidas explícitamente; "dynamodb" se mide con los eventos de botocore
+FASE_DYNAMODB = 'dynamodb'
+FASE_CONVERSION = 'conversion'
+FASE_SERIALIZACION = 'serializacion'
+
+# Operaciones que aceptan ReturnConsumedCapacity y tipo de capacidad que consumen
+OPERACIONES_LECTURA = {'GetItem', 'BatchGetItem', 'Query', 'Scan', 'TransactGetItems'}
+OPERACIONES_ESCRITURA = {'PutItem', 'UpdateItem', 'DeleteItem', 'BatchWriteItem', 'TransactWriteItems'}
+OPERACIONES_PAGINADAS = {'Query', 'Scan'}
+
+# Límites (segundos) del histograma de duración de las peticiones
+LIMITES_DURACION = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Medicion:
+    """Lo medido en una petición; segura para los hilos que la comparten"""
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.fases: Dict[str, float] = defaultdict(float)
+        self.llamadas = 0
+        self.paginas = 0
+        # (tabla, 'lectura' | 'escritura') -> unidades
+        self.capacidad: Dict[Tuple[str, str], float] = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def sumar_fase(self, nombre: str, segundos: float):
+        with self._lock:
+            self.fases[nombre] += segundos
+
+    def registrar_llamada(self, operacion: str, segundos: float, consumida: Any):
+        tipo = 'lectura' if operacion in OPERACIONES_LECTURA else 'escritura'
+        # BatchGetItem/BatchWriteItem devuelven una lista, una entrada por tabla
+        entradas = consumida if isinstance(consumida, list) else [consumida] if consumida else []
+        with self._lock:
+            self.fases[FASE_DYNAMODB] += segundos
+            self.llamadas += 1
+            if operacion in OPERACIONES_PAGINADAS:
+                self.paginas += 1
+            for entrada in entradas:
+                self.capacidad[(entrada.get('TableName', ''), tipo)] += float(entrada.get('CapacityUnits', 0))
+
+    def unidades(self, tipo: str) -> float:
+        with self._lock:
+            return sum(valor for (_, tipo_capacidad), valor in self.capacidad.items() if tipo_capacidad == tipo)
+
+    def server_timing(self) -> str:
+        """Valor de la cabecera Server-Timing (duraciones en ms)"""
+        with self._lock:
+            fases = dict(self.fases)
+            llamadas, paginas = self.llamadas, self.paginas
+        partes = [f"total;dur={(time.perf_counter() - self.inicio) * 1000:.2f}"]
+        for nombre, segundos in sorted(fases.items()):
+            descripcion = f';desc="{llamadas} llamadas, {paginas} paginas"' if nombre == FASE_DYNAMODB else ''
+            partes.append(f"{nombre};dur={segundos * 1000:.2f}{descripcion}")
+        partes.append(f"rcu;desc=\"{self.unidades('lectura'):g}\"")
+        partes.append(f"wcu;desc=\"{self.unidades('escritura'):g}\"")
+        return ", ".join(partes)
+
+    def como_dict(self) -> dict:
+        with self._lock:
+            return {
+                'duracion_ms': round((time.perf_counter() - self.inicio) * 1000, 3),
+                'fases_ms': {nombre: round(segundos * 1000, 3) for nombre, segundos in self.fases.items()},
+                'dynamodb': {
+                    'llamadas': self.llamadas,
+                    'paginas': self.paginas,
+                    'capacidad': [{'tabla': tabla, 'tipo': tipo, 'unidades': unidades}
+                                  for (tabla, tipo), unidades in sorted(self.capacidad.items())],
+                },
+            }
+
+
+_medicion: contextvars.ContextVar[Optional[Medicion]] = contextvars.ContextVar('medicion', default=None)
+_fase_activa: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar('fase_activa', default=None)
+
+
+def medicion_actual() -> Optional[Medicion]:
+    return _medicion.get()
+
+
+@contextmanager
+def fase(nombre: str) -> Iterator[None]:
+    """
+    Suma la duración del bloque a la fase indicada. Las fases no se anidan:
+    dentro de otra fase el bloque cuenta para la exterior.
+    """
+    medicion = _medicion.get()
+    if medicion is None or _fase_activa.get() is not None:
+        yield
+        return
+    token = _fase_activa.set(nombre)
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        medicion.sumar_fase(nombre, time.perf_counter() - inicio)
+        _fase_activa.reset(token)
+
+
+def medir_fase(nombre: str) -> Callable:
+    """Decorador equivalente a envolver la función en fase(nombre)"""
+    def decorador(funcion):
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            if _medicion.get() is None:
+                return funcion(*args, **kwargs)
+            with fase(nombre):
+                return funcion(*args, **kwargs)
+        return envoltura
+    return decorador
+
+
+def en_contexto(funcion: Callable) -> Callable:
+    """Envuelve funcion para que corra en una copia del contexto actual (para enviarla a un pool de hilos)"""
+    contexto = contextvars.copy_context()
+    # Un mismo contexto no puede estar activo en dos hilos: cada llamada usa su copia
+    return lambda *args, **kwargs: contexto.copy().run(funcion, *args, **kwargs)
+
+
+# Eventos de botocore
+
+def _antes_de_parametros(params: dict, model, **kwargs):
+    if _medicion.get() is not None and model.name in OPERACIONES_LECTURA | OPERACIONES_ESCRITURA:
+        params.setdefault('ReturnConsumedCapacity', 'TOTAL')
+
+
+def _antes_de_llamada(context: dict, **kwargs):
+    if _medicion.get() is not None:
+        context['inicio_instrumentacion'] = time.perf_counter()
+
+
+def _despues_de_llamada(parsed: dict, model, context: dict, **kwargs):
+    medicion = _medicion.get()
+    inicio = context.get('inicio_instrumentacion')
+    if medicion is not None and inicio is not None:
+        medicion.registrar_llamada(model.name, time.perf_counter() - inicio, parsed.get('ConsumedCapacity'))
+
+
+def registrar_eventos(cliente):
+    """Conecta la medición a un cliente de DynamoDB de boto3"""
+    eventos = cliente.meta.events
+    eventos.register('provide-client-params.dynamodb.*', _antes_de_parametros)
+    eventos.register('before-call.dynamodb.*', _antes_de_llamada)
+    eventos.register('after-call.dynamodb.*', _despues_de_llamada)
+
+
+class MetricasPeticiones:
+    """Acumulados por (método, ruta) de todas las peticiones medidas"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._peticiones: Dict[Tuple[str, str, int], int] = defaultdict(int)
+        self._histograma: Dict[Tuple[str, str], List[int]] = {}
+        self._duracion: Dict[Tuple[str, str], float] = defaultdict(float)
+        self._fases: Dict[Tuple[str, str, str], float] = defaultdict(float)
+        self._llamadas: Dict[Tuple[str, str], int] = defaultdict(int)
+        self._paginas: Dict[Tuple[str, str], int] = defaultdict(int)
+        self._capacidad: Dict[Tuple[str, str, str, str], float] = defaultdict(float)
+
+    def registrar(self, metodo: str, ruta: str, estado: int, segundos: float, medicion: Medicion):
+        clave = (metodo, ruta)
+        with self._lock:
+            self._peticiones[(metodo, ruta, estado)] += 1
+            self._duracion[clave] += segundos
+            cubetas = self._histograma.setdefault(clave, [0] * len(LIMITES_DURACION))
+            for posicion, limite in enumerate(LIMITES_DURACION):
+                if segundos <= limite:
+                    cubetas[posicion] += 1
+            for nombre, duracion in medicion.fases.items():
+                self._fases[(metodo, ruta, nombre)] += duracion
+            self._llamadas[clave] += medicion.llamadas
+            self._paginas[clave] += medicion.paginas
+            for (tabla, tipo), unidades in medicion.capacidad.items():
+                self._capacidad[(metodo, ruta, tabla, tipo)] += unidades
+
+    @staticmethod
+    def _etiquetas(**etiquetas) -> str:
+        return "{" + ",".join(
+            f'{nombre}="{str(valor).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+            for nombre, valor in etiquetas.items()
+        ) + "}"
+
+    def exportar(self) -> str:
+        """Métricas en el formato de texto de Prometheus"""
+        e = self._etiquetas
+        lineas = []
+        with self._lock:
+            lineas += ["# HELP proyecciones_peticiones_total Peticiones atendidas",
+                       "# TYPE proyecciones_peticiones_total counter"]
+            lineas += [f"proyecciones_peticiones_total{e(metodo=metodo, ruta=ruta, estado=estado)} {total}"
+                       for (metodo, ruta, estado), total in sorted(self._peticiones.items())]
+
+            lineas += ["# HELP proyecciones_duracion_segundos Duración de las peticiones",
+                       "# TYPE proyecciones_duracion_segundos histogram"]
+            for (metodo, ruta), cubetas in sorted(self._histograma.items()):
+                total = sum(valor for (m, r, _), valor in self._peticiones.items() if (m, r) == (metodo, ruta))
+                for limite, acumulado in zip(LIMITES_DURACION, cubetas):
+                    lineas.append(f"proyecciones_duracion_segundos_bucket{e(metodo=metodo, ruta=ruta, le=limite)} "
+                                  f"{acumulado}")
+                lineas.append(f"proyecciones_duracion_segundos_bucket{e(metodo=metodo, ruta=ruta, le='+Inf')} {total}")
+                lineas.append(f"proyecciones_duracion_segundos_sum{e(metodo=metodo, ruta=ruta)} "
+                              f"{self._duracion[(metodo, ruta)]:.6f}")
+                lineas.append(f"proyecciones_duracion_segundos_count{e(metodo=metodo, ruta=ruta)} {total}")
+
+            lineas += ["# HELP proyecciones_fase_segundos_total Tiempo acumulado por fase",
+                       "# TYPE proyecciones_fase_segundos_total counter"]
+            lineas += [f"proyecciones_fase_segundos_total{e(metodo=metodo, ruta=ruta, fase=nombre)} {segundos:.6f}"
+                       for (metodo, ruta, nombre), segundos in sorted(self._fases.items())]
+
+            lineas += ["# HELP proyecciones_dynamodb_llamadas_total Llamadas a DynamoDB",
+                       "# TYPE proyecciones_dynamodb_llamadas_total counter"]
+            lineas += [f"proyecciones_dynamodb_llamadas_total{e(metodo=metodo, ruta=ruta)} {total}"
+                       for (metodo, ruta), total in sorted(self._llamadas.items())]
+
+            lineas += ["# HELP proyecciones_dynamodb_paginas_total Páginas de Query y Scan leídas",
+                       "# TYPE proyecciones_dynamodb_paginas_total counter"]
+            lineas += [f"proyecciones_dynamodb_paginas_total{e(metodo=metodo, ruta=ruta)} {total}"
+                       for (metodo, ruta), total in sorted(self._paginas.items())]
+
+            lineas += ["# HELP proyecciones_dynamodb_capacidad_total Unidades de capacidad consumidas",
+                       "# TYPE proyecciones_dynamodb_capacidad_total counter"]
+            lineas += [f"proyecciones_dynamodb_capacidad_total{e(metodo=metodo, ruta=ruta, tabla=tabla, tipo=tipo)} "
+                       f"{unidades:g}"
+                       for (metodo, ruta, tabla, tipo), unidades in sorted(self._capacidad.items())]
+        return "\n".join(lineas) + "\n"
+
+
+METRICAS = MetricasPeticiones()
+
+
+class MiddlewareInstrumentacion:
+    """
+    Middleware ASGI: abre la medición de cada petición, añade Server-Timing a
+    la respuesta y, cuando termina de enviarse el cuerpo, escribe el log y
+    acumula las métricas.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        medicion = Medicion()
+        token = _medicion.set(medicion)
+        estado = 500
+
+        async def enviar(mensaje):
+            nonlocal estado
+            if mensaje['type'] == 'http.response.start':
+                estado = mensaje['status']
+                cabeceras = list(mensaje.get('headers', []))
+                cabeceras.append((b'server-timing', medicion.server_timing().encode('latin-1')))
+                mensaje = {**mensaje, 'headers': cabeceras}
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            _medicion.reset(token)
+            self._terminar(scope, estado, medicion)
+
+    @staticmethod
+    def _terminar(scope, estado: int, medicion: Medicion):
+        # La plantilla de la ruta (no la URL) agrupa las métricas sin crecer sin límite
+        ruta = getattr(scope.get('route'), 'path', None) or 'sin_ruta'
+        segundos = time.perf_counter() - medicion.inicio
+        METRICAS.registrar(scope['method'], ruta, estado, segundos, medicion)
+        logger.info(json.dumps({
+            'evento': 'peticion',
+            'metodo': scope['method'],
+            'ruta': ruta,
+            'path': scope['path'],
+            'estado': estado,
+            **medicion.como_dict(),
+        }, ensure_ascii=False))
@@ -0,0 +1,83 @@
+"""
+Limitadores de ritmo de escritura.
+
+Limitador es una cubeta de fichas: las fichas se reponen a `por_segundo` y
+una petición mayor que la cubeta se atiende "a crédito" (espera lo que le
+falta), así un BatchWriteItem de 25 filas funciona aunque la tabla admita 5
+por segundo.
+
+LimitadorAdaptativo parte de la capacidad provisionada y baja el ritmo a la
+mitad cada vez que DynamoDB rechaza escrituras por capacidad; después lo
+recupera linealmente hasta el máximo en RECUPERACION_SEGUNDOS. Cada proceso
+(cada contenedor de Lambda) tiene sus propios limitadores: con varios a la
+vez es la parte adaptativa la que reparte la capacidad.
+"""
+import threading
+import time
+
+# Segundos en recuperar el ritmo máximo después de un rechazo por capacidad
+RECUPERACION_SEGUNDOS = 10.0
+
+# Ritmo mínimo, como fracción del máximo
+FRACCION_MINIMA = 0.05
+
+
+class Limitador:
+    """Cubeta de fichas: entrega como mucho `por_segundo` fichas por segundo (ráfagas de hasta un segundo)"""
+
+    def __init__(self, por_segundo: float):
+        self.por_segundo = por_segundo
+        self._fichas = por_segundo
+        self._ultimo = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _tasa(self, ahora: float) -> float:
+        return self.por_segundo
+
+    def esperar(self, fichas: float = 1.0):
+        """Bloquea hasta disponer de las fichas pedidas"""
+        with self._lock:
+            ahora = time.monotonic()
+            tasa = self._tasa(ahora)
+            self._fichas = min(tasa, self._fichas + (ahora - self._ultimo) * tasa)
+            self._ultimo = ahora
+            self._fichas -= fichas
+            espera = -self._fichas / tasa if self._fichas < 0 else 0.0
+        if espera:
+            time.sleep(espera)
+
+
+class LimitadorAdaptativo(Limitador):
+    """Limitador que reduce su ritmo cuando DynamoDB rechaza escrituras por capacidad"""
+
+    def __init__(self, maximo: float):
+        super().__init__(maximo)
+        self.maximo = maximo
+        self.rechazos = 0
+        self._reducido = maximo
+        self._reducido_en = None
+
+    def _tasa(self, ahora: float) -> float:
+        if self._reducido_en is None:
+            return self.maximo
+        recuperado = self.maximo * (ahora - self._reducido_en) / RECUPERACION_SEGUNDOS
+        if self._reducido + recuperado >= self.maximo:
+            self._reducido_en = None
+            return self.maximo
+        return self._reducido + recuperado
+
+    def reducir(self):
+        """Registra un rechazo por capacidad: el ritmo actual baja a la mitad"""
+        with self._lock:
+            ahora = time.monotonic()
+            self.rechazos += 1
+            self._reducido = max(self.maximo * FRACCION_MINIMA, self._tasa(ahora) / 2)
+            self._reducido_en = ahora
+            # Las fichas acumuladas al ritmo anterior ya no están disponibles
+            self._fichas = min(self._fichas, 0.0)
+            self._ultimo = ahora
+
+    @property
+    def ritmo_actual(self) -> float:
+        with self._lock:
+            return self._tasa(time.monotonic())
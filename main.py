@@ -1,7 +1,52 @@
-from fastapi import FastAPI
-from app.routes.proyecciones import router as proyecciones_router
-from mangum import Mangum
-app = FastAPI()
-
-app.include_router(proyecciones_router)
-handler = Mangum(app)
\ No newline at end of file
+# FastAPI, el router (y con él boto3) y Mangum se importan en la primera
+# invocación: el arranque en frío de Lambda solo paga lo que usa la petición
+_app = None
+_handler = None
+
+
+def crear_app():
+    from fastapi import FastAPI
+    from fastapi.responses import PlainTextResponse
+    from config import INSTRUMENTACION_ACTIVA
+    from proyecciones import router as proyecciones_router
+
+    app = FastAPI()
+    app.include_router(proyecciones_router)
+
+    if INSTRUMENTACION_ACTIVA:
+        import logging
+        from instrumentacion import METRICAS, MiddlewareInstrumentacion
+
+        # Sin handler en la raíz (uvicorn local) el log JSON por petición no
+        # saldría; en Lambda la raíz ya tiene el suyo y esto no hace nada
+        logging.basicConfig()
+        app.add_middleware(MiddlewareInstrumentacion)
+
+        @app.get("/metricas", response_class=PlainTextResponse, include_in_schema=False)
+        def metricas():
+            """Métricas por ruta en formato de texto de Prometheus"""
+            return PlainTextResponse(METRICAS.exportar(), media_type="text/plain; version=0.0.4")
+    return app
+
+
+def __getattr__(nombre):
+    # Permite "uvicorn main:app" sin construir la app al importar el módulo
+    global _app
+    if nombre == "app":
+        if _app is None:
+            _app = crear_app()
+        return _app
+    raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
+
+
+def handler(event, context):
+    """Handler de AWS Lambda; la app y Mangum se reutilizan entre invocaciones warm"""
+    global _handler
+    if isinstance(event, dict) and "trabajo_generacion" in event:
+        # Invocación asíncrona de la propia función para ejecutar un trabajo de generación
+        import trabajos
+        return trabajos.ejecutar_evento(event, context.get_remaining_time_in_millis() / 1000)
+    if _handler is None:
+        from mangum import Mangum
+        _handler = Mangum(__getattr__("app"))
+    return _handler(event, context)
@@ -0,0 +1,277 @@
+"""
+Backend en memoria de RepositorioProyecciones, para desarrollo local,
+pruebas de carga y como referencia de latencia cero en los benchmarks.
+
+Los items se guardan en el mismo formato que en DynamoDB, en un diccionario
+por clave primaria, con índices hash por tienda_id, semana y
+categoria_insumo. Cada índice es un dict de claves primarias (un conjunto
+ordenado), así altas y bajas son O(1) y los listados solo recorren las filas
+que coinciden. Los resúmenes semanales y los marcadores de versión se
+mantienen al escribir, igual que en DynamoDB. Todo el estado vive en el
+proceso y se pierde al reiniciar.
+"""
+import threading
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from config import CLAVE_CON_CATEGORIA
+from dynamodb_service import (
+    DynamoDBService,
+    DeltasResumen,
+    CAMPOS_RESUMEN,
+    DIMENSION_TOTAL,
+    PREFIJO_SEMANA,
+    PREFIJO_TIENDA,
+)
+from model import ProyeccionInsumo, ProyeccionVersionada
+from repositorio import (
+    RepositorioProyecciones,
+    ConflictoVersion,
+    ValorCriterio,
+    CRITERIO_TODAS,
+    CRITERIO_TIENDA,
+    CRITERIO_SEMANA,
+    CRITERIO_CATEGORIA,
+    CRITERIO_TIENDA_FECHAS,
+    CRITERIO_TIENDA_SEMANA,
+    CRITERIO_SEMANA_CATEGORIA,
+)
+
+# Tamaño de página de iterar_paginas (DynamoDB corta las páginas en 1 MB)
+TAMANO_PAGINA = 1000
+
+# Atributos indexados
+INDICES = ('tienda_id', 'semana', 'categoria_insumo')
+
+ClavePrimaria = Tuple[str, str]
+
+
+class RepositorioMemoria(RepositorioProyecciones):
+    """Repositorio en memoria con índices hash; seguro para varios hilos"""
+
+    def __init__(self):
+        self._items: Dict[ClavePrimaria, dict] = {}
+        self._indices: Dict[str, Dict[str, Dict[ClavePrimaria, None]]] = {
+            atributo: defaultdict(dict) for atributo in INDICES
+        }
+        self._resumenes = DeltasResumen()
+        self._trabajos: Dict[str, Tuple[dict, Dict[str, dict]]] = {}
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _clave(item: dict) -> ClavePrimaria:
+        return item['tienda_id'], item['fecha_proyeccion_semana']
+
+    def _guardar(self, item: dict) -> Optional[dict]:
+        """Inserta o reemplaza un item; devuelve la versión anterior"""
+        clave = self._clave(item)
+        with self._lock:
+            anterior = self._items.get(clave)
+            if anterior is not None:
+                self._desindexar(clave, anterior)
+            self._items[clave] = item
+            for atributo in INDICES:
+                self._indices[atributo][item[atributo]][clave] = None
+            self._resumenes.agregar(item, anterior)
+        return anterior
+
+    def _borrar(self, clave: ClavePrimaria) -> Optional[dict]:
+        """Elimina un item por clave primaria; devuelve el item eliminado"""
+        with self._lock:
+            anterior = self._items.pop(clave, None)
+            if anterior is not None:
+                self._desindexar(clave, anterior)
+                self._resumenes.agregar(anterior=anterior)
+        return anterior
+
+    def _desindexar(self, clave: ClavePrimaria, item: dict):
+        for atributo in INDICES:
+            indice = self._indices[atributo]
+            claves = indice[item[atributo]]
+            del claves[clave]
+            if not claves:
+                del indice[item[atributo]]
+
+    def _indice(self, atributo: str, valor: str) -> Iterable[ClavePrimaria]:
+        return self._indices[atributo].get(valor, {})
+
+    def _seleccion(self, criterio: str, valor: ValorCriterio) -> List[dict]:
+        """Items de un criterio, en el orden en que los devolvería DynamoDB dentro de cada partición"""
+        with self._lock:
+            if criterio == CRITERIO_TODAS:
+                return list(self._items.values())
+            if criterio == CRITERIO_TIENDA:
+                claves = sorted(self._indice('tienda_id', valor))
+            elif criterio == CRITERIO_SEMANA:
+                claves = list(self._indice('semana', valor))
+            elif criterio == CRITERIO_CATEGORIA:
+                claves = list(self._indice('categoria_insumo', valor))
+            elif criterio == CRITERIO_TIENDA_FECHAS:
+                tienda_id, desde, hasta = valor
+                claves = sorted(clave for clave in self._indice('tienda_id', tienda_id)
+                                if desde <= clave[1] < f"{hasta}$")
+            elif criterio in (CRITERIO_TIENDA_SEMANA, CRITERIO_SEMANA_CATEGORIA):
+                # Se recorre el índice más pequeño de los dos y se filtra por el otro
+                if criterio == CRITERIO_TIENDA_SEMANA:
+                    (primero, valor_primero), (segundo, valor_segundo) = zip(('tienda_id', 'semana'), valor)
+                else:
+                    (primero, valor_primero), (segundo, valor_segundo) = zip(('semana', 'categoria_insumo'), valor)
+                a, b = self._indice(primero, valor_primero), self._indice(segundo, valor_segundo)
+                menor, mayor = (a, b) if len(a) <= len(b) else (b, a)
+                claves = [clave for clave in menor if clave in mayor]
+            else:
+                raise ValueError(f"Criterio de listado desconocido: {criterio}")
+            return [self._items[clave] for clave in claves]
+
+    @staticmethod
+    def _proyectar(items: List[dict], campos: Optional[Sequence[str]]) -> List[dict]:
+        if not campos:
+            return items
+        return [{campo: item[campo] for campo in campos if campo in item} for item in items]
+
+    def _reemplazar(self, proyeccion: ProyeccionInsumo):
+        """Escribe la fila completa en la versión siguiente de la anterior, como en DynamoDB"""
+        item = DynamoDBService._proyeccion_to_item(proyeccion)
+        with self._lock:
+            anterior = self._items.get(self._clave(item), {})
+            item['version'] = int(anterior.get('version', 0)) + 1
+            self._guardar(item)
+
+    def crear_proyeccion(self, proyeccion: ProyeccionInsumo) -> ProyeccionInsumo:
+        self._reemplazar(proyeccion)
+        return proyeccion
+
+    def crear_proyecciones_lote(self, proyecciones: Iterable[ProyeccionInsumo]) -> Iterator[Tuple[int, Optional[str]]]:
+        for posicion, proyeccion in enumerate(proyecciones):
+            self._reemplazar(proyeccion)
+            yield posicion, None
+
+    def actualizar_proyeccion(self, proyeccion: ProyeccionInsumo) -> ProyeccionInsumo:
+        return self.crear_proyeccion(proyeccion)
+
+    def actualizar_parcial(self, tienda_id: str, fecha_proyeccion: str, semana: str, cambios: Dict[str, Any],
+                           version: Optional[int] = None,
+                           categoria: Optional[str] = None) -> Optional[ProyeccionVersionada]:
+        if CLAVE_CON_CATEGORIA and 'categoria_insumo' in cambios:
+            raise ValueError("categoria_insumo forma parte de la clave de la proyección y no se puede cambiar")
+        clave = (tienda_id, DynamoDBService._fecha_semana(fecha_proyeccion, semana, categoria))
+        valores = {campo: DynamoDBService._valor_item(valor) for campo, valor in cambios.items()}
+        if 'categoria_insumo' in valores:
+            valores.update(DynamoDBService._atributos_fragmento({
+                'tienda_id': tienda_id, 'fecha_proyeccion_semana': clave[1],
+                'semana': semana, 'categoria_insumo': valores['categoria_insumo'],
+            }))
+        with self._lock:
+            anterior = self._items.get(clave)
+            if anterior is None:
+                return None
+            version_actual = int(anterior.get('version', 0))
+            if version is not None and version != version_actual:
+                raise ConflictoVersion(f"La proyección ya no está en la versión {version}")
+            item = {**anterior, **valores, 'version': version_actual + 1}
+            if 'cantidad_estimada' in valores or 'cantidad_consumida_real' in valores:
+                item['diferencia_vs_real'] = (
+                    Decimal(item['cantidad_estimada']) - Decimal(item['cantidad_consumida_real'])
+                )
+            self._guardar(item)
+        return ProyeccionVersionada(**DynamoDBService._item_to_proyeccion(item).model_dump(),
+                                    version=item['version'])
+
+    def eliminar_proyeccion(self, tienda_id: str, fecha_proyeccion: str, semana: str,
+                            categoria: Optional[str] = None) -> bool:
+        return self._borrar((tienda_id, DynamoDBService._fecha_semana(fecha_proyeccion, semana, categoria))) is not None
+
+    def eliminar_por_tienda_y_semana(self, tienda_id: str, semana: str) -> int:
+        with self._lock:
+            claves = [self._clave(item) for item in self._seleccion(CRITERIO_TIENDA_SEMANA, (tienda_id, semana))]
+            for clave in claves:
+                self._borrar(clave)
+        return len(claves)
+
+    def obtener_por_claves(self, claves: Sequence[Tuple[str, str, str, Optional[str]]],
+                           campos: Optional[Sequence[str]] = None) -> List[Optional[dict]]:
+        primarias = [(tienda_id, DynamoDBService._fecha_semana(fecha_proyeccion, semana, categoria))
+                     for tienda_id, fecha_proyeccion, semana, categoria in claves]
+        with self._lock:
+            items = [self._items.get(clave) for clave in primarias]
+        if not campos:
+            return items
+        return [self._proyectar([item], campos)[0] if item is not None else None for item in items]
+
+    def listar_items(self, criterio: str, valor: ValorCriterio = None,
+                     campos: Optional[Sequence[str]] = None) -> List[dict]:
+        return self._proyectar(self._seleccion(criterio, valor), campos)
+
+    def listar_pagina(self, criterio: str, valor: ValorCriterio = None, limit: Optional[int] = None,
+                      cursor: Optional[str] = None,
+                      campos: Optional[Sequence[str]] = None) -> Tuple[List[dict], Optional[str]]:
+        # El cursor guarda la posición dentro del listado; si el listado cambia
+        # entre páginas puede saltarse o repetir filas (basta para desarrollo)
+        inicio = 0
+        if cursor:
+            inicio = DynamoDBService._decodificar_cursor(criterio, valor, cursor).get('posicion')
+            if not isinstance(inicio, int) or inicio < 0:
+                raise ValueError("Cursor inválido")
+        items = self._seleccion(criterio, valor)
+        fin = len(items) if limit is None else inicio + limit
+        siguiente = None
+        if fin < len(items):
+            siguiente = DynamoDBService._codificar_cursor(criterio, valor, {'posicion': fin})
+        return self._proyectar(items[inicio:fin], campos), siguiente
+
+    def iterar_paginas(self, criterio: str, valor: ValorCriterio = None, cursor: Optional[str] = None,
+                       campos: Optional[Sequence[str]] = None) -> Iterator[List[dict]]:
+        while True:
+            items, cursor = self.listar_pagina(criterio, valor, TAMANO_PAGINA, cursor, campos)
+            yield items
+            if cursor is None:
+                break
+
+    def listar_desviaciones(self, semana: str, minima: Decimal,
+                            campos: Optional[Sequence[str]] = None) -> List[dict]:
+        items = [item for item in self._seleccion(CRITERIO_SEMANA, semana)
+                 if abs(Decimal(item['diferencia_vs_real'])) > minima]
+        return self._proyectar(items, campos)
+
+    def listar_por_fechas(self, desde: date, hasta: date,
+                          campos: Optional[Sequence[str]] = None) -> List[dict]:
+        desde_texto, hasta_texto = desde.isoformat(), hasta.isoformat()
+        items = [item for item in self._seleccion(CRITERIO_TODAS, None)
+                 if desde_texto <= item['fecha_proyeccion'] < hasta_texto]
+        return self._proyectar(items, campos)
+
+    def guardar_trabajo(self, trabajo: dict):
+        with self._lock:
+            _, bloques = self._trabajos.get(trabajo['trabajo_id'], (None, {}))
+            self._trabajos[trabajo['trabajo_id']] = (dict(trabajo), bloques)
+
+    def guardar_bloque_trabajo(self, trabajo_id: str, bloque: dict):
+        with self._lock:
+            self._trabajos[trabajo_id][1][bloque['tienda_id']] = dict(bloque)
+
+    def leer_trabajo(self, trabajo_id: str) -> Optional[Tuple[dict, List[dict]]]:
+        with self._lock:
+            if trabajo_id not in self._trabajos:
+                return None
+            trabajo, bloques = self._trabajos[trabajo_id]
+            return dict(trabajo), [dict(bloque) for bloque in bloques.values()]
+
+    def version_semana(self, semana: str) -> Optional[int]:
+        return self._resumenes.version(f"{PREFIJO_SEMANA}{semana}")
+
+    def version_tienda(self, tienda_id: str) -> Optional[int]:
+        return self._resumenes.version(f"{PREFIJO_TIENDA}{tienda_id}")
+
+    def _item_resumen(self, semana: str, dimension: str, valores: Dict[str, Decimal]) -> dict:
+        return {'semana': semana, 'dimension': dimension,
+                **{campo: valores.get(campo, Decimal(0)) for campo in ('filas',) + CAMPOS_RESUMEN}}
+
+    def obtener_resumen(self, semana: str, dimension: str = DIMENSION_TOTAL) -> Optional[dict]:
+        valores = self._resumenes.resumenes().get((semana, dimension))
+        return self._item_resumen(semana, dimension, valores) if valores is not None else None
+
+    def listar_resumenes(self, semana: str) -> List[dict]:
+        return [self._item_resumen(clave[0], clave[1], valores)
+                for clave, valores in sorted(self._resumenes.resumenes().items()) if clave[0] == semana]
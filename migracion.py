@@ -0,0 +1,424 @@
+"""
+Migración en línea de las cantidades guardadas como texto a números de DynamoDB.
+
+Recorre la tabla con un escaneo paralelo (Segment/TotalSegments) y reescribe
+cantidad_estimada, cantidad_despachada, cantidad_consumida_real y
+diferencia_vs_real de cada fila que aún las tenga como texto. Cada fila se
+actualiza con un UpdateItem condicionado a que esos atributos sigan teniendo
+el valor leído, así una escritura concurrente nunca se pisa: la fila se omite
+y se cuenta como "cambiada".
+
+Con --fragmentos, en cambio, escribe semana_fragmento y categoria_fragmento
+(los atributos de los índices fragmentados, ver INDICE_FRAGMENTOS) en las
+filas que no los tienen o que los tienen calculados para otro número de
+fragmentos, condicionado a que la semana y la categoría sigan siendo las
+leídas. Antes crea en la tabla los índices fragmentados que falten. El paso
+a índices fragmentados es:
+
+    1. Desplegar con INDICE_FRAGMENTOS=<n>: las escrituras nuevas ya llevan
+       los atributos y las lecturas siguen en semana-index y categoria-index.
+    2. python migracion.py --fragmentos, hasta que --fragmentos --verificar
+       no encuentre filas pendientes.
+    3. Desplegar con LECTURA_FRAGMENTADA=true.
+
+Para cambiar el número de fragmentos se repite el proceso con
+LECTURA_FRAGMENTADA=false hasta terminar la migración.
+
+Con --clave-categoria (requiere CLAVE_CON_CATEGORIA=true) pasa cada fila con
+la clave anterior "<fecha>#<semana>" a "<fecha>#<semana>#<categoria>": en una
+transacción escribe la fila con la clave nueva y borra la anterior,
+condicionado a que la anterior siga igual a la leída. Si una escritura con la
+clave nueva se adelantó, la fila anterior solo se borra. El cambio de clave es:
+
+    1. Desplegar con CLAVE_CON_CATEGORIA=true: las escrituras nuevas ya usan
+       la clave con categoría y los listados devuelven filas de ambas claves.
+    2. python migracion.py --clave-categoria, hasta que --clave-categoria
+       --verificar no encuentre filas pendientes. Hasta entonces, las
+       lecturas y escrituras por clave no encuentran las filas sin migrar.
+
+Con --indices solo crea en la tabla desplegada los índices que se añadieron
+después de crearla (create_table_if_not_exists también lo hace).
+
+El progreso se guarda por segmento en un archivo de checkpoint después de
+cada página; si el proceso se interrumpe, al relanzarlo continúa donde quedó.
+
+Uso:
+    python migracion.py --segmentos 8 --workers 8
+    python migracion.py --checkpoint /tmp/migracion.json --limite-rcu 5000
+    python migracion.py --verificar        # solo cuenta las filas pendientes
+    python migracion.py --fragmentos --segmentos 8
+    python migracion.py --clave-categoria --segmentos 8
+    python migracion.py --indices          # solo crea los índices que falten
+"""
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal, InvalidOperation
+from typing import Dict, List, Optional
+
+from boto3.dynamodb.conditions import Attr
+from botocore.exceptions import ClientError
+from config import (
+    get_table,
+    get_dynamodb,
+    crear_indices_faltantes,
+    crear_indices_fragmentados,
+    DYNAMODB_TABLE_NAME,
+    INDICE_FRAGMENTOS,
+    CLAVE_CON_CATEGORIA,
+    SCAN_TOTAL_SEGMENTOS,
+    SCAN_WORKERS,
+)
+from dynamodb_service import DynamoDBService, DeltasResumen, CAMPOS_CANTIDAD, CAMPOS_CLAVE, CRITERIOS_FRAGMENTADOS
+from repositorio import CapacidadAgotada
+
+CHECKPOINT_POR_DEFECTO = "migracion_cantidades.json"
+CHECKPOINT_FRAGMENTOS_POR_DEFECTO = "migracion_fragmentos.json"
+CHECKPOINT_CLAVE_POR_DEFECTO = "migracion_clave.json"
+
+MODO_CANTIDADES = "cantidades"
+MODO_FRAGMENTOS = "fragmentos"
+MODO_CLAVE = "clave"
+
+CHECKPOINTS_POR_DEFECTO = {
+    MODO_CANTIDADES: CHECKPOINT_POR_DEFECTO,
+    MODO_FRAGMENTOS: CHECKPOINT_FRAGMENTOS_POR_DEFECTO,
+    MODO_CLAVE: CHECKPOINT_CLAVE_POR_DEFECTO,
+}
+
+# Atributos con los que se calcula la clave con categoría
+CAMPOS_CLAVE_CATEGORIA = ('fecha_proyeccion', 'semana', 'categoria_insumo')
+
+# Atributos de origen y de los índices fragmentados
+CAMPOS_FRAGMENTO = tuple(origen for _, _, origen in CRITERIOS_FRAGMENTADOS.values()) + tuple(
+    atributo for _, atributo, _ in CRITERIOS_FRAGMENTADOS.values())
+
+
+def _filtro_pendientes():
+    """Filas con alguna cantidad guardada como texto"""
+    filtro = Attr(CAMPOS_CANTIDAD[0]).attribute_type('S')
+    for campo in CAMPOS_CANTIDAD[1:]:
+        filtro = filtro | Attr(campo).attribute_type('S')
+    return filtro
+
+
+def cargar_checkpoint(ruta: str, total_segmentos: int, modo: str = MODO_CANTIDADES) -> dict:
+    """
+    Lee el checkpoint o crea uno nuevo; ni el número de segmentos ni el tipo
+    de migración pueden cambiar al reanudar
+    """
+    if os.path.exists(ruta):
+        with open(ruta, encoding="utf-8") as archivo:
+            checkpoint = json.load(archivo)
+        if checkpoint.get('modo', MODO_CANTIDADES) != modo:
+            raise ValueError(f"El checkpoint {ruta} es de otra migración; use otro --checkpoint")
+        if checkpoint['total_segmentos'] != total_segmentos:
+            raise ValueError(
+                f"El checkpoint se creó con {checkpoint['total_segmentos']} segmentos; "
+                f"relance con --segmentos {checkpoint['total_segmentos']} o borre {ruta}"
+            )
+        return checkpoint
+    return {
+        'modo': modo,
+        'total_segmentos': total_segmentos,
+        'segmentos': {str(segmento): {'clave': None, 'terminado': False} for segmento in range(total_segmentos)},
+        'contadores': {'leidas': 0, 'migradas': 0, 'cambiadas': 0, 'errores': 0},
+    }
+
+
+def guardar_checkpoint(ruta: str, checkpoint: dict):
+    """Escritura atómica: un corte a mitad no deja el checkpoint corrupto"""
+    temporal = ruta + ".tmp"
+    with open(temporal, "w", encoding="utf-8") as archivo:
+        json.dump(checkpoint, archivo)
+    os.replace(temporal, ruta)
+
+
+def _como_numero(valor) -> Optional[Decimal]:
+    try:
+        return Decimal(valor)
+    except (InvalidOperation, TypeError):
+        return None
+
+
+def migrar_item(item: dict) -> str:
+    """
+    Convierte a número las cantidades en texto de un item.
+    Devuelve 'migrada', 'cambiada' (otra escritura se adelantó) o 'error'.
+    """
+    textos = {campo: item[campo] for campo in CAMPOS_CANTIDAD if isinstance(item.get(campo), str)}
+    numeros = {campo: _como_numero(valor) for campo, valor in textos.items()}
+    if not textos or any(numero is None for numero in numeros.values()):
+        return 'error' if textos else 'migrada'
+
+    nombres = {f"#c{i}": campo for i, campo in enumerate(textos)}
+    parametros = {
+        'Key': {'tienda_id': item['tienda_id'], 'fecha_proyeccion_semana': item['fecha_proyeccion_semana']},
+        'UpdateExpression': 'SET ' + ', '.join(f"{nombre} = :n{nombre[2:]}" for nombre in nombres),
+        'ConditionExpression': ' AND '.join(f"{nombre} = :s{nombre[2:]}" for nombre in nombres),
+        'ExpressionAttributeNames': nombres,
+        'ExpressionAttributeValues': {
+            **{f":n{nombre[2:]}": numeros[campo] for nombre, campo in nombres.items()},
+            **{f":s{nombre[2:]}": textos[campo] for nombre, campo in nombres.items()},
+        },
+    }
+    try:
+        # Al ritmo del limitador de escritura de la tabla, con reintentos si hay rechazos
+        DynamoDBService._escribir(DYNAMODB_TABLE_NAME, get_table().update_item, **parametros)
+        return 'migrada'
+    except ClientError as e:
+        return 'cambiada' if e.response['Error']['Code'] == 'ConditionalCheckFailedException' else 'error'
+    except CapacidadAgotada:
+        return 'error'
+
+
+def _fragmentos_pendientes(item: dict) -> Dict[str, str]:
+    """Atributos de fragmento que le faltan a un item o que no corresponden a INDICE_FRAGMENTOS"""
+    esperados = DynamoDBService._atributos_fragmento(item)
+    return {atributo: valor for atributo, valor in esperados.items() if item.get(atributo) != valor}
+
+
+def fragmentar_item(item: dict) -> str:
+    """
+    Escribe los atributos de los índices fragmentados de un item.
+    Devuelve 'migrada', 'al_dia' (ya los tenía), 'cambiada' (la fila cambió
+    de categoría o se borró después de leerla) o 'error'.
+    """
+    pendientes = _fragmentos_pendientes(item)
+    if not pendientes:
+        return 'al_dia'
+
+    origenes = tuple(origen for _, _, origen in CRITERIOS_FRAGMENTADOS.values())
+    nombres = {f"#f{i}": atributo for i, atributo in enumerate(pendientes)}
+    condiciones = {f"#o{i}": origen for i, origen in enumerate(origenes)}
+    parametros = {
+        'Key': {campo: item[campo] for campo in CAMPOS_CLAVE},
+        'UpdateExpression': 'SET ' + ', '.join(f"{nombre} = :f{nombre[2:]}" for nombre in nombres),
+        'ConditionExpression': ' AND '.join(f"{nombre} = :o{nombre[2:]}" for nombre in condiciones),
+        'ExpressionAttributeNames': {**nombres, **condiciones},
+        'ExpressionAttributeValues': {
+            **{f":f{nombre[2:]}": pendientes[atributo] for nombre, atributo in nombres.items()},
+            **{f":o{nombre[2:]}": item[origen] for nombre, origen in condiciones.items()},
+        },
+    }
+    try:
+        DynamoDBService._escribir(DYNAMODB_TABLE_NAME, get_table().update_item, **parametros)
+        return 'migrada'
+    except ClientError as e:
+        return 'cambiada' if e.response['Error']['Code'] == 'ConditionalCheckFailedException' else 'error'
+    except CapacidadAgotada:
+        return 'error'
+
+
+def _clave_nueva(item: dict) -> Optional[str]:
+    """Clave de ordenación con categoría de un item; None si ya la tiene"""
+    clave = DynamoDBService._fecha_semana(item['fecha_proyeccion'], item['semana'], item['categoria_insumo'])
+    return None if item['fecha_proyeccion_semana'] == clave else clave
+
+
+def reclavar_item(item: dict) -> str:
+    """
+    Pasa un item (completo) a la clave con categoría.
+    Devuelve 'migrada', 'al_dia' (ya la tenía), 'cambiada' (la fila cambió o
+    se borró después de leerla) o 'error'.
+    """
+    clave = _clave_nueva(item)
+    if clave is None:
+        return 'al_dia'
+    nuevo = {**item, 'fecha_proyeccion_semana': clave}
+    nuevo.update(DynamoDBService._atributos_fragmento(nuevo))
+
+    # La fila anterior solo se borra si sigue igual a la leída (una fila
+    # actualizada con PATCH también cambia de versión)
+    nombres = {f"#c{i}": campo for i, campo in enumerate(campo for campo in item if campo not in CAMPOS_CLAVE)}
+    condiciones = [f"{nombre} = :c{nombre[2:]}" for nombre in nombres]
+    if 'version' not in item:
+        nombres['#version'] = 'version'
+        condiciones.append('attribute_not_exists(#version)')
+    borrado = {
+        'TableName': DYNAMODB_TABLE_NAME,
+        'Key': {campo: item[campo] for campo in CAMPOS_CLAVE},
+        'ConditionExpression': ' AND '.join(condiciones),
+        'ExpressionAttributeNames': nombres,
+        'ExpressionAttributeValues': {f":c{nombre[2:]}": item[campo] for nombre, campo in nombres.items()
+                                      if campo in item},
+    }
+    try:
+        DynamoDBService._escribir(DYNAMODB_TABLE_NAME, get_dynamodb().meta.client.transact_write_items,
+                                  TransactItems=[
+                                      {'Put': {'TableName': DYNAMODB_TABLE_NAME, 'Item': nuevo,
+                                               'ConditionExpression': 'attribute_not_exists(tienda_id)'}},
+                                      {'Delete': borrado},
+                                  ])
+        return 'migrada'
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'TransactionCanceledException':
+            return 'error'
+        motivos = [motivo.get('Code') for motivo in e.response.get('CancellationReasons', [])]
+        if motivos[1:2] == ['ConditionalCheckFailed']:
+            return 'cambiada'
+        if motivos[:1] != ['ConditionalCheckFailed']:
+            return 'error'
+    except CapacidadAgotada:
+        return 'error'
+
+    # Ya existe la fila con la clave nueva, escrita después del cambio de
+    # clave: la anterior sobra y se descuenta de los resúmenes
+    borrado.pop('TableName')
+    try:
+        DynamoDBService._escribir(DYNAMODB_TABLE_NAME, get_table().delete_item, **borrado)
+    except ClientError as e:
+        return 'cambiada' if e.response['Error']['Code'] == 'ConditionalCheckFailedException' else 'error'
+    except CapacidadAgotada:
+        return 'error'
+    deltas = DeltasResumen()
+    deltas.agregar(anterior=item)
+    try:
+        deltas.aplicar()
+    except Exception:
+        # La fila ya se borró, pero los marcadores de versión no cambiaron
+        return 'error'
+    return 'migrada'
+
+
+def _lectura(modo: str) -> dict:
+    """Parámetros del escaneo de cada migración"""
+    if modo == MODO_CLAVE:
+        # Filas completas: la fila con la clave nueva se escribe a partir de ellas
+        return {}
+    if modo == MODO_FRAGMENTOS:
+        # Sin filtro: los atributos desactualizados solo se detectan al leer la fila
+        return {'ProjectionExpression': ', '.join(CAMPOS_CLAVE + CAMPOS_FRAGMENTO)}
+    return {
+        'FilterExpression': _filtro_pendientes(),
+        'ProjectionExpression': ', '.join(CAMPOS_CLAVE + CAMPOS_CANTIDAD),
+    }
+
+
+def migrar(ruta_checkpoint: str, total_segmentos: int, max_workers: int,
+           limite_rcu: Optional[float] = None, modo: str = MODO_CANTIDADES) -> dict:
+    """
+    Ejecuta (o reanuda) la migración y devuelve el checkpoint final.
+    Cada página se migra en paralelo y su LastEvaluatedKey solo se guarda
+    cuando todas sus filas terminaron.
+    """
+    checkpoint = cargar_checkpoint(ruta_checkpoint, total_segmentos, modo)
+    estado: Dict[str, dict] = checkpoint['segmentos']
+    contadores = checkpoint['contadores']
+    pendientes = [int(segmento) for segmento, datos in estado.items() if not datos['terminado']]
+
+    escaneo = DynamoDBService.escanear_paralelo(
+        total_segmentos=total_segmentos,
+        max_workers=max_workers,
+        limite_rcu=limite_rcu,
+        segmentos=pendientes,
+        inicio={int(segmento): datos['clave'] for segmento, datos in estado.items() if datos['clave']},
+        **_lectura(modo)
+    )
+    funcion = {MODO_FRAGMENTOS: fragmentar_item, MODO_CLAVE: reclavar_item}.get(modo, migrar_item)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for segmento, items, last_evaluated_key in escaneo.paginas():
+            resultados: List[str] = list(executor.map(funcion, items))
+            contadores['leidas'] += len(items)
+            contadores['migradas'] += resultados.count('migrada')
+            contadores['cambiadas'] += resultados.count('cambiada')
+            contadores['errores'] += resultados.count('error')
+            estado[str(segmento)] = {'clave': last_evaluated_key, 'terminado': last_evaluated_key is None}
+            guardar_checkpoint(ruta_checkpoint, checkpoint)
+
+    checkpoint['limite_alcanzado'] = escaneo.limite_alcanzado
+    checkpoint['capacidad_consumida'] = escaneo.capacidad_consumida
+    return checkpoint
+
+
+def contar_pendientes(total_segmentos: int, max_workers: int, modo: str = MODO_CANTIDADES) -> int:
+    """
+    Cuenta las filas que aún tienen alguna cantidad en texto, atributos de
+    fragmento por escribir o la clave sin categoría
+    """
+    if modo == MODO_CLAVE:
+        escaneo = DynamoDBService.escanear_paralelo(total_segmentos=total_segmentos, max_workers=max_workers,
+                                                    ProjectionExpression=', '.join(CAMPOS_CLAVE
+                                                                                   + CAMPOS_CLAVE_CATEGORIA))
+        return sum(1 for item in escaneo if _clave_nueva(item) is not None)
+    if modo == MODO_FRAGMENTOS:
+        escaneo = DynamoDBService.escanear_paralelo(total_segmentos=total_segmentos, max_workers=max_workers,
+                                                    **_lectura(modo))
+        return sum(1 for item in escaneo if _fragmentos_pendientes(item))
+    escaneo = DynamoDBService.escanear_paralelo(
+        total_segmentos=total_segmentos,
+        max_workers=max_workers,
+        FilterExpression=_filtro_pendientes(),
+        ProjectionExpression='tienda_id',
+    )
+    return sum(len(items) for _, items, _ in escaneo.paginas())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migra las cantidades en texto a números de DynamoDB, "
+                                                 "completa los atributos de los índices fragmentados "
+                                                 "o pasa las filas a la clave con categoría")
+    parser.add_argument("--segmentos", type=int, default=SCAN_TOTAL_SEGMENTOS,
+                        help="Segmentos del escaneo paralelo (fijo para toda la migración)")
+    parser.add_argument("--workers", type=int, default=SCAN_WORKERS,
+                        help="Hilos de lectura y de escritura")
+    parser.add_argument("--checkpoint",
+                        help=f"Archivo donde se guarda el progreso por segmento (por defecto "
+                             f"{CHECKPOINT_POR_DEFECTO}, {CHECKPOINT_FRAGMENTOS_POR_DEFECTO} "
+                             f"o {CHECKPOINT_CLAVE_POR_DEFECTO})")
+    parser.add_argument("--limite-rcu", type=float,
+                        help="Detiene la ejecución al consumir estas unidades de lectura (se reanuda después)")
+    parser.add_argument("--verificar", action="store_true",
+                        help="Solo cuenta las filas pendientes de migrar")
+    parser.add_argument("--fragmentos", action="store_true",
+                        help="Crea los índices fragmentados y escribe sus atributos en las filas existentes")
+    parser.add_argument("--clave-categoria", action="store_true",
+                        help="Pasa las filas existentes a la clave con categoría (CLAVE_CON_CATEGORIA)")
+    parser.add_argument("--indices", action="store_true",
+                        help="Solo crea en la tabla desplegada los índices que le falten")
+    args = parser.parse_args()
+    if args.indices:
+        crear_indices_faltantes()
+        return
+    if args.fragmentos and args.clave_categoria:
+        sys.exit("Indique solo una de --fragmentos y --clave-categoria")
+    modo = MODO_FRAGMENTOS if args.fragmentos else MODO_CLAVE if args.clave_categoria else MODO_CANTIDADES
+    args.checkpoint = args.checkpoint or CHECKPOINTS_POR_DEFECTO[modo]
+    if args.fragmentos and not INDICE_FRAGMENTOS:
+        sys.exit("INDICE_FRAGMENTOS no está definido: indique el número de fragmentos")
+    if args.clave_categoria and not CLAVE_CON_CATEGORIA:
+        sys.exit("CLAVE_CON_CATEGORIA no está activa: despliegue con CLAVE_CON_CATEGORIA=true antes de migrar")
+
+    if args.verificar:
+        pendientes = contar_pendientes(args.segmentos, args.workers, modo)
+        if args.fragmentos:
+            print(f"{pendientes} fila(s) sin los atributos de {INDICE_FRAGMENTOS} fragmentos")
+        elif args.clave_categoria:
+            print(f"{pendientes} fila(s) con la clave sin categoría")
+        else:
+            print(f"{pendientes} fila(s) con cantidades en texto")
+        sys.exit(1 if pendientes else 0)
+
+    try:
+        if args.fragmentos:
+            crear_indices_fragmentados()
+        checkpoint = migrar(args.checkpoint, args.segmentos, args.workers, args.limite_rcu, modo)
+    except ValueError as e:
+        sys.exit(str(e))
+
+    contadores = checkpoint['contadores']
+    terminados = sum(datos['terminado'] for datos in checkpoint['segmentos'].values())
+    print(f"Leídas: {contadores['leidas']}, migradas: {contadores['migradas']}, "
+          f"cambiadas durante la migración: {contadores['cambiadas']}, errores: {contadores['errores']}")
+    print(f"Segmentos terminados: {terminados}/{checkpoint['total_segmentos']} "
+          f"({checkpoint['capacidad_consumida']:.1f} RCU consumidas)")
+    if checkpoint['limite_alcanzado']:
+        print(f"Se alcanzó el límite de RCU; relance el comando para continuar desde {args.checkpoint}")
+    elif contadores['cambiadas'] or contadores['errores']:
+        print("Hay filas sin migrar; relance con un checkpoint nuevo para reintentarlas")
+
+
+if __name__ == "__main__":
+    main()
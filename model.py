@@ -1,84 +1,321 @@
-from pydantic import BaseModel, Field
-from typing import Optional
-from datetime import date
-from decimal import Decimal
-
-class ProyeccionInsumo(BaseModel):
-    fecha_proyeccion: date = Field(
-        ...,
-        description="Día en que se estima la demanda de insumos",
-        example="2025-10-05"
-    )
-    tienda_id: str = Field(
-        ...,
-        description="Identificador único de la tienda",
-        example="T001"
-    )
-    nombre_tienda: str = Field(
-        ...,
-        description="Nombre descriptivo de la tienda",
-        example="Salón Surco Central"
-    )
-    categoria_insumo: str = Field(
-        ..., description="Categoría general del insumo", example="crepas"
-    )
-    unidad_medida: str = Field(
-        ...,
-        description="Unidad de medida del insumo",
-        example="Base de crepe"
-    )
-    cantidad_estimada: Decimal = Field(
-        ...,
-        description="Cantidad estimada en la unidad de medida",
-        example=12.50
-    )
-    semana: str = Field(
-        ...,
-        description="Semana de proyección",
-        example="2025-W41"
-    )
-    origen_modelo: str = Field(
-        ...,
-        description="Nombre o versión del modelo que genera la estimación",
-        example="Modelo_Ventas_2025_v1"
-    )
-    fecha_generacion: date = Field(
-        ...,
-        description="Fecha en la que se generó la estimación",
-        example="2025-10-01"
-    )
-    estado_proyeccion: str = Field(
-        ...,
-        description="Estado de la estimación",
-        example="pendiente"
-    )
-    cantidad_despachada: Decimal = Field(
-        ...,
-        description="Cantidad efectivamente enviada desde el centro de distribución",
-        example=11.00
-    )
-    cantidad_consumida_real: Decimal = Field(
-        ...,
-        description="Cantidad real utilizada del insumo (según cierre del día)",
-        example=11.80
-    )
-    diferencia_vs_real: Decimal = Field(
-        ...,
-        description="Diferencia entre la cantidad estimada y la cantidad real utilizada",
-        example=0.70
-    )
-    usuario_ajuste: str = Field(
-        ...,
-        description="Usuario o proceso que realizó el ajuste (si aplica)",
-        example="sistema_autajuste"
-    )
-    fecha_confirmacion: date = Field(
-        ...,
-        description="Fecha en que se validó la proyección o consumo",
-        example="2025-10-06"
-    )
-    observaciones: Optional[str] = Field(
-        None,
-        description="Comentarios o incidencias",
-        example="Sobrestimado por evento local"
-    )
+from pydantic import BaseModel, ConfigDict, Field, create_model
+from typing import Dict, List, Literal, Optional, Union
+from datetime import date
+from decimal import Decimal
+
+class ProyeccionInsumo(BaseModel):
+    fecha_proyeccion: date = Field(
+        ...,
+        description="Día en que se estima la demanda de insumos",
+        example="2025-10-05"
+    )
+    tienda_id: str = Field(
+        ...,
+        description="Identificador único de la tienda",
+        example="T001"
+    )
+    nombre_tienda: str = Field(
+        ...,
+        description="Nombre descriptivo de la tienda",
+        example="Salón Surco Central"
+    )
+    categoria_insumo: str = Field(
+        ..., description="Categoría general del insumo", example="crepas"
+    )
+    unidad_medida: str = Field(
+        ...,
+        description="Unidad de medida del insumo",
+        example="Base de crepe"
+    )
+    cantidad_estimada: Decimal = Field(
+        ...,
+        description="Cantidad estimada en la unidad de medida",
+        example=12.50
+    )
+    semana: str = Field(
+        ...,
+        description="Semana de proyección",
+        example="2025-W41"
+    )
+    origen_modelo: str = Field(
+        ...,
+        description="Nombre o versión del modelo que genera la estimación",
+        example="Modelo_Ventas_2025_v1"
+    )
+    fecha_generacion: date = Field(
+        ...,
+        description="Fecha en la que se generó la estimación",
+        example="2025-10-01"
+    )
+    estado_proyeccion: str = Field(
+        ...,
+        description="Estado de la estimación",
+        example="pendiente"
+    )
+    cantidad_despachada: Decimal = Field(
+        ...,
+        description="Cantidad efectivamente enviada desde el centro de distribución",
+        example=11.00
+    )
+    cantidad_consumida_real: Decimal = Field(
+        ...,
+        description="Cantidad real utilizada del insumo (según cierre del día)",
+        example=11.80
+    )
+    diferencia_vs_real: Decimal = Field(
+        ...,
+        description="Diferencia entre la cantidad estimada y la cantidad real utilizada",
+        example=0.70
+    )
+    usuario_ajuste: str = Field(
+        ...,
+        description="Usuario o proceso que realizó el ajuste (si aplica)",
+        example="sistema_autajuste"
+    )
+    fecha_confirmacion: date = Field(
+        ...,
+        description="Fecha en que se validó la proyección o consumo",
+        example="2025-10-06"
+    )
+    observaciones: Optional[str] = Field(
+        None,
+        description="Comentarios o incidencias",
+        example="Sobrestimado por evento local"
+    )
+
+
+class ResultadoRegistro(BaseModel):
+    indice: int = Field(
+        ...,
+        description="Posición de la fila dentro del lote enviado",
+        example=0
+    )
+    tienda_id: Optional[str] = Field(
+        None,
+        description="Identificador de la tienda de la fila (si se pudo leer)",
+        example="T001"
+    )
+    fecha_proyeccion: Optional[date] = Field(
+        None,
+        description="Fecha de proyección de la fila (si se pudo leer)",
+        example="2025-10-05"
+    )
+    exito: bool = Field(
+        ...,
+        description="Indica si la fila quedó registrada",
+        example=True
+    )
+    error: Optional[str] = Field(
+        None,
+        description="Motivo del fallo cuando la fila no se registró",
+        example=None
+    )
+
+
+class ResumenRegistroLote(BaseModel):
+    total: int = Field(..., description="Filas recibidas", example=100)
+    exitosas: int = Field(..., description="Filas registradas", example=98)
+    fallidas: int = Field(..., description="Filas con error", example=2)
+    resultados: List[ResultadoRegistro] = Field(
+        ...,
+        description="Resultado de cada fila, en el orden en que se enviaron"
+    )
+
+
+class PaginaProyecciones(BaseModel):
+    items: List[ProyeccionInsumo] = Field(
+        ...,
+        description="Proyecciones de la página"
+    )
+    siguiente_cursor: Optional[str] = Field(
+        None,
+        description="Cursor opaco para pedir la página siguiente; null si no hay más",
+        example="eyJjIjoidG9kYXMiLCJ2IjpudWxsLCJrIjp7fX0"
+    )
+
+
+class MetricasPrecision(BaseModel):
+    grupo: str = Field(..., description="Tienda, categoría o semana del grupo ('total' para el global)", example="T001")
+    filas: int = Field(..., description="Filas del grupo", example=84)
+    total_estimada: float = Field(..., description="Suma de cantidad_estimada", example=1050.0)
+    total_despachada: float = Field(..., description="Suma de cantidad_despachada", example=980.0)
+    total_consumida_real: float = Field(..., description="Suma de cantidad_consumida_real", example=1000.0)
+    mape: Optional[float] = Field(
+        None,
+        description="Error porcentual absoluto medio (%) en filas con consumo real > 0",
+        example=7.5
+    )
+    sesgo: Optional[float] = Field(
+        None,
+        description="(estimada - real) / real en % sobre los totales; positivo = sobreestimación",
+        example=5.0
+    )
+    sobre_despacho: float = Field(..., description="Cantidad despachada por encima del consumo real", example=12.0)
+    sub_despacho: float = Field(..., description="Consumo real no cubierto por el despacho", example=32.0)
+
+
+class ReportePrecision(BaseModel):
+    total: Optional[MetricasPrecision] = Field(None, description="Métricas del subconjunto completo")
+    por_tienda: List[MetricasPrecision] = Field(..., description="Métricas por tienda")
+    por_categoria: List[MetricasPrecision] = Field(..., description="Métricas por categoría")
+    por_semana: List[MetricasPrecision] = Field(..., description="Métricas por semana")
+
+
+class SolicitudGeneracion(BaseModel):
+    semana: Optional[str] = Field(
+        None,
+        description="Semana a proyectar; por defecto la semana ISO siguiente",
+        example="2025-W41"
+    )
+    metodo: Literal["media_movil", "suavizado_exponencial"] = Field(
+        "media_movil",
+        description="media_movil: promedio por día de la semana; suavizado_exponencial: SES con estacionalidad semanal",
+        example="media_movil"
+    )
+    semanas_historia: int = Field(
+        8, ge=1, le=52,
+        description="Semanas de consumo real previas que se usan como histórico",
+        example=8
+    )
+    alpha: float = Field(
+        0.3, gt=0, le=1,
+        description="Factor de suavizado (solo suavizado_exponencial)",
+        example=0.3
+    )
+
+
+class ErrorBloque(BaseModel):
+    tienda_id: str = Field(..., description="Tienda del bloque", example="T001")
+    error: Optional[str] = Field(None, description="Motivo del fallo", example="Throughput exceeded")
+    intentos: int = Field(..., description="Veces que se procesó el bloque", example=1)
+
+
+class EstadoTrabajo(BaseModel):
+    trabajo_id: str = Field(..., description="Identificador del trabajo", example="9f1c2e7d4b3a4c0e8d6f5a2b1c0d9e8f")
+    estado: Literal["pendiente", "en_curso", "completado", "con_errores"] = Field(
+        ...,
+        description="pendiente: aún no empezó; con_errores: terminó con bloques fallidos (se pueden reintentar)",
+        example="en_curso"
+    )
+    semana: str = Field(..., description="Semana proyectada", example="2025-W41")
+    origen_modelo: str = Field(..., description="Modelo y versión registrados en las filas", example="MediaMovilSemanal_v2.0")
+    creado: str = Field(..., description="Momento de creación (ISO 8601, UTC)", example="2025-10-01T08:00:00.000+00:00")
+    iniciado: Optional[str] = Field(None, description="Inicio de la ejecución", example="2025-10-01T08:00:01.250+00:00")
+    terminado: Optional[str] = Field(None, description="Fin de la última ejecución", example=None)
+    ultimo_avance: str = Field(..., description="Último bloque terminado", example="2025-10-01T08:00:41.480+00:00")
+    bloques: int = Field(..., description="Bloques del trabajo (uno por tienda; 0 hasta que empieza)", example=1200)
+    bloques_completados: int = Field(..., description="Bloques escritos por completo", example=800)
+    bloques_fallidos: int = Field(..., description="Bloques con error", example=2)
+    bloques_pendientes: int = Field(..., description="Bloques sin procesar", example=398)
+    progreso: float = Field(..., description="Fracción de bloques procesados (0 a 1)", example=0.6683)
+    filas: int = Field(..., description="Filas generadas", example=22400)
+    exitosas: int = Field(..., description="Filas escritas", example=22344)
+    fallidas: int = Field(..., description="Filas con error de escritura", example=56)
+    segundos: float = Field(..., description="Tiempo transcurrido desde el inicio", example=40.2)
+    filas_por_segundo: Optional[float] = Field(None, description="Filas escritas por segundo", example=555.8)
+    error: Optional[str] = Field(None, description="Error del trabajo fuera de los bloques (al buscar las tiendas)",
+                                 example=None)
+    errores: List[ErrorBloque] = Field(..., description="Bloques fallidos (máximo 100)")
+
+
+class TotalesResumen(BaseModel):
+    filas: int = Field(..., description="Proyecciones incluidas", example=84)
+    cantidad_estimada: Decimal = Field(..., description="Suma de cantidad_estimada", example=1050.0)
+    cantidad_despachada: Decimal = Field(..., description="Suma de cantidad_despachada", example=980.0)
+    cantidad_consumida_real: Decimal = Field(..., description="Suma de cantidad_consumida_real", example=1000.0)
+    diferencia_vs_real: Decimal = Field(..., description="Suma de diferencia_vs_real", example=-20.0)
+
+
+class ResumenSemanal(BaseModel):
+    semana: str = Field(..., description="Semana resumida", example="2025-W41")
+    total: Optional[TotalesResumen] = Field(None, description="Totales de la semana (null si no hay proyecciones)")
+    por_tienda: Dict[str, TotalesResumen] = Field(..., description="Totales por tienda_id")
+    por_categoria: Dict[str, TotalesResumen] = Field(..., description="Totales por categoría de insumo")
+
+
+class ErrorImportacion(BaseModel):
+    fila: int = Field(..., description="Número de fila en el archivo (sin contar la cabecera)", example=42)
+    error: str = Field(..., description="Motivo del rechazo", example="cantidad_estimada: Field required")
+
+
+class ResumenImportacion(BaseModel):
+    leidas: int = Field(..., description="Filas leídas después de desde_fila", example=100000)
+    exitosas: int = Field(..., description="Filas escritas", example=99990)
+    fallidas: int = Field(..., description="Filas rechazadas por validación o escritura", example=10)
+    fila_confirmada: int = Field(
+        ...,
+        description="Todas las filas hasta esta quedaron resueltas; se envía como desde_fila para reanudar",
+        example=100000
+    )
+    errores: List[ErrorImportacion] = Field(..., description="Primeras filas rechazadas (máximo 100)")
+    segundos: float = Field(..., description="Duración de la importación", example=512.3)
+
+
+class ProyeccionVersionada(ProyeccionInsumo):
+    version: int = Field(
+        ...,
+        description="Versión de la fila tras la actualización; se envía en el siguiente PATCH",
+        example=3
+    )
+
+# Misma forma que ProyeccionInsumo con todos los campos opcionales; describe
+# las respuestas de los listados cuando se piden solo algunos campos (fields=)
+ProyeccionParcial = create_model(
+    "ProyeccionParcial",
+    **{
+        nombre: (Optional[campo.annotation], Field(None, description=campo.description))
+        for nombre, campo in ProyeccionInsumo.model_fields.items()
+    }
+)
+
+# Campos que no se pueden enviar en un PATCH: la clave primaria y la
+# diferencia, que el servidor recalcula
+CAMPOS_NO_ACTUALIZABLES = ('fecha_proyeccion', 'tienda_id', 'semana', 'diferencia_vs_real')
+
+# Cuerpo de PATCH: los campos modificables de ProyeccionInsumo, más la
+# versión esperada para la concurrencia optimista. Se pueden omitir, pero
+# conservan su tipo: un null explícito se rechaza (salvo en los campos que ya
+# lo admiten, como observaciones), porque el default no se valida
+ActualizacionProyeccion = create_model(
+    "ActualizacionProyeccion",
+    __config__=ConfigDict(extra='forbid'),
+    version=(int, Field(
+        None, ge=0,
+        description="Versión leída por el cliente; si la fila cambió desde entonces se responde 409"
+    )),
+    **{
+        nombre: (campo.annotation, Field(None, description=campo.description))
+        for nombre, campo in ProyeccionInsumo.model_fields.items()
+        if nombre not in CAMPOS_NO_ACTUALIZABLES
+    }
+)
+
+
+class ClaveProyeccion(BaseModel):
+    tienda_id: str = Field(..., description="Identificador de la tienda", example="T001")
+    fecha_proyeccion: date = Field(..., description="Fecha de la proyección", example="2025-10-05")
+    semana: str = Field(..., description="Semana de la proyección", example="2025-W41")
+    categoria_insumo: Optional[str] = Field(
+        None,
+        description="Categoría del insumo; obligatoria cuando la clave incluye la categoría (CLAVE_CON_CATEGORIA)",
+        example="crepas"
+    )
+
+
+class ResultadoConsulta(BaseModel):
+    indice: int = Field(..., description="Posición de la clave dentro de la solicitud", example=0)
+    encontrada: bool = Field(..., description="Indica si existe una proyección con esa clave", example=True)
+    proyeccion: Optional[Union[ProyeccionInsumo, ProyeccionParcial]] = Field(
+        None,
+        description="Proyección encontrada (solo los campos pedidos con fields=); null si no existe"
+    )
+
+
+class RespuestaConsultaLote(BaseModel):
+    total: int = Field(..., description="Claves recibidas", example=3)
+    encontradas: int = Field(..., description="Claves con proyección", example=2)
+    faltantes: int = Field(..., description="Claves sin proyección", example=1)
+    resultados: List[ResultadoConsulta] = Field(
+        ...,
+        description="Resultado de cada clave, en el orden en que se enviaron"
+    )
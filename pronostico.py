@@ -0,0 +1,296 @@
+import warnings
+from contextlib import contextmanager
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from config import CLAVE_CON_CATEGORIA
+from model import ProyeccionInsumo
+from repositorio import obtener_repositorio, CRITERIO_TIENDA_FECHAS
+
+# Versión del motor; se registra en origen_modelo de cada proyección generada
+VERSION_MOTOR = "2.0"
+
+METODO_MEDIA_MOVIL = "media_movil"
+METODO_SUAVIZADO = "suavizado_exponencial"
+
+NOMBRES_METODO = {
+    METODO_MEDIA_MOVIL: "MediaMovilSemanal",
+    METODO_SUAVIZADO: "SuavizadoExponencial",
+}
+
+# Estado con el que el motor escribe las proyecciones, antes de conciliarlas con el consumo real
+ESTADO_PENDIENTE = "pendiente"
+
+# Atributos que se leen del histórico
+CAMPOS_HISTORIA = (
+    'tienda_id',
+    'nombre_tienda',
+    'categoria_insumo',
+    'unidad_medida',
+    'fecha_proyeccion',
+    'estado_proyeccion',
+    'cantidad_consumida_real',
+)
+
+
+def semana_iso(fecha: date) -> str:
+    """Semana ISO con el formato usado en la tabla, p. ej. 2025-W41"""
+    anio, semana, _ = fecha.isocalendar()
+    return f"{anio}-W{semana:02d}"
+
+
+def fechas_de_semana(semana: str) -> List[date]:
+    """Los 7 días (lunes a domingo) de una semana ISO "YYYY-Www"; lanza ValueError si no es válida"""
+    try:
+        anio, numero = semana.split("-W")
+        lunes = date.fromisocalendar(int(anio), int(numero), 1)
+    except ValueError:
+        raise ValueError(f"Semana inválida: {semana} (formato esperado: 2025-W41)")
+    return [lunes + timedelta(days=i) for i in range(7)]
+
+
+def origen_modelo(metodo: str) -> str:
+    """Valor de origen_modelo para un método, incluida la versión del motor"""
+    return f"{NOMBRES_METODO[metodo]}_v{VERSION_MOTOR}"
+
+
+def cargar_historia_tienda(tienda_id: str, desde: date, hasta: date) -> List[dict]:
+    """Lee las filas de una tienda con fecha_proyeccion en [desde, hasta) con una query sobre su partición"""
+    return obtener_repositorio().listar_items(
+        CRITERIO_TIENDA_FECHAS, (tienda_id, desde.isoformat(), (hasta - timedelta(days=1)).isoformat()),
+        CAMPOS_HISTORIA
+    )
+
+
+def tiendas_con_historia(semana: str, semanas_historia: int) -> List[str]:
+    """
+    Tiendas con alguna fila en las semanas_historia semanas previas a la
+    semana, según los resúmenes semanales (una query por semana). Las semanas
+    sin ningún resumen (filas escritas antes de que existieran los resúmenes
+    o sin reconstruir con resumenes.py) se buscan en la tabla de
+    proyecciones con el escaneo paralelo, en un solo rango que las cubre.
+    """
+    from dynamodb_service import PREFIJO_TIENDA
+
+    lunes = fechas_de_semana(semana)[0]
+    tiendas = set()
+    sin_resumen = []
+    for atras in range(1, semanas_historia + 1):
+        inicio = lunes - timedelta(weeks=atras)
+        resumenes = obtener_repositorio().listar_resumenes(semana_iso(inicio))
+        if not resumenes:
+            sin_resumen.append(inicio)
+        for resumen in resumenes:
+            if resumen['dimension'].startswith(PREFIJO_TIENDA) and resumen.get('filas', 0) > 0:
+                tiendas.add(resumen['dimension'][len(PREFIJO_TIENDA):])
+    if sin_resumen:
+        items = obtener_repositorio().listar_por_fechas(min(sin_resumen), max(sin_resumen) + timedelta(weeks=1),
+                                                        ('tienda_id',))
+        tiendas.update(item['tienda_id'] for item in items)
+    return sorted(tiendas)
+
+
+def conciliada(item: dict) -> bool:
+    """
+    Indica si una fila tiene consumo real: las pendientes con consumo 0 (p. ej.
+    las que escribió el motor y aún no se conciliaron) no son un dato
+    """
+    return item.get('estado_proyeccion') != ESTADO_PENDIENTE or Decimal(item['cantidad_consumida_real']) != 0
+
+
+def matriz_historia(historia: Iterable[dict], desde: date,
+                    dias: int) -> Tuple[List[Tuple[str, str]], Dict[Tuple[str, str], dict], np.ndarray]:
+    """
+    Pivotea el histórico conciliado a una matriz series × días (NaN donde no
+    hay dato). Devuelve las series (tienda_id, categoria_insumo), los
+    metadatos más recientes de cada serie y la matriz.
+    """
+    historia = [item for item in historia if conciliada(item)]
+    if not historia:
+        return [], {}, np.full((0, dias), np.nan)
+
+    claves = np.array([f"{item['tienda_id']}\x1f{item['categoria_insumo']}" for item in historia])
+    fechas = np.array([item['fecha_proyeccion'] for item in historia])
+    valores = np.array([item['cantidad_consumida_real'] for item in historia], dtype=np.float64)
+
+    # Solo hay unas decenas de fechas distintas: se convierten una vez cada una
+    fechas_unicas, indice_fecha = np.unique(fechas, return_inverse=True)
+    dia_por_fecha = np.array([(date.fromisoformat(fecha) - desde).days for fecha in fechas_unicas])
+    dia = dia_por_fecha[indice_fecha]
+    en_rango = (dia >= 0) & (dia < dias)
+
+    claves_unicas, serie = np.unique(claves[en_rango], return_inverse=True)
+    dia = dia[en_rango]
+    posiciones = np.flatnonzero(en_rango)
+
+    matriz = np.full((len(claves_unicas), dias), np.nan)
+    matriz[serie, dia] = valores[en_rango]
+
+    # Metadatos: la fila más reciente de cada serie (último elemento de cada
+    # grupo al ordenar por serie y día)
+    orden = np.lexsort((dia, serie))
+    ultimos = orden[np.r_[serie[orden][1:] != serie[orden][:-1], True]]
+    series = [tuple(clave.split('\x1f', 1)) for clave in claves_unicas]
+    metadatos = {series[serie[k]]: historia[posiciones[k]] for k in ultimos}
+    return series, metadatos, matriz
+
+
+@contextmanager
+def _sin_advertencias_nan():
+    """Silencia el RuntimeWarning de nanmean para series o días sin datos"""
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', category=RuntimeWarning)
+        yield
+
+
+def _rellenar_con_promedio(pronostico: np.ndarray, matriz: np.ndarray) -> np.ndarray:
+    """Completa los huecos del pronóstico con el promedio de la serie y recorta negativos"""
+    with _sin_advertencias_nan():
+        promedio = np.nanmean(matriz, axis=1, keepdims=True)
+    pronostico = np.where(np.isnan(pronostico), promedio, pronostico)
+    return np.clip(np.nan_to_num(pronostico, nan=0.0), 0, None)
+
+
+def media_movil_semanal(matriz: np.ndarray) -> np.ndarray:
+    """
+    Pronóstico por día de la semana: promedio del mismo día en las semanas
+    del histórico. La matriz debe empezar en lunes y cubrir semanas completas.
+    Devuelve una matriz series × 7.
+    """
+    series, dias = matriz.shape
+    por_semana = matriz.reshape(series, dias // 7, 7)
+    with _sin_advertencias_nan():
+        pronostico = np.nanmean(por_semana, axis=1)
+    # Días de la semana sin ningún dato: se usa el promedio general de la serie
+    return _rellenar_con_promedio(pronostico, matriz)
+
+
+def suavizado_exponencial(matriz: np.ndarray, alpha: float) -> np.ndarray:
+    """
+    Suavizado exponencial simple con índices estacionales por día de la semana.
+    La recursión del nivel recorre los días, pero cada paso actualiza todas
+    las series a la vez. Devuelve una matriz series × 7.
+    """
+    series, dias = matriz.shape
+    with _sin_advertencias_nan():
+        promedio = np.nanmean(matriz, axis=1, keepdims=True)
+        por_dia_semana = np.nanmean(matriz.reshape(series, dias // 7, 7), axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        indices = np.where(promedio > 0, por_dia_semana / promedio, 1.0)
+    indices = np.where(np.isnan(indices), 1.0, indices)
+
+    desestacionalizada = matriz / np.tile(indices, dias // 7)
+    desestacionalizada[~np.isfinite(desestacionalizada)] = np.nan
+
+    nivel = promedio[:, 0].copy()
+    for dia in range(dias):
+        observado = desestacionalizada[:, dia]
+        hay_dato = ~np.isnan(observado)
+        nivel[hay_dato] = alpha * observado[hay_dato] + (1 - alpha) * nivel[hay_dato]
+
+    pronostico = nivel[:, None] * indices
+    return _rellenar_con_promedio(pronostico, matriz)
+
+
+def pronosticar(historia: Iterable[dict], semana: str, metodo: str = METODO_MEDIA_MOVIL,
+                semanas_historia: int = 8, alpha: float = 0.3,
+                fecha_generacion: Optional[date] = None) -> List[ProyeccionInsumo]:
+    """
+    Calcula las proyecciones de la semana para todas las series tienda×categoría
+    presentes en el histórico (las semanas_historia semanas previas).
+    """
+    if metodo not in NOMBRES_METODO:
+        raise ValueError(f"Método desconocido: {metodo}")
+    fechas = fechas_de_semana(semana)
+    desde = fechas[0] - timedelta(weeks=semanas_historia)
+    series, metadatos, matriz = matriz_historia(historia, desde, semanas_historia * 7)
+    if not series:
+        return []
+
+    if metodo == METODO_MEDIA_MOVIL:
+        pronostico = media_movil_semanal(matriz)
+    else:
+        pronostico = suavizado_exponencial(matriz, alpha)
+
+    generada = fecha_generacion or date.today()
+    origen = origen_modelo(metodo)
+    cero = Decimal("0.00")
+    proyecciones = []
+    # Los valores ya están calculados; aquí solo se arman las filas
+    for i, serie in enumerate(series):
+        datos = metadatos[serie]
+        for dia, fecha in enumerate(fechas):
+            proyecciones.append(ProyeccionInsumo.model_construct(
+                fecha_proyeccion=fecha,
+                tienda_id=serie[0],
+                nombre_tienda=datos['nombre_tienda'],
+                categoria_insumo=serie[1],
+                unidad_medida=datos['unidad_medida'],
+                cantidad_estimada=Decimal(f"{pronostico[i, dia]:.2f}"),
+                semana=semana,
+                origen_modelo=origen,
+                fecha_generacion=generada,
+                estado_proyeccion=ESTADO_PENDIENTE,
+                cantidad_despachada=cero,
+                cantidad_consumida_real=cero,
+                diferencia_vs_real=cero,
+                usuario_ajuste="sistema",
+                fecha_confirmacion=generada,
+                observaciones="Generado automáticamente"
+            ))
+    return proyecciones
+
+
+def _una_categoria_por_fecha(proyecciones: List[ProyeccionInsumo]) -> Tuple[List[ProyeccionInsumo], List[str]]:
+    """
+    Sin CLAVE_CON_CATEGORIA la clave de la tabla es tienda_id + "<fecha>#<semana>",
+    así que dos categorías de una tienda en la misma fecha se sobrescribirían.
+    Deja la primera categoría de cada tienda y fecha (las series llegan
+    ordenadas) y devuelve un error por cada fila descartada.
+    """
+    if CLAVE_CON_CATEGORIA:
+        return proyecciones, []
+    primeras: Dict[Tuple[str, date], str] = {}
+    aceptadas, errores = [], []
+    for proyeccion in proyecciones:
+        categoria = primeras.setdefault((proyeccion.tienda_id, proyeccion.fecha_proyeccion),
+                                        proyeccion.categoria_insumo)
+        if categoria == proyeccion.categoria_insumo:
+            aceptadas.append(proyeccion)
+        else:
+            errores.append(
+                f"{proyeccion.tienda_id} {proyeccion.fecha_proyeccion.isoformat()} {proyeccion.categoria_insumo}: "
+                f"sobrescribiría la fila de {categoria} (la clave no incluye la categoría; "
+                f"active CLAVE_CON_CATEGORIA y ejecute migracion.py --clave-categoria)"
+            )
+    return aceptadas, errores
+
+
+def _escribir(proyecciones: List[ProyeccionInsumo]) -> List[str]:
+    """Escribe las proyecciones en lote; devuelve los errores de las filas que no se escribieron"""
+    proyecciones, errores = _una_categoria_por_fecha(proyecciones)
+    errores += [error for _, error in obtener_repositorio().crear_proyecciones_lote(proyecciones)
+                if error is not None]
+    return errores
+
+
+def generar_tienda(tienda_id: str, semana: str, metodo: str = METODO_MEDIA_MOVIL, semanas_historia: int = 8,
+                   alpha: float = 0.3, fecha_generacion: Optional[date] = None) -> dict:
+    """
+    Pronostica y escribe la semana de una sola tienda (un bloque de un trabajo
+    de generación); las series son independientes, así que cada tienda se
+    pronostica solo con su propio histórico
+    """
+    fechas = fechas_de_semana(semana)
+    historia = cargar_historia_tienda(tienda_id, fechas[0] - timedelta(weeks=semanas_historia), fechas[0])
+    proyecciones = pronosticar(historia, semana, metodo, semanas_historia, alpha, fecha_generacion)
+
+    errores = _escribir(proyecciones)
+    return {
+        'filas': len(proyecciones),
+        'exitosas': len(proyecciones) - len(errores),
+        'fallidas': len(errores),
+        'primer_error': errores[0] if errores else None,
+    }
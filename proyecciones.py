@@ -1,156 +1,678 @@
-from fastapi import APIRouter, HTTPException
-from typing import List
-from model import ProyeccionInsumo
-from dynamodb_service import DynamoDBService
-from datetime import date
-from decimal import Decimal
-
-router = APIRouter(
-    prefix="/proyecciones",
-    tags=["proyecciones"],
-    responses={404: {"description": "Proyección no encontrada"}},
-)
-
-
-@router.post("/registrar", response_model=ProyeccionInsumo, summary="Registrar proyección")
-def crear_proyeccion(proyeccion: ProyeccionInsumo):
-    """
-    Registra una nueva proyección de insumos en DynamoDB.
-    """
-    try:
-        return DynamoDBService.crear_proyeccion(proyeccion)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-
-@router.get("/listar", response_model=List[ProyeccionInsumo], summary="Listar todas las proyecciones")
-def listar_proyecciones():
-    """
-    Lista todas las proyecciones almacenadas en DynamoDB.
-    """
-    try:
-        proyecciones = DynamoDBService.listar_todas()
-        return proyecciones
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-
-@router.get("/listar/{tienda_id}", response_model=List[ProyeccionInsumo], summary="Obtener proyecciones por tienda")
-def obtener_por_tienda(tienda_id: str):
-    """
-    Obtiene todas las proyecciones de una tienda específica.
-    """
-    try:
-        resultado = DynamoDBService.obtener_por_tienda(tienda_id)
-        if not resultado:
-            raise HTTPException(status_code=404, detail="No se encontraron proyecciones para esa tienda")
-        return resultado
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-
-@router.get("/semana/{semana}", response_model=List[ProyeccionInsumo], summary="Obtener proyecciones por semana")
-def obtener_por_semana(semana: str):
-    """
-    Obtiene todas las proyecciones de una semana específica.
-    Ejemplo: semana = "2025-W41"
-    """
-    try:
-        resultado = DynamoDBService.obtener_por_semana(semana)
-        if not resultado:
-            raise HTTPException(status_code=404, detail="No se encontraron proyecciones para esa semana")
-        return resultado
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-
-@router.get("/categoria/{categoria}", response_model=List[ProyeccionInsumo], summary="Obtener proyecciones por categoría")
-def obtener_por_categoria(categoria: str):
-    """
-    Obtiene todas las proyecciones de una categoría específica.
-    Ejemplo: categoria = "crepas"
-    """
-    try:
-        resultado = DynamoDBService.obtener_por_categoria(categoria)
-        if not resultado:
-            raise HTTPException(status_code=404, detail="No se encontraron proyecciones para esa categoría")
-        return resultado
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-
-@router.delete("/eliminar/{tienda_id}/{semana}", summary="Eliminar proyecciones por tienda y semana")
-def eliminar_proyeccion(tienda_id: str, semana: str):
-    """
-    Elimina todas las proyecciones de una tienda en una semana específica.
-    """
-    try:
-        deleted_count = DynamoDBService.eliminar_por_tienda_y_semana(tienda_id, semana)
-        if deleted_count == 0:
-            raise HTTPException(status_code=404, detail="No se encontró la proyección para eliminar")
-        return {"mensaje": f"{deleted_count} proyección(es) eliminada(s)"}
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-
-@router.put("/actualizar", response_model=ProyeccionInsumo, summary="Actualizar proyección")
-def actualizar_proyeccion(proyeccion: ProyeccionInsumo):
-    """
-    Actualiza una proyección existente en DynamoDB.
-    """
-    try:
-        return DynamoDBService.actualizar_proyeccion(proyeccion)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-
-@router.post("/generar", response_model=List[ProyeccionInsumo], summary="Generar proyecciones automáticamente")
-def generar_proyecciones():
-    """
-    Genera proyecciones automáticamente para todas las tiendas y categorías.
-    Ejemplo de cómo integrar con el modelo de ML.
-    """
-    try:
-        # Aquí integrar consumo promedio o modelo de ML
-        tiendas = [
-            {"id": "T001", "nombre": "Salón Surco Central"}, 
-            {"id": "T002", "nombre": "Salón Miraflores"}
-        ]
-        categorias = ["crepas", "waffles"]
-        semana = "2025-W41"
-
-        nuevas = []
-        for tienda in tiendas:
-            for categoria in categorias:
-                proyeccion = ProyeccionInsumo(
-                    fecha_proyeccion=date.fromisoformat("2025-10-05"),
-                    tienda_id=tienda["id"],
-                    nombre_tienda=tienda["nombre"],
-                    categoria_insumo=categoria,
-                    unidad_medida="Base de crepe" if categoria == "crepas" else "Base de waffle",
-                    cantidad_estimada=Decimal("12.50"),
-                    semana=semana,
-                    origen_modelo="Promedio_Historico_v1",
-                    fecha_generacion=date.today(),
-                    estado_proyeccion="pendiente",
-                    cantidad_despachada=Decimal("11.00"),
-                    cantidad_consumida_real=Decimal("11.80"),
-                    diferencia_vs_real=Decimal("0.70"),
-                    usuario_ajuste="sistema_autajuste",
-                    fecha_confirmacion=date.fromisoformat("2025-10-06"),
-                    observaciones="Generado automáticamente"
-                )
-                DynamoDBService.crear_proyeccion(proyeccion)
-                nuevas.append(proyeccion)
-        
-        return nuevas
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+from fastapi import APIRouter, Body, Depends, File, HTTPException, Query, Request, UploadFile
+from fastapi.responses import Response, StreamingResponse
+import hashlib
+import io
+import time
+from itertools import chain
+from pydantic import ValidationError
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Union
+from model import (
+    ActualizacionProyeccion,
+    ClaveProyeccion,
+    ErrorImportacion,
+    EstadoTrabajo,
+    ProyeccionInsumo,
+    ProyeccionParcial,
+    ProyeccionVersionada,
+    PaginaProyecciones,
+    ReportePrecision,
+    RespuestaConsultaLote,
+    ResultadoRegistro,
+    ResumenImportacion,
+    ResumenRegistroLote,
+    ResumenSemanal,
+    SolicitudGeneracion,
+    TotalesResumen,
+)
+from dynamodb_service import (
+    DynamoDBService,
+    CAMPOS_RESUMEN,
+    DIMENSION_TOTAL,
+    PREFIJO_TIENDA,
+    PREFIJO_CATEGORIA,
+)
+from repositorio import (
+    obtener_repositorio,
+    CapacidadAgotada,
+    ConflictoVersion,
+    CRITERIO_TODAS,
+    CRITERIO_TIENDA,
+    CRITERIO_SEMANA,
+    CRITERIO_CATEGORIA,
+    CRITERIO_TIENDA_FECHAS,
+    CRITERIO_TIENDA_SEMANA,
+    CRITERIO_SEMANA_CATEGORIA,
+    ValorCriterio,
+)
+from datetime import date, timedelta
+from decimal import Decimal
+
+# analitica, importacion, pronostico y trabajos (numpy) se importan en las
+# rutas que los usan: el arranque en frío de Lambda no los paga
+
+router = APIRouter(
+    prefix="/proyecciones",
+    tags=["proyecciones"],
+    responses={404: {"description": "Proyección no encontrada"}},
+)
+
+RespuestaListado = Union[List[ProyeccionInsumo], List[ProyeccionParcial], PaginaProyecciones]
+
+# Claves admitidas por consulta en /obtener-lote
+MAX_CLAVES_CONSULTA = 5000
+
+# Segundos que se sugieren al cliente (Retry-After) cuando la tabla no tiene capacidad
+REINTENTAR_TRAS_SEGUNDOS = 1
+
+
+def _error_servidor(e: Exception) -> HTTPException:
+    """503 con Retry-After si la tabla rechazó la escritura por capacidad; 500 en otro caso"""
+    if isinstance(e, CapacidadAgotada):
+        return HTTPException(status_code=503, detail=str(e),
+                             headers={"Retry-After": str(REINTENTAR_TRAS_SEGUNDOS)})
+    return HTTPException(status_code=500, detail=str(e))
+
+
+class ParametrosListado:
+    """Parámetros comunes de paginación y formato de los endpoints de listado"""
+
+    def __init__(
+        self,
+        limit: Optional[int] = Query(None, ge=1, le=1000, description="Tamaño de página; activa la paginación por cursor"),
+        cursor: Optional[str] = Query(None, description="Cursor devuelto por la página anterior"),
+        formato: str = Query("json", pattern="^(json|ndjson)$", description="ndjson transmite las filas página a página"),
+        fields: Optional[str] = Query(
+            None,
+            description="Campos a devolver separados por coma, p. ej. tienda_id,categoria_insumo,fecha_proyeccion,cantidad_estimada",
+        ),
+    ):
+        self.limit = limit
+        self.cursor = cursor
+        self.formato = formato
+        try:
+            self.campos = DynamoDBService.validar_campos(fields.split(",") if fields is not None else None)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+
+def _ndjson(paginas: Iterator[List[dict]], campos: Optional[Sequence[str]]) -> Iterator[bytes]:
+    """Serializa las páginas como NDJSON, una línea por proyección"""
+    for pagina in paginas:
+        if pagina:
+            yield DynamoDBService.codificar_ndjson(pagina, campos)
+
+
+def _respuesta_json(contenido: bytes) -> Response:
+    """
+    Respuesta con JSON ya serializado por el codec del servicio; evita que
+    FastAPI vuelva a validar y serializar cada fila con response_model.
+    """
+    return Response(content=contenido, media_type="application/json")
+
+
+def _etag(request: Request, version: int) -> str:
+    """
+    ETag débil de una respuesta: la versión de los datos más la ruta y los
+    parámetros, que cambian la representación (campos, formato, página...)
+    """
+    peticion = f"{request.url.path}?{request.url.query}".encode('utf-8')
+    return f'W/"{version}-{hashlib.blake2b(peticion, digest_size=8).hexdigest()}"'
+
+
+def _coincide(if_none_match: Optional[str], etag: str) -> bool:
+    """Comparación débil de If-None-Match (lista de ETags o *) con el ETag actual"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaco = etag.removeprefix("W/")
+    return any(candidato.strip().removeprefix("W/") == opaco for candidato in if_none_match.split(","))
+
+
+def _condicional(request: Request, version: Optional[int], responder: Callable[[], Response]) -> Response:
+    """
+    GET condicional: si el cliente ya tiene la versión actual responde 304 sin
+    consultar la tabla; si no, añade el ETag a la respuesta de responder().
+    La versión se lee antes que los datos: una escritura intermedia deja datos
+    nuevos con el ETag anterior, y el cliente los vuelve a pedir (nunca al revés).
+    """
+    if version is None:
+        return responder()
+    cabeceras = {"ETag": _etag(request, version), "Cache-Control": "no-cache"}
+    if _coincide(request.headers.get("if-none-match"), cabeceras["ETag"]):
+        return Response(status_code=304, headers=cabeceras)
+    respuesta = responder()
+    respuesta.headers.update(cabeceras)
+    return respuesta
+
+
+def _listado(criterio: str, valor: ValorCriterio, listado: ParametrosListado,
+             mensaje_404: Optional[str]) -> Response:
+    """Listado completo serializado directamente desde los items de DynamoDB"""
+    items = obtener_repositorio().listar_items(criterio, valor, listado.campos)
+    if not items and mensaje_404:
+        raise HTTPException(status_code=404, detail=mensaje_404)
+    return _respuesta_json(DynamoDBService.codificar_json(items, listado.campos))
+
+
+def _listado_alternativo(criterio: str, valor: ValorCriterio, listado: ParametrosListado):
+    """
+    Atiende los modos paginado (limit/cursor) y streaming (formato=ndjson) de los listados.
+    Devuelve None cuando se pide el listado completo tradicional.
+    """
+    try:
+        if listado.formato == "ndjson":
+            paginas = obtener_repositorio().iterar_paginas(criterio, valor, listado.cursor, listado.campos)
+            # Se lee la primera página antes de responder para que los errores
+            # iniciales lleguen como 400/500 y no como un stream cortado
+            primera = next(paginas, [])
+            return StreamingResponse(_ndjson(chain([primera], paginas), listado.campos),
+                                     media_type="application/x-ndjson")
+        if listado.limit is not None or listado.cursor is not None:
+            items, siguiente_cursor = obtener_repositorio().listar_pagina(
+                criterio, valor, listado.limit, listado.cursor, listado.campos
+            )
+            return _respuesta_json(DynamoDBService.codificar_pagina(items, siguiente_cursor, listado.campos))
+        return None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/registrar", response_model=ProyeccionInsumo, summary="Registrar proyección")
+def crear_proyeccion(proyeccion: ProyeccionInsumo):
+    """
+    Registra una nueva proyección de insumos en DynamoDB.
+    """
+    try:
+        return obtener_repositorio().crear_proyeccion(proyeccion)
+    except Exception as e:
+        raise _error_servidor(e)
+
+
+@router.post("/registrar-lote", response_model=ResumenRegistroLote, summary="Registrar proyecciones en lote")
+def crear_proyecciones_lote(filas: List[Dict[str, Any]] = Body(...)):
+    """
+    Registra varias proyecciones usando BatchWriteItem en bloques de 25.
+    Cada fila se valida por separado; la respuesta indica el resultado de cada una.
+    """
+    try:
+        resultados = {}
+        validas = []
+        for indice, fila in enumerate(filas):
+            try:
+                validas.append((indice, ProyeccionInsumo.model_validate(fila)))
+            except ValidationError as e:
+                errores = "; ".join(
+                    f"{'.'.join(str(parte) for parte in error['loc'])}: {error['msg']}" for error in e.errors()
+                )
+                resultados[indice] = ResultadoRegistro(
+                    indice=indice,
+                    tienda_id=fila.get("tienda_id") if isinstance(fila.get("tienda_id"), str) else None,
+                    exito=False,
+                    error=errores
+                )
+
+        escritura = obtener_repositorio().crear_proyecciones_lote(proyeccion for _, proyeccion in validas)
+        for posicion, error in escritura:
+            indice, proyeccion = validas[posicion]
+            resultados[indice] = ResultadoRegistro(
+                indice=indice,
+                tienda_id=proyeccion.tienda_id,
+                fecha_proyeccion=proyeccion.fecha_proyeccion,
+                exito=error is None,
+                error=error
+            )
+
+        ordenados = [resultados[indice] for indice in range(len(filas))]
+        exitosas = sum(1 for resultado in ordenados if resultado.exito)
+        return ResumenRegistroLote(
+            total=len(ordenados),
+            exitosas=exitosas,
+            fallidas=len(ordenados) - exitosas,
+            resultados=ordenados
+        )
+    except Exception as e:
+        raise _error_servidor(e)
+
+
+@router.post("/importar", response_model=ResumenImportacion, summary="Importar proyecciones desde un archivo")
+def importar_proyecciones(
+    archivo: UploadFile = File(..., description="Archivo CSV (con cabecera) o NDJSON, una proyección por fila"),
+    formato: Optional[str] = Query(None, pattern="^(csv|ndjson)$",
+                                   description="Formato del archivo; por defecto se deduce de la extensión"),
+    desde_fila: int = Query(0, ge=0, description="Reanuda después de esta fila (fila_confirmada de un intento previo)"),
+    wcu: Optional[float] = Query(None, gt=0,
+                                 description="Filas por segundo, por debajo de la capacidad de escritura de la tabla"),
+):
+    """
+    Importa un archivo leyéndolo fila a fila: valida en bloques contra
+    ProyeccionInsumo y escribe con BatchWriteItem limitando el ritmo a la
+    capacidad de escritura de la tabla. Si la importación se corta, se puede
+    reenviar el archivo con desde_fila para no reescribir filas ya resueltas.
+    """
+    import importacion
+
+    try:
+        formato = formato or importacion.formato_de_archivo(archivo.filename or "")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        inicio = time.perf_counter()
+        texto = io.TextIOWrapper(archivo.file, encoding="utf-8-sig", newline="")
+        estado = importacion.importar(texto, formato, desde_fila, wcu, max_errores=100)
+        return ResumenImportacion(
+            leidas=estado.leidas,
+            exitosas=estado.exitosas,
+            fallidas=estado.fallidas,
+            fila_confirmada=estado.fila_confirmada,
+            errores=[ErrorImportacion(fila=fila, error=error) for fila, error in estado.errores],
+            segundos=round(time.perf_counter() - inicio, 3)
+        )
+    except Exception as e:
+        raise _error_servidor(e)
+
+
+@router.post("/obtener-lote", response_model=RespuestaConsultaLote, summary="Obtener proyecciones por clave")
+def obtener_por_claves(
+    claves: List[ClaveProyeccion] = Body(..., max_length=MAX_CLAVES_CONSULTA),
+    fields: Optional[str] = Query(None, description="Campos a devolver separados por coma"),
+):
+    """
+    Lee proyecciones concretas por su clave (tienda_id, fecha_proyeccion,
+    semana y, con CLAVE_CON_CATEGORIA, categoria_insumo) con BatchGetItem en bloques de 100, sin recorrer particiones.
+    Los resultados vuelven en el orden de las claves; las que no existen se
+    marcan con encontrada=false.
+    """
+    try:
+        campos = DynamoDBService.validar_campos(fields.split(",") if fields is not None else None)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        items = obtener_repositorio().obtener_por_claves(
+            [(clave.tienda_id, clave.fecha_proyeccion.isoformat(), clave.semana, clave.categoria_insumo)
+             for clave in claves],
+            campos
+        )
+        return _respuesta_json(DynamoDBService.codificar_consulta(items, campos))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise _error_servidor(e)
+
+
+@router.get("/listar", response_model=RespuestaListado, summary="Listar todas las proyecciones")
+def listar_proyecciones(listado: ParametrosListado = Depends()):
+    """
+    Lista todas las proyecciones almacenadas en DynamoDB.
+    """
+    try:
+        alternativo = _listado_alternativo(CRITERIO_TODAS, None, listado)
+        if alternativo is not None:
+            return alternativo
+
+        return _listado(CRITERIO_TODAS, None, listado, None)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise _error_servidor(e)
+
+
+@router.get("/listar/{tienda_id}", response_model=RespuestaListado, summary="Obtener proyecciones por tienda")
+def obtener_por_tienda(tienda_id: str, request: Request, listado: ParametrosListado = Depends()):
+    """
+    Obtiene todas las proyecciones de una tienda específica.
+    Admite GET condicional (ETag / If-None-Match) con la versión de la tienda.
+    """
+    try:
+        return _condicional(request, obtener_repositorio().version_tienda(tienda_id), lambda: (
+            _listado_alternativo(CRITERIO_TIENDA, tienda_id, listado)
+            or _listado(CRITERIO_TIENDA, tienda_id, listado, "No se encontraron proyecciones para esa tienda")
+        ))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise _error_servidor(e)
+
+
+@router.get("/listar/{tienda_id}/rango", response_model=RespuestaListado,
+            summary="Obtener proyecciones de una tienda entre dos fechas")
+def obtener_por_tienda_y_fechas(
+    tienda_id: str,
+    request: Request,
+    desde: date = Query(..., description="Primera fecha de proyección (incluida)"),
+    hasta: date = Query(..., description="Última fecha de proyección (incluida)"),
+    listado: ParametrosListado = Depends(),
+):
+    """
+    Obtiene las proyecciones de una tienda entre dos fechas, leyendo solo ese
+    tramo de la partición (condición between sobre la clave de ordenación).
+    Admite GET condicional con la versión de la tienda.
+    """
+    if desde > hasta:
+        raise HTTPException(status_code=400, detail="desde debe ser anterior o igual a hasta")
+    valor = (tienda_id, desde.isoformat(), hasta.isoformat())
+    try:
+        return _condicional(request, obtener_repositorio().version_tienda(tienda_id), lambda: (
+            _listado_alternativo(CRITERIO_TIENDA_FECHAS, valor, listado)
+            or _listado(CRITERIO_TIENDA_FECHAS, valor, listado,
+                        "No se encontraron proyecciones para esa tienda en esas fechas")
+        ))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise _error_servidor(e)
+
+
+@router.get("/listar/{tienda_id}/semana/{semana}", response_model=RespuestaListado,
+            summary="Obtener proyecciones de una tienda en una semana")
+def obtener_por_tienda_y_semana(tienda_id: str, semana: str, request: Request,
+                                listado: ParametrosListado = Depends()):
+    """
+    Obtiene las proyecciones de una tienda en una semana usando tienda-semana-index
+    (que solo proyecta la categoría y las cantidades; el resto de los campos
+    se lee por clave con BatchGetItem). Admite GET condicional con la versión
+    de la tienda.
+    """
+    valor = (tienda_id, semana)
+    try:
+        return _condicional(request, obtener_repositorio().version_tienda(tienda_id), lambda: (
+            _listado_alternativo(CRITERIO_TIENDA_SEMANA, valor, listado)
+            or _listado(CRITERIO_TIENDA_SEMANA, valor, listado,
+                        "No se encontraron proyecciones para esa tienda en esa semana")
+        ))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise _error_servidor(e)
+
+
+@router.get("/semana/{semana}", response_model=RespuestaListado, summary="Obtener proyecciones por semana")
+def obtener_por_semana(semana: str, request: Request, listado: ParametrosListado = Depends()):
+    """
+    Obtiene todas las proyecciones de una semana específica.
+    Ejemplo: semana = "2025-W41"
+    Admite GET condicional (ETag / If-None-Match) con la versión de la semana.
+    """
+    try:
+        return _condicional(request, obtener_repositorio().version_semana(semana), lambda: (
+            _listado_alternativo(CRITERIO_SEMANA, semana, listado)
+            or _listado(CRITERIO_SEMANA, semana, listado, "No se encontraron proyecciones para esa semana")
+        ))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise _error_servidor(e)
+
+
+@router.get("/semana/{semana}/desviaciones", response_model=Union[List[ProyeccionInsumo], List[ProyeccionParcial]],
+            summary="Proyecciones de una semana con desviación alta")
+def obtener_desviaciones(
+    semana: str,
+    request: Request,
+    minima: Decimal = Query(..., ge=0, description="Desviación mínima |diferencia_vs_real| (exclusiva)"),
+    fields: Optional[str] = Query(None, description="Campos a devolver separados por coma"),
+):
+    """
+    Devuelve las proyecciones de la semana cuya diferencia entre lo estimado
+    y lo real supera, en valor absoluto, la desviación mínima. El filtro se
+    evalúa en DynamoDB, así que solo viajan las filas que lo cumplen.
+    Admite GET condicional con la versión de la semana.
+    """
+    try:
+        campos = DynamoDBService.validar_campos(fields.split(",") if fields is not None else None)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        return _condicional(request, obtener_repositorio().version_semana(semana), lambda: _respuesta_json(
+            DynamoDBService.codificar_json(obtener_repositorio().listar_desviaciones(semana, minima, campos), campos)
+        ))
+    except Exception as e:
+        raise _error_servidor(e)
+
+
+@router.get("/semana/{semana}/categoria/{categoria}", response_model=RespuestaListado,
+            summary="Obtener proyecciones de una categoría en una semana")
+def obtener_por_semana_y_categoria(semana: str, categoria: str, request: Request,
+                                   listado: ParametrosListado = Depends()):
+    """
+    Obtiene las proyecciones de una categoría en una semana usando semana-categoria-index.
+    Ejemplo: semana = "2025-W41", categoria = "crepas"
+    Admite GET condicional con la versión de la semana.
+    """
+    valor = (semana, categoria)
+    try:
+        return _condicional(request, obtener_repositorio().version_semana(semana), lambda: (
+            _listado_alternativo(CRITERIO_SEMANA_CATEGORIA, valor, listado)
+            or _listado(CRITERIO_SEMANA_CATEGORIA, valor, listado,
+                        "No se encontraron proyecciones para esa categoría en esa semana")
+        ))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise _error_servidor(e)
+
+
+@router.get("/categoria/{categoria}", response_model=RespuestaListado, summary="Obtener proyecciones por categoría")
+def obtener_por_categoria(categoria: str, listado: ParametrosListado = Depends()):
+    """
+    Obtiene todas las proyecciones de una categoría específica.
+    Ejemplo: categoria = "crepas"
+    """
+    try:
+        alternativo = _listado_alternativo(CRITERIO_CATEGORIA, categoria, listado)
+        if alternativo is not None:
+            return alternativo
+
+        return _listado(CRITERIO_CATEGORIA, categoria, listado, "No se encontraron proyecciones para esa categoría")
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise _error_servidor(e)
+
+
+@router.get("/analitica/precision", response_model=ReportePrecision, summary="Precisión de las proyecciones")
+def precision_proyecciones(
+    semana: Optional[str] = Query(None, description="Semana a analizar, p. ej. 2025-W41"),
+    tienda_id: Optional[str] = Query(None, description="Tienda a analizar"),
+    categoria: Optional[str] = Query(None, description="Categoría a analizar"),
+):
+    """
+    Calcula totales, MAPE, sesgo y sobre/sub-despacho de las proyecciones,
+    globales y por tienda, categoría y semana, para el subconjunto filtrado.
+    """
+    import analitica
+
+    try:
+        return analitica.reporte_precision(semana, tienda_id, categoria)
+    except Exception as e:
+        raise _error_servidor(e)
+
+
+def _totales(item: dict) -> TotalesResumen:
+    """Convierte un item de la tabla de resúmenes en TotalesResumen"""
+    return TotalesResumen(filas=int(item.get('filas', 0)),
+                          **{campo: item.get(campo, 0) for campo in CAMPOS_RESUMEN})
+
+
+def _resumen(semana: str, dimension: str) -> TotalesResumen:
+    try:
+        item = obtener_repositorio().obtener_resumen(semana, dimension)
+    except Exception as e:
+        raise _error_servidor(e)
+    if not item or not item.get('filas'):
+        raise HTTPException(status_code=404, detail="No hay proyecciones para este resumen")
+    return _totales(item)
+
+
+@router.get("/resumen/{semana}", response_model=ResumenSemanal, summary="Resumen semanal")
+def resumen_semanal(semana: str):
+    """
+    Devuelve los totales de la semana, por tienda y por categoría, leídos de
+    los resúmenes que se mantienen al escribir (una sola query).
+    """
+    try:
+        items = obtener_repositorio().listar_resumenes(semana)
+    except Exception as e:
+        raise _error_servidor(e)
+    resumen = ResumenSemanal(semana=semana, por_tienda={}, por_categoria={})
+    for item in items:
+        if not item.get('filas'):
+            continue
+        dimension = item['dimension']
+        if dimension == DIMENSION_TOTAL:
+            resumen.total = _totales(item)
+        elif dimension.startswith(PREFIJO_TIENDA):
+            resumen.por_tienda[dimension[len(PREFIJO_TIENDA):]] = _totales(item)
+        elif dimension.startswith(PREFIJO_CATEGORIA):
+            resumen.por_categoria[dimension[len(PREFIJO_CATEGORIA):]] = _totales(item)
+    return resumen
+
+
+@router.get("/resumen/{semana}/total", response_model=TotalesResumen, summary="Total semanal")
+def resumen_total(semana: str):
+    """Totales de la semana (un único GetItem)."""
+    return _resumen(semana, DIMENSION_TOTAL)
+
+
+@router.get("/resumen/{semana}/tienda/{tienda_id}", response_model=TotalesResumen,
+            summary="Total semanal de una tienda")
+def resumen_tienda(semana: str, tienda_id: str):
+    """Totales de una tienda en la semana (un único GetItem)."""
+    return _resumen(semana, f"{PREFIJO_TIENDA}{tienda_id}")
+
+
+@router.get("/resumen/{semana}/categoria/{categoria}", response_model=TotalesResumen,
+            summary="Total semanal de una categoría")
+def resumen_categoria(semana: str, categoria: str):
+    """Totales de una categoría en la semana (un único GetItem)."""
+    return _resumen(semana, f"{PREFIJO_CATEGORIA}{categoria}")
+
+
+@router.get("/cache/metricas", summary="Métricas de la cache de consultas")
+def metricas_cache():
+    """
+    Devuelve los contadores de aciertos, fallos, expiraciones y desalojos
+    de la cache de consultas por semana y categoría, y las consultas
+    agrupadas: peticiones concurrentes que esperaron la lectura de otra en
+    lugar de repetir la query.
+    """
+    return obtener_repositorio().metricas_cache()
+
+
+@router.delete("/eliminar/{tienda_id}/{semana}", summary="Eliminar proyecciones por tienda y semana")
+def eliminar_proyeccion(tienda_id: str, semana: str):
+    """
+    Elimina todas las proyecciones de una tienda en una semana específica.
+    """
+    try:
+        deleted_count = obtener_repositorio().eliminar_por_tienda_y_semana(tienda_id, semana)
+        if deleted_count == 0:
+            raise HTTPException(status_code=404, detail="No se encontró la proyección para eliminar")
+        return {"mensaje": f"{deleted_count} proyección(es) eliminada(s)"}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise _error_servidor(e)
+
+
+@router.put("/actualizar", response_model=ProyeccionInsumo, summary="Actualizar proyección")
+def actualizar_proyeccion(proyeccion: ProyeccionInsumo):
+    """
+    Actualiza una proyección existente en DynamoDB.
+    """
+    try:
+        return obtener_repositorio().actualizar_proyeccion(proyeccion)
+    except Exception as e:
+        raise _error_servidor(e)
+
+
+@router.patch("/actualizar/{tienda_id}/{fecha_proyeccion}/{semana}", response_model=ProyeccionVersionada,
+              summary="Actualizar campos de una proyección")
+def actualizar_parcial(
+    tienda_id: str,
+    fecha_proyeccion: date,
+    semana: str,
+    cambios: ActualizacionProyeccion,
+    categoria: Optional[str] = Query(None, description="Categoría del insumo; obligatoria con CLAVE_CON_CATEGORIA"),
+):
+    """
+    Actualiza solo los campos enviados (p. ej. cantidad_consumida_real al
+    cierre del día). diferencia_vs_real se recalcula en el servidor. Si se
+    envía version y la fila cambió desde entonces, responde 409.
+    """
+    valores = cambios.model_dump(exclude_unset=True)
+    version = valores.pop('version', None)
+    if not valores:
+        raise HTTPException(status_code=400, detail="Debe indicar al menos un campo a actualizar")
+    try:
+        proyeccion = obtener_repositorio().actualizar_parcial(tienda_id, fecha_proyeccion.isoformat(), semana,
+                                                        valores, version, categoria)
+    except ConflictoVersion as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise _error_servidor(e)
+    if proyeccion is None:
+        raise HTTPException(status_code=404, detail="No se encontró la proyección para actualizar")
+    return proyeccion
+
+
+@router.post("/generar", response_model=EstadoTrabajo, status_code=202,
+             summary="Generar proyecciones automáticamente")
+def generar_proyecciones(solicitud: Optional[SolicitudGeneracion] = Body(None)):
+    """
+    Genera las proyecciones de una semana para todas las series tienda×categoría
+    con historial de consumo real, usando media móvil semanal o suavizado
+    exponencial, y las escribe en lote. El modelo y su versión quedan en origen_modelo.
+    La generación corre en segundo plano (un bloque por tienda): la respuesta
+    trae el id del trabajo y su avance se consulta en GET /generar/{trabajo_id}.
+    """
+    import pronostico
+    import trabajos
+
+    solicitud = solicitud or SolicitudGeneracion()
+    try:
+        semana = solicitud.semana or pronostico.semana_iso(date.today() + timedelta(weeks=1))
+        return trabajos.crear(semana, solicitud.metodo, solicitud.semanas_historia, solicitud.alpha)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise _error_servidor(e)
+
+
+@router.get("/generar/{trabajo_id}", response_model=EstadoTrabajo, summary="Estado de un trabajo de generación")
+def estado_generacion(trabajo_id: str):
+    """
+    Devuelve el avance de un trabajo de generación: bloques completados,
+    fallidos y pendientes, filas escritas, ritmo y los bloques con error.
+    """
+    import trabajos
+
+    try:
+        situacion = trabajos.estado(trabajo_id)
+    except Exception as e:
+        raise _error_servidor(e)
+    if situacion is None:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado")
+    return situacion
+
+
+@router.post("/generar/{trabajo_id}/reintentar", response_model=EstadoTrabajo, status_code=202,
+             summary="Reintentar un trabajo de generación")
+def reintentar_generacion(trabajo_id: str):
+    """
+    Vuelve a lanzar un trabajo terminado (o abandonado) procesando solo los
+    bloques fallidos o pendientes; los completados no se repiten.
+    """
+    import trabajos
+
+    try:
+        situacion = trabajos.reintentar(trabajo_id)
+    except trabajos.ConflictoTrabajo as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        raise _error_servidor(e)
+    if situacion is None:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado")
+    return situacion
@@ -0,0 +1,171 @@
+"""
+Interfaz común de almacenamiento de proyecciones.
+
+Los routers, la analítica, el motor de pronóstico y la importación trabajan
+contra RepositorioProyecciones; el backend concreto (DynamoDB o memoria) se
+elige con BACKEND_ALMACENAMIENTO. Ambos backends intercambian las filas en
+el formato de item de DynamoDB (el que produce
+DynamoDBService._proyeccion_to_item), así los codecs de respuesta son los mismos.
+"""
+import threading
+from abc import ABC, abstractmethod
+from datetime import date
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+from model import ProyeccionInsumo, ProyeccionVersionada
+
+BACKEND_DYNAMODB = "dynamodb"
+BACKEND_MEMORIA = "memoria"
+
+# Criterios de listado (también forman parte de los cursores de paginación)
+CRITERIO_TODAS = 'todas'
+CRITERIO_TIENDA = 'tienda'
+CRITERIO_SEMANA = 'semana'
+CRITERIO_CATEGORIA = 'categoria'
+CRITERIO_TIENDA_FECHAS = 'tienda_fechas'        # valor: (tienda_id, desde, hasta)
+CRITERIO_TIENDA_SEMANA = 'tienda_semana'        # valor: (tienda_id, semana)
+CRITERIO_SEMANA_CATEGORIA = 'semana_categoria'  # valor: (semana, categoria_insumo)
+
+# Valor de un criterio de listado: un texto o, en los criterios compuestos, una tupla
+ValorCriterio = Union[str, Tuple[str, ...], None]
+
+
+class ConflictoVersion(Exception):
+    """La fila cambió desde la versión que el cliente leyó"""
+
+
+class CapacidadAgotada(Exception):
+    """El almacenamiento rechazó una escritura por capacidad tras agotar los reintentos"""
+
+
+class RepositorioProyecciones(ABC):
+    """Operaciones de almacenamiento que usan los endpoints y los procesos"""
+
+    @abstractmethod
+    def crear_proyeccion(self, proyeccion: ProyeccionInsumo) -> ProyeccionInsumo:
+        """Crea (o reemplaza) una proyección"""
+
+    @abstractmethod
+    def crear_proyecciones_lote(self, proyecciones: Iterable[ProyeccionInsumo]) -> Iterator[Tuple[int, Optional[str]]]:
+        """Escribe en lote; genera (posición, error) con error None si la fila se escribió"""
+
+    @abstractmethod
+    def actualizar_proyeccion(self, proyeccion: ProyeccionInsumo) -> ProyeccionInsumo:
+        """Reemplaza una proyección completa"""
+
+    @abstractmethod
+    def actualizar_parcial(self, tienda_id: str, fecha_proyeccion: str, semana: str, cambios: Dict[str, Any],
+                           version: Optional[int] = None,
+                           categoria: Optional[str] = None) -> Optional[ProyeccionVersionada]:
+        """
+        Actualiza solo los campos indicados, recalcula diferencia_vs_real y
+        lanza ConflictoVersion si la fila no está en version. None si no existe.
+        La categoría completa la clave con CLAVE_CON_CATEGORIA.
+        """
+
+    @abstractmethod
+    def eliminar_proyeccion(self, tienda_id: str, fecha_proyeccion: str, semana: str,
+                            categoria: Optional[str] = None) -> bool:
+        """Elimina una proyección; False si no existía"""
+
+    @abstractmethod
+    def eliminar_por_tienda_y_semana(self, tienda_id: str, semana: str) -> int:
+        """Elimina las proyecciones de una tienda en una semana y devuelve cuántas se eliminaron"""
+
+    @abstractmethod
+    def obtener_por_claves(self, claves: Sequence[Tuple[str, str, str, Optional[str]]],
+                           campos: Optional[Sequence[str]] = None) -> List[Optional[dict]]:
+        """Items de las claves (tienda_id, fecha_proyeccion, semana, categoria_insumo), en su orden; None si no existe"""
+
+    @abstractmethod
+    def listar_items(self, criterio: str, valor: ValorCriterio = None,
+                     campos: Optional[Sequence[str]] = None) -> List[dict]:
+        """Items completos de un listado (solo lectura)"""
+
+    @abstractmethod
+    def listar_pagina(self, criterio: str, valor: ValorCriterio = None, limit: Optional[int] = None,
+                      cursor: Optional[str] = None,
+                      campos: Optional[Sequence[str]] = None) -> Tuple[List[dict], Optional[str]]:
+        """Una página del listado y el cursor de la siguiente; ValueError si el cursor no es válido"""
+
+    @abstractmethod
+    def iterar_paginas(self, criterio: str, valor: ValorCriterio = None, cursor: Optional[str] = None,
+                       campos: Optional[Sequence[str]] = None) -> Iterator[List[dict]]:
+        """Genera el listado página a página"""
+
+    @abstractmethod
+    def listar_desviaciones(self, semana: str, minima: Decimal,
+                            campos: Optional[Sequence[str]] = None) -> List[dict]:
+        """Filas de la semana con |diferencia_vs_real| > minima"""
+
+    @abstractmethod
+    def listar_por_fechas(self, desde: date, hasta: date,
+                          campos: Optional[Sequence[str]] = None) -> List[dict]:
+        """Filas con fecha_proyeccion en [desde, hasta)"""
+
+    @abstractmethod
+    def obtener_resumen(self, semana: str, dimension: str) -> Optional[dict]:
+        """Resumen semanal de una dimensión ('total', 'tienda#<id>' o 'categoria#<nombre>')"""
+
+    @abstractmethod
+    def listar_resumenes(self, semana: str) -> List[dict]:
+        """Todos los resúmenes de una semana"""
+
+    @abstractmethod
+    def guardar_trabajo(self, trabajo: dict):
+        """Crea o reemplaza el registro de un trabajo de generación (con trabajo_id)"""
+
+    @abstractmethod
+    def guardar_bloque_trabajo(self, trabajo_id: str, bloque: dict):
+        """Crea o reemplaza el resultado de un bloque (una tienda, con tienda_id) de un trabajo"""
+
+    @abstractmethod
+    def leer_trabajo(self, trabajo_id: str) -> Optional[Tuple[dict, List[dict]]]:
+        """Registro de un trabajo y los resultados de sus bloques; None si no existe"""
+
+    def version_semana(self, semana: str) -> Optional[int]:
+        """
+        Marcador de versión de los datos de una semana: cambia con cada
+        escritura que la afecta. None si el backend no lleva versiones.
+        """
+        return None
+
+    def version_tienda(self, tienda_id: str) -> Optional[int]:
+        """Marcador de versión de los datos de una tienda (None si el backend no lleva versiones)"""
+        return None
+
+    def capacidad_escritura(self) -> Optional[float]:
+        """Filas por segundo que admite el almacenamiento; None si no hay límite"""
+        return None
+
+    def metricas_cache(self) -> Dict[str, int]:
+        """Contadores de la cache de consultas (vacío si el backend no usa cache)"""
+        return {}
+
+
+_repositorio: Optional[RepositorioProyecciones] = None
+_lock = threading.Lock()
+
+
+def crear_repositorio(backend: str) -> RepositorioProyecciones:
+    """Instancia el backend indicado; lanza ValueError si no existe"""
+    if backend == BACKEND_DYNAMODB:
+        from dynamodb_service import DynamoDBService
+        return DynamoDBService()
+    if backend == BACKEND_MEMORIA:
+        from memoria import RepositorioMemoria
+        return RepositorioMemoria()
+    raise ValueError(f"Backend de almacenamiento desconocido: {backend} "
+                     f"(opciones: {BACKEND_DYNAMODB}, {BACKEND_MEMORIA})")
+
+
+def obtener_repositorio() -> RepositorioProyecciones:
+    """Repositorio configurado en BACKEND_ALMACENAMIENTO, creado en el primer uso"""
+    global _repositorio
+    if _repositorio is None:
+        with _lock:
+            if _repositorio is None:
+                from config import BACKEND_ALMACENAMIENTO
+                _repositorio = crear_repositorio(BACKEND_ALMACENAMIENTO)
+    return _repositorio
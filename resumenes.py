@@ -0,0 +1,142 @@
+"""
+Reconstrucción y verificación de los resúmenes semanales.
+
+Los resúmenes (total, por tienda y por categoría de cada semana) se mantienen
+con UpdateItem ADD en cada escritura; este comando los recalcula desde la
+tabla de proyecciones para corregir cualquier desviación (por ejemplo, un
+ADD fallido o escrituras concurrentes de otro proceso durante una carga).
+
+Uso:
+    python resumenes.py --semana 2025-W41 --semana 2025-W42
+    python resumenes.py                      # todas las semanas (escaneo paralelo)
+    python resumenes.py --verificar          # solo informa las diferencias
+
+Las escrituras que lleguen mientras se reconstruye una semana pueden quedar
+sin reflejar; conviene ejecutarlo en una ventana sin cargas y repetir con
+--verificar.
+"""
+import argparse
+import sys
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from config import get_tabla_resumen
+from dynamodb_service import (
+    DynamoDBService,
+    DeltasResumen,
+    CAMPOS_RESUMEN,
+    CRITERIO_SEMANA,
+    CRITERIO_TODAS,
+    SEMANA_VERSIONES,
+)
+
+CAMPOS_LECTURA = ('tienda_id', 'semana', 'categoria_insumo') + CAMPOS_RESUMEN
+
+
+def calcular_resumenes(semanas: Optional[Iterable[str]] = None) -> Dict[Tuple[str, str], Dict[str, Decimal]]:
+    """
+    Recalcula los resúmenes desde las proyecciones: con semanas, una query a
+    semana-index por semana; sin ellas, un escaneo paralelo de la tabla
+    """
+    acumulado = DeltasResumen()
+    if semanas is None:
+        paginas = DynamoDBService.iterar_paginas(CRITERIO_TODAS, campos=CAMPOS_LECTURA)
+    else:
+        paginas = (pagina for semana in semanas
+                   for pagina in DynamoDBService.iterar_paginas(CRITERIO_SEMANA, semana, campos=CAMPOS_LECTURA))
+    for pagina in paginas:
+        for item in pagina:
+            acumulado.agregar(item)
+    return acumulado.resumenes()
+
+
+def resumenes_guardados(semanas: Iterable[str]) -> Dict[Tuple[str, str], Dict[str, Decimal]]:
+    """Lee los resúmenes almacenados de las semanas indicadas"""
+    guardados = {}
+    for semana in semanas:
+        for item in DynamoDBService.listar_resumenes(semana):
+            guardados[(semana, item['dimension'])] = {
+                campo: Decimal(item.get(campo, 0)) for campo in ('filas',) + CAMPOS_RESUMEN
+            }
+    return guardados
+
+
+def semanas_guardadas() -> List[str]:
+    """
+    Semanas que tienen algún resumen almacenado (escaneo de solo claves).
+    La partición de marcadores de versión no es una semana y no se toca.
+    """
+    semanas = set()
+    parametros = {'ProjectionExpression': 'semana'}
+    for response in DynamoDBService._paginas(get_tabla_resumen().scan, **parametros):
+        semanas.update(item['semana'] for item in response.get('Items', []))
+    semanas.discard(SEMANA_VERSIONES)
+    return sorted(semanas)
+
+
+def diferencias(calculados: Dict[Tuple[str, str], Dict[str, Decimal]],
+                guardados: Dict[Tuple[str, str], Dict[str, Decimal]]) -> List[Tuple[str, str, str]]:
+    """Lista (semana, dimension, descripción) de los resúmenes que no cuadran"""
+    resultado = []
+    for clave in sorted(set(calculados) | set(guardados)):
+        esperado = calculados.get(clave)
+        actual = guardados.get(clave)
+        if esperado is None:
+            if any(actual.values()):
+                resultado.append((*clave, "sobra (no hay proyecciones)"))
+        elif actual is None:
+            resultado.append((*clave, "falta"))
+        else:
+            distintos = [campo for campo in ('filas',) + CAMPOS_RESUMEN
+                         if esperado.get(campo, 0) != actual.get(campo, 0)]
+            if distintos:
+                resultado.append((*clave, "difiere en " + ", ".join(distintos)))
+    return resultado
+
+
+def reconstruir(calculados: Dict[Tuple[str, str], Dict[str, Decimal]],
+                guardados: Dict[Tuple[str, str], Dict[str, Decimal]]) -> Tuple[int, int]:
+    """
+    Sobrescribe los resúmenes con los valores calculados y elimina los que
+    ya no tienen proyecciones. Devuelve (escritos, eliminados).
+    """
+    escritos = eliminados = 0
+    with get_tabla_resumen().batch_writer(overwrite_by_pkeys=['semana', 'dimension']) as lote:
+        for (semana, dimension), valores in calculados.items():
+            lote.put_item(Item={'semana': semana, 'dimension': dimension,
+                                **{campo: valores.get(campo, Decimal(0)) for campo in ('filas',) + CAMPOS_RESUMEN}})
+            escritos += 1
+        for semana, dimension in set(guardados) - set(calculados):
+            lote.delete_item(Key={'semana': semana, 'dimension': dimension})
+            eliminados += 1
+    return escritos, eliminados
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconstruye o verifica los resúmenes semanales")
+    parser.add_argument("--semana", action="append", dest="semanas",
+                        help="Semana a procesar (repetible); por defecto todas")
+    parser.add_argument("--verificar", action="store_true",
+                        help="Solo informa las diferencias, sin escribir")
+    args = parser.parse_args()
+
+    calculados = calcular_resumenes(args.semanas)
+    semanas = args.semanas
+    if semanas is None:
+        semanas = sorted({semana for semana, _ in calculados} | set(semanas_guardadas()))
+    guardados = resumenes_guardados(semanas)
+
+    pendientes = diferencias(calculados, guardados)
+    for semana, dimension, descripcion in pendientes:
+        print(f"{semana} {dimension}: {descripcion}")
+    print(f"{len(pendientes)} resumen(es) con diferencias en {len(semanas)} semana(s)")
+
+    if args.verificar:
+        sys.exit(1 if pendientes else 0)
+    if pendientes:
+        escritos, eliminados = reconstruir(calculados, guardados)
+        print(f"{escritos} resumen(es) reescritos, {eliminados} eliminado(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+import os
+import sys
+
+# Credenciales ficticias y sin límite de escritura antes de importar config
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+os.environ["ESCRITURA_WCU"] = "0"
+os.environ["TRABAJOS_MODO"] = "hilo"
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from fastapi.testclient import TestClient
+from moto import mock_aws
+
+import config
+import dynamodb_service
+import repositorio
+from cache import CacheTTL
+from memoria import RepositorioMemoria
+
+
+@pytest.fixture
+def aws(monkeypatch):
+    """Tablas de DynamoDB simuladas con moto, nuevas en cada prueba"""
+    with mock_aws():
+        for recurso in ('_dynamodb', '_table', '_tabla_resumen', '_tabla_trabajos'):
+            monkeypatch.setattr(config, recurso, None)
+        monkeypatch.setattr(dynamodb_service, '_limitadores', {})
+        monkeypatch.setattr(dynamodb_service, 'cache_consultas',
+                            CacheTTL(config.CACHE_MAX_ENTRADAS, config.CACHE_TTL_SEGUNDOS))
+        monkeypatch.setattr(repositorio, '_repositorio', None)
+        config.create_table_if_not_exists()
+        yield config.get_table()
+
+
+@pytest.fixture
+def operaciones(aws):
+    """Operaciones de DynamoDB enviadas durante la prueba, como pares (nombre, parámetros)"""
+    enviadas = []
+
+    def registrar(params, model, **kwargs):
+        enviadas.append((model.name, params))
+
+    eventos = config.get_dynamodb().meta.client.meta.events
+    eventos.register('before-parameter-build.dynamodb', registrar)
+    yield enviadas
+    eventos.unregister('before-parameter-build.dynamodb', registrar)
+
+
+@pytest.fixture
+def memoria(monkeypatch):
+    """Backend en memoria como repositorio configurado"""
+    repo = RepositorioMemoria()
+    monkeypatch.setattr(repositorio, '_repositorio', repo)
+    return repo
+
+
+@pytest.fixture
+def clave_con_categoria(monkeypatch):
+    """Activa CLAVE_CON_CATEGORIA en los módulos que la importan"""
+    import memoria as modulo_memoria
+    import migracion
+    import pronostico
+
+    for modulo in (config, dynamodb_service, modulo_memoria, migracion, pronostico):
+        monkeypatch.setattr(modulo, 'CLAVE_CON_CATEGORIA', True)
+
+
+@pytest.fixture
+def app():
+    import main
+    return main.crear_app()
+
+
+@pytest.fixture
+def cliente(aws, app):
+    return TestClient(app)
+
+
+@pytest.fixture
+def cliente_memoria(memoria, app):
+    return TestClient(app)
+
+
+@pytest.fixture(params=['dynamodb', 'memoria'])
+def cliente_backend(request):
+    """Cliente de la API con cada backend: DynamoDB (moto) y en memoria"""
+    return request.getfixturevalue('cliente' if request.param == 'dynamodb' else 'cliente_memoria')
+
+
+@pytest.fixture
+def fila():
+    """Construye el JSON de una proyección; los argumentos reemplazan campos"""
+    def construir(**campos):
+        datos = {
+            'fecha_proyeccion': "2025-10-06",
+            'tienda_id': "T001",
+            'nombre_tienda': "Tienda Centro",
+            'categoria_insumo': "crepas",
+            'unidad_medida': "unidades",
+            'cantidad_estimada': "12.50",
+            'semana': "2025-W41",
+            'origen_modelo': "MediaMovilSemanal_v2.0",
+            'fecha_generacion': "2025-10-01",
+            'estado_proyeccion': "pendiente",
+            'cantidad_despachada': "11.00",
+            'cantidad_consumida_real': "11.80",
+            'diferencia_vs_real': "0.70",
+            'usuario_ajuste': "sistema",
+            'fecha_confirmacion': "2025-10-06",
+            'observaciones': "Generado automáticamente",
+        }
+        datos.update(campos)
+        return datos
+    return construir
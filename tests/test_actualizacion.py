@@ -0,0 +1,109 @@
+from decimal import Decimal
+
+import pytest
+
+from model import ProyeccionInsumo
+
+URL = "/proyecciones/actualizar/T001/2025-10-06/2025-W41"
+
+
+@pytest.fixture
+def api(cliente_backend, fila):
+    cliente = cliente_backend
+    assert cliente.post("/proyecciones/registrar", json=fila()).status_code == 200
+    return cliente
+
+
+def test_actualiza_solo_los_campos_enviados(api):
+    respuesta = api.patch(URL, json={'cantidad_consumida_real': "10", 'observaciones': "cierre"})
+
+    assert respuesta.status_code == 200
+    proyeccion = respuesta.json()
+    assert Decimal(proyeccion['diferencia_vs_real']) == Decimal("2.5")
+    assert proyeccion['observaciones'] == "cierre" and proyeccion['nombre_tienda'] == "Tienda Centro"
+    assert proyeccion['version'] == 2
+    assert api.get("/proyecciones/listar/T001").json()[0]['cantidad_consumida_real'] in ("10", "10.00")
+
+
+def test_con_la_version_actual_se_aplica_y_con_una_vieja_responde_409(api):
+    assert api.patch(URL, json={'cantidad_estimada': "20", 'version': 1}).json()['version'] == 2
+
+    conflicto = api.patch(URL, json={'cantidad_estimada': "30", 'version': 1})
+
+    assert conflicto.status_code == 409
+    assert Decimal(api.get("/proyecciones/listar/T001").json()[0]['cantidad_estimada']) == 20
+
+
+def test_un_reemplazo_completo_invalida_las_versiones_leidas(api, fila):
+    assert api.put("/proyecciones/actualizar", json=fila(cantidad_estimada="50")).status_code == 200
+    assert api.patch(URL, json={'cantidad_estimada': "1", 'version': 1}).status_code == 409
+
+    assert api.patch(URL, json={'cantidad_estimada': "1", 'version': 2}).json()['version'] == 3
+
+
+def test_una_escritura_en_lote_tambien_cambia_la_version(api, fila):
+    from repositorio import obtener_repositorio
+
+    list(obtener_repositorio().crear_proyecciones_lote([ProyeccionInsumo(**fila(cantidad_estimada="7"))]))
+
+    assert api.patch(URL, json={'cantidad_estimada': "1", 'version': 1}).status_code == 409
+    assert api.patch(URL, json={'cantidad_estimada': "1", 'version': 2}).status_code == 200
+
+
+def test_un_patch_durante_una_carga_no_comparte_version_con_ella(cliente, fila, monkeypatch):
+    from dynamodb_service import DynamoDBService
+    from repositorio import obtener_repositorio
+
+    assert cliente.post("/proyecciones/registrar", json=fila()).status_code == 200
+    leer = DynamoDBService._leer_para_resumen
+    parches = []
+
+    def leer_y_parchear(claves):
+        anteriores = leer(claves)
+        parches.append(cliente.patch(URL, json={'cantidad_estimada': "20", 'version': 1}).json())
+        return anteriores
+
+    monkeypatch.setattr(DynamoDBService, '_leer_para_resumen', staticmethod(leer_y_parchear))
+    errores = list(obtener_repositorio().crear_proyecciones_lote([ProyeccionInsumo(**fila(cantidad_estimada="7"))]))
+
+    assert errores == [(0, None)] and parches[0]['version'] == 2
+    assert cliente.patch(URL, json={'cantidad_estimada': "1", 'version': 2}).status_code == 409
+    resumen = cliente.get("/proyecciones/resumen/2025-W41/total").json()
+    assert (resumen['filas'], Decimal(resumen['cantidad_estimada'])) == (1, 7)
+
+
+@pytest.mark.parametrize("cuerpo", [
+    {},
+    {'version': 1},
+])
+def test_sin_campos_responde_400(api, cuerpo):
+    assert api.patch(URL, json=cuerpo).status_code == 400
+
+
+@pytest.mark.parametrize("cuerpo", [
+    {'tienda_id': "T999"},
+    {'diferencia_vs_real': "1"},
+    {'cantidad_estimada': None},
+    {'estado_proyeccion': None},
+    {'cantidad_estimada': "abc"},
+    {'version': -1, 'observaciones': "x"},
+])
+def test_rechaza_campos_no_actualizables_o_nulos(api, cuerpo):
+    assert api.patch(URL, json=cuerpo).status_code == 422
+
+
+def test_observaciones_admite_null(api):
+    assert api.patch(URL, json={'observaciones': None}).json()['observaciones'] is None
+
+
+def test_una_fila_inexistente_responde_404(api):
+    assert api.patch("/proyecciones/actualizar/T404/2025-10-06/2025-W41",
+                     json={'cantidad_estimada': "1"}).status_code == 404
+    assert api.patch("/proyecciones/actualizar/T404/2025-10-06/2025-W41",
+                     json={'cantidad_estimada': "1", 'version': 1}).status_code == 404
+
+
+def test_el_resumen_refleja_la_actualizacion(api):
+    api.patch(URL, json={'cantidad_estimada': "20"})
+
+    assert Decimal(api.get("/proyecciones/resumen/2025-W41/total").json()['cantidad_estimada']) == 20
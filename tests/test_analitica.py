@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+
+import analitica
+
+
+def _columnas(filas):
+    nombres = ('tienda_id', 'categoria_insumo', 'semana', 'cantidad_estimada', 'cantidad_despachada',
+               'cantidad_consumida_real')
+    return {nombre: np.array([fila[i] for fila in filas], dtype=object if i < 3 else np.float64)
+            for i, nombre in enumerate(nombres)}
+
+
+FILAS = [
+    # tienda, categoría, semana, estimada, despachada, real
+    ("T1", "crepas", "W1", 10.0, 12.0, 8.0),
+    ("T1", "waffles", "W1", 20.0, 18.0, 25.0),
+    ("T2", "crepas", "W2", 5.0, 5.0, 0.0),
+    ("T2", "crepas", "W2", 4.0, 3.0, 0.0),
+]
+
+
+def _grupo(lista, nombre):
+    return next(metricas for metricas in lista if metricas['grupo'] == nombre)
+
+
+def test_calcula_mape_sesgo_y_despacho_por_grupo():
+    reporte = analitica.calcular_precision(_columnas(FILAS))
+
+    total = reporte['total']
+    assert total['filas'] == 4 and total['grupo'] == 'total'
+    assert total['mape'] == pytest.approx((2 / 8 + 5 / 25) / 2 * 100, abs=1e-4)
+    assert total['sesgo'] == pytest.approx((39 - 33) / 33 * 100, abs=1e-4)
+    assert total['sobre_despacho'] == pytest.approx(4 + 5 + 3)
+    assert total['sub_despacho'] == pytest.approx(7)
+
+    t1 = _grupo(reporte['por_tienda'], "T1")
+    assert (t1['total_estimada'], t1['total_despachada'], t1['total_consumida_real']) == (30.0, 30.0, 33.0)
+    assert [m['grupo'] for m in reporte['por_categoria']] == ["crepas", "waffles"]
+    assert _grupo(reporte['por_categoria'], "crepas")['filas'] == 3
+
+
+def test_grupos_sin_consumo_real_no_tienen_mape_ni_sesgo():
+    t2 = _grupo(analitica.calcular_precision(_columnas(FILAS))['por_tienda'], "T2")
+
+    assert t2['mape'] is None and t2['sesgo'] is None
+    assert t2['sobre_despacho'] == 8.0
+
+
+def test_sin_filas_el_reporte_queda_vacio():
+    reporte = analitica.calcular_precision(_columnas([]))
+
+    assert reporte == {'total': None, 'por_tienda': [], 'por_categoria': [], 'por_semana': []}
+
+
+@pytest.fixture
+def registradas(cliente, fila):
+    filas = [fila(tienda_id=tienda, categoria_insumo=categoria, semana=semana, fecha_proyeccion=fecha,
+                  cantidad_estimada=str(estimada), cantidad_despachada=str(despachada),
+                  cantidad_consumida_real=str(real))
+             for (tienda, categoria, semana, estimada, despachada, real), fecha
+             in zip(FILAS, ("2025-10-06", "2025-10-07", "2025-10-13", "2025-10-14"))]
+    assert cliente.post("/proyecciones/registrar-lote", json=filas).json()['exitosas'] == 4
+    return cliente
+
+
+def test_el_endpoint_coincide_con_el_calculo(registradas):
+    reporte = registradas.get("/proyecciones/analitica/precision").json()
+
+    esperado = analitica.calcular_precision(_columnas(FILAS))
+    assert reporte['total'] == pytest.approx(esperado['total'])
+    assert len(reporte['por_semana']) == 2
+
+
+def test_el_endpoint_combina_filtros(registradas):
+    reporte = registradas.get("/proyecciones/analitica/precision",
+                              params={'semana': "W1", 'categoria': "crepas"}).json()
+
+    assert reporte['total']['filas'] == 1
+    assert [m['grupo'] for m in reporte['por_tienda']] == ["T1"]
+    assert registradas.get("/proyecciones/analitica/precision",
+                           params={'tienda_id': "T9"}).json()['total'] is None
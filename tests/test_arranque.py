@@ -0,0 +1,94 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import config
+import main
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _en_proceso_nuevo(codigo: str):
+    salida = subprocess.run([sys.executable, "-c", codigo], capture_output=True, text=True, check=True, cwd=RAIZ)
+    return json.loads(salida.stdout.strip().splitlines()[-1])
+
+
+def test_importar_main_no_carga_boto3_ni_fastapi():
+    cargados = _en_proceso_nuevo(
+        "import json, sys; import main; "
+        "print(json.dumps([m for m in ('boto3', 'botocore', 'fastapi', 'mangum') if m in sys.modules]))"
+    )
+
+    assert cargados == []
+
+
+def test_la_primera_peticion_no_carga_numpy():
+    cargados = _en_proceso_nuevo(
+        "import json, sys; from fastapi.testclient import TestClient; import main; "
+        "estado = TestClient(main.app).get('/proyecciones/cache/metricas').status_code; "
+        "print(json.dumps([estado, 'numpy' in sys.modules]))"
+    )
+
+    assert cargados == [200, False]
+
+
+def test_el_log_por_peticion_sale_sin_configurar_logging():
+    salida = subprocess.run(
+        [sys.executable, "-c", "from fastapi.testclient import TestClient; import main; "
+                               "TestClient(main.app).get('/proyecciones/cache/metricas')"],
+        capture_output=True, text=True, check=True, cwd=RAIZ, env={**os.environ, "INSTRUMENTACION_ACTIVA": "true"}
+    )
+
+    assert '"ruta": "/proyecciones/cache/metricas"' in salida.stderr
+
+
+def test_importar_config_no_crea_recursos():
+    estado = _en_proceso_nuevo(
+        "import json, sys; import config; "
+        "print(json.dumps(['boto3' in sys.modules, config._dynamodb is None, config._table is None]))"
+    )
+
+    assert estado == [False, True, True]
+
+
+def test_los_recursos_se_crean_una_vez_y_se_reutilizan(aws):
+    assert config.get_dynamodb() is config.get_dynamodb()
+    assert config.get_table() is config.get_table()
+    assert config.get_table().name == config.DYNAMODB_TABLE_NAME
+
+
+def test_la_app_se_construye_en_el_primer_acceso(monkeypatch):
+    monkeypatch.setattr(main, '_app', None)
+
+    app = main.app
+
+    assert main.app is app
+    with pytest.raises(AttributeError):
+        main.no_existe
+
+
+def test_el_handler_despacha_los_eventos_de_trabajo(monkeypatch):
+    import trabajos
+
+    recibidos = []
+    monkeypatch.setattr(trabajos, 'ejecutar_evento', lambda evento, segundos: recibidos.append((evento, segundos)))
+
+    class Contexto:
+        def get_remaining_time_in_millis(self):
+            return 120000
+
+    main.handler({"trabajo_generacion": "abc"}, Contexto())
+
+    assert recibidos == [({"trabajo_generacion": "abc"}, 120.0)]
+
+
+def test_benchmark_de_arranque_en_frio_mide_una_invocacion():
+    from benchmarks import cold_start
+
+    medicion = cold_start.medir("/proyecciones/cache/metricas")
+
+    assert medicion['status'] == 200
+    assert medicion['importacion_ms'] > 0 and medicion['primera_respuesta_ms'] > medicion['segunda_respuesta_ms']
@@ -0,0 +1,41 @@
+import json
+import os
+import subprocess
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PEQUENO = ["--tiendas", "4", "--dias", "14", "--repeticiones", "3", "--filas-codec", "50"]
+
+
+def _benchmark(*argumentos):
+    return subprocess.run([sys.executable, os.path.join(RAIZ, "benchmarks", "endpoints.py"), *argumentos],
+                          capture_output=True, text=True, check=True, cwd=RAIZ).stdout
+
+
+def test_benchmark_en_memoria_mide_todos_los_endpoints(tmp_path):
+    salida = tmp_path / "memoria.json"
+
+    _benchmark("--backend", "memoria", *PEQUENO, "--salida", str(salida))
+
+    resultado = json.loads(salida.read_text())
+    assert resultado['parametros']['filas_iniciales'] == 56
+    assert {'registrar_lote', 'listar_tienda', 'semana_ndjson', 'resumen_total', 'eliminar'} <= set(resultado['endpoints'])
+    for medida in resultado['endpoints'].values():
+        assert medida['peticiones'] > 0 and medida['p50_ms'] <= medida['p95_ms'] <= medida['p99_ms']
+    assert set(resultado['codec']) == {'_proyeccion_to_item', '_item_to_proyeccion',
+                                       '_item_to_proyeccion_rapido', 'codificar_json'}
+    assert resultado['endpoints']['listar_tienda']['filas'] == 3 * 14
+
+
+def test_benchmark_con_moto_filtra_endpoints_y_compara(tmp_path):
+    base, actual = tmp_path / "base.json", tmp_path / "actual.json"
+    _benchmark("--backend", "memoria", *PEQUENO, "--solo", "listar_tienda,resumen_total", "--salida", str(base))
+
+    salida = _benchmark(*PEQUENO, "--solo", "listar_tienda,resumen_total", "--concurrencia", "2",
+                        "--salida", str(actual), "--comparar", str(base))
+
+    resultado = json.loads(actual.read_text())
+    assert resultado['parametros']['backend'] == "dynamodb"
+    assert set(resultado['endpoints']) == {'listar_tienda', 'resumen_total'}
+    assert "Comparación con" in salida and "listar_tienda" in salida.split("Comparación con")[1]
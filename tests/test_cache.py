@@ -0,0 +1,247 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import cache
+from cache import CacheTTL
+
+
+class Reloj:
+    def __init__(self):
+        self.ahora = 1000.0
+
+    def __call__(self):
+        return self.ahora
+
+
+@pytest.fixture
+def reloj(monkeypatch):
+    reloj = Reloj()
+    monkeypatch.setattr(cache.time, 'monotonic', reloj)
+    return reloj
+
+
+def _cargador(valores):
+    llamadas = []
+
+    def cargar():
+        llamadas.append(1)
+        return valores[len(llamadas) - 1]
+    return cargar, llamadas
+
+
+def test_devuelve_el_valor_guardado_hasta_que_expira(reloj):
+    memoria = CacheTTL(10, 60)
+    cargar, llamadas = _cargador(["a", "b"])
+
+    assert memoria.obtener_o_cargar('k', cargar) == "a"
+    reloj.ahora += 59
+    assert memoria.obtener_o_cargar('k', cargar) == "a"
+    reloj.ahora += 2
+    assert memoria.obtener_o_cargar('k', cargar) == "b"
+
+    assert len(llamadas) == 2
+    metricas = memoria.metricas()
+    assert (metricas['aciertos'], metricas['fallos'], metricas['expiradas']) == (1, 2, 1)
+
+
+def test_desaloja_la_entrada_usada_hace_mas_tiempo(reloj):
+    memoria = CacheTTL(2, 60)
+    memoria.obtener_o_cargar('a', lambda: 1)
+    memoria.obtener_o_cargar('b', lambda: 2)
+    memoria.obtener_o_cargar('a', lambda: 0)
+
+    memoria.obtener_o_cargar('c', lambda: 3)
+
+    assert memoria.obtener_o_cargar('a', lambda: 0) == 1
+    assert memoria.obtener_o_cargar('b', lambda: 20) == 20
+    assert memoria.metricas()['desalojos'] == 2
+
+
+def test_invalidar_fuerza_una_nueva_carga(reloj):
+    memoria = CacheTTL(10, 60)
+    for clave in (('semana', 'W1'), ('semana', 'W2'), ('categoria', 'crepas')):
+        memoria.obtener_o_cargar(clave, lambda: "viejo")
+
+    memoria.invalidar(('semana', 'W1'))
+    memoria.invalidar_si(lambda clave: clave[0] == 'categoria')
+
+    assert memoria.obtener_o_cargar(('semana', 'W1'), lambda: "nuevo") == "nuevo"
+    assert memoria.obtener_o_cargar(('semana', 'W2'), lambda: "nuevo") == "viejo"
+    assert memoria.obtener_o_cargar(('categoria', 'crepas'), lambda: "nuevo") == "nuevo"
+    assert memoria.metricas()['invalidaciones'] == 2
+
+
+def test_no_guarda_una_carga_invalidada_mientras_estaba_en_curso(reloj):
+    memoria = CacheTTL(10, 60)
+
+    def cargar_y_escribir():
+        memoria.invalidar('k')
+        return "anterior a la escritura"
+
+    assert memoria.obtener_o_cargar('k', cargar_y_escribir) == "anterior a la escritura"
+    assert memoria.obtener_o_cargar('k', lambda: "posterior") == "posterior"
+
+
+def test_no_conserva_estado_de_claves_sin_cargas_en_curso(reloj):
+    memoria = CacheTTL(2, 60)
+    for i in range(50):
+        memoria.obtener_o_cargar(i, lambda: i)
+        memoria.invalidar(i)
+
+    def falla():
+        raise RuntimeError("sin datos")
+    with pytest.raises(RuntimeError):
+        memoria.obtener_o_cargar('error', falla)
+
+    assert memoria._generaciones == {} and memoria._cargas == {} and memoria._en_curso == {}
+
+
+def test_sin_entradas_no_guarda_nada(reloj):
+    memoria = CacheTTL(0, 60)
+    cargar, llamadas = _cargador([1, 2])
+
+    memoria.obtener_o_cargar('k', cargar)
+    memoria.obtener_o_cargar('k', cargar)
+
+    assert len(llamadas) == 2 and memoria.metricas()['entradas'] == 0
+
+
+def _consultas(operaciones):
+    return sum(1 for nombre, params in operaciones if nombre == 'Query' and params.get('IndexName'))
+
+
+def test_las_consultas_por_semana_se_sirven_de_la_cache(cliente, fila, operaciones):
+    cliente.post("/proyecciones/registrar", json=fila())
+    operaciones.clear()
+
+    primera = cliente.get("/proyecciones/semana/2025-W41").json()
+    segunda = cliente.get("/proyecciones/semana/2025-W41").json()
+
+    assert primera == segunda and _consultas(operaciones) == 1
+    assert cliente.get("/proyecciones/cache/metricas").json()['aciertos'] == 1
+
+
+def test_las_escrituras_invalidan_las_consultas_afectadas(cliente, fila):
+    cliente.post("/proyecciones/registrar", json=fila())
+    assert len(cliente.get("/proyecciones/semana/2025-W41").json()) == 1
+    assert len(cliente.get("/proyecciones/categoria/crepas").json()) == 1
+
+    cliente.post("/proyecciones/registrar", json=fila(tienda_id="T002"))
+    assert len(cliente.get("/proyecciones/semana/2025-W41").json()) == 2
+
+    cliente.put("/proyecciones/actualizar", json=fila(tienda_id="T002", categoria_insumo="waffles"))
+    assert len(cliente.get("/proyecciones/categoria/crepas").json()) == 1
+    assert len(cliente.get("/proyecciones/categoria/waffles").json()) == 1
+
+    cliente.post("/proyecciones/registrar-lote", json=[fila(tienda_id="T003")])
+    assert len(cliente.get("/proyecciones/categoria/crepas").json()) == 2
+
+    cliente.delete("/proyecciones/eliminar/T001/2025-W41")
+    assert [p['tienda_id'] for p in cliente.get("/proyecciones/categoria/crepas").json()] == ["T003"]
+    assert len(cliente.get("/proyecciones/semana/2025-W41").json()) == 2
+
+
+def _esperar_hasta(condicion, segundos=5.0):
+    limite = time.monotonic() + segundos
+    while not condicion():
+        assert time.monotonic() < limite, "la condición no se cumplió a tiempo"
+        time.sleep(0.005)
+
+
+def _en_hilos(n, funcion):
+    hilos = [threading.Thread(target=funcion) for _ in range(n)]
+    for hilo in hilos:
+        hilo.start()
+    return hilos
+
+
+@pytest.mark.parametrize('max_entradas', [0, 10])
+def test_cargas_concurrentes_de_una_clave_se_agrupan(max_entradas):
+    memoria = CacheTTL(max_entradas, 60)
+    liberar = threading.Event()
+    cargas, resultados = [], []
+
+    def cargar():
+        cargas.append(1)
+        liberar.wait(5)
+        return [1, 2]
+
+    hilos = _en_hilos(20, lambda: resultados.append(memoria.obtener_o_cargar('k', cargar)))
+    _esperar_hasta(lambda: memoria.metricas()['agrupadas'] == 19)
+    en_curso = memoria.metricas()['en_curso']
+    liberar.set()
+    for hilo in hilos:
+        hilo.join()
+
+    assert len(cargas) == 1 and en_curso == 1
+    assert resultados == [[1, 2]] * 20
+    assert (memoria.metricas()['fallos'], memoria.metricas()['en_curso']) == (1, 0)
+
+
+def test_el_error_de_una_carga_llega_a_todos_los_que_esperan():
+    memoria = CacheTTL(10, 60)
+    liberar = threading.Event()
+    errores = []
+
+    def cargar():
+        liberar.wait(5)
+        raise RuntimeError("sin conexión")
+
+    def leer():
+        try:
+            memoria.obtener_o_cargar('k', cargar)
+        except RuntimeError as e:
+            errores.append(str(e))
+
+    hilos = _en_hilos(5, leer)
+    _esperar_hasta(lambda: memoria.metricas()['agrupadas'] == 4)
+    liberar.set()
+    for hilo in hilos:
+        hilo.join()
+
+    assert errores == ["sin conexión"] * 5
+    assert memoria.obtener_o_cargar('k', lambda: "recuperado") == "recuperado"
+
+
+def test_tras_invalidar_no_se_espera_a_la_carga_anterior():
+    memoria = CacheTTL(10, 60)
+    liberar = threading.Event()
+    cargas, resultados = [], {}
+
+    def cargar():
+        cargas.append(1)
+        numero = len(cargas)
+        liberar.wait(5)
+        return numero
+
+    anterior = threading.Thread(target=lambda: resultados.update(anterior=memoria.obtener_o_cargar('k', cargar)))
+    anterior.start()
+    _esperar_hasta(lambda: len(cargas) == 1)
+    memoria.invalidar('k')
+    posterior = threading.Thread(target=lambda: resultados.update(posterior=memoria.obtener_o_cargar('k', cargar)))
+    posterior.start()
+    _esperar_hasta(lambda: len(cargas) == 2)
+    liberar.set()
+    anterior.join()
+    posterior.join()
+
+    assert resultados == {'anterior': 1, 'posterior': 2}
+    assert memoria.obtener_o_cargar('k', lambda: 0) == 2
+
+
+def test_lecturas_concurrentes_de_la_api_consultan_una_vez(cliente, fila, operaciones):
+    for tienda in range(10):
+        cliente.post("/proyecciones/registrar", json=fila(tienda_id=f"T{tienda}"))
+    operaciones.clear()
+
+    with ThreadPoolExecutor(16) as executor:
+        respuestas = list(executor.map(lambda _: cliente.get("/proyecciones/categoria/crepas"), range(32)))
+
+    assert {respuesta.status_code for respuesta in respuestas} == {200}
+    assert all(len(respuesta.json()) == 10 for respuesta in respuestas)
+    metricas = cliente.get("/proyecciones/cache/metricas").json()
+    assert metricas['fallos'] == _consultas(operaciones) == 1
+    assert metricas['aciertos'] + metricas['agrupadas'] == 31
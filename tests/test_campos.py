@@ -0,0 +1,68 @@
+import json
+
+import pytest
+
+from dynamodb_service import DynamoDBService
+
+CAMPOS = "tienda_id,categoria_insumo,fecha_proyeccion,cantidad_estimada"
+
+
+@pytest.fixture
+def registradas(cliente, fila):
+    filas = [fila(tienda_id=f"T{tienda}", fecha_proyeccion=f"2025-10-{6 + dia:02d}")
+             for tienda in range(3) for dia in range(4)]
+    cliente.post("/proyecciones/registrar-lote", json=filas)
+    return cliente
+
+
+@pytest.mark.parametrize("url", [
+    "/proyecciones/listar",
+    "/proyecciones/listar/T1",
+    "/proyecciones/semana/2025-W41",
+    "/proyecciones/categoria/crepas",
+    "/proyecciones/semana/2025-W41/categoria/crepas",
+    "/proyecciones/listar/T1/semana/2025-W41",
+])
+def test_devuelve_solo_los_campos_pedidos(registradas, url):
+    proyecciones = registradas.get(url, params={'fields': CAMPOS}).json()
+
+    assert proyecciones and all(list(p) == CAMPOS.split(",") for p in proyecciones)
+
+
+def test_la_lectura_usa_projection_expression(registradas, operaciones):
+    operaciones.clear()
+
+    registradas.get("/proyecciones/semana/2025-W41", params={'fields': "tienda_id,cantidad_estimada"})
+
+    consulta, = [params for nombre, params in operaciones if nombre == 'Query' and params.get('IndexName')]
+    proyectados = {consulta['ExpressionAttributeNames'][nombre.strip()]
+                   for nombre in consulta['ProjectionExpression'].split(",")}
+    assert proyectados == {'tienda_id', 'cantidad_estimada'}
+
+
+def test_paginas_y_ndjson_respetan_la_seleccion(registradas):
+    pagina = registradas.get("/proyecciones/listar", params={'fields': "semana", 'limit': 5}).json()
+    lineas = registradas.get("/proyecciones/listar/T2", params={'fields': "semana", 'formato': 'ndjson'}).text
+
+    assert pagina['items'] == [{'semana': "2025-W41"}] * 5 and pagina['siguiente_cursor']
+    assert [json.loads(linea) for linea in lineas.splitlines()] == [{'semana': "2025-W41"}] * 4
+
+
+def test_la_cache_distingue_la_seleccion(registradas):
+    completas = registradas.get("/proyecciones/semana/2025-W41").json()
+    parciales = registradas.get("/proyecciones/semana/2025-W41", params={'fields': "tienda_id"}).json()
+
+    assert len(completas[0]) > 1 and all(list(p) == ['tienda_id'] for p in parciales)
+
+
+def test_rechaza_campos_desconocidos(registradas):
+    respuesta = registradas.get("/proyecciones/categoria/crepas", params={'fields': "tienda_id,clave_secreta"})
+
+    assert respuesta.status_code == 400
+    assert "clave_secreta" in respuesta.json()['detail']
+    assert registradas.get("/proyecciones/listar", params={'fields': " , "}).status_code == 400
+
+
+def test_validar_campos_normaliza_la_seleccion():
+    assert DynamoDBService.validar_campos(None) is None
+    assert DynamoDBService.validar_campos([" tienda_id", "semana", "tienda_id"]) == ('tienda_id', 'semana')
@@ -0,0 +1,102 @@
+from decimal import Decimal
+
+import pytest
+
+import migracion
+from dynamodb_service import DynamoDBService, DeltasResumen
+from model import ProyeccionInsumo
+from repositorio import obtener_repositorio
+
+URL_PATCH = "/proyecciones/actualizar/T1/2025-10-06/2025-W41"
+
+
+@pytest.fixture
+def heredadas(aws, clave_con_categoria, fila):
+    """Filas escritas con la clave anterior "<fecha>#<semana>", como antes de activar la categoría"""
+    items = {}
+    deltas = DeltasResumen()
+    for tienda_id, categoria in (("T1", "crepas"), ("T2", "waffles"), ("T3", "helados")):
+        item = DynamoDBService._proyeccion_to_item(ProyeccionInsumo(**fila(tienda_id=tienda_id,
+                                                                           categoria_insumo=categoria)))
+        item['fecha_proyeccion_semana'] = "2025-10-06#2025-W41"
+        aws.put_item(Item=item)
+        deltas.agregar(nuevo=item)
+        items[tienda_id] = item
+    deltas.aplicar()
+    return items
+
+
+def _claves(tabla):
+    return sorted((item['tienda_id'], item['fecha_proyeccion_semana']) for item in tabla.scan()['Items'])
+
+
+def test_la_clave_incluye_la_categoria(clave_con_categoria):
+    assert DynamoDBService._fecha_semana("2025-10-06", "2025-W41", "crepas") == "2025-10-06#2025-W41#crepas"
+    with pytest.raises(ValueError, match="categoria_insumo"):
+        DynamoDBService._fecha_semana("2025-10-06", "2025-W41")
+
+
+def test_sin_categoria_la_clave_no_cambia():
+    assert DynamoDBService._fecha_semana("2025-10-06", "2025-W41", "crepas") == "2025-10-06#2025-W41"
+
+
+def test_reclavar_mueve_la_fila_a_la_clave_nueva(aws, heredadas):
+    assert migracion.reclavar_item(heredadas["T1"]) == 'migrada'
+    assert migracion.reclavar_item({**heredadas["T1"], 'fecha_proyeccion_semana': "2025-10-06#2025-W41#crepas"}) \
+        == 'al_dia'
+
+    assert ("T1", "2025-10-06#2025-W41#crepas") in _claves(aws)
+    assert ("T1", "2025-10-06#2025-W41") not in _claves(aws)
+
+
+def test_reclavar_no_borra_una_fila_que_cambio_despues_de_leerla(aws, heredadas):
+    leida = dict(heredadas["T3"], cantidad_estimada=Decimal("1"))
+
+    assert migracion.reclavar_item(leida) == 'cambiada'
+    assert ("T3", "2025-10-06#2025-W41") in _claves(aws)
+    assert ("T3", "2025-10-06#2025-W41#helados") not in _claves(aws)
+
+
+def test_reclavar_descarta_la_fila_anterior_si_ya_existe_la_nueva(aws, heredadas, fila):
+    obtener_repositorio().crear_proyeccion(ProyeccionInsumo(**fila(tienda_id="T2", categoria_insumo="waffles",
+                                                                   cantidad_estimada="99")))
+
+    assert migracion.reclavar_item(heredadas["T2"]) == 'migrada'
+
+    assert [clave for clave in _claves(aws) if clave[0] == "T2"] == [("T2", "2025-10-06#2025-W41#waffles")]
+    assert obtener_repositorio().obtener_resumen("2025-W41", "tienda#T2")['cantidad_estimada'] == Decimal("99")
+
+
+def test_migrar_pasa_todas_las_filas_y_se_puede_repetir(aws, heredadas, tmp_path):
+    ruta = str(tmp_path / "clave.json")
+    assert migracion.contar_pendientes(2, 2, migracion.MODO_CLAVE) == 3
+
+    checkpoint = migracion.migrar(ruta, 2, 2, modo=migracion.MODO_CLAVE)
+
+    assert checkpoint['contadores']['migradas'] == 3
+    assert migracion.contar_pendientes(2, 2, migracion.MODO_CLAVE) == 0
+    assert all(clave.count("#") == 2 for _, clave in _claves(aws))
+    assert migracion.migrar(ruta, 2, 2, modo=migracion.MODO_CLAVE)['contadores']['migradas'] == 3
+
+
+def test_las_operaciones_por_clave_exigen_la_categoria(cliente, clave_con_categoria, fila):
+    cliente.post("/proyecciones/registrar", json=fila(tienda_id="T1"))
+    clave = {'tienda_id': "T1", 'fecha_proyeccion': "2025-10-06", 'semana': "2025-W41"}
+
+    assert cliente.patch(URL_PATCH, json={'cantidad_estimada': "3"}).status_code == 400
+    assert cliente.patch(URL_PATCH, params={'categoria': "crepas"}, json={'cantidad_estimada': "3"}).status_code == 200
+    assert cliente.patch(URL_PATCH, params={'categoria': "crepas"},
+                         json={'categoria_insumo': "waffles"}).status_code == 400
+    assert cliente.post("/proyecciones/obtener-lote", json=[clave]).status_code == 400
+    encontrada = cliente.post("/proyecciones/obtener-lote", json=[{**clave, 'categoria_insumo': "crepas"}]).json()
+    assert encontrada['encontradas'] == 1
+
+
+def test_dos_categorias_el_mismo_dia_no_se_pisan(cliente, clave_con_categoria, fila):
+    cliente.post("/proyecciones/registrar", json=fila(categoria_insumo="crepas"))
+    cliente.post("/proyecciones/registrar", json=fila(categoria_insumo="waffles"))
+
+    assert sorted(p['categoria_insumo'] for p in cliente.get("/proyecciones/listar/T001").json()) == [
+        "crepas", "waffles"
+    ]
+    assert cliente.get("/proyecciones/resumen/2025-W41/total").json()['filas'] == 2
@@ -0,0 +1,82 @@
+import json
+from decimal import Decimal
+from typing import List
+
+from pydantic import TypeAdapter
+
+from benchmarks import codec
+from dynamodb_service import DynamoDBService, CAMPOS_PROYECCION
+from model import ProyeccionInsumo
+
+
+def _item(fila, **campos):
+    return DynamoDBService._proyeccion_to_item(ProyeccionInsumo(**fila(**campos)))
+
+
+def _con_pydantic(items) -> list:
+    proyecciones = [DynamoDBService._item_to_proyeccion(item) for item in items]
+    return json.loads(TypeAdapter(List[ProyeccionInsumo]).dump_json(proyecciones))
+
+
+def test_json_directo_igual_al_de_pydantic(fila):
+    items = [_item(fila), _item(fila, tienda_id="T002", observaciones=None, nombre_tienda="Salón Ñandú"),
+             _item(fila, tienda_id="T003", cantidad_estimada="0.05", diferencia_vs_real="-3.25")]
+
+    assert json.loads(DynamoDBService.codificar_json(items)) == _con_pydantic(items)
+
+
+def test_acepta_cantidades_guardadas_como_texto(fila):
+    item = _item(fila)
+    heredado = dict(item, cantidad_estimada="12.50", diferencia_vs_real="0.70")
+
+    assert json.loads(DynamoDBService.codificar_json([heredado])) == _con_pydantic([item])
+
+
+def test_conversion_rapida_igual_a_la_validada(fila):
+    item = _item(fila, observaciones=None)
+
+    assert DynamoDBService._item_to_proyeccion_rapido(item) == DynamoDBService._item_to_proyeccion(item)
+
+
+def test_ndjson_pagina_y_consulta_comparten_la_forma(fila):
+    items = [_item(fila), _item(fila, tienda_id="T002")]
+    esperado = _con_pydantic(items)
+
+    lineas = DynamoDBService.codificar_ndjson(items).decode().splitlines()
+    pagina = json.loads(DynamoDBService.codificar_pagina(items, "cursor"))
+    consulta = json.loads(DynamoDBService.codificar_consulta([items[0], None, items[1]]))
+
+    assert [json.loads(linea) for linea in lineas] == esperado
+    assert pagina == {'items': esperado, 'siguiente_cursor': "cursor"}
+    assert (consulta['total'], consulta['encontradas'], consulta['faltantes']) == (3, 2, 1)
+    assert [r['proyeccion'] for r in consulta['resultados']] == [esperado[0], None, esperado[1]]
+
+
+def test_selecciona_solo_los_campos_pedidos(fila):
+    campos = ('tienda_id', 'cantidad_estimada')
+
+    assert json.loads(DynamoDBService.codificar_json([_item(fila)], campos)) == [
+        {'tienda_id': "T001", 'cantidad_estimada': "12.50"}
+    ]
+
+
+def test_las_rutas_del_benchmark_producen_el_mismo_json():
+    items = codec.generar_items(30)
+
+    esperado = json.loads(codec.ruta_actual(items))
+
+    assert json.loads(codec.ruta_modelos_rapidos(items)) == esperado
+    assert json.loads(codec.ruta_json_directo(items)) == esperado
+    assert isinstance(items[0]['cantidad_estimada'], Decimal)
+
+
+def test_el_listado_devuelve_todos_los_campos_del_modelo(cliente, fila):
+    cliente.post("/proyecciones/registrar", json=fila(observaciones=None))
+
+    respuesta = cliente.get("/proyecciones/semana/2025-W41")
+
+    assert respuesta.headers['content-type'] == "application/json"
+    proyeccion, = respuesta.json()
+    assert list(proyeccion) == list(CAMPOS_PROYECCION)
+    assert proyeccion['observaciones'] is None
+    ProyeccionInsumo.model_validate(proyeccion)
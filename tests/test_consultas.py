@@ -0,0 +1,111 @@
+from datetime import date, timedelta
+
+import pytest
+
+
+@pytest.fixture
+def api(cliente_backend, fila):
+    """Cliente con 3 tiendas × 14 días (dos semanas) y categorías alternas"""
+    cliente = cliente_backend
+    filas = [fila(tienda_id=f"T{tienda}", fecha_proyeccion=f"2025-10-{dia:02d}",
+                  semana="2025-W41" if dia <= 12 else "2025-W42",
+                  categoria_insumo="crepas" if dia % 2 else "bebidas", cantidad_estimada=str(dia))
+             for tienda in range(3) for dia in range(6, 20)]
+    assert cliente.post("/proyecciones/registrar-lote", json=filas).json()['exitosas'] == 42
+    return cliente
+
+
+def test_rango_de_fechas_incluye_ambos_extremos(api):
+    respuesta = api.get("/proyecciones/listar/T1/rango", params={'desde': "2025-10-08", 'hasta': "2025-10-10"})
+
+    assert respuesta.status_code == 200
+    assert [p['fecha_proyeccion'] for p in respuesta.json()] == ["2025-10-08", "2025-10-09", "2025-10-10"]
+    assert {p['tienda_id'] for p in respuesta.json()} == {"T1"}
+
+
+def test_rango_con_campos_y_ndjson(api):
+    campos = api.get("/proyecciones/listar/T1/rango",
+                     params={'desde': "2025-10-08", 'hasta': "2025-10-08", 'fields': "fecha_proyeccion"})
+    ndjson = api.get("/proyecciones/listar/T1/rango",
+                     params={'desde': "2025-10-06", 'hasta': "2025-10-19", 'formato': "ndjson"})
+
+    assert campos.json() == [{'fecha_proyeccion': "2025-10-08"}]
+    assert len(ndjson.text.splitlines()) == 14
+
+
+def test_rango_invalido_o_vacio(api):
+    assert api.get("/proyecciones/listar/T1/rango", params={'desde': "2025-10-09", 'hasta': "2025-10-08"}).status_code == 400
+    assert api.get("/proyecciones/listar/T1/rango", params={'desde': "2025-11-09", 'hasta': "2025-11-10"}).status_code == 404
+    assert api.get("/proyecciones/listar/T1/rango", params={'desde': "no-es-fecha", 'hasta': "2025-10-08"}).status_code == 422
+
+
+def test_tienda_y_semana_devuelve_filas_completas(api):
+    respuesta = api.get("/proyecciones/listar/T1/semana/2025-W42")
+
+    filas = respuesta.json()
+    assert len(filas) == 7 and {p['semana'] for p in filas} == {"2025-W42"}
+    assert all(p['origen_modelo'] == "MediaMovilSemanal_v2.0" and p['nombre_tienda'] == "Tienda Centro" for p in filas)
+    assert [p['fecha_proyeccion'] for p in filas] == sorted(p['fecha_proyeccion'] for p in filas)
+
+
+def test_tienda_y_semana_pagina_con_cursor(api):
+    primera = api.get("/proyecciones/listar/T1/semana/2025-W41", params={'limit': 3}).json()
+    segunda = api.get("/proyecciones/listar/T1/semana/2025-W41",
+                      params={'limit': 3, 'cursor': primera['siguiente_cursor']}).json()
+    tercera = api.get("/proyecciones/listar/T1/semana/2025-W41",
+                      params={'limit': 3, 'cursor': segunda['siguiente_cursor']}).json()
+
+    vistas = [p['fecha_proyeccion'] for pagina in (primera, segunda, tercera) for p in pagina['items']]
+    assert vistas == [f"2025-10-{dia:02d}" for dia in range(6, 13)]
+    assert primera['items'][0]['nombre_tienda'] == "Tienda Centro"
+    assert tercera['siguiente_cursor'] is None
+
+
+def test_semana_y_categoria_filtra_y_pagina(api):
+    completa = api.get("/proyecciones/semana/2025-W41/categoria/crepas").json()
+    vistas, cursor = [], None
+    while True:
+        pagina = api.get("/proyecciones/semana/2025-W41/categoria/crepas",
+                         params={'limit': 2, **({'cursor': cursor} if cursor else {})}).json()
+        vistas += pagina['items']
+        cursor = pagina['siguiente_cursor']
+        if cursor is None:
+            break
+
+    assert len(completa) == 9 and {p['categoria_insumo'] for p in completa} == {"crepas"}
+    assert sorted((p['tienda_id'], p['fecha_proyeccion']) for p in vistas) == \
+        sorted((p['tienda_id'], p['fecha_proyeccion']) for p in completa)
+
+
+def test_cursor_de_otra_categoria_se_rechaza(api):
+    cursor = api.get("/proyecciones/semana/2025-W41/categoria/crepas", params={'limit': 2}).json()['siguiente_cursor']
+
+    assert api.get("/proyecciones/semana/2025-W41/categoria/bebidas",
+                   params={'limit': 2, 'cursor': cursor}).status_code == 400
+
+
+def test_indice_tienda_semana_proyecta_solo_cantidades(aws):
+    indices = {i['IndexName']: i['Projection'] for i in aws.global_secondary_indexes}
+
+    proyeccion = indices['tienda-semana-index']
+    assert proyeccion['ProjectionType'] == "INCLUDE"
+    assert {'categoria_insumo', 'cantidad_estimada'} <= set(proyeccion['NonKeyAttributes'])
+    assert 'observaciones' not in proyeccion['NonKeyAttributes']
+
+
+def test_tienda_y_semana_completa_por_clave_solo_si_faltan_campos(cliente, fila, operaciones):
+    cliente.post("/proyecciones/registrar-lote",
+                 json=[fila(fecha_proyeccion=f"2025-10-{dia:02d}") for dia in range(6, 13)])
+
+    operaciones.clear()
+    completas = cliente.get("/proyecciones/listar/T001/semana/2025-W41").json()
+    con_lectura = [nombre for nombre, _ in operaciones]
+    operaciones.clear()
+    parciales = cliente.get("/proyecciones/listar/T001/semana/2025-W41",
+                            params={'fields': "categoria_insumo,cantidad_estimada"}).json()
+    sin_lectura = [nombre for nombre, _ in operaciones]
+
+    assert len(completas) == 7 and completas[0]['observaciones'] == "Generado automáticamente"
+    assert "Query" in con_lectura and "BatchGetItem" in con_lectura
+    assert len(parciales) == 7 and set(parciales[0]) == {'categoria_insumo', 'cantidad_estimada'}
+    assert "BatchGetItem" not in sin_lectura
@@ -0,0 +1,72 @@
+import config
+from config import DYNAMODB_TABLE_NAME
+
+
+def _registrar_semana(cliente, fila, tienda_id, semana="2025-W41", lunes=6):
+    filas = [fila(tienda_id=tienda_id, fecha_proyeccion=f"2025-10-{lunes + dia:02d}", semana=semana)
+             for dia in range(7)]
+    assert cliente.post("/proyecciones/registrar-lote", json=filas).json()['exitosas'] == 7
+
+
+def test_elimina_una_tienda_en_una_semana(cliente, fila, operaciones):
+    _registrar_semana(cliente, fila, "T001")
+    _registrar_semana(cliente, fila, "T001", semana="2025-W42", lunes=13)
+    _registrar_semana(cliente, fila, "T002")
+    operaciones.clear()
+
+    respuesta = cliente.delete("/proyecciones/eliminar/T001/2025-W41")
+    enviadas = list(operaciones)
+
+    assert respuesta.status_code == 200
+    assert respuesta.json() == {"mensaje": "7 proyección(es) eliminada(s)"}
+    consultas = [params for nombre, params in enviadas if nombre == 'Query']
+    assert consultas and all(params.get('IndexName') == 'tienda-semana-index' for params in consultas)
+    assert {nombre for nombre, _ in enviadas}.isdisjoint({'Scan', 'DeleteItem'})
+    assert [p['semana'] for p in cliente.get("/proyecciones/listar/T001").json()] == ["2025-W42"] * 7
+    assert len(cliente.get("/proyecciones/listar/T002").json()) == 7
+
+
+def test_eliminar_descuenta_el_resumen(cliente, fila):
+    _registrar_semana(cliente, fila, "T001")
+    _registrar_semana(cliente, fila, "T002")
+
+    cliente.delete("/proyecciones/eliminar/T001/2025-W41")
+
+    assert cliente.get("/proyecciones/resumen/2025-W41/total").json()['filas'] == 7
+    assert cliente.get("/proyecciones/resumen/2025-W41/tienda/T001").status_code == 404
+
+
+def test_eliminar_sin_filas_responde_404(cliente, fila):
+    _registrar_semana(cliente, fila, "T001")
+
+    assert cliente.delete("/proyecciones/eliminar/T001/2025-W50").status_code == 404
+    assert cliente.delete("/proyecciones/eliminar/T404/2025-W41").status_code == 404
+
+
+def test_crea_los_indices_faltantes_en_una_tabla_desplegada(aws, fila):
+    from dynamodb_service import DynamoDBService
+    from model import ProyeccionInsumo
+
+    dynamodb_client = config.get_dynamodb().meta.client
+    for indice in ('tienda-semana-index', 'semana-categoria-index'):
+        dynamodb_client.update_table(TableName=DYNAMODB_TABLE_NAME,
+                                     GlobalSecondaryIndexUpdates=[{'Delete': {'IndexName': indice}}])
+    DynamoDBService.crear_proyeccion(ProyeccionInsumo(**fila()))
+
+    config.crear_indices_faltantes(dynamodb_client, espera_segundos=0)
+
+    indices = {indice['IndexName']: indice for indice in
+               dynamodb_client.describe_table(TableName=DYNAMODB_TABLE_NAME)['Table']['GlobalSecondaryIndexes']}
+    assert {'tienda-semana-index', 'semana-categoria-index'} <= set(indices)
+    assert indices['tienda-semana-index']['Projection']['ProjectionType'] == 'INCLUDE'
+    assert DynamoDBService.eliminar_por_tienda_y_semana("T001", "2025-W41") == 1
+
+
+def test_crear_indices_faltantes_no_repite_los_existentes(aws):
+    dynamodb_client = config.get_dynamodb().meta.client
+    antes = dynamodb_client.describe_table(TableName=DYNAMODB_TABLE_NAME)['Table']['GlobalSecondaryIndexes']
+
+    config.crear_indices_faltantes(dynamodb_client, espera_segundos=0)
+
+    despues = dynamodb_client.describe_table(TableName=DYNAMODB_TABLE_NAME)['Table']['GlobalSecondaryIndexes']
+    assert sorted(indice['IndexName'] for indice in despues) == sorted(indice['IndexName'] for indice in antes)
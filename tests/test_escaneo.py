@@ -0,0 +1,77 @@
+import threading
+
+import pytest
+from botocore.exceptions import ClientError
+
+import dynamodb_service
+from dynamodb_service import DynamoDBService, EscaneoParalelo
+from model import ProyeccionInsumo
+
+
+@pytest.fixture
+def tabla(aws, fila):
+    filas = [ProyeccionInsumo(**fila(tienda_id=f"T{i:03d}", fecha_proyeccion=f"2025-10-{6 + i % 7:02d}"))
+             for i in range(60)]
+    list(DynamoDBService.crear_proyecciones_lote(filas))
+    return aws
+
+
+def _clave(item):
+    return item['tienda_id'], item['fecha_proyeccion_semana']
+
+
+def test_lee_todos_los_segmentos_una_vez(tabla, operaciones):
+    escaneo = DynamoDBService.escanear_paralelo(total_segmentos=8, max_workers=3, Limit=10)
+
+    claves = [_clave(item) for item in escaneo]
+
+    assert len(claves) == 60 and len(set(claves)) == 60
+    segmentos = {params['Segment'] for nombre, params in operaciones if nombre == 'Scan'}
+    assert segmentos == set(range(8))
+    assert escaneo.capacidad_consumida > 0
+
+
+def test_se_detiene_al_alcanzar_el_limite_de_lectura(tabla):
+    escaneo = DynamoDBService.escanear_paralelo(total_segmentos=4, max_workers=2, limite_rcu=1, Limit=5)
+
+    leidos = sum(1 for _ in escaneo)
+
+    assert escaneo.limite_alcanzado
+    assert 0 < leidos < 60
+
+
+def test_continua_un_segmento_desde_su_ultima_clave(tabla):
+    segmento, primeros, ultima = next(EscaneoParalelo(total_segmentos=2, segmentos=[0], Limit=7).paginas())
+    assert ultima is not None
+
+    resto = list(EscaneoParalelo(total_segmentos=2, segmentos=[segmento], inicio={segmento: ultima}))
+    completo = list(EscaneoParalelo(total_segmentos=2, segmentos=[segmento]))
+
+    assert sorted(map(_clave, primeros + resto)) == sorted(map(_clave, completo))
+
+
+def test_cerrar_el_iterador_termina_los_hilos(tabla):
+    antes = threading.active_count()
+    iterador = iter(DynamoDBService.escanear_paralelo(total_segmentos=8, max_workers=4, Limit=2))
+    for _ in range(3):
+        next(iterador)
+
+    iterador.close()
+
+    assert threading.active_count() <= antes
+
+
+def test_propaga_el_error_de_un_segmento(tabla, monkeypatch):
+    class TablaRota:
+        def scan(self, **parametros):
+            raise ClientError({'Error': {'Code': 'ValidationException', 'Message': 'segmento roto'}}, 'Scan')
+
+    monkeypatch.setattr(dynamodb_service, 'get_table', lambda: TablaRota())
+
+    with pytest.raises(ClientError, match="segmento roto"):
+        list(DynamoDBService.escanear_paralelo(total_segmentos=4, max_workers=2))
+
+
+def test_listado_completo_usa_el_escaneo_paralelo(tabla, cliente, operaciones):
+    assert len(cliente.get("/proyecciones/listar").json()) == 60
+    assert any('TotalSegments' in params for nombre, params in operaciones if nombre == 'Scan')
@@ -0,0 +1,131 @@
+import pytest
+
+import config
+from memoria import RepositorioMemoria
+from model import ProyeccionInsumo
+
+
+@pytest.fixture
+def api(cliente_backend, fila):
+    """Cliente con dos tiendas en la semana 2025-W41 y una en la 2025-W42"""
+    cliente = cliente_backend
+    cliente.post("/proyecciones/registrar", json=fila())
+    cliente.post("/proyecciones/registrar", json=fila(tienda_id="T002"))
+    cliente.post("/proyecciones/registrar", json=fila(tienda_id="T009", fecha_proyeccion="2025-10-13", semana="2025-W42"))
+    return cliente
+
+
+def _get(cliente, url, etag=None, **params):
+    return cliente.get(url, params=params, headers={'If-None-Match': etag} if etag else {})
+
+
+def test_etag_debil_y_304_sin_cuerpo(api):
+    respuesta = _get(api, "/proyecciones/semana/2025-W41")
+    etag = respuesta.headers['etag']
+
+    repetida = _get(api, "/proyecciones/semana/2025-W41", etag)
+
+    assert respuesta.status_code == 200 and etag.startswith('W/"')
+    assert respuesta.headers['cache-control'] == "no-cache"
+    assert repetida.status_code == 304 and repetida.content == b""
+    assert repetida.headers['etag'] == etag
+
+
+def test_if_none_match_admite_listas_y_comodin(api):
+    etag = _get(api, "/proyecciones/semana/2025-W41").headers['etag']
+
+    assert _get(api, "/proyecciones/semana/2025-W41", f'"otro", {etag}').status_code == 304
+    assert _get(api, "/proyecciones/semana/2025-W41", "*").status_code == 304
+    assert _get(api, "/proyecciones/semana/2025-W41", '"otro"').status_code == 200
+
+
+def test_cada_representacion_tiene_su_etag(api):
+    etag = _get(api, "/proyecciones/semana/2025-W41").headers['etag']
+
+    campos = _get(api, "/proyecciones/semana/2025-W41", etag, fields="tienda_id")
+    ndjson = _get(api, "/proyecciones/semana/2025-W41", formato="ndjson")
+
+    assert campos.status_code == 200 and campos.headers['etag'] != etag
+    assert ndjson.headers['etag'] not in (etag, campos.headers['etag'])
+
+
+def test_escritura_en_otra_tienda_cambia_la_semana_pero_no_la_tienda(api, fila):
+    semana = _get(api, "/proyecciones/semana/2025-W41").headers['etag']
+    tienda = _get(api, "/proyecciones/listar/T001").headers['etag']
+    otra_semana = _get(api, "/proyecciones/semana/2025-W42").headers['etag']
+
+    api.put("/proyecciones/actualizar", json=fila(tienda_id="T002", cantidad_estimada="99"))
+
+    assert _get(api, "/proyecciones/semana/2025-W41", semana).status_code == 200
+    assert _get(api, "/proyecciones/listar/T001", tienda).status_code == 304
+    assert _get(api, "/proyecciones/semana/2025-W42", otra_semana).status_code == 304
+
+
+@pytest.mark.parametrize('escribir', [
+    lambda api, fila: api.patch("/proyecciones/actualizar/T001/2025-10-06/2025-W41", json={'observaciones': "zz"}),
+    lambda api, fila: api.delete("/proyecciones/eliminar/T001/2025-W41"),
+    lambda api, fila: api.post("/proyecciones/registrar-lote", json=[fila(fecha_proyeccion="2025-10-07")]),
+], ids=['patch', 'eliminar', 'lote'])
+def test_escrituras_de_la_tienda_invalidan_sus_etags(api, fila, escribir):
+    semana = _get(api, "/proyecciones/semana/2025-W41").headers['etag']
+    tienda = _get(api, "/proyecciones/listar/T001").headers['etag']
+    rango = _get(api, "/proyecciones/listar/T001/rango", desde="2025-10-01", hasta="2025-10-31").headers['etag']
+
+    assert escribir(api, fila).status_code == 200
+
+    assert _get(api, "/proyecciones/semana/2025-W41", semana).status_code == 200
+    assert _get(api, "/proyecciones/listar/T001", tienda).status_code != 304
+    assert _get(api, "/proyecciones/listar/T001/rango", rango,
+                desde="2025-10-01", hasta="2025-10-31").status_code != 304
+
+
+def test_semana_sin_datos_no_lleva_etag(api):
+    respuesta = _get(api, "/proyecciones/semana/2099-W01")
+
+    assert respuesta.status_code == 404 and 'etag' not in respuesta.headers
+
+
+def test_304_no_consulta_la_tabla_de_proyecciones(cliente, fila, operaciones):
+    cliente.post("/proyecciones/registrar", json=fila())
+    etag = _get(cliente, "/proyecciones/semana/2025-W41").headers['etag']
+    operaciones.clear()
+
+    assert _get(cliente, "/proyecciones/semana/2025-W41", etag).status_code == 304
+
+    tablas = {parametros.get('TableName') for _, parametros in operaciones}
+    assert config.DYNAMODB_TABLE_NAME not in tablas
+
+
+def test_si_no_se_puede_incrementar_la_version_la_escritura_falla(cliente, fila, monkeypatch):
+    from botocore.exceptions import ClientError
+    from dynamodb_service import DynamoDBService, SEMANA_VERSIONES
+
+    cliente.post("/proyecciones/registrar", json=fila())
+    etag = _get(cliente, "/proyecciones/semana/2025-W41").headers['etag']
+    escribir = DynamoDBService._escribir
+
+    def sin_marcadores(tabla, operacion, **parametros):
+        if parametros.get('Key', {}).get('semana') == SEMANA_VERSIONES:
+            raise ClientError({'Error': {'Code': 'ValidationException', 'Message': "sin acceso"}}, 'UpdateItem')
+        return escribir(tabla, operacion, **parametros)
+
+    monkeypatch.setattr(DynamoDBService, '_escribir', staticmethod(sin_marcadores))
+    fallida = cliente.post("/proyecciones/registrar", json=fila(cantidad_estimada="20"))
+    monkeypatch.setattr(DynamoDBService, '_escribir', staticmethod(escribir))
+    repetida = cliente.post("/proyecciones/registrar", json=fila(cantidad_estimada="20"))
+
+    assert fallida.status_code == 500 and "Error al incrementar la versión" in fallida.json()['detail']
+    assert repetida.status_code == 200
+    assert _get(cliente, "/proyecciones/semana/2025-W41", etag).status_code == 200
+
+
+def test_versiones_del_backend_en_memoria(fila):
+    repo = RepositorioMemoria()
+    inicial = repo.version_semana("2025-W41")
+
+    repo.crear_proyeccion(ProyeccionInsumo(**fila()))
+    repo.crear_proyeccion(ProyeccionInsumo(**fila()))
+
+    assert inicial == 0
+    assert (repo.version_semana("2025-W41"), repo.version_tienda("T001")) == (2, 2)
+    assert repo.version_tienda("T002") == 0
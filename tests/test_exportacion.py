@@ -0,0 +1,113 @@
+import csv
+import gzip
+import io
+import json
+
+import pytest
+
+import exportacion
+from dynamodb_service import DynamoDBService
+from model import ProyeccionInsumo
+
+
+@pytest.fixture
+def tabla(aws, fila):
+    """20 tiendas × 14 días (dos semanas) con categorías alternas"""
+    filas = [ProyeccionInsumo(**fila(tienda_id=f"T{tienda}", fecha_proyeccion=f"2025-10-{dia:02d}",
+                                     semana="2025-W41" if dia <= 12 else "2025-W42",
+                                     categoria_insumo="crepas" if dia % 2 else "bebidas", cantidad_estimada=str(dia)))
+             for tienda in range(20) for dia in range(6, 20)]
+    assert all(error is None for _, error in DynamoDBService.crear_proyecciones_lote(filas))
+    return aws
+
+
+def _lineas(salida, segmentos, formato="ndjson"):
+    return [linea for segmento in range(segmentos)
+            for linea in gzip.decompress(open(exportacion.ruta_parte(salida, segmento, formato), "rb").read())
+            .decode().splitlines()]
+
+
+def test_exporta_toda_la_tabla_por_segmentos(tabla, tmp_path):
+    salida = str(tmp_path / "proyecciones")
+
+    checkpoint = exportacion.exportar(salida, total_segmentos=4)
+
+    lineas = _lineas(salida, 4)
+    assert len(lineas) == 280 and len(set(lineas)) == 280
+    assert all(datos['terminado'] for datos in checkpoint['segmentos'].values())
+    assert sum(datos['filas'] for datos in checkpoint['segmentos'].values()) == 280
+    assert json.loads(lineas[0])['origen_modelo'] == "MediaMovilSemanal_v2.0"
+
+
+def test_reanuda_una_exportacion_interrumpida_sin_duplicar(tabla, tmp_path, monkeypatch):
+    salida = str(tmp_path / "proyecciones")
+    original = exportacion.guardar_checkpoint
+    guardados = []
+
+    def interrumpir(ruta, checkpoint):
+        guardados.append(ruta)
+        if len(guardados) == 2:
+            raise KeyboardInterrupt
+        original(ruta, checkpoint)
+
+    monkeypatch.setattr(exportacion, 'guardar_checkpoint', interrumpir)
+    with pytest.raises(KeyboardInterrupt):
+        exportacion.exportar(salida, total_segmentos=4)
+    monkeypatch.setattr(exportacion, 'guardar_checkpoint', original)
+    interrumpido = json.load(open(f"{salida}.checkpoint.json"))
+    pendientes = [int(s) for s, datos in interrumpido['segmentos'].items() if not datos['terminado']]
+    # Lo escrito después del último checkpoint se descarta al reanudar
+    with open(exportacion.ruta_parte(salida, pendientes[0], "ndjson"), "ab") as parte:
+        parte.write(gzip.compress(b'{"basura": true}\n'))
+
+    checkpoint = exportacion.exportar(salida, total_segmentos=4)
+
+    assert sum(datos['terminado'] for datos in interrumpido['segmentos'].values()) == 1
+    lineas = _lineas(salida, 4)
+    assert len(lineas) == 280 and len(set(lineas)) == 280
+    assert sum(datos['filas'] for datos in checkpoint['segmentos'].values()) == 280
+
+
+def test_relanzar_una_exportacion_terminada_no_reescribe(tabla, tmp_path):
+    salida = str(tmp_path / "proyecciones")
+    exportacion.exportar(salida, total_segmentos=4)
+
+    checkpoint = exportacion.exportar(salida, total_segmentos=4)
+
+    assert len(_lineas(salida, 4)) == 280
+    assert sum(datos['filas'] for datos in checkpoint['segmentos'].values()) == 280
+    with pytest.raises(ValueError):
+        exportacion.exportar(salida, total_segmentos=3)
+
+
+def test_csv_con_filtros_y_campos(tabla, tmp_path):
+    salida = str(tmp_path / "crepas")
+
+    checkpoint = exportacion.exportar(salida, formato="csv", semana="2025-W41", categoria="crepas",
+                                      campos=['tienda_id', 'cantidad_estimada'])
+
+    filas = list(csv.reader(io.StringIO(gzip.decompress(
+        open(exportacion.ruta_parte(salida, 0, "csv"), "rb").read()).decode())))
+    assert list(checkpoint['segmentos']) == ["0"]
+    assert filas[0] == ['tienda_id', 'cantidad_estimada']
+    assert len(filas) == 1 + 20 * 3
+    assert {cantidad for _, cantidad in filas[1:]} == {"7", "9", "11"}
+
+
+def test_tienda_y_categoria_filtran_la_particion(tabla, tmp_path):
+    salida = str(tmp_path / "t3")
+
+    exportacion.exportar(salida, tienda_id="T3", categoria="crepas")
+
+    filas = [json.loads(linea) for linea in _lineas(salida, 1)]
+    assert len(filas) == 7
+    assert {(f['tienda_id'], f['categoria_insumo']) for f in filas} == {("T3", "crepas")}
+
+
+def test_plan_lectura_elige_el_indice_mas_selectivo():
+    assert exportacion.plan_lectura(semana="2025-W41", tienda_id="T1")[:2] == \
+        (exportacion.CRITERIO_TIENDA_SEMANA, ("T1", "2025-W41"))
+    assert exportacion.plan_lectura(semana="2025-W41", categoria="crepas")[:2] == \
+        (exportacion.CRITERIO_SEMANA_CATEGORIA, ("2025-W41", "crepas"))
+    assert 'FilterExpression' in exportacion.plan_lectura(tienda_id="T1", categoria="crepas")[2]
+    assert exportacion.plan_lectura()[0] == exportacion.CRITERIO_TODAS
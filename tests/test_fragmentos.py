@@ -0,0 +1,166 @@
+import gzip
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+
+import config
+import dynamodb_service
+import exportacion
+import migracion
+from dynamodb_service import DynamoDBService, CRITERIO_CATEGORIA, CRITERIO_SEMANA
+from model import ProyeccionInsumo
+
+CATEGORIAS = ("crepas", "bebidas", "salsas")
+
+
+def _filas(fila):
+    return [fila(tienda_id=f"T{tienda:03d}", fecha_proyeccion=(date(2025, 10, 6) + timedelta(days=dia)).isoformat(),
+                 categoria_insumo=CATEGORIAS[(tienda + dia) % 3], diferencia_vs_real=str((tienda * dia) % 5))
+            for tienda in range(30) for dia in range(7)]
+
+
+def _escribir(filas):
+    assert all(error is None for _, error in DynamoDBService.crear_proyecciones_lote(
+        ProyeccionInsumo(**datos) for datos in filas))
+
+
+def _clave(item):
+    return item['tienda_id'], item['fecha_proyeccion_semana']
+
+
+@pytest.fixture
+def fragmentar(aws, monkeypatch):
+    """Fija INDICE_FRAGMENTOS y LECTURA_FRAGMENTADA en los módulos que los importan"""
+    def fijar(fragmentos: int, lectura: bool):
+        for modulo in (config, dynamodb_service, migracion):
+            monkeypatch.setattr(modulo, 'INDICE_FRAGMENTOS', fragmentos)
+        for modulo in (config, dynamodb_service):
+            monkeypatch.setattr(modulo, 'LECTURA_FRAGMENTADA', lectura)
+        dynamodb_service.cache_consultas.invalidar_si(lambda clave: True)
+    return fijar
+
+
+@pytest.fixture
+def fragmentada(fragmentar, fila):
+    """210 filas de 2025-W41 escritas con 4 fragmentos, índices creados y lectura fragmentada"""
+    fragmentar(4, False)
+    config.crear_indices_fragmentados(espera_segundos=0.1)
+    _escribir(_filas(fila))
+    fragmentar(4, True)
+
+
+def test_las_escrituras_llevan_los_atributos_de_fragmento(fragmentar, fila):
+    _escribir(_filas(fila)[:3])
+    sin_fragmentos = config.get_table().get_item(Key={'tienda_id': "T000", 'fecha_proyeccion_semana': "2025-10-06#2025-W41"})['Item']
+    fragmentar(4, False)
+
+    _escribir(_filas(fila)[3:7])
+
+    item = config.get_table().get_item(Key={'tienda_id': "T000", 'fecha_proyeccion_semana': "2025-10-12#2025-W41"})['Item']
+    assert 'semana_fragmento' not in sin_fragmentos
+    assert item['semana_fragmento'] == f"2025-W41#{item['semana_fragmento'].split('#')[1]}"
+    assert item['categoria_fragmento'].startswith(item['categoria_insumo'] + "#")
+    assert int(item['semana_fragmento'].split('#')[1]) in range(4)
+    assert DynamoDBService._atributos_fragmento(item) == {'semana_fragmento': item['semana_fragmento'],
+                                                         'categoria_fragmento': item['categoria_fragmento']}
+
+
+def test_la_migracion_completa_los_fragmentos_de_las_filas_anteriores(fragmentar, fila, tmp_path):
+    _escribir(_filas(fila)[:150])
+    fragmentar(4, False)
+    _escribir(_filas(fila)[150:])
+    config.crear_indices_fragmentados(espera_segundos=0.1)
+    pendientes = migracion.contar_pendientes(2, 2, migracion.MODO_FRAGMENTOS)
+
+    checkpoint = migracion.migrar(str(tmp_path / "migracion.json"), 2, 2, modo=migracion.MODO_FRAGMENTOS)
+
+    assert pendientes == 150
+    assert checkpoint['contadores'] == {'leidas': 210, 'migradas': 150, 'cambiadas': 0, 'errores': 0}
+    assert migracion.contar_pendientes(2, 2, migracion.MODO_FRAGMENTOS) == 0
+    with pytest.raises(ValueError):
+        migracion.migrar(str(tmp_path / "migracion.json"), 2, 2)
+    fragmentar(4, True)
+    assert len(DynamoDBService.listar_items(CRITERIO_SEMANA, "2025-W41")) == 210
+
+
+def test_la_lectura_fusionada_es_ordenada_completa_y_sin_repetir(fragmentada, fila):
+    items = DynamoDBService.listar_items(CRITERIO_SEMANA, "2025-W41")
+    crepas = DynamoDBService.listar_items(CRITERIO_CATEGORIA, "crepas")
+
+    claves = [item['fecha_proyeccion_semana'] for item in items]
+    assert len(items) == 210 and len({_clave(item) for item in items}) == 210
+    assert claves == sorted(claves)
+    assert len(crepas) == sum(1 for datos in _filas(fila) if datos['categoria_insumo'] == "crepas")
+
+
+@pytest.mark.parametrize('limit, campos', [(7, None), (1, ('fecha_proyeccion_semana', 'cantidad_estimada')),
+                                           (64, ('tienda_id', 'fecha_proyeccion_semana'))])
+def test_paginacion_entre_fragmentos(fragmentada, limit, campos):
+    vistos, cursor = [], None
+    while True:
+        items, cursor = DynamoDBService.listar_pagina(CRITERIO_SEMANA, "2025-W41", limit, cursor, campos)
+        assert len(items) <= limit
+        vistos += items
+        if cursor is None:
+            break
+
+    orden = [item['fecha_proyeccion_semana'] for item in vistos]
+    assert len(vistos) == 210 and orden == sorted(orden)
+    if campos:
+        assert all(set(item) == set(campos) for item in vistos)
+    else:
+        assert len({_clave(item) for item in vistos}) == 210
+
+
+def test_iterar_paginas_desde_un_cursor(fragmentada):
+    todos = DynamoDBService.listar_items(CRITERIO_SEMANA, "2025-W41")
+    primeros, cursor = DynamoDBService.listar_pagina(CRITERIO_SEMANA, "2025-W41", 50)
+
+    resto = [item for pagina in DynamoDBService.iterar_paginas(CRITERIO_SEMANA, "2025-W41", cursor) for item in pagina]
+
+    assert [item for pagina in DynamoDBService.iterar_paginas(CRITERIO_SEMANA, "2025-W41") for item in pagina] == todos
+    assert len(resto) == 160
+    assert {_clave(item) for item in primeros + resto} == {_clave(item) for item in todos}
+    assert primeros[-1]['fecha_proyeccion_semana'] <= resto[0]['fecha_proyeccion_semana']
+
+
+def test_cursores_de_otra_semana_o_de_otro_numero_de_fragmentos(fragmentada, fragmentar, cliente):
+    pagina = cliente.get("/proyecciones/semana/2025-W41", params={'limit': 25}).json()
+    cursor = pagina['siguiente_cursor']
+
+    siguiente = cliente.get("/proyecciones/semana/2025-W41", params={'limit': 25, 'cursor': cursor})
+    otra_semana = cliente.get("/proyecciones/semana/2025-W42", params={'limit': 5, 'cursor': cursor})
+    fragmentar(3, True)
+    otro_numero = cliente.get("/proyecciones/semana/2025-W41", params={'limit': 25, 'cursor': cursor})
+
+    assert len(pagina['items']) == 25 and cursor
+    assert siguiente.status_code == 200 and len(siguiente.json()['items']) == 25
+    assert (otra_semana.status_code, otro_numero.status_code) == (400, 400)
+
+
+def test_desviaciones_desde_el_indice_fragmentado(fragmentada, fila):
+    desviaciones = DynamoDBService.listar_desviaciones("2025-W41", Decimal("2.5"))
+
+    esperadas = {(d['tienda_id'], d['fecha_proyeccion']) for d in _filas(fila) if Decimal(d['diferencia_vs_real']) > Decimal("2.5")}
+    assert {(item['tienda_id'], item['fecha_proyeccion']) for item in desviaciones} == esperadas
+
+
+def test_cambiar_la_categoria_mueve_la_fila_de_fragmento(fragmentada, cliente):
+    respuesta = cliente.patch("/proyecciones/actualizar/T000/2025-10-06/2025-W41", json={'categoria_insumo': "nueva"})
+
+    item = config.get_table().get_item(Key={'tienda_id': "T000", 'fecha_proyeccion_semana': "2025-10-06#2025-W41"})['Item']
+    assert respuesta.status_code == 200
+    assert item['categoria_fragmento'].startswith("nueva#")
+    assert [_clave(p) for p in DynamoDBService.listar_items(CRITERIO_CATEGORIA, "nueva")] == \
+        [("T000", "2025-10-06#2025-W41")]
+
+
+def test_exporta_una_parte_por_fragmento(fragmentada, tmp_path):
+    salida = str(tmp_path / "semana")
+
+    checkpoint = exportacion.exportar(salida, semana="2025-W41")
+
+    filas = sum(len(gzip.decompress(open(exportacion.ruta_parte(salida, fragmento, "ndjson"), "rb").read()).splitlines())
+                for fragmento in range(4))
+    assert len(checkpoint['segmentos']) == 4 and filas == 210
@@ -0,0 +1,121 @@
+import csv
+import io
+import json
+import sys
+
+import pytest
+
+import importacion
+
+
+def _csv(filas):
+    buffer = io.StringIO()
+    escritor = csv.DictWriter(buffer, list(filas[0]))
+    escritor.writeheader()
+    escritor.writerows(filas)
+    return buffer.getvalue()
+
+
+def _filas(fila, n, invalidas=()):
+    filas = [fila(tienda_id=f"T{i % 5}", fecha_proyeccion=f"2025-10-{6 + i // 5 % 7:02d}", cantidad_estimada=str(i))
+             for i in range(n)]
+    for i in invalidas:
+        filas[i]['cantidad_estimada'] = "abc"
+    return filas
+
+
+def _importar(cliente, nombre, contenido, **params):
+    return cliente.post("/proyecciones/importar", params=params,
+                        files={'archivo': (nombre, contenido.encode(), "application/octet-stream")})
+
+
+def test_importa_csv_e_informa_filas_invalidas(cliente_backend, fila):
+    cliente = cliente_backend
+    filas = _filas(fila, 35, invalidas=(3, 20))
+    filas[10]['observaciones'] = ""
+
+    respuesta = _importar(cliente, "proyecciones.csv", _csv(filas), wcu=100000)
+
+    assert respuesta.status_code == 200
+    resumen = respuesta.json()
+    assert (resumen['leidas'], resumen['exitosas'], resumen['fallidas'], resumen['fila_confirmada']) == (35, 33, 2, 35)
+    assert [error['fila'] for error in resumen['errores']] == [4, 21]
+    assert "cantidad_estimada" in resumen['errores'][0]['error']
+    assert len(cliente.get("/proyecciones/listar").json()) == 33
+
+
+def test_ndjson_con_lineas_malformadas_y_desde_fila(cliente, fila):
+    lineas = [json.dumps(fila(tienda_id=f"N{i}")) for i in range(12)] + ["{malo", json.dumps([1]), ""]
+
+    resumen = _importar(cliente, "proyecciones.ndjson", "\n".join(lineas), desde_fila=10).json()
+
+    assert (resumen['leidas'], resumen['exitosas'], resumen['fallidas'], resumen['fila_confirmada']) == (4, 2, 2, 14)
+    assert [error['fila'] for error in resumen['errores']] == [13, 14]
+    assert sorted(p['tienda_id'] for p in cliente.get("/proyecciones/listar").json()) == ["N10", "N11"]
+
+
+def test_rechaza_formatos_no_soportados(cliente):
+    assert _importar(cliente, "proyecciones.txt", "").status_code == 400
+    assert _importar(cliente, "proyecciones.txt", "", formato="xml").status_code == 422
+    with pytest.raises(ValueError):
+        importacion.formato_de_archivo("proyecciones.xlsx")
+
+
+def _ejecutar_cli(monkeypatch, *argumentos):
+    monkeypatch.setattr(sys, 'argv', ["importacion.py", *map(str, argumentos)])
+    try:
+        importacion.main()
+    except SystemExit as e:
+        return e.code
+    return 0
+
+
+def test_cli_reanuda_desde_el_checkpoint_y_anota_errores(aws, fila, tmp_path, monkeypatch):
+    ruta = tmp_path / "proyecciones.csv"
+    ruta.write_text(_csv(_filas(fila, 35, invalidas=(3, 30))), encoding="utf-8")
+    checkpoint = tmp_path / "proyecciones.csv.checkpoint.json"
+    checkpoint.write_text(json.dumps({**importacion._identidad_archivo(str(ruta)), 'fila_confirmada': 25}))
+    errores = tmp_path / "errores.ndjson"
+
+    codigo = _ejecutar_cli(monkeypatch, ruta, "--errores", errores)
+
+    assert codigo == 1
+    assert aws.scan(Select='COUNT')['Count'] == 9
+    assert [json.loads(linea)['fila'] for linea in errores.read_text().splitlines()] == [31]
+    assert json.loads(checkpoint.read_text())['fila_confirmada'] == 35
+
+
+def test_cli_termina_sin_errores_y_guarda_el_checkpoint(aws, fila, tmp_path, monkeypatch):
+    ruta = tmp_path / "proyecciones.ndjson"
+    ruta.write_text("\n".join(json.dumps(f) for f in _filas(fila, 20)), encoding="utf-8")
+
+    codigo = _ejecutar_cli(monkeypatch, ruta)
+
+    assert codigo == 0
+    assert aws.scan(Select='COUNT')['Count'] == 20
+    assert json.loads((tmp_path / "proyecciones.ndjson.checkpoint.json").read_text())['fila_confirmada'] == 20
+
+
+def test_cli_rechaza_el_checkpoint_de_otro_archivo(aws, fila, tmp_path, monkeypatch):
+    ruta = tmp_path / "proyecciones.csv"
+    ruta.write_text(_csv(_filas(fila, 5)), encoding="utf-8")
+    (tmp_path / "proyecciones.csv.checkpoint.json").write_text(
+        json.dumps({**importacion._identidad_archivo(str(ruta)), 'tamano': 1, 'fila_confirmada': 3}))
+
+    codigo = _ejecutar_cli(monkeypatch, ruta)
+
+    assert "checkpoint" in str(codigo)
+    assert aws.scan(Select='COUNT')['Count'] == 0
+
+
+def test_checkpoint_avanza_solo_con_filas_contiguas():
+    estado = importacion.Importacion(desde_fila=10)
+
+    estado.resolver(12, None)
+    estado.resolver(13, "error")
+    confirmada_con_hueco = estado.fila_confirmada
+    estado.resolver(11, None)
+
+    assert confirmada_con_hueco == 10
+    assert estado.fila_confirmada == 13
+    assert (estado.exitosas, estado.fallidas) == (2, 1)
@@ -0,0 +1,134 @@
+import json
+import logging
+import re
+
+import pytest
+
+import instrumentacion
+from instrumentacion import FASE_CONVERSION, FASE_DYNAMODB, FASE_SERIALIZACION, Medicion
+
+
+def _server_timing(respuesta) -> dict:
+    """{métrica: {'dur': ms, 'desc': texto}} de la cabecera Server-Timing"""
+    metricas = {}
+    for nombre, atributos in re.findall(r'(\w+)((?:;\w+=(?:"[^"]*"|[^,;]*))*)', respuesta.headers['server-timing']):
+        metricas[nombre] = dict(re.findall(r';(\w+)=("[^"]*"|[^,;]*)', atributos))
+    return metricas
+
+
+def _metrica(texto: str, nombre: str, **etiquetas) -> float:
+    patron = re.escape(nombre + instrumentacion.MetricasPeticiones._etiquetas(**etiquetas)) + r" (\S+)"
+    encontrada = re.search(patron, texto)
+    return float(encontrada.group(1)) if encontrada else 0.0
+
+
+@pytest.fixture
+def sembrado(cliente, fila):
+    filas = [fila(tienda_id=f"T{tienda}", fecha_proyeccion=f"2025-10-{dia:02d}")
+             for tienda in range(5) for dia in range(6, 13)]
+    cliente.post("/proyecciones/registrar-lote", json=filas)
+    return cliente
+
+
+def test_server_timing_de_una_lectura(sembrado):
+    respuesta = sembrado.get("/proyecciones/semana/2025-W41")
+
+    metricas = _server_timing(respuesta)
+    assert len(respuesta.json()) == 35
+    assert float(metricas['total']['dur']) > 0
+    assert re.fullmatch(r'"\d+ llamadas, [1-9]\d* paginas"', metricas[FASE_DYNAMODB]['desc'])
+    assert FASE_SERIALIZACION in metricas
+    assert float(metricas['rcu']['desc'].strip('"')) > 0 and metricas['wcu']['desc'] == '"0"'
+
+
+def test_server_timing_de_escrituras_incluye_la_conversion(cliente, fila):
+    alta = cliente.post("/proyecciones/registrar", json=fila())
+    cambio = cliente.patch("/proyecciones/actualizar/T001/2025-10-06/2025-W41", json={'cantidad_estimada': "20"})
+
+    for respuesta in (alta, cambio):
+        metricas = _server_timing(respuesta)
+        assert FASE_CONVERSION in metricas and FASE_DYNAMODB in metricas
+        assert float(metricas['wcu']['desc'].strip('"')) > 0
+
+
+def test_escaneo_paralelo_suma_las_paginas_de_cada_hilo(sembrado):
+    metricas = _server_timing(sembrado.get("/proyecciones/listar"))
+
+    paginas = int(re.search(r"(\d+) paginas", metricas[FASE_DYNAMODB]['desc']).group(1))
+    assert paginas >= 2
+
+
+def test_log_json_por_peticion(sembrado, caplog):
+    with caplog.at_level(logging.INFO, logger='instrumentacion'):
+        sembrado.get("/proyecciones/listar/NOPE")
+
+    registro = json.loads(caplog.records[-1].getMessage())
+    assert registro['evento'] == "peticion"
+    assert (registro['ruta'], registro['path'], registro['estado']) == \
+        ("/proyecciones/listar/{tienda_id}", "/proyecciones/listar/NOPE", 404)
+    assert registro['dynamodb']['llamadas'] >= 1
+    assert {c['tabla'] for c in registro['dynamodb']['capacidad']} >= {"ProyeccionesInsumos"}
+    assert registro['fases_ms'][FASE_DYNAMODB] > 0
+
+
+def test_metricas_en_formato_prometheus(sembrado):
+    etiquetas = {'metodo': "GET", 'ruta': "/proyecciones/semana/{semana}"}
+    antes = sembrado.get("/metricas").text
+
+    sembrado.get("/proyecciones/semana/2025-W41")
+    sembrado.get("/proyecciones/semana/2025-W42")
+    respuesta = sembrado.get("/metricas")
+
+    texto = respuesta.text
+    assert respuesta.headers['content-type'].startswith("text/plain; version=0.0.4")
+    assert "# TYPE proyecciones_duracion_segundos histogram" in texto
+    for estado in (200, 404):
+        assert _metrica(texto, "proyecciones_peticiones_total", **etiquetas, estado=estado) == \
+            _metrica(antes, "proyecciones_peticiones_total", **etiquetas, estado=estado) + 1
+    assert _metrica(texto, "proyecciones_duracion_segundos_count", **etiquetas) == \
+        _metrica(antes, "proyecciones_duracion_segundos_count", **etiquetas) + 2
+    assert _metrica(texto, "proyecciones_duracion_segundos_bucket", **etiquetas, le="+Inf") == \
+        _metrica(texto, "proyecciones_duracion_segundos_count", **etiquetas)
+    assert _metrica(texto, "proyecciones_dynamodb_capacidad_total", **etiquetas,
+                    tabla="ProyeccionesInsumos", tipo="lectura") > 0
+
+
+def test_backend_en_memoria_no_registra_dynamodb(cliente_memoria, fila):
+    cliente_memoria.post("/proyecciones/registrar", json=fila())
+
+    metricas = _server_timing(cliente_memoria.get("/proyecciones/listar/T001"))
+
+    assert FASE_DYNAMODB not in metricas
+    assert metricas['rcu']['desc'] == '"0"'
+
+
+def test_fases_anidadas_cuentan_para_la_exterior():
+    medicion = Medicion()
+    token = instrumentacion._medicion.set(medicion)
+    try:
+        with instrumentacion.fase(FASE_SERIALIZACION):
+            with instrumentacion.fase(FASE_CONVERSION):
+                pass
+    finally:
+        instrumentacion._medicion.reset(token)
+
+    assert set(medicion.fases) == {FASE_SERIALIZACION}
+
+
+def test_fuera_de_una_peticion_no_mide():
+    with instrumentacion.fase(FASE_CONVERSION):
+        pass
+
+    assert instrumentacion.medicion_actual() is None
+    assert instrumentacion.medir_fase(FASE_CONVERSION)(lambda: 7)() == 7
+
+
+def test_capacidad_de_operaciones_por_lotes():
+    medicion = Medicion()
+
+    medicion.registrar_llamada('BatchWriteItem', 0.01, [{'TableName': "A", 'CapacityUnits': 2.0},
+                                                        {'TableName': "B", 'CapacityUnits': 1.0}])
+    medicion.registrar_llamada('Query', 0.01, {'TableName': "A", 'CapacityUnits': 0.5})
+
+    assert (medicion.unidades('escritura'), medicion.unidades('lectura')) == (3.0, 0.5)
+    assert (medicion.llamadas, medicion.paginas) == (2, 1)
@@ -0,0 +1,165 @@
+import pytest
+from botocore.awsrequest import AWSResponse
+
+import config
+import dynamodb_service
+import limitador
+from dynamodb_service import DynamoDBService
+from limitador import Limitador, LimitadorAdaptativo, FRACCION_MINIMA, RECUPERACION_SEGUNDOS
+from model import ProyeccionInsumo
+
+
+class Reloj:
+    """Reloj simulado: sleep avanza el tiempo y anota cada espera"""
+
+    def __init__(self):
+        self.ahora = 1000.0
+        self.esperas = []
+
+    def __call__(self):
+        return self.ahora
+
+    def dormir(self, segundos):
+        self.esperas.append(round(segundos, 6))
+        self.ahora += segundos
+
+
+@pytest.fixture
+def reloj(monkeypatch):
+    reloj = Reloj()
+    monkeypatch.setattr(limitador.time, 'monotonic', reloj)
+    monkeypatch.setattr(limitador.time, 'sleep', reloj.dormir)
+    return reloj
+
+
+def test_entrega_una_rafaga_y_despues_espera_al_ritmo(reloj):
+    ritmo = Limitador(10)
+
+    for _ in range(10):
+        ritmo.esperar()
+    ritmo.esperar()
+    ritmo.esperar()
+
+    assert reloj.esperas == [0.1, 0.1]
+
+
+def test_peticiones_mayores_que_la_cubeta_se_atienden_a_credito(reloj):
+    ritmo = Limitador(5)
+
+    ritmo.esperar(25)
+    ritmo.esperar(1)
+
+    assert reloj.esperas == [4.0, 0.2]
+
+
+def test_reducir_baja_a_la_mitad_y_se_recupera(reloj):
+    ritmo = LimitadorAdaptativo(100)
+
+    ritmo.reducir()
+    reducido = ritmo.ritmo_actual
+    ritmo.reducir()
+    doble = ritmo.ritmo_actual
+    reloj.ahora += RECUPERACION_SEGUNDOS / 4
+    recuperando = ritmo.ritmo_actual
+    reloj.ahora += RECUPERACION_SEGUNDOS
+    recuperado = ritmo.ritmo_actual
+
+    assert (reducido, doble, recuperando, recuperado) == (50, 25, 50, 100)
+    assert ritmo.rechazos == 2
+
+
+def test_el_ritmo_no_baja_del_minimo(reloj):
+    ritmo = LimitadorAdaptativo(100)
+
+    for _ in range(20):
+        ritmo.reducir()
+
+    assert ritmo.ritmo_actual == 100 * FRACCION_MINIMA
+
+
+def test_un_rechazo_descarta_las_fichas_acumuladas(reloj):
+    ritmo = LimitadorAdaptativo(10)
+
+    ritmo.reducir()
+    ritmo.esperar()
+
+    assert reloj.esperas == [0.2]
+
+
+def _estrangular(fallos: dict, codigo: str = 'ProvisionedThroughputExceededException'):
+    """Hace fallar por capacidad las próximas llamadas de cada operación indicada"""
+    def estrangular(model, **kwargs):
+        if fallos.get(model.name, 0) > 0:
+            fallos[model.name] -= 1
+            return AWSResponse('http://x', 400, {}, None), {
+                'Error': {'Code': codigo, 'Message': "limite"},
+                'ResponseMetadata': {'HTTPStatusCode': 400},
+            }
+    config.get_dynamodb().meta.client.meta.events.register_first('before-call.dynamodb.*', estrangular)
+
+
+@pytest.fixture
+def con_limite(aws, monkeypatch):
+    monkeypatch.setattr(dynamodb_service, 'ESCRITURA_WCU', "1000")
+    monkeypatch.setattr(DynamoDBService, '_espera_backoff', staticmethod(lambda intento: 0))
+    return aws
+
+
+def test_rechazos_por_capacidad_se_reintentan_y_reducen_el_ritmo(con_limite, cliente, fila):
+    _estrangular({'UpdateItem': 3})
+
+    respuesta = cliente.post("/proyecciones/registrar", json=fila())
+
+    limite = dynamodb_service._limitadores[config.DYNAMODB_TABLE_NAME]
+    assert respuesta.status_code == 200
+    assert limite.rechazos == 3 and limite.ritmo_actual < limite.maximo == 1000
+    assert len(cliente.get("/proyecciones/listar/T001").json()) == 1
+
+
+def test_capacidad_agotada_responde_503_con_retry_after(con_limite, cliente, fila, monkeypatch):
+    monkeypatch.setattr(dynamodb_service, 'BATCH_WRITE_MAX_REINTENTOS', 2)
+    _estrangular({'UpdateItem': 100})
+
+    respuesta = cliente.post("/proyecciones/registrar", json=fila())
+
+    assert respuesta.status_code == 503
+    assert int(respuesta.headers['retry-after']) > 0
+    assert "capacidad" in respuesta.json()['detail']
+
+
+def test_errores_no_reintentables_no_se_reintentan(con_limite, fila, operaciones):
+    _estrangular({'UpdateItem': 1}, codigo='ValidationException')
+
+    with pytest.raises(Exception):
+        DynamoDBService.crear_proyeccion(ProyeccionInsumo(**fila()))
+
+    assert [nombre for nombre, _ in operaciones].count('UpdateItem') == 1
+    assert dynamodb_service._limitadores[config.DYNAMODB_TABLE_NAME].rechazos == 0
+
+
+def test_lote_rechazado_por_capacidad_se_completa(con_limite, fila):
+    _estrangular({'BatchWriteItem': 2})
+
+    resultados = list(DynamoDBService.crear_proyecciones_lote(
+        ProyeccionInsumo(**fila(tienda_id=f"T{i}")) for i in range(30)
+    ))
+
+    assert all(error is None for _, error in resultados) and len(resultados) == 30
+    assert dynamodb_service._limitadores[config.DYNAMODB_TABLE_NAME].rechazos == 2
+    assert con_limite.scan(Select='COUNT')['Count'] == 30
+
+
+def test_modo_auto_usa_la_menor_capacidad_de_la_tabla_y_sus_indices(aws, monkeypatch):
+    monkeypatch.setattr(dynamodb_service, 'ESCRITURA_WCU', "auto")
+    tabla = config.get_dynamodb().meta.client.describe_table(TableName=config.DYNAMODB_TABLE_NAME)['Table']
+    capacidades = [tabla['ProvisionedThroughput']['WriteCapacityUnits']]
+    capacidades += [indice['ProvisionedThroughput']['WriteCapacityUnits'] for indice in tabla['GlobalSecondaryIndexes']]
+
+    limite = DynamoDBService._limitador(config.DYNAMODB_TABLE_NAME)
+
+    assert limite.maximo == min(capacidades)
+    assert DynamoDBService._limitador(config.DYNAMODB_TABLE_NAME) is limite
+
+
+def test_sin_limite_no_crea_limitador(aws):
+    assert DynamoDBService._limitador(config.DYNAMODB_TABLE_NAME) is None
@@ -0,0 +1,76 @@
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+import repositorio
+from dynamodb_service import DynamoDBService
+from memoria import RepositorioMemoria
+from model import ProyeccionInsumo
+from repositorio import CRITERIO_CATEGORIA, CRITERIO_SEMANA, CRITERIO_SEMANA_CATEGORIA, CRITERIO_TIENDA
+
+
+def _proyecciones(fila):
+    return [ProyeccionInsumo(**fila(tienda_id=f"T{tienda}", fecha_proyeccion=f"2025-10-{dia:02d}",
+                                    categoria_insumo="crepas" if dia % 2 else "bebidas",
+                                    cantidad_estimada=str(dia)))
+            for tienda in range(3) for dia in range(6, 13)]
+
+
+def _claves(items):
+    return sorted((item['tienda_id'], item['fecha_proyeccion_semana']) for item in items)
+
+
+def test_crear_repositorio_por_nombre():
+    assert isinstance(repositorio.crear_repositorio('memoria'), RepositorioMemoria)
+    assert isinstance(repositorio.crear_repositorio('dynamodb'), DynamoDBService)
+    with pytest.raises(ValueError):
+        repositorio.crear_repositorio('sqlite')
+
+
+def test_indices_se_mantienen_al_cambiar_y_borrar(fila):
+    repo = RepositorioMemoria()
+    list(repo.crear_proyecciones_lote(_proyecciones(fila)))
+
+    repo.actualizar_parcial("T0", "2025-10-07", "2025-W41", {'categoria_insumo': "waffles"})
+    borradas = repo.eliminar_por_tienda_y_semana("T2", "2025-W41")
+
+    assert borradas == 7
+    assert len(repo._items) == 14
+    assert set(repo._indices['tienda_id']) == {"T0", "T1"}
+    assert _claves(repo.listar_items(CRITERIO_CATEGORIA, "waffles")) == [("T0", "2025-10-07#2025-W41")]
+    assert len(repo.listar_items(CRITERIO_CATEGORIA, "crepas")) == 2 * 3 - 1
+    assert sum(len(claves) for claves in repo._indices['semana'].values()) == 14
+
+
+def test_mismos_resultados_que_dynamodb(aws, fila):
+    dynamodb, memoria = DynamoDBService(), RepositorioMemoria()
+    for repo in (dynamodb, memoria):
+        list(repo.crear_proyecciones_lote(_proyecciones(fila)))
+        repo.actualizar_parcial("T1", "2025-10-08", "2025-W41", {'cantidad_estimada': Decimal("30")})
+        repo.eliminar_por_tienda_y_semana("T2", "2025-W41")
+
+    for criterio, valor in [(CRITERIO_TIENDA, "T1"), (CRITERIO_SEMANA, "2025-W41"),
+                            (CRITERIO_SEMANA_CATEGORIA, ("2025-W41", "crepas"))]:
+        assert _claves(dynamodb.listar_items(criterio, valor)) == _claves(memoria.listar_items(criterio, valor))
+    assert [item['fecha_proyeccion'] for item in dynamodb.listar_items(CRITERIO_TIENDA, "T1")] == \
+        [item['fecha_proyeccion'] for item in memoria.listar_items(CRITERIO_TIENDA, "T1")]
+    resumen_dynamodb, resumen_memoria = dynamodb.obtener_resumen("2025-W41"), memoria.obtener_resumen("2025-W41")
+    assert resumen_dynamodb['filas'] == resumen_memoria['filas'] == 14
+    assert resumen_dynamodb['cantidad_estimada'] == resumen_memoria['cantidad_estimada']
+    assert _claves(dynamodb.listar_por_fechas(date(2025, 10, 7), date(2025, 10, 9))) == \
+        _claves(memoria.listar_por_fechas(date(2025, 10, 7), date(2025, 10, 9)))
+
+
+def test_api_con_backend_en_memoria(cliente_memoria, fila, memoria):
+    for dia in range(6, 9):
+        cliente_memoria.post("/proyecciones/registrar", json=fila(fecha_proyeccion=f"2025-10-{dia:02d}"))
+
+    pagina = cliente_memoria.get("/proyecciones/listar/T001", params={'limit': 2}).json()
+    actualizada = cliente_memoria.patch("/proyecciones/actualizar/T001/2025-10-06/2025-W41",
+                                        json={'cantidad_estimada': "20", 'version': 1})
+
+    assert [p['fecha_proyeccion'] for p in pagina['items']] == ["2025-10-06", "2025-10-07"]
+    assert actualizada.status_code == 200 and actualizada.json()['version'] == 2
+    assert cliente_memoria.get("/proyecciones/resumen/2025-W41/total").json()['filas'] == 3
+    assert len(memoria._items) == 3
@@ -0,0 +1,95 @@
+import sys
+from decimal import Decimal
+
+import pytest
+
+import migracion
+from dynamodb_service import DynamoDBService, CAMPOS_CANTIDAD
+from model import ProyeccionInsumo
+
+
+@pytest.fixture
+def heredadas(aws, fila):
+    """40 filas con las cantidades guardadas como texto, como antes de la migración"""
+    with aws.batch_writer() as lote:
+        for i in range(40):
+            item = DynamoDBService._proyeccion_to_item(ProyeccionInsumo(**fila(tienda_id=f"T{i:02d}")))
+            item.update({campo: str(item[campo]) for campo in CAMPOS_CANTIDAD})
+            item['diferencia_vs_real'] = str(i - 20)
+            lote.put_item(Item=item)
+    return aws
+
+
+def _item(tabla, tienda_id):
+    return tabla.get_item(Key={'tienda_id': tienda_id, 'fecha_proyeccion_semana': "2025-10-06#2025-W41"})['Item']
+
+
+def test_las_escrituras_nuevas_guardan_numeros(cliente, fila, aws):
+    cliente.post("/proyecciones/registrar", json=fila(cantidad_estimada="12.50"))
+
+    item = _item(aws, "T001")
+
+    assert all(isinstance(item[campo], Decimal) for campo in CAMPOS_CANTIDAD)
+
+
+def test_las_filas_en_texto_se_siguen_leyendo(heredadas, cliente):
+    proyeccion = cliente.get("/proyecciones/listar/T05").json()[0]
+
+    assert proyeccion['cantidad_estimada'] == "12.50" and proyeccion['diferencia_vs_real'] == "-15"
+
+
+def test_migra_por_tandas_y_reanuda_desde_el_checkpoint(heredadas, cliente, tmp_path):
+    ruta = str(tmp_path / "cantidades.json")
+    assert migracion.contar_pendientes(4, 2) == 40
+
+    parcial = migracion.migrar(ruta, 4, 2, limite_rcu=1)
+    assert parcial['limite_alcanzado'] and parcial['contadores']['migradas'] < 40
+
+    final = migracion.migrar(ruta, 4, 2)
+
+    assert final['contadores']['migradas'] == 40 and final['contadores']['errores'] == 0
+    assert all(datos['terminado'] for datos in final['segmentos'].values())
+    assert migracion.contar_pendientes(4, 2) == 0
+    assert isinstance(_item(heredadas, "T07")['cantidad_estimada'], Decimal)
+    desviadas = cliente.get("/proyecciones/semana/2025-W41/desviaciones", params={'minima': 10}).json()
+    assert len(desviadas) == 19
+
+
+def test_no_pisa_una_fila_que_cambio_despues_de_leerla(heredadas):
+    leida = dict(_item(heredadas, "T03"), cantidad_estimada="99")
+
+    assert migracion.migrar_item(leida) == 'cambiada'
+    assert _item(heredadas, "T03")['cantidad_estimada'] == "12.50"
+
+
+def test_informa_cantidades_que_no_son_numeros(heredadas):
+    heredadas.update_item(Key={'tienda_id': "T01", 'fecha_proyeccion_semana': "2025-10-06#2025-W41"},
+                          UpdateExpression="SET cantidad_estimada = :texto",
+                          ExpressionAttributeValues={':texto': "doce"})
+
+    assert migracion.migrar_item(_item(heredadas, "T01")) == 'error'
+    assert migracion.migrar_item(_item(heredadas, "T02")) == 'migrada'
+
+
+def test_el_checkpoint_fija_segmentos_y_tipo_de_migracion(heredadas, tmp_path):
+    ruta = str(tmp_path / "cantidades.json")
+    migracion.migrar(ruta, 2, 2)
+
+    with pytest.raises(ValueError, match="segmentos"):
+        migracion.migrar(ruta, 3, 2)
+    with pytest.raises(ValueError, match="otra migración"):
+        migracion.migrar(ruta, 2, 2, modo=migracion.MODO_FRAGMENTOS)
+
+
+def test_verificar_termina_con_error_si_quedan_filas(heredadas, tmp_path, monkeypatch):
+    def verificar():
+        monkeypatch.setattr(sys, 'argv', ['migracion.py', '--verificar', '--segmentos', '2'])
+        with pytest.raises(SystemExit) as salida:
+            migracion.main()
+        return salida.value.code
+
+    assert verificar() == 1
+    monkeypatch.setattr(sys, 'argv', ['migracion.py', '--segmentos', '2', '--checkpoint',
+                                      str(tmp_path / "cantidades.json")])
+    migracion.main()
+    assert verificar() == 0
@@ -0,0 +1,133 @@
+import pytest
+
+import config
+import dynamodb_service
+from dynamodb_service import DynamoDBService, TAMANO_LOTE_LECTURA
+from memoria import RepositorioMemoria
+from model import ProyeccionInsumo
+from proyecciones import MAX_CLAVES_CONSULTA
+
+
+class RecursoConLecturasParciales:
+    """Recurso de DynamoDB que deja sin procesar la mitad de las primeras lecturas en lote"""
+
+    def __init__(self, recurso, rechazos: int):
+        self._recurso = recurso
+        self.rechazos = rechazos
+        self.llamadas = 0
+
+    def __getattr__(self, nombre):
+        return getattr(self._recurso, nombre)
+
+    def batch_get_item(self, RequestItems):
+        self.llamadas += 1
+        (tabla, solicitud), = RequestItems.items()
+        if self.rechazos > 0 and len(solicitud['Keys']) > 1:
+            self.rechazos -= 1
+            mitad = len(solicitud['Keys']) // 2
+            respuesta = self._recurso.batch_get_item(RequestItems={tabla: dict(solicitud, Keys=solicitud['Keys'][:mitad])})
+            respuesta['UnprocessedKeys'] = {tabla: dict(solicitud, Keys=solicitud['Keys'][mitad:])}
+            return respuesta
+        return self._recurso.batch_get_item(RequestItems=RequestItems)
+
+
+def _clave(tienda, dia):
+    return {'tienda_id': f"T{tienda:03d}", 'fecha_proyeccion': f"2025-10-{dia:02d}", 'semana': "2025-W41"}
+
+
+@pytest.fixture
+def api(cliente_backend, fila):
+    """Cliente con 30 tiendas × 7 días registrados en el backend indicado"""
+    cliente = cliente_backend
+    filas = [fila(**_clave(tienda, dia), cantidad_estimada=str(tienda)) for tienda in range(30) for dia in range(6, 13)]
+    assert cliente.post("/proyecciones/registrar-lote", json=filas).json()['exitosas'] == 210
+    return cliente
+
+
+def test_devuelve_en_el_orden_de_las_claves_y_marca_las_faltantes(api):
+    claves = [_clave(tienda, dia) for tienda in reversed(range(30)) for dia in range(6, 13)]
+    claves.insert(100, _clave(99, 6))
+
+    respuesta = api.post("/proyecciones/obtener-lote", json=claves)
+
+    consulta = respuesta.json()
+    assert respuesta.status_code == 200
+    assert (consulta['total'], consulta['encontradas'], consulta['faltantes']) == (211, 210, 1)
+    assert [r['indice'] for r in consulta['resultados']] == list(range(211))
+    assert consulta['resultados'][100] == {'indice': 100, 'encontrada': False, 'proyeccion': None}
+    for clave, resultado in zip(claves, consulta['resultados']):
+        if resultado['encontrada']:
+            proyeccion = resultado['proyeccion']
+            assert (proyeccion['tienda_id'], proyeccion['fecha_proyeccion']) == (clave['tienda_id'], clave['fecha_proyeccion'])
+
+
+def test_claves_repetidas_devuelven_la_misma_fila(api):
+    claves = [_clave(3, 6), _clave(4, 7), _clave(3, 6)]
+
+    resultados = api.post("/proyecciones/obtener-lote", json=claves).json()['resultados']
+
+    assert resultados[0]['proyeccion'] == resultados[2]['proyeccion']
+    assert resultados[0]['proyeccion']['cantidad_estimada'] == "3"
+
+
+def test_campos_y_errores_de_validacion(api):
+    claves = [_clave(1, 6), _clave(2, 6)]
+
+    parcial = api.post("/proyecciones/obtener-lote", params={'fields': "tienda_id,cantidad_estimada"}, json=claves)
+
+    assert [r['proyeccion'] for r in parcial.json()['resultados']] == [
+        {'tienda_id': "T001", 'cantidad_estimada': "1"}, {'tienda_id': "T002", 'cantidad_estimada': "2"}]
+    assert api.post("/proyecciones/obtener-lote", params={'fields': "zz"}, json=claves).status_code == 400
+    assert api.post("/proyecciones/obtener-lote", json=[{'tienda_id': "T001"}]).status_code == 422
+    assert api.post("/proyecciones/obtener-lote", json=[_clave(1, 6)] * (MAX_CLAVES_CONSULTA + 1)).status_code == 422
+    assert api.post("/proyecciones/obtener-lote", json=[]).json() == \
+        {'total': 0, 'encontradas': 0, 'faltantes': 0, 'resultados': []}
+
+
+def test_lee_cada_clave_una_vez_en_bloques_de_100(aws, fila, operaciones):
+    list(DynamoDBService.crear_proyecciones_lote(
+        ProyeccionInsumo(**fila(tienda_id=f"T{tienda:03d}")) for tienda in range(250)))
+    operaciones.clear()
+
+    items = DynamoDBService.obtener_por_claves(
+        [(f"T{tienda % 250:03d}", "2025-10-06", "2025-W41", None) for tienda in range(500)])
+
+    bloques = [len(p['RequestItems'][config.DYNAMODB_TABLE_NAME]['Keys'])
+               for nombre, p in operaciones if nombre == 'BatchGetItem']
+    assert sorted(bloques) == [50, TAMANO_LOTE_LECTURA, TAMANO_LOTE_LECTURA]
+    assert all(item is not None for item in items) and items[0] == items[250]
+
+
+def test_reintenta_las_claves_no_procesadas(aws, fila, monkeypatch):
+    list(DynamoDBService.crear_proyecciones_lote(ProyeccionInsumo(**fila(fecha_proyeccion=f"2025-10-{dia:02d}"))
+                                                 for dia in range(6, 13)))
+    recurso = RecursoConLecturasParciales(dynamodb_service.get_dynamodb(), rechazos=2)
+    monkeypatch.setattr(dynamodb_service, 'get_dynamodb', lambda: recurso)
+    monkeypatch.setattr(DynamoDBService, '_espera_backoff', staticmethod(lambda intento: 0))
+
+    items = DynamoDBService.obtener_por_claves([("T001", f"2025-10-{dia:02d}", "2025-W41", None) for dia in range(6, 13)])
+
+    assert [item['fecha_proyeccion'] for item in items] == [f"2025-10-{dia:02d}" for dia in range(6, 13)]
+    assert recurso.llamadas == 3
+
+
+def test_agotar_los_reintentos_es_un_error_del_servidor(cliente, fila, monkeypatch):
+    cliente.post("/proyecciones/registrar-lote", json=[fila(**_clave(1, dia)) for dia in range(6, 9)])
+    recurso = RecursoConLecturasParciales(dynamodb_service.get_dynamodb(), rechazos=100)
+    monkeypatch.setattr(dynamodb_service, 'get_dynamodb', lambda: recurso)
+    monkeypatch.setattr(dynamodb_service, 'BATCH_WRITE_MAX_REINTENTOS', 1)
+    monkeypatch.setattr(DynamoDBService, '_espera_backoff', staticmethod(lambda intento: 0))
+
+    respuesta = cliente.post("/proyecciones/obtener-lote", json=[_clave(1, dia) for dia in range(6, 9)])
+
+    assert respuesta.status_code == 500 and "reintentos" in respuesta.json()['detail']
+
+
+def test_backend_en_memoria_proyecta_los_campos(fila):
+    repo = RepositorioMemoria()
+    repo.crear_proyeccion(ProyeccionInsumo(**fila()))
+
+    items = repo.obtener_por_claves([("T001", "2025-10-06", "2025-W41", None), ("X", "2025-10-06", "2025-W41", None)],
+                                    ("tienda_id",))
+
+    assert items == [{'tienda_id': "T001"}, None]
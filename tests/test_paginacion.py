@@ -0,0 +1,63 @@
+import json
+from datetime import date, timedelta
+
+import pytest
+
+
+@pytest.fixture
+def api(cliente_backend, fila):
+    """Cliente con 3 tiendas × 21 días (tres semanas) registrados en el backend indicado"""
+    cliente = cliente_backend
+    filas = [fila(tienda_id=f"T{tienda}", fecha_proyeccion=(date(2025, 10, 6) + timedelta(days=dia)).isoformat(),
+                  semana=f"2025-W{41 + dia // 7}")
+             for tienda in range(3) for dia in range(21)]
+    assert cliente.post("/proyecciones/registrar-lote", json=filas).json()['exitosas'] == 63
+    return cliente
+
+
+def _recorrer(cliente, url, limit):
+    vistas, paginas, cursor = [], 0, None
+    while True:
+        pagina = cliente.get(url, params={'limit': limit, **({'cursor': cursor} if cursor else {})}).json()
+        assert len(pagina['items']) <= limit
+        vistas += pagina['items']
+        paginas += 1
+        cursor = pagina['siguiente_cursor']
+        if cursor is None:
+            return vistas, paginas
+
+
+def test_pagina_el_listado_completo_sin_repetir_filas(api):
+    vistas, paginas = _recorrer(api, "/proyecciones/listar", 10)
+
+    assert len(vistas) == 63 and paginas >= 7
+    assert len({(p['tienda_id'], p['fecha_proyeccion']) for p in vistas}) == 63
+
+
+def test_pagina_por_tienda_en_orden_de_fecha(api):
+    vistas, _ = _recorrer(api, "/proyecciones/listar/T1", 5)
+
+    fechas = [p['fecha_proyeccion'] for p in vistas]
+    assert fechas == sorted(fechas) and len(fechas) == 21
+
+
+def test_sin_limit_devuelve_la_lista(api):
+    assert len(api.get("/proyecciones/semana/2025-W42").json()) == 21
+
+
+def test_rechaza_cursores_invalidos_o_de_otra_consulta(api):
+    cursor = api.get("/proyecciones/semana/2025-W41", params={'limit': 5}).json()['siguiente_cursor']
+
+    assert api.get("/proyecciones/listar", params={'cursor': "no-es-un-cursor"}).status_code == 400
+    assert api.get("/proyecciones/semana/2025-W42", params={'cursor': cursor}).status_code == 400
+    assert api.get("/proyecciones/listar", params={'limit': 0}).status_code == 422
+
+
+def test_ndjson_transmite_una_fila_por_linea(api):
+    respuesta = api.get("/proyecciones/listar/T2", params={'formato': 'ndjson'})
+
+    assert respuesta.headers['content-type'].startswith("application/x-ndjson")
+    lineas = respuesta.text.splitlines()
+    assert len(lineas) == 21 and {json.loads(linea)['tienda_id'] for linea in lineas} == {"T2"}
+    assert api.get("/proyecciones/semana/2030-W01", params={'formato': 'ndjson'}).text == ""
+    assert api.get("/proyecciones/listar", params={'formato': 'xml'}).status_code == 422
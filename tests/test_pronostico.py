@@ -0,0 +1,129 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+import numpy as np
+import pytest
+
+import pronostico
+from dynamodb_service import DynamoDBService
+from model import ProyeccionInsumo
+from repositorio import obtener_repositorio, CRITERIO_TIENDA_SEMANA
+
+LUNES = date(2025, 10, 6)  # 2025-W41
+
+
+def _historia(tienda_id="T1", categoria="crepas", semanas=8, valor=lambda fecha: 10, **campos):
+    filas = []
+    for dia in range(semanas * 7):
+        fecha = LUNES - timedelta(days=semanas * 7 - dia)
+        filas.append({'tienda_id': tienda_id, 'nombre_tienda': "Centro", 'categoria_insumo': categoria,
+                      'unidad_medida': "u", 'fecha_proyeccion': fecha.isoformat(),
+                      'estado_proyeccion': "confirmada", 'cantidad_consumida_real': Decimal(valor(fecha)),
+                      **campos})
+    return filas
+
+
+def test_fechas_de_semana_y_semana_iso():
+    fechas = pronostico.fechas_de_semana("2025-W41")
+
+    assert fechas[0] == LUNES and len(fechas) == 7
+    assert pronostico.semana_iso(fechas[-1]) == "2025-W41"
+    with pytest.raises(ValueError, match="Semana inválida"):
+        pronostico.fechas_de_semana("2025-41")
+
+
+def test_media_movil_reproduce_el_patron_semanal():
+    patron = np.array([1.0, 2, 3, 4, 5, 8, 9])
+    matriz = np.tile(patron, 4)[None, :]
+
+    assert np.allclose(pronostico.media_movil_semanal(matriz), patron)
+
+
+def test_los_huecos_se_completan_con_el_promedio_de_la_serie():
+    matriz = np.tile([2.0, 4, np.nan, 2, 4, 2, 4], 2)[None, :]
+    vacia = np.full((1, 14), np.nan)
+
+    assert pronostico.media_movil_semanal(matriz)[0, 2] == pytest.approx(3.0)
+    assert np.array_equal(pronostico.media_movil_semanal(vacia), np.zeros((1, 7)))
+
+
+def test_suavizado_de_una_serie_constante_es_constante():
+    matriz = np.full((3, 28), 7.0)
+
+    assert np.allclose(pronostico.suavizado_exponencial(matriz, 0.3), 7.0)
+
+
+def test_pronosticar_arma_una_fila_por_serie_y_dia():
+    historia = _historia(valor=lambda fecha: 15 if fecha.weekday() >= 5 else 10)
+    historia += _historia(tienda_id="T2", valor=lambda fecha: 4)
+
+    proyecciones = pronostico.pronosticar(historia, "2025-W41", fecha_generacion=date(2025, 10, 1))
+
+    assert len(proyecciones) == 14
+    t1 = {p.fecha_proyeccion.weekday(): p.cantidad_estimada for p in proyecciones if p.tienda_id == "T1"}
+    assert t1 == {dia: Decimal("15.00") if dia >= 5 else Decimal("10.00") for dia in range(7)}
+    primera = proyecciones[0]
+    assert primera.semana == "2025-W41" and primera.origen_modelo == "MediaMovilSemanal_v2.0"
+    assert primera.estado_proyeccion == pronostico.ESTADO_PENDIENTE
+    assert primera.fecha_generacion == date(2025, 10, 1) and primera.nombre_tienda == "Centro"
+
+
+def test_pronosticar_rechaza_metodos_desconocidos():
+    with pytest.raises(ValueError, match="Método desconocido"):
+        pronostico.pronosticar(_historia(), "2025-W41", metodo="arima")
+    assert pronostico.pronosticar([], "2025-W41") == []
+
+
+def test_el_historico_excluye_las_filas_sin_conciliar():
+    conciliadas = _historia(semanas=4, valor=lambda fecha: 10)
+    generadas = _historia(semanas=8, valor=lambda fecha: 0, estado_proyeccion=pronostico.ESTADO_PENDIENTE)[:28]
+
+    proyecciones = pronostico.pronosticar(conciliadas + generadas, "2025-W41")
+
+    assert {p.cantidad_estimada for p in proyecciones} == {Decimal("10.00")}
+    assert not pronostico.conciliada({'estado_proyeccion': "pendiente", 'cantidad_consumida_real': "0"})
+    assert pronostico.conciliada({'estado_proyeccion': "confirmada", 'cantidad_consumida_real': 0})
+
+
+def _escribir_historia(filas):
+    proyecciones = [ProyeccionInsumo(**{
+        **fila, 'semana': pronostico.semana_iso(date.fromisoformat(fila['fecha_proyeccion'])),
+        'cantidad_estimada': fila['cantidad_consumida_real'], 'origen_modelo': "m", 'fecha_generacion': "2025-08-01",
+        'cantidad_despachada': 0, 'diferencia_vs_real': 0, 'usuario_ajuste': "u", 'fecha_confirmacion': "2025-08-01",
+    }) for fila in filas]
+    assert all(error is None for _, error in DynamoDBService.crear_proyecciones_lote(proyecciones))
+
+
+def test_generar_tienda_escribe_la_semana(aws):
+    _escribir_historia(_historia(valor=lambda fecha: 6))
+
+    resultado = pronostico.generar_tienda("T1", "2025-W41")
+
+    assert resultado == {'filas': 7, 'exitosas': 7, 'fallidas': 0, 'primer_error': None}
+    semana = obtener_repositorio().listar_items(CRITERIO_TIENDA_SEMANA, ("T1", "2025-W41"))
+    assert len(semana) == 7 and {Decimal(p['cantidad_estimada']) for p in semana} == {Decimal(6)}
+
+
+def test_sin_categoria_en_la_clave_solo_escribe_una_categoria_por_fecha(aws):
+    historia = _historia(categoria="crepas") + _historia(categoria="waffles")
+
+    proyecciones = pronostico.pronosticar(historia, "2025-W41")
+    errores = pronostico._escribir(proyecciones)
+
+    assert len(proyecciones) == 14 and len(errores) == 7
+    assert all("waffles" in error and "CLAVE_CON_CATEGORIA" in error for error in errores)
+    semana = obtener_repositorio().listar_items(CRITERIO_TIENDA_SEMANA, ("T1", "2025-W41"))
+    assert {p['categoria_insumo'] for p in semana} == {"crepas"}
+
+
+def test_con_categoria_en_la_clave_escribe_todas(aws, clave_con_categoria):
+    historia = _historia(categoria="crepas") + _historia(categoria="waffles", valor=lambda fecha: 3)
+
+    errores = pronostico._escribir(pronostico.pronosticar(historia, "2025-W41"))
+
+    assert errores == []
+    semana = obtener_repositorio().listar_items(CRITERIO_TIENDA_SEMANA, ("T1", "2025-W41"))
+    assert len(semana) == 14
+    assert {p['fecha_proyeccion_semana'] for p in semana if p['fecha_proyeccion'] == "2025-10-06"} == {
+        "2025-10-06#2025-W41#crepas", "2025-10-06#2025-W41#waffles"
+    }
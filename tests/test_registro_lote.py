@@ -0,0 +1,88 @@
+from datetime import date, timedelta
+
+import dynamodb_service
+from dynamodb_service import DynamoDBService, TAMANO_LOTE_ESCRITURA
+from model import ProyeccionInsumo
+
+
+class RecursoConRechazos:
+    """Recurso de DynamoDB que deja sin procesar la segunda mitad de las primeras escrituras en lote"""
+
+    def __init__(self, recurso, rechazos: int):
+        self._recurso = recurso
+        self.rechazos = rechazos
+        self.llamadas = 0
+
+    def __getattr__(self, nombre):
+        return getattr(self._recurso, nombre)
+
+    def batch_write_item(self, RequestItems):
+        self.llamadas += 1
+        (tabla, solicitudes), = RequestItems.items()
+        if self.rechazos > 0 and len(solicitudes) > 1:
+            self.rechazos -= 1
+            mitad = len(solicitudes) // 2
+            respuesta = self._recurso.batch_write_item(RequestItems={tabla: solicitudes[:mitad]})
+            respuesta['UnprocessedItems'] = {tabla: solicitudes[mitad:]}
+            return respuesta
+        return self._recurso.batch_write_item(RequestItems=RequestItems)
+
+
+def _filas(fila, n):
+    return [fila(tienda_id=f"T{i % 7}", fecha_proyeccion=(date(2025, 10, 6) + timedelta(days=i // 7 % 7)).isoformat(),
+                 cantidad_estimada=str(i))
+            for i in range(n)]
+
+
+def test_registra_en_bloques_e_informa_cada_fila(cliente, fila):
+    filas = _filas(fila, 49) + [{"tienda_id": "T9"}]
+
+    respuesta = cliente.post("/proyecciones/registrar-lote", json=filas)
+
+    assert respuesta.status_code == 200
+    resumen = respuesta.json()
+    assert (resumen['total'], resumen['exitosas'], resumen['fallidas']) == (50, 49, 1)
+    assert [resultado['indice'] for resultado in resumen['resultados']] == list(range(50))
+    invalida = resumen['resultados'][49]
+    assert invalida['exito'] is False and invalida['tienda_id'] == "T9" and "fecha_proyeccion" in invalida['error']
+    assert len(cliente.get("/proyecciones/listar").json()) == 49
+
+
+def test_claves_repetidas_conservan_la_ultima_escritura(cliente, fila):
+    filas = [fila(cantidad_estimada="1"), fila(tienda_id="T002"), fila(cantidad_estimada="3")]
+
+    resumen = cliente.post("/proyecciones/registrar-lote", json=filas).json()
+
+    assert resumen['exitosas'] == 3
+    assert cliente.get("/proyecciones/listar/T001").json()[0]['cantidad_estimada'] == "3"
+
+
+def test_reintenta_las_filas_no_procesadas(aws, fila, monkeypatch):
+    recurso = RecursoConRechazos(dynamodb_service.get_dynamodb(), rechazos=2)
+    monkeypatch.setattr(dynamodb_service, 'get_dynamodb', lambda: recurso)
+    monkeypatch.setattr(DynamoDBService, '_espera_backoff', staticmethod(lambda intento: 0))
+
+    resultados = list(DynamoDBService.crear_proyecciones_lote(
+        ProyeccionInsumo(**datos) for datos in _filas(fila, TAMANO_LOTE_ESCRITURA)
+    ))
+
+    assert sorted(posicion for posicion, _ in resultados) == list(range(TAMANO_LOTE_ESCRITURA))
+    assert all(error is None for _, error in resultados)
+    assert recurso.llamadas == 3
+    assert aws.scan(Select='COUNT')['Count'] == TAMANO_LOTE_ESCRITURA
+
+
+def test_informa_las_filas_que_agotan_los_reintentos(aws, fila, monkeypatch):
+    recurso = RecursoConRechazos(dynamodb_service.get_dynamodb(), rechazos=100)
+    monkeypatch.setattr(dynamodb_service, 'get_dynamodb', lambda: recurso)
+    monkeypatch.setattr(dynamodb_service, 'BATCH_WRITE_MAX_REINTENTOS', 1)
+    monkeypatch.setattr(DynamoDBService, '_espera_backoff', staticmethod(lambda intento: 0))
+
+    resultados = dict(DynamoDBService.crear_proyecciones_lote(
+        ProyeccionInsumo(**datos) for datos in _filas(fila, 8)
+    ))
+
+    fallidas = [posicion for posicion, error in resultados.items() if error is not None]
+    assert len(resultados) == 8 and len(fallidas) == 2
+    assert "reintentos" in resultados[fallidas[0]]
+    assert aws.scan(Select='COUNT')['Count'] == 6
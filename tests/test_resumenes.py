@@ -0,0 +1,142 @@
+import sys
+import threading
+import time
+from decimal import Decimal
+
+import config
+import resumenes
+from dynamodb_service import AgrupadorResumenes, DeltasResumen, CAMPOS_RESUMEN
+
+
+def _sumas(proyecciones):
+    return {'filas': len(proyecciones),
+            **{campo: sum(Decimal(p[campo]) for p in proyecciones) for campo in CAMPOS_RESUMEN}}
+
+
+def _totales(respuesta):
+    return {campo: Decimal(str(valor)) if campo != 'filas' else valor for campo, valor in respuesta.items()}
+
+
+def test_las_escrituras_mantienen_los_totales(cliente, fila):
+    cliente.post("/proyecciones/registrar", json=fila(cantidad_estimada="10"))
+    cliente.post("/proyecciones/registrar", json=fila(fecha_proyeccion="2025-10-07", cantidad_estimada="5.5"))
+    cliente.post("/proyecciones/registrar-lote", json=[fila(tienda_id="T002", cantidad_estimada=str(i))
+                                                       for i in range(1, 4)])
+
+    total = _totales(cliente.get("/proyecciones/resumen/2025-W41/total").json())
+
+    assert total == _sumas(cliente.get("/proyecciones/semana/2025-W41").json())
+    assert total['filas'] == 3 and total['cantidad_estimada'] == Decimal("18.5")
+
+
+def test_reemplazar_una_fila_no_la_cuenta_dos_veces(cliente, fila):
+    cliente.post("/proyecciones/registrar", json=fila(cantidad_estimada="10"))
+    cliente.put("/proyecciones/actualizar", json=fila(cantidad_estimada="4", categoria_insumo="waffles"))
+
+    resumen = cliente.get("/proyecciones/resumen/2025-W41").json()
+
+    assert resumen['total']['filas'] == 1 and Decimal(resumen['total']['cantidad_estimada']) == 4
+    assert list(resumen['por_categoria']) == ["waffles"]
+    assert list(resumen['por_tienda']) == ["T001"]
+    assert cliente.get("/proyecciones/resumen/2025-W41/categoria/crepas").status_code == 404
+
+
+def test_eliminar_descuenta_y_oculta_las_dimensiones_vacias(cliente, fila):
+    cliente.post("/proyecciones/registrar-lote", json=[fila(tienda_id=t, cantidad_estimada="2") for t in ("A", "B")])
+
+    cliente.delete("/proyecciones/eliminar/A/2025-W41")
+
+    assert cliente.get("/proyecciones/resumen/2025-W41/total").json()['filas'] == 1
+    assert cliente.get("/proyecciones/resumen/2025-W41/tienda/A").status_code == 404
+    assert Decimal(cliente.get("/proyecciones/resumen/2025-W41/tienda/B").json()['cantidad_estimada']) == 2
+    assert cliente.get("/proyecciones/resumen/2030-W01/total").status_code == 404
+    assert cliente.get("/proyecciones/resumen/2030-W01").json()['total'] is None
+
+
+def _main(monkeypatch, *argumentos):
+    monkeypatch.setattr(sys, 'argv', ['resumenes.py', *argumentos])
+    try:
+        resumenes.main()
+    except SystemExit as e:
+        return e.code
+    return 0
+
+
+def test_reconstruir_corrige_los_resumenes_desviados(cliente, fila, monkeypatch):
+    cliente.post("/proyecciones/registrar-lote", json=[fila(tienda_id=f"T{i}") for i in range(5)])
+    assert _main(monkeypatch, "--verificar") == 0
+
+    tabla = config.get_tabla_resumen()
+    tabla.put_item(Item={'semana': "2025-W41", 'dimension': "total", 'filas': 1})
+    tabla.put_item(Item={'semana': "2025-W41", 'dimension': "tienda#fantasma", 'filas': 3})
+    assert _main(monkeypatch, "--verificar") == 1
+
+    assert _main(monkeypatch, "--semana", "2025-W41") == 0
+    assert _main(monkeypatch, "--verificar") == 0
+    assert cliente.get("/proyecciones/resumen/2025-W41/total").json()['filas'] == 5
+    assert cliente.get("/proyecciones/resumen/2025-W41/tienda/fantasma").status_code == 404
+
+
+def test_diferencias_describe_cada_desvio():
+    calculados = {("W1", "total"): {'filas': Decimal(2)}, ("W1", "tienda#A"): {'filas': Decimal(1)}}
+    guardados = {("W1", "total"): {'filas': Decimal(3)}, ("W1", "tienda#B"): {'filas': Decimal(1)}}
+
+    assert resumenes.diferencias(calculados, guardados) == [
+        ("W1", "tienda#A", "falta"),
+        ("W1", "tienda#B", "sobra (no hay proyecciones)"),
+        ("W1", "total", "difiere en filas"),
+    ]
+
+
+def test_una_carga_en_una_semana_nueva_solo_lee_las_claves_repetidas(cliente, fila, operaciones):
+    # 31 filas: dos bloques, el segundo repite la clave de la primera
+    filas = [fila(tienda_id=f"T{i:03d}") for i in range(30)] + [fila(tienda_id="T000", cantidad_estimada="3")]
+
+    cliente.post("/proyecciones/registrar-lote", json=filas)
+    cliente.post("/proyecciones/registrar-lote", json=[fila(tienda_id="T001", cantidad_estimada="4")])
+
+    lecturas = [len(parametros['RequestItems'][config.DYNAMODB_TABLE_NAME]['Keys'])
+                for nombre, parametros in operaciones
+                if nombre == 'BatchGetItem' and config.DYNAMODB_TABLE_NAME in parametros['RequestItems']]
+    total = _totales(cliente.get("/proyecciones/resumen/2025-W41/total").json())
+    assert lecturas == [1, 1]
+    assert total == _sumas(cliente.get("/proyecciones/semana/2025-W41").json()) and total['filas'] == 30
+
+
+def test_las_escrituras_concurrentes_comparten_la_aplicacion_de_los_resumenes(monkeypatch):
+    agrupador = AgrupadorResumenes()
+    aplicados = []
+    primero, liberar = threading.Event(), threading.Event()
+
+    def aplicar(deltas):
+        aplicados.append(deltas.resumenes()[("2025-W41", "total")]['filas'])
+        primero.set()
+        liberar.wait(5)
+
+    monkeypatch.setattr(DeltasResumen, 'aplicar', aplicar)
+    item = {'semana': "2025-W41", 'tienda_id': "T001", 'categoria_insumo': "crepas",
+            **{campo: Decimal(1) for campo in CAMPOS_RESUMEN}}
+    hilos = [threading.Thread(target=agrupador.aplicar, args=(item,)) for _ in range(4)]
+    hilos[0].start()
+    primero.wait(5)
+    for hilo in hilos[1:]:
+        hilo.start()
+    limite = time.monotonic() + 5
+    while agrupador._grupo['deltas'].resumenes().get(("2025-W41", "total"), {}).get('filas') != 3:
+        assert time.monotonic() < limite
+        time.sleep(0.01)
+    liberar.set()
+    for hilo in hilos:
+        hilo.join(5)
+
+    assert aplicados == [1, 3]
+
+
+def test_el_backend_en_memoria_mantiene_los_mismos_totales(cliente_memoria, fila):
+    cliente_memoria.post("/proyecciones/registrar", json=fila(cantidad_estimada="10"))
+    cliente_memoria.put("/proyecciones/actualizar", json=fila(cantidad_estimada="4"))
+    cliente_memoria.post("/proyecciones/registrar", json=fila(tienda_id="T002", cantidad_estimada="1"))
+
+    total = _totales(cliente_memoria.get("/proyecciones/resumen/2025-W41/total").json())
+
+    assert total == _sumas(cliente_memoria.get("/proyecciones/semana/2025-W41").json())
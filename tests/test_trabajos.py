@@ -0,0 +1,223 @@
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+
+import main
+import pronostico
+import trabajos
+from repositorio import obtener_repositorio
+
+INICIO = date(2025, 8, 11)  # 8 semanas antes de 2025-W41
+
+
+def _historia(fila, tiendas=4):
+    return [fila(tienda_id=f"T{tienda:02d}", fecha_proyeccion=(INICIO + timedelta(days=dia)).isoformat(),
+                 semana=pronostico.semana_iso(INICIO + timedelta(days=dia)),
+                 cantidad_consumida_real=str(10 + (5 if (INICIO + timedelta(days=dia)).weekday() >= 5 else 0) + tienda))
+            for tienda in range(tiendas) for dia in range(56)]
+
+
+@pytest.fixture
+def api(cliente_backend, fila):
+    """Cliente con 8 semanas de consumo real de 4 tiendas en el backend indicado"""
+    cliente = cliente_backend
+    assert cliente.post("/proyecciones/registrar-lote", json=_historia(fila)).json()['exitosas'] == 224
+    return cliente
+
+
+@pytest.fixture
+def lanzados(monkeypatch):
+    """Los trabajos no arrancan solos: se anotan y la prueba los ejecuta con trabajos.ejecutar"""
+    lanzados = []
+    monkeypatch.setattr(trabajos, 'lanzar', lanzados.append)
+    return lanzados
+
+
+def _esperar(cliente, trabajo_id, segundos=30.0):
+    limite = time.monotonic() + segundos
+    while True:
+        situacion = cliente.get(f"/proyecciones/generar/{trabajo_id}").json()
+        if situacion['estado'] in (trabajos.ESTADO_COMPLETADO, trabajos.ESTADO_CON_ERRORES):
+            return situacion
+        assert time.monotonic() < limite, "el trabajo no terminó a tiempo"
+        time.sleep(0.05)
+
+
+def test_el_trabajo_en_segundo_plano_genera_lo_mismo_que_pronosticar(api):
+    historia = obtener_repositorio().listar_por_fechas(INICIO, INICIO + timedelta(weeks=8), pronostico.CAMPOS_HISTORIA)
+    esperado = {(p.tienda_id, p.fecha_proyeccion.isoformat()): p.cantidad_estimada
+                for p in pronostico.pronosticar(historia, "2025-W41")}
+
+    respuesta = api.post("/proyecciones/generar", json={'semana': "2025-W41"})
+    situacion = _esperar(api, respuesta.json()['trabajo_id'])
+
+    assert respuesta.status_code == 202
+    assert situacion['estado'] == trabajos.ESTADO_COMPLETADO
+    assert (situacion['bloques'], situacion['bloques_completados'], situacion['progreso'], situacion['exitosas']) == \
+        (4, 4, 1.0, 28)
+    generadas = api.get("/proyecciones/semana/2025-W41").json()
+    assert {(p['tienda_id'], p['fecha_proyeccion']): Decimal(p['cantidad_estimada']) for p in generadas} == esperado
+
+
+def test_bloques_fallidos_y_reintento_de_solo_esos(aws, cliente, fila, lanzados, monkeypatch):
+    cliente.post("/proyecciones/registrar-lote", json=_historia(fila))
+    original = pronostico.generar_tienda
+    fallar, llamadas = {"T01", "T03"}, []
+
+    def generar_tienda(tienda_id, *args, **kwargs):
+        llamadas.append(tienda_id)
+        if tienda_id in fallar:
+            raise RuntimeError(f"fallo en {tienda_id}")
+        return original(tienda_id, *args, **kwargs)
+
+    monkeypatch.setattr(pronostico, 'generar_tienda', generar_tienda)
+    trabajo_id = cliente.post("/proyecciones/generar", json={'semana': "2025-W41"}).json()['trabajo_id']
+    trabajos.ejecutar(trabajo_id)
+    fallido = cliente.get(f"/proyecciones/generar/{trabajo_id}").json()
+    fallar.clear()
+    llamadas.clear()
+    reintento = cliente.post(f"/proyecciones/generar/{trabajo_id}/reintentar")
+    trabajos.ejecutar(trabajo_id)
+    final = cliente.get(f"/proyecciones/generar/{trabajo_id}").json()
+
+    assert fallido['estado'] == trabajos.ESTADO_CON_ERRORES and fallido['bloques_fallidos'] == 2
+    assert sorted(error['tienda_id'] for error in fallido['errores']) == ["T01", "T03"]
+    assert all(error['intentos'] == 1 and "fallo en" in error['error'] for error in fallido['errores'])
+    assert reintento.status_code == 202 and reintento.json()['estado'] == trabajos.ESTADO_PENDIENTE
+    assert sorted(llamadas) == ["T01", "T03"]
+    assert final['estado'] == trabajos.ESTADO_COMPLETADO and final['exitosas'] == 28
+    assert lanzados == [trabajo_id, trabajo_id]
+
+
+def test_las_tiendas_se_buscan_al_ejecutar_y_se_reutilizan(cliente, fila, lanzados, monkeypatch):
+    cliente.post("/proyecciones/registrar-lote", json=_historia(fila))
+    original = pronostico.tiendas_con_historia
+    busquedas = []
+    monkeypatch.setattr(pronostico, 'tiendas_con_historia',
+                        lambda *args: busquedas.append(args) or original(*args))
+    monkeypatch.setattr(pronostico, 'generar_tienda', lambda tienda_id, *args, **kwargs: (_ for _ in ()).throw(
+        RuntimeError("fallo")) if tienda_id == "T02" else {'filas': 7, 'exitosas': 7, 'fallidas': 0, 'primer_error': None})
+
+    creado = cliente.post("/proyecciones/generar", json={'semana': "2025-W41"}).json()
+    trabajos.ejecutar(creado['trabajo_id'])
+    cliente.post(f"/proyecciones/generar/{creado['trabajo_id']}/reintentar")
+    trabajos.ejecutar(creado['trabajo_id'])
+
+    assert (creado['estado'], creado['bloques'], creado['progreso']) == (trabajos.ESTADO_PENDIENTE, 0, 0.0)
+    assert busquedas == [("2025-W41", 8)]
+    trabajo, _ = obtener_repositorio().leer_trabajo(creado['trabajo_id'])
+    assert trabajo['tiendas'] == ["T00", "T01", "T02", "T03"]
+
+
+def test_un_fallo_al_buscar_las_tiendas_se_puede_reintentar(cliente, fila, lanzados, monkeypatch):
+    cliente.post("/proyecciones/registrar-lote", json=_historia(fila, tiendas=2))
+    original = pronostico.tiendas_con_historia
+
+    def sin_conexion(*args):
+        raise RuntimeError("sin conexión")
+
+    monkeypatch.setattr(pronostico, 'tiendas_con_historia', sin_conexion)
+    trabajo_id = cliente.post("/proyecciones/generar", json={'semana': "2025-W41"}).json()['trabajo_id']
+    trabajos.ejecutar(trabajo_id)
+    fallido = cliente.get(f"/proyecciones/generar/{trabajo_id}").json()
+    monkeypatch.setattr(pronostico, 'tiendas_con_historia', original)
+    reintento = cliente.post(f"/proyecciones/generar/{trabajo_id}/reintentar")
+    trabajos.ejecutar(trabajo_id)
+    final = cliente.get(f"/proyecciones/generar/{trabajo_id}").json()
+
+    assert fallido['estado'] == trabajos.ESTADO_CON_ERRORES and "sin conexión" in fallido['error']
+    assert reintento.status_code == 202
+    assert (final['estado'], final['bloques'], final['error']) == (trabajos.ESTADO_COMPLETADO, 2, None)
+
+
+def test_el_modo_lambda_sin_funcion_falla_sin_guardar_el_trabajo(cliente, monkeypatch):
+    monkeypatch.setattr(trabajos, 'TRABAJOS_MODO', trabajos.MODO_LAMBDA)
+    monkeypatch.setattr(trabajos, 'TRABAJOS_FUNCION', "")
+    guardados = []
+    monkeypatch.setattr(type(obtener_repositorio()), 'guardar_trabajo', lambda self, trabajo: guardados.append(trabajo))
+
+    respuesta = cliente.post("/proyecciones/generar", json={'semana': "2025-W41"})
+
+    assert respuesta.status_code == 500 and "TRABAJOS_FUNCION" in respuesta.json()['detail']
+    assert guardados == []
+
+
+def test_errores_de_la_api_de_trabajos(cliente, fila, lanzados):
+    cliente.post("/proyecciones/registrar-lote", json=_historia(fila, tiendas=1))
+    trabajo_id = cliente.post("/proyecciones/generar", json={'semana': "2025-W41"}).json()['trabajo_id']
+
+    en_curso = cliente.post(f"/proyecciones/generar/{trabajo_id}/reintentar")
+    trabajos.ejecutar(trabajo_id)
+    completado = cliente.post(f"/proyecciones/generar/{trabajo_id}/reintentar")
+
+    assert en_curso.status_code == 409 and completado.status_code == 409
+    assert cliente.get("/proyecciones/generar/no-existe").status_code == 404
+    assert cliente.post("/proyecciones/generar/no-existe/reintentar").status_code == 404
+    assert cliente.post("/proyecciones/generar", json={'semana': "2025-41"}).status_code == 400
+    assert cliente.post("/proyecciones/generar", json={'semana': "2025-W41", 'metodo': "otro"}).status_code == 422
+
+
+def test_un_trabajo_abandonado_se_puede_reintentar(cliente, fila, lanzados, monkeypatch):
+    cliente.post("/proyecciones/registrar-lote", json=_historia(fila, tiendas=1))
+    trabajo_id = cliente.post("/proyecciones/generar", json={'semana': "2025-W41"}).json()['trabajo_id']
+    monkeypatch.setattr(trabajos, 'INACTIVO_SEGUNDOS', 0)
+
+    respuesta = cliente.post(f"/proyecciones/generar/{trabajo_id}/reintentar")
+
+    assert respuesta.status_code == 202 and lanzados == [trabajo_id, trabajo_id]
+
+
+def test_sin_tiempo_disponible_procesa_un_bloque_y_se_vuelve_a_lanzar(cliente, fila, lanzados):
+    cliente.post("/proyecciones/registrar-lote", json=_historia(fila))
+    trabajo_id = cliente.post("/proyecciones/generar", json={'semana': "2025-W41"}).json()['trabajo_id']
+
+    trabajos.ejecutar(trabajo_id, 0.0)
+    interrumpido = cliente.get(f"/proyecciones/generar/{trabajo_id}").json()
+    for _ in range(3):
+        trabajos.ejecutar(trabajo_id, 0.0)
+
+    assert interrumpido['estado'] == trabajos.ESTADO_EN_CURSO
+    assert (interrumpido['bloques_completados'], interrumpido['bloques_pendientes']) == (1, 3)
+    assert lanzados == [trabajo_id] * 4
+    assert cliente.get(f"/proyecciones/generar/{trabajo_id}").json()['estado'] == trabajos.ESTADO_COMPLETADO
+
+
+def test_con_un_timeout_corto_el_margen_es_proporcional(cliente, fila, lanzados, monkeypatch):
+    cliente.post("/proyecciones/registrar-lote", json=_historia(fila, tiendas=2))
+    trabajo_id = cliente.post("/proyecciones/generar", json={'semana': "2025-W41"}).json()['trabajo_id']
+    disponibles = []
+    original = trabajos.ejecutar
+    monkeypatch.setattr(trabajos, 'ejecutar', lambda tid, segundos=None: (disponibles.append(segundos),
+                                                                          original(tid, segundos)))
+
+    trabajos.ejecutar_evento({trabajos.EVENTO_TRABAJO: trabajo_id}, 60.0)
+
+    assert disponibles == [pytest.approx(60.0 * (1 - trabajos.FRACCION_MARGEN_LAMBDA))]
+    assert cliente.get(f"/proyecciones/generar/{trabajo_id}").json()['estado'] == trabajos.ESTADO_COMPLETADO
+    assert lanzados == [trabajo_id]
+
+
+def test_el_handler_de_lambda_ejecuta_el_trabajo_con_margen(cliente, fila, lanzados):
+    class Contexto:
+        def get_remaining_time_in_millis(self):
+            return (trabajos.MARGEN_LAMBDA_SEGUNDOS + 600) * 1000
+
+    cliente.post("/proyecciones/registrar-lote", json=_historia(fila, tiendas=2))
+    trabajo_id = cliente.post("/proyecciones/generar", json={'semana': "2025-W41"}).json()['trabajo_id']
+
+    main.handler({trabajos.EVENTO_TRABAJO: trabajo_id}, Contexto())
+
+    assert cliente.get(f"/proyecciones/generar/{trabajo_id}").json()['estado'] == trabajos.ESTADO_COMPLETADO
+    assert lanzados == [trabajo_id]
+
+
+def test_descubre_tiendas_sin_resumenes_en_la_tabla(aws):
+    for tienda_id, fecha in (("T9", date(2025, 9, 29)), ("T8", date(2025, 9, 1))):
+        aws.put_item(Item={'tienda_id': tienda_id, 'fecha_proyeccion_semana': f"{fecha.isoformat()}#{pronostico.semana_iso(fecha)}",
+                           'fecha_proyeccion': fecha.isoformat(), 'categoria_insumo': "pan",
+                           'cantidad_estimada': Decimal("1")})
+
+    assert sorted(pronostico.tiendas_con_historia("2025-W41", 8)) == ["T8", "T9"]
+    assert pronostico.tiendas_con_historia("2025-W41", 1) == ["T9"]
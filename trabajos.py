@@ -0,0 +1,291 @@
+"""
+Trabajos de generación de proyecciones en segundo plano.
+
+POST /proyecciones/generar crea un trabajo y responde de inmediato con su id.
+El trabajo se divide en un bloque por tienda (las tiendas con histórico en las
+semanas previas, según los resúmenes semanales), que se buscan al empezar la
+ejecución y quedan guardadas en el trabajo: cada bloque lee el histórico de
+su tienda con una query sobre su partición, pronostica y escribe en lote.
+Los bloques se procesan con TRABAJOS_WORKERS hilos y cada uno guarda su
+resultado al terminar, así el avance sobrevive al proceso y reintentar un
+trabajo solo repite los bloques fallidos o sin procesar.
+
+En modo "hilo" el trabajo corre en un hilo del proceso (uvicorn). En modo
+"lambda" la función se invoca a sí misma de forma asíncrona con
+{"trabajo_generacion": <id>} (main.handler reconoce el evento); si el tiempo
+que le queda no alcanza, deja de tomar bloques y se vuelve a invocar para
+continuar. La función necesita permiso lambda:InvokeFunction sobre sí misma.
+"""
+import json
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from typing import Optional
+
+import pronostico
+from config import AWS_REGION, TRABAJOS_FUNCION, TRABAJOS_MODO, TRABAJOS_WORKERS
+from repositorio import obtener_repositorio
+
+# Clave del evento con el que la función Lambda se invoca a sí misma
+EVENTO_TRABAJO = "trabajo_generacion"
+
+MODO_HILO = "hilo"
+MODO_LAMBDA = "lambda"
+
+ESTADO_PENDIENTE = "pendiente"
+ESTADO_EN_CURSO = "en_curso"
+ESTADO_COMPLETADO = "completado"
+ESTADO_CON_ERRORES = "con_errores"
+
+BLOQUE_COMPLETADO = "completado"
+BLOQUE_FALLIDO = "fallido"
+
+# Días que se conservan los registros de un trabajo (TTL de la tabla)
+RETENCION_DIAS = 30
+
+# Tiempo de Lambda que se reserva para terminar los bloques en curso y
+# reinvocarse: FRACCION_MARGEN_LAMBDA del tiempo restante, como mucho
+# MARGEN_LAMBDA_SEGUNDOS (así también funciona con timeouts cortos)
+MARGEN_LAMBDA_SEGUNDOS = 90
+FRACCION_MARGEN_LAMBDA = 0.2
+
+# Un trabajo en curso sin bloques terminados en este tiempo se considera
+# abandonado (proceso reiniciado) y se puede reintentar
+INACTIVO_SEGUNDOS = 900
+
+# Bloques fallidos que se detallan en el estado
+MAX_ERRORES = 100
+
+logger = logging.getLogger(__name__)
+
+
+class ConflictoTrabajo(Exception):
+    """El trabajo sigue en curso o no tiene bloques que reintentar"""
+
+
+def _ahora() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def crear(semana: str, metodo: str, semanas_historia: int, alpha: float) -> dict:
+    """
+    Registra un trabajo, lo lanza y devuelve su estado inicial. Lanza
+    ValueError si la semana no es válida. Las tiendas (tiendas None) se buscan
+    al ejecutarlo, porque sin resúmenes la búsqueda escanea la tabla.
+    """
+    pronostico.fechas_de_semana(semana)
+    _comprobar_modo()
+    ahora = _ahora()
+    trabajo = {
+        'trabajo_id': uuid.uuid4().hex,
+        'estado': ESTADO_PENDIENTE,
+        'semana': semana,
+        'metodo': metodo,
+        'semanas_historia': semanas_historia,
+        'alpha': Decimal(str(alpha)),
+        'origen_modelo': pronostico.origen_modelo(metodo),
+        'fecha_generacion': date.today().isoformat(),
+        'tiendas': None,
+        'creado': ahora.isoformat(timespec='milliseconds'),
+        'iniciado': None,
+        'terminado': None,
+        'error': None,
+        'expira': int(ahora.timestamp()) + RETENCION_DIAS * 86400,
+    }
+    obtener_repositorio().guardar_trabajo(trabajo)
+    lanzar(trabajo['trabajo_id'])
+    return estado(trabajo['trabajo_id'])
+
+
+def _comprobar_modo():
+    """
+    Falla antes de guardar nada si TRABAJOS_MODO no permite lanzar trabajos,
+    así no quedan trabajos pendientes que nadie va a ejecutar
+    """
+    if TRABAJOS_MODO not in (MODO_HILO, MODO_LAMBDA):
+        raise Exception(f"Error al lanzar el trabajo: TRABAJOS_MODO debe ser "
+                        f"'{MODO_HILO}' o '{MODO_LAMBDA}', no '{TRABAJOS_MODO}'")
+    if TRABAJOS_MODO == MODO_LAMBDA and not TRABAJOS_FUNCION:
+        raise Exception("Error al lanzar el trabajo: TRABAJOS_MODO=lambda necesita TRABAJOS_FUNCION "
+                        "(o AWS_LAMBDA_FUNCTION_NAME, fuera de Lambda no existe)")
+
+
+def lanzar(trabajo_id: str):
+    """Pone en marcha la ejecución de un trabajo según TRABAJOS_MODO"""
+    _comprobar_modo()
+    if TRABAJOS_MODO == MODO_LAMBDA:
+        import boto3
+        boto3.client('lambda', region_name=AWS_REGION).invoke(
+            FunctionName=TRABAJOS_FUNCION,
+            InvocationType='Event',
+            Payload=json.dumps({EVENTO_TRABAJO: trabajo_id}).encode('utf-8')
+        )
+    else:
+        threading.Thread(target=ejecutar, args=(trabajo_id,), name=f"trabajo-{trabajo_id}", daemon=True).start()
+
+
+def _procesar_bloque(trabajo: dict, tienda_id: str, intentos: int):
+    """Genera la semana de una tienda y guarda el resultado del bloque"""
+    inicio = time.perf_counter()
+    try:
+        resultado = pronostico.generar_tienda(
+            tienda_id, trabajo['semana'], trabajo['metodo'], int(trabajo['semanas_historia']),
+            float(trabajo['alpha']), date.fromisoformat(trabajo['fecha_generacion'])
+        )
+        error = resultado['primer_error']
+    except Exception as e:
+        resultado = {'filas': 0, 'exitosas': 0, 'fallidas': 0}
+        error = str(e)
+    bloque = {
+        'tienda_id': tienda_id,
+        'estado': BLOQUE_COMPLETADO if error is None else BLOQUE_FALLIDO,
+        'filas': resultado['filas'],
+        'exitosas': resultado['exitosas'],
+        'fallidas': resultado['fallidas'],
+        'error': error,
+        'intentos': intentos,
+        'segundos': Decimal(f"{time.perf_counter() - inicio:.3f}"),
+        'terminado': _ahora().isoformat(timespec='milliseconds'),
+        'expira': trabajo['expira'],
+    }
+    try:
+        obtener_repositorio().guardar_bloque_trabajo(trabajo['trabajo_id'], bloque)
+    except Exception as e:
+        # Sin su resultado el bloque sigue pendiente y se repite al reintentar
+        logger.error("No se pudo guardar el bloque %s del trabajo %s: %s", tienda_id, trabajo['trabajo_id'], e)
+
+
+def ejecutar(trabajo_id: str, segundos_disponibles: Optional[float] = None):
+    """
+    Procesa los bloques no completados de un trabajo. Con segundos_disponibles
+    (Lambda), deja de tomar bloques al agotarse y se vuelve a lanzar; siempre
+    toma al menos uno, así cada invocación avanza aunque el tiempo no alcance.
+    """
+    repositorio = obtener_repositorio()
+    leido = repositorio.leer_trabajo(trabajo_id)
+    if leido is None:
+        logger.warning("Trabajo de generación %s no encontrado", trabajo_id)
+        return
+    trabajo, bloques = leido
+    trabajo['estado'] = ESTADO_EN_CURSO
+    trabajo['iniciado'] = trabajo['iniciado'] or _ahora().isoformat(timespec='milliseconds')
+    trabajo['error'] = None
+    repositorio.guardar_trabajo(trabajo)
+
+    if trabajo['tiendas'] is None:
+        # La lista se guarda: una reinvocación o un reintento repiten los mismos bloques
+        try:
+            trabajo['tiendas'] = pronostico.tiendas_con_historia(trabajo['semana'], int(trabajo['semanas_historia']))
+        except Exception as e:
+            logger.error("No se pudieron buscar las tiendas del trabajo %s: %s", trabajo_id, e)
+            trabajo['estado'] = ESTADO_CON_ERRORES
+            trabajo['error'] = f"Error al buscar las tiendas con histórico: {e}"
+            trabajo['terminado'] = _ahora().isoformat(timespec='milliseconds')
+            repositorio.guardar_trabajo(trabajo)
+            return
+        repositorio.guardar_trabajo(trabajo)
+
+    anteriores = {bloque['tienda_id']: bloque for bloque in bloques}
+    pendientes = [tienda_id for tienda_id in trabajo['tiendas']
+                  if anteriores.get(tienda_id, {}).get('estado') != BLOQUE_COMPLETADO]
+
+    limite = time.monotonic() + segundos_disponibles if segundos_disponibles is not None else None
+    interrumpido = False
+    with ThreadPoolExecutor(max_workers=TRABAJOS_WORKERS) as executor:
+        en_vuelo = set()
+        for posicion, tienda_id in enumerate(pendientes):
+            if posicion and limite is not None and time.monotonic() >= limite:
+                interrumpido = True
+                break
+            if len(en_vuelo) >= TRABAJOS_WORKERS:
+                _, en_vuelo = wait(en_vuelo, return_when=FIRST_COMPLETED)
+            intentos = int(anteriores.get(tienda_id, {}).get('intentos', 0)) + 1
+            en_vuelo.add(executor.submit(_procesar_bloque, trabajo, tienda_id, intentos))
+
+    if interrumpido:
+        lanzar(trabajo_id)
+        return
+
+    _, bloques = repositorio.leer_trabajo(trabajo_id)
+    completados = sum(1 for bloque in bloques if bloque['estado'] == BLOQUE_COMPLETADO)
+    trabajo['estado'] = ESTADO_COMPLETADO if completados == len(trabajo['tiendas']) else ESTADO_CON_ERRORES
+    trabajo['terminado'] = _ahora().isoformat(timespec='milliseconds')
+    repositorio.guardar_trabajo(trabajo)
+
+
+def ejecutar_evento(evento: dict, segundos_restantes: float):
+    """Atiende la invocación asíncrona de Lambda que ejecuta un trabajo"""
+    margen = min(MARGEN_LAMBDA_SEGUNDOS, FRACCION_MARGEN_LAMBDA * segundos_restantes)
+    ejecutar(evento[EVENTO_TRABAJO], max(0.0, segundos_restantes - margen))
+
+
+def estado(trabajo_id: str) -> Optional[dict]:
+    """Avance, filas, ritmo y bloques fallidos de un trabajo (forma de EstadoTrabajo); None si no existe"""
+    leido = obtener_repositorio().leer_trabajo(trabajo_id)
+    if leido is None:
+        return None
+    trabajo, bloques = leido
+    completados = [bloque for bloque in bloques if bloque['estado'] == BLOQUE_COMPLETADO]
+    fallidos = [bloque for bloque in bloques if bloque['estado'] == BLOQUE_FALLIDO]
+    buscadas = trabajo['tiendas'] is not None
+    total = len(trabajo['tiendas']) if buscadas else 0
+    exitosas = sum(int(bloque['exitosas']) for bloque in bloques)
+
+    segundos = 0.0
+    if trabajo['iniciado']:
+        fin = datetime.fromisoformat(trabajo['terminado']) if trabajo['terminado'] else _ahora()
+        segundos = max(0.0, (fin - datetime.fromisoformat(trabajo['iniciado'])).total_seconds())
+    ultimo_avance = max([bloque['terminado'] for bloque in bloques]
+                        + [trabajo['iniciado'] or trabajo['creado']])
+    return {
+        'trabajo_id': trabajo['trabajo_id'],
+        'estado': trabajo['estado'],
+        'semana': trabajo['semana'],
+        'origen_modelo': trabajo['origen_modelo'],
+        'creado': trabajo['creado'],
+        'iniciado': trabajo['iniciado'],
+        'terminado': trabajo['terminado'],
+        'ultimo_avance': ultimo_avance,
+        'bloques': total,
+        'bloques_completados': len(completados),
+        'bloques_fallidos': len(fallidos),
+        'bloques_pendientes': total - len(completados) - len(fallidos),
+        'progreso': round((len(completados) + len(fallidos)) / total, 4) if total else float(buscadas),
+        'filas': sum(int(bloque['filas']) for bloque in bloques),
+        'exitosas': exitosas,
+        'fallidas': sum(int(bloque['fallidas']) for bloque in bloques),
+        'segundos': round(segundos, 3),
+        'filas_por_segundo': round(exitosas / segundos, 1) if segundos else None,
+        'error': trabajo.get('error'),
+        'errores': [{'tienda_id': bloque['tienda_id'], 'error': bloque['error'], 'intentos': int(bloque['intentos'])}
+                    for bloque in fallidos[:MAX_ERRORES]],
+    }
+
+
+def reintentar(trabajo_id: str) -> Optional[dict]:
+    """
+    Vuelve a lanzar un trabajo para procesar solo sus bloques fallidos o
+    pendientes (o repetir la búsqueda de tiendas si fue eso lo que falló).
+    None si no existe; ConflictoTrabajo si sigue en curso o si todos sus
+    bloques están completados.
+    """
+    situacion = estado(trabajo_id)
+    if situacion is None:
+        return None
+    inactivo = (_ahora() - datetime.fromisoformat(situacion['ultimo_avance'])).total_seconds()
+    if situacion['estado'] in (ESTADO_PENDIENTE, ESTADO_EN_CURSO) and inactivo < INACTIVO_SEGUNDOS:
+        raise ConflictoTrabajo("El trabajo sigue en curso")
+    trabajo, _ = obtener_repositorio().leer_trabajo(trabajo_id)
+    if trabajo['tiendas'] is not None and situacion['bloques_completados'] == situacion['bloques']:
+        raise ConflictoTrabajo("El trabajo no tiene bloques fallidos ni pendientes")
+    _comprobar_modo()
+
+    trabajo['estado'] = ESTADO_PENDIENTE
+    trabajo['terminado'] = None
+    obtener_repositorio().guardar_trabajo(trabajo)
+    lanzar(trabajo_id)
+    return estado(trabajo_id)